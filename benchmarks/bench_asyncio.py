@@ -0,0 +1,147 @@
+"""Compare CPU time per message of threaded and asyncio websocket connectors.
+
+A local server process streams messages to ``n_connectors`` connections; the benchmark then
+measures the client process' CPU time until all messages were handled, once using
+:class:`thoth.core.websocket.WebSocketConnector` threads and once using
+:class:`thoth.core.aiowebsocket.AsyncWebSocketConnector` instances on a single event loop.
+
+Usage::
+
+    python benchmarks/bench_asyncio.py [n_connectors] [n_messages_per_connector]
+"""
+
+# Import Built-Ins
+import asyncio
+import multiprocessing
+import sys
+import threading
+import time
+
+# Import Third-Party
+from autobahn.asyncio.websocket import WebSocketServerProtocol, WebSocketServerFactory
+
+# Import Home-grown
+from thoth.core.websocket import WebSocketConnector
+from thoth.core.aiowebsocket import AsyncWebSocketConnector
+
+PAYLOAD = ('{"e":"trade","E":123456789,"s":"BNBBTC","t":12345,"p":"0.001","q":"100",'
+           '"b":88,"a":50,"T":123456785,"m":true,"M":true}').encode('UTF-8')
+
+
+def serve(port, n_messages, ready):
+    """Run a server sending ``n_messages`` to each client upon connection."""
+    class StreamProtocol(WebSocketServerProtocol):
+        """Stream the payload, yielding to the loop every 100 messages."""
+
+        def onOpen(self):  # pylint: disable=invalid-name
+            """Start streaming."""
+            asyncio.ensure_future(self.stream())
+
+        async def stream(self):
+            """Send the payload ``n_messages`` times."""
+            for i in range(n_messages):
+                self.sendMessage(PAYLOAD)
+                if i % 100 == 0:
+                    await asyncio.sleep(0)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    factory = WebSocketServerFactory()
+    factory.protocol = StreamProtocol
+    loop.run_until_complete(loop.create_server(factory, '127.0.0.1', port))
+    ready.set()
+    loop.run_forever()
+
+
+class CountingMixin:
+    """Count messages instead of pushing them to a DataNode."""
+
+    target = 0
+    done = None
+
+    def _on_message(self, ws, data):
+        self.last_seen = 0
+        self.count = getattr(self, 'count', 0) + 1
+        if self.count == self.target:
+            self.done()
+
+
+class ThreadedCounter(CountingMixin, WebSocketConnector):
+    """Threaded counting connector."""
+
+
+class AsyncCounter(CountingMixin, AsyncWebSocketConnector):
+    """Asyncio counting connector."""
+
+
+def bench_threaded(url, n_connectors, n_messages):
+    """Return CPU seconds spent handling all messages with threaded connectors."""
+    finished = threading.Semaphore(0)
+    connectors = []
+    for i in range(n_connectors):
+        connector = ThreadedCounter(url, zmq_addr='inproc://bench_thread_%s' % i)
+        connector.target, connector.done = n_messages, finished.release
+        connectors.append(connector)
+    start = time.process_time()
+    for connector in connectors:
+        connector.start()
+    for _ in connectors:
+        finished.acquire()
+    elapsed = time.process_time() - start
+    for connector in connectors:
+        connector.disconnect()
+    return elapsed
+
+
+def bench_async(url, n_connectors, n_messages):
+    """Return CPU seconds spent handling all messages with connectors on one event loop."""
+    loop = asyncio.new_event_loop()
+    remaining = [n_connectors]
+    finished = loop.create_future()
+
+    def done():
+        remaining[0] -= 1
+        if not remaining[0]:
+            finished.set_result(True)
+
+    connectors = []
+    for i in range(n_connectors):
+        connector = AsyncCounter(url, zmq_addr='inproc://bench_async_%s' % i)
+        connector.target, connector.done = n_messages, done
+        connectors.append(connector)
+    start = time.process_time()
+    for connector in connectors:
+        connector.start(loop)
+    loop.run_until_complete(finished)
+    elapsed = time.process_time() - start
+    for connector in connectors:
+        connector.stop()
+    loop.run_until_complete(asyncio.sleep(0.1))
+    loop.close()
+    return elapsed
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_connectors = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    n_messages = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    total = n_connectors * n_messages
+
+    results = {}
+    for name, bench, port in (('threaded', bench_threaded, 18765),
+                              ('asyncio', bench_async, 18766)):
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(port, n_messages, ready),
+                                         daemon=True)
+        server.start()
+        ready.wait()
+        results[name] = bench('ws://127.0.0.1:%s' % port, n_connectors, n_messages)
+        server.terminate()
+
+    print("connectors: %d, messages: %d" % (n_connectors, total))
+    for name, cpu in results.items():
+        print("%-9s %8.3fs CPU  %8.2f us/msg" % (name, cpu, cpu / total * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare PUSH/PULL throughput of single-message and micro-batched pushes.
+
+Usage::
+
+    python benchmarks/bench_batching.py [n_messages] [batch_size]
+"""
+
+# Import Built-Ins
+import multiprocessing
+import sys
+import time
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.core.batching import PushBatcher, iter_messages
+
+FRAMES = [b'diff_book_BNBBTC',
+          b'{"e":"depthUpdate","E":123456789,"s":"BNBBTC","U":157,"u":160,'
+          b'"b":[["0.0024","10"]],"a":[["0.0026","100"]]}',
+          b'1514764800.123456']
+
+
+ADDR = 'ipc:///tmp/thoth_bench_batching'
+
+
+def receive(n_messages):
+    """Receive ``n_messages``, unpacking batches as :class:`thoth.DataNode` does."""
+    ctx = zmq.Context()
+    pull = ctx.socket(zmq.PULL)
+    pull.connect(ADDR)
+    received = 0
+    while received < n_messages:
+        received += sum(1 for _ in iter_messages(pull.recv_multipart()))
+    pull.close()
+    ctx.term()
+
+
+def bench(n_messages, batch_size):
+    """Return the time in seconds it took to push and receive ``n_messages``."""
+    ctx = zmq.Context()
+    push = ctx.socket(zmq.PUSH)
+    push.bind(ADDR)
+    receiver = multiprocessing.Process(target=receive, args=(n_messages,))
+    receiver.start()
+    send = PushBatcher(push, batch_size).push if batch_size else push.send_multipart
+    start = time.perf_counter()
+    for _ in range(n_messages):
+        send(FRAMES)
+    receiver.join()
+    elapsed = time.perf_counter() - start
+    push.close()
+    ctx.term()
+    return elapsed
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    for name, size in (('unbatched', None), ('batch_size=%d' % batch_size, batch_size)):
+        elapsed = bench(n_messages, size)
+        print("%-16s %10.0f msg/s  %6.2f us/msg" % (name, n_messages / elapsed,
+                                                    elapsed / n_messages * 1e6))
+
+
+if __name__ == '__main__':
+    main()
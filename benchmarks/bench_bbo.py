@@ -0,0 +1,80 @@
+"""Compare consuming full order books with consuming change-suppressed BBO records.
+
+Simulates a Bitstamp-like ``order_book`` stream of 100-level books, where updates mostly
+touch levels near, but not always at, the top of the book. Reports the number of messages and
+the time a BBO-only consumer spends decoding them, for the book stream and for the ``bbo/``
+stream of a :class:`thoth.core.bbo.BBOTracker`.
+
+Usage::
+
+    python benchmarks/bench_bbo.py [n_updates]
+"""
+
+# Import Built-Ins
+import json
+import random
+import sys
+import time
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.bbo import BBOTracker
+
+DEPTH = 100
+
+
+def make_books(n_updates):
+    """Return a list of JSON-encoded books, each differing from the last in one level."""
+    rand = random.Random(42)
+    bids = [['%.2f' % (1000 - i * 0.01), '%.8f' % rand.uniform(0.1, 5)] for i in range(DEPTH)]
+    asks = [['%.2f' % (1000.01 + i * 0.01), '%.8f' % rand.uniform(0.1, 5)] for i in range(DEPTH)]
+    books = []
+    for _ in range(n_updates):
+        side = rand.choice((bids, asks))
+        side[min(int(rand.expovariate(0.1)), DEPTH - 1)][1] = '%.8f' % rand.uniform(0.1, 5)
+        books.append(json.dumps({'timestamp': str(int(time.time())), 'bids': bids,
+                                 'asks': asks}).encode())
+    return books
+
+
+def consume_books(books):
+    """Decode full books, keeping the top of book."""
+    start = time.perf_counter()
+    for data in books:
+        book = json.loads(data)
+        _ = book['bids'][0], book['asks'][0]
+    return time.perf_counter() - start
+
+
+def consume_bbos(records):
+    """Decode BBO records."""
+    start = time.perf_counter()
+    for data in records:
+        _ = json.loads(data)
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    books = make_books(n_updates)
+    tracker = BBOTracker()
+    start = time.perf_counter()
+    records = [json.dumps(bbo).encode() for bbo in
+               (tracker.update('order_book/data', data) for data in books) if bbo is not None]
+    extract = time.perf_counter() - start
+
+    book_bytes, bbo_bytes = sum(map(len, books)), sum(map(len, records))
+    book_time, bbo_time = consume_books(books), consume_bbos(records)
+    print("book stream: %6s messages %10s bytes, consumer decoding %7.1f ms" % (
+        len(books), book_bytes, book_time * 1e3))
+    print("bbo stream:  %6s messages %10s bytes, consumer decoding %7.1f ms" % (
+        len(records), bbo_bytes, bbo_time * 1e3))
+    print("messages: %.1fx fewer, bytes: %.0fx fewer, decoding: %.0fx faster per consumer" % (
+        len(books) / len(records), book_bytes / bbo_bytes, book_time / bbo_time))
+    print("one-off extraction by the BBO stage: %.1f ms" % (extract * 1e3))
+
+
+if __name__ == '__main__':
+    main()
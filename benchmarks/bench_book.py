@@ -0,0 +1,107 @@
+"""Compare re-sorting a dict-based book on every update with :class:`thoth.core.book.OrderBook`.
+
+For books of various depths, random diffs (size changes, removals and new levels) are applied,
+each followed by reading the top level and the top 10 levels of both sides.
+
+Adding and removing levels is timed separately as well, comparing a flat sorted list - whose
+inserts and deletes move all following keys - with the chunked keys of
+:class:`thoth.core.book.BookSide`.
+
+Usage::
+
+    python benchmarks/bench_book.py [n_updates]
+"""
+
+# Import Built-Ins
+import random
+import sys
+import time
+from bisect import bisect_left, insort
+from functools import partial
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.book import OrderBook, _SortedKeys
+
+
+def make_updates(depth, n_updates):
+    """Return an initial book and a list of (side, price, size) updates."""
+    rand = random.Random(depth)
+    bids = [('%.8f' % (1 - i * 1e-5), '%.4f' % rand.uniform(0.1, 10), '0') for i in range(depth)]
+    asks = [('%.8f' % (1 + i * 1e-5), '%.4f' % rand.uniform(0.1, 10), '0') for i in range(depth)]
+    updates = []
+    for _ in range(n_updates):
+        side = rand.choice(('bids', 'asks'))
+        offset = rand.randrange(int(depth * 1.1)) * 1e-5
+        price = '%.8f' % (1 - offset if side == 'bids' else 1 + offset)
+        size = '0.00' if rand.random() < 0.2 else '%.4f' % rand.uniform(0.1, 10)
+        updates.append((side, price, size))
+    return bids, asks, updates
+
+
+def bench_sorted_dict(bids, asks, updates):
+    """Apply updates to dicts and sort both sides after each, like HitBTC used to."""
+    book = {'bids': {b[0]: b for b in bids}, 'asks': {a[0]: a for a in asks}}
+    start = time.perf_counter()
+    for side, price, size in updates:
+        if size == '0.00':
+            book[side].pop(price, None)
+        else:
+            book[side][price] = (price, size, '1')
+        prepped_bids = sorted(book['bids'].values(), key=lambda x: float(x[0]), reverse=True)
+        prepped_asks = sorted(book['asks'].values(), key=lambda x: float(x[0]))
+        _ = prepped_bids[0], prepped_asks[0], prepped_bids[:10], prepped_asks[:10]
+    return (time.perf_counter() - start) / len(updates)
+
+
+def bench_order_book(bids, asks, updates):
+    """Apply updates to an OrderBook, reading the top levels after each."""
+    book = OrderBook()
+    book.snapshot(bids, asks)
+    update = {'bids': book.update_bid, 'asks': book.update_ask}
+    start = time.perf_counter()
+    for side, price, size in updates:
+        update[side](price, size, '1')
+        _ = book.best_bid(), book.best_ask(), book.top(10)
+    return (time.perf_counter() - start) / len(updates)
+
+
+def bench_add_remove(keys, depth, n_ops):
+    """Remove a random level and add it back, n_ops times; return the time per operation."""
+    rand = random.Random(depth)
+    picks = [rand.randrange(depth) for _ in range(n_ops)]
+    if isinstance(keys, list):
+        def remove(key):
+            """Delete the key from the flat list."""
+            del keys[bisect_left(keys, key)]
+        add = partial(insort, keys)
+    else:
+        remove, add = keys.remove, keys.add
+    start = time.perf_counter()
+    for key in picks:
+        remove(key)
+        add(key)
+    return (time.perf_counter() - start) / (2 * n_ops)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print("%6s  %14s  %14s" % ('depth', 'sorted dict', 'OrderBook'))
+    for depth in (100, 1000, 5000, 20000):
+        bids, asks, updates = make_updates(depth, n_updates)
+        old = bench_sorted_dict(bids, asks, updates)
+        new = bench_order_book(bids, asks, updates)
+        print("%6s  %11.1f us  %11.2f us  (%.0fx)" % (depth, old * 1e6, new * 1e6, old / new))
+
+    print()
+    print("%7s  %14s  %14s" % ('depth', 'flat list', 'chunked keys'))
+    for depth in (1000, 10000, 100000, 1000000):
+        flat = bench_add_remove(list(range(depth)), depth, n_updates * 10)
+        chunked = bench_add_remove(_SortedKeys(range(depth)), depth, n_updates * 10)
+        print("%7s  %11.3f us  %11.3f us" % (depth, flat * 1e6, chunked * 1e6))
+
+
+if __name__ == '__main__':
+    main()
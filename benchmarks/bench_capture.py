@@ -0,0 +1,79 @@
+"""Compare capturing messages to memory-mapped segments with writing them to a file.
+
+Writes messages of typical depth update size and reports the throughput and latency
+percentiles of a single write, for :class:`thoth.core.capture.CaptureWriter` and for
+:meth:`io.BufferedWriter.write` of the same records, flushed after each batch of 100 messages.
+
+Usage::
+
+    python benchmarks/bench_capture.py [n_messages]
+"""
+
+# Import Built-Ins
+import os
+import sys
+import tempfile
+import time
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.batching import RECORD_HEADER
+from thoth.core.capture import CaptureWriter
+from thoth.core.frames import pack_frames
+
+DATA = (b'{"e":"depthUpdate","E":1523000000000,"s":"BNBBTC","U":157,"u":160,'
+        b'"b":[["0.0024","10"],["0.0023","120"]],"a":[["0.0026","100"],["0.0027","0"]]}')
+
+
+def report(name, durations):
+    """Print throughput and latency percentiles of the given write durations."""
+    durations = sorted(durations)
+    n = len(durations)
+    print("%-8s %9.0f msg/s  p50 %5.2f us  p99 %6.2f us  p99.99 %7.2f us  max %8.1f us" % (
+        name, n / sum(durations), durations[n // 2] * 1e6, durations[int(n * 0.99)] * 1e6,
+        durations[int(n * 0.9999)] * 1e6, durations[-1] * 1e6))
+
+
+def bench_capture(directory, messages):
+    """Return the durations of capturing each message."""
+    writer = CaptureWriter(directory, segment_size=256 * 1024 * 1024)
+    writer.start()
+    write, clock = writer.write, time.perf_counter
+    durations = []
+    for topic, data, ts in messages:
+        start = clock()
+        write(topic, data, ts)
+        durations.append(clock() - start)
+    writer.stop()
+    return durations
+
+
+def bench_file(directory, messages):
+    """Return the durations of writing each message to a buffered file."""
+    durations = []
+    clock = time.perf_counter
+    with open(os.path.join(directory, 'capture.bin'), 'wb') as f:
+        for i, (topic, data, ts) in enumerate(messages):
+            start = clock()
+            f.write(RECORD_HEADER.pack(len(topic), len(data), len(ts)))
+            f.write(topic)
+            f.write(data)
+            f.write(ts)
+            if not i % 100:
+                f.flush()
+            durations.append(clock() - start)
+    return durations
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    messages = [pack_frames('diff_book_BNBBTC', DATA, time.time_ns()) for _ in range(n_messages)]
+    with tempfile.TemporaryDirectory() as directory:
+        report('file', bench_file(directory, messages))
+        report('capture', bench_capture(directory, messages))
+
+
+if __name__ == '__main__':
+    main()
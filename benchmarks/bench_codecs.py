@@ -0,0 +1,65 @@
+"""Compare encode/decode throughput and message size of the ThothEnvelope codecs.
+
+Payloads are a 20-level Binance depth snapshot and a Binance trade, each once as the raw
+payload with its reception timestamp (as published by :class:`thoth.DataNode`) and once as
+decoded Python structure. The struct codec only supports raw payloads.
+
+Usage::
+
+    python benchmarks/bench_codecs.py [n_messages]
+"""
+
+# Import Built-Ins
+import json
+import sys
+import time
+
+# Import Home-grown
+from thoth.core.codecs import get_codec
+from thoth.core.structs import ThothEnvelope
+
+TRADE = {"e": "trade", "E": 1514764800123, "s": "BNBBTC", "t": 12345, "p": "0.00106930",
+         "q": "100.00000000", "b": 88, "a": 50, "T": 1514764800120, "m": True, "M": True}
+BOOK = {"lastUpdateId": 160,
+        "bids": [["0.%08d" % (106930 - i), "%d.00000000" % (i * 7 + 1)] for i in range(20)],
+        "asks": [["0.%08d" % (106931 + i), "%d.00000000" % (i * 5 + 3)] for i in range(20)]}
+
+
+def bench(codec, topic, data, n_messages):
+    """Return encode and decode rate in messages per second, as well as the message size."""
+    envelope = ThothEnvelope(topic, 'DataNode', data, codec=codec)
+    start = time.perf_counter()
+    for _ in range(n_messages):
+        frames = envelope.convert_to_frames()
+    encode = n_messages / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(n_messages):
+        ThothEnvelope.load_from_frames(frames)
+    decode = n_messages / (time.perf_counter() - start)
+    return encode, decode, sum(len(f) for f in frames)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    ts = time.time_ns()
+    cases = [('book raw', 'book_BNBBTC', (json.dumps(BOOK).encode(), ts)),
+             ('trade raw', 'trades_BNBBTC', (json.dumps(TRADE).encode(), ts)),
+             ('book struct', 'book_BNBBTC', (BOOK, ts)),
+             ('trade struct', 'trades_BNBBTC', (TRADE, ts))]
+    print("%-14s %-8s %12s %12s %8s" % ('payload', 'codec', 'encode/s', 'decode/s', 'bytes'))
+    for name, topic, data in cases:
+        for codec in ('json', 'msgpack', 'struct'):
+            if codec == 'struct' and not isinstance(data[0], bytes):
+                continue
+            try:
+                get_codec(codec)
+            except ValueError:
+                print("%-14s %-8s not available" % (name, codec))
+                continue
+            encode, decode, size = bench(codec, topic, data, n_messages)
+            print("%-14s %-8s %12.0f %12.0f %8d" % (name, codec, encode, decode, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Measure the end-to-end load capacity of connectors and a :class:`thoth.DataNode`, offline.
+
+Runs a :class:`thoth.testing.exchange.FakeExchange` in a separate process and points the real
+connectors at it; their messages are received by a :class:`thoth.DataNode` whose publisher
+serializes each envelope and records how long ago the fake exchange sent the message.
+
+Reports, per scenario, the messages per second processed, the p50/p99/p999 end-to-end latency
+from the exchange's send to the node's publish, and the CPU time spent per message by the
+client process (connector and node; the exchange's CPU time is not included).
+
+Scenarios are given as ``<feed>[:<variant>]``; feeds are ``binance``, ``gdax``, ``bitfinex`` and
+``bitstamp``, variants ``thread`` (default) and ``async``. Bitstamp is served via the Pusher
+protocol and has no async variant; Bitfinex is received by a generic connector pushing raw
+channel data.
+
+Usage::
+
+    python benchmarks/bench_e2e.py [--rate N] [--burst N] [--count N] [--sample-interval N]
+                                   [scenario ..]
+
+``--rate`` is messages per second (default: 2000; 0 sends as fast as possible, measuring the
+maximum throughput rather than latency); with ``--burst``, messages are sent back-to-back in
+bursts of that size, at the same average rate. With ``--sample-interval``, connectors trace every
+n-th message and the node records per-stage latencies (see :mod:`thoth.core.stats`), which are
+reported as well.
+"""
+
+# Import Built-Ins
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.connectors.binance import BinanceConnector, AsyncBinanceConnector
+from thoth.connectors.bitstamp import BitstampConnector
+from thoth.connectors.gdax import GDAXConnector, AsyncGDAXConnector
+from thoth.core.aiowebsocket import AsyncWebSocketConnector
+from thoth.core.node import DataNode
+from thoth.core.receiver import PullReceiver
+from thoth.core.stats import LatencyStats, STATS_TOPIC
+from thoth.testing.exchange import FEEDS, start_exchange_process
+
+
+class LatencyPublisher:
+    """Publisher stand-in serializing envelopes and recording their end-to-end latency."""
+
+    name = 'LatencyPublisher'
+
+    def __init__(self, sent_at):
+        """Initialize the instance.
+
+        :param sent_at: callable extracting the send time from a message's data
+        """
+        self.sent_at = sent_at
+        self.latencies = []
+
+    def start(self):
+        """Nothing to start."""
+
+    def stop(self):
+        """Nothing to stop."""
+
+    def publish(self, envelope):
+        """Serialize the envelope and record its latency."""
+        envelope.convert_to_frames()
+        if envelope.topic == STATS_TOPIC:
+            return
+        data, _ = envelope.data
+        self.latencies.append(time.time_ns() - self.sent_at(data))
+
+
+class RawConnector(AsyncWebSocketConnector):
+    """Subscribe to the given channels and push channel data untouched, by channel id."""
+
+    def __init__(self, url, subscriptions, **conn_ops):
+        """Initialize the instance."""
+        super(RawConnector, self).__init__(url, **conn_ops)
+        self.subscriptions = subscriptions
+
+    def _on_open(self, ws):
+        """Subscribe to all channels."""
+        super(RawConnector, self)._on_open(ws)
+        for subscription in self.subscriptions:
+            self.send(subscription)
+
+    def _on_message(self, ws, data):
+        """Push list messages to ``raw_<chanId>``."""
+        if data[:1] == b'[':
+            topic = 'raw_' + data[1:data.index(b',')].decode()
+            super(RawConnector, self)._on_message(ws, (topic, data, time.time_ns()))
+
+
+def make_connector(feed, variant, port, addr, ctx, sample_interval=None):
+    """Return the connector for the scenario, pointed at the fake exchange."""
+    url = 'ws://127.0.0.1:%d' % port
+    conn_ops = dict(zmq_addr=addr, ctx=ctx, sample_interval=sample_interval)
+    if feed == 'bitstamp':
+        return BitstampConnector(custom_host='127.0.0.1', port=port, secure=False,
+                                 log_level=logging.WARNING, **conn_ops)
+    if feed == 'bitfinex':
+        return RawConnector(url, [{'event': 'subscribe', 'channel': 'book', 'symbol': 'tBTCUSD'}],
+                            **conn_ops)
+    threaded = variant == 'thread'
+    if feed == 'binance':
+        cls = BinanceConnector if threaded else AsyncBinanceConnector
+        conn = cls(['bnbbtc', 'ethbtc'], **conn_ops)
+        conn.url = url + '/stream?streams=bnbbtc@depth/ethbtc@depth'
+    else:
+        cls = GDAXConnector if threaded else AsyncGDAXConnector
+        conn = cls(['BTC-USD', 'ETH-USD'], **conn_ops)
+        conn.url = url
+    return conn
+
+
+def run_connector(conn):
+    """Start the connector; return a callable stopping it."""
+    if not isinstance(conn, AsyncWebSocketConnector):
+        conn.start()
+        return conn.stop
+
+    loop = asyncio.new_event_loop()
+    runner = threading.Thread(target=loop.run_forever, daemon=True)
+    runner.start()
+    asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result()
+    loop.call_soon_threadsafe(conn.start, loop)
+
+    def stop():
+        """Stop the connector, then its event loop."""
+        loop.call_soon_threadsafe(conn.stop)
+        # Let the cancelled connection task finish before stopping the loop
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.1), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        runner.join()
+        loop.close()
+
+    return stop
+
+
+def percentile(values, q):
+    """Return the q-th percentile of the sorted values."""
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def bench(scenario, rate, burst, count, run, sample_interval=None):
+    """Run the scenario and return its results."""
+    feed, _, variant = scenario.partition(':')
+    variant = variant or 'thread'
+    exchange, port = start_exchange_process(feed, rate=rate or None, burst=burst, count=count)
+    ctx = zmq.Context.instance()
+    addr = 'inproc://bench_e2e_%s' % run
+    publisher = LatencyPublisher(FEEDS[feed].sent_at)
+    conn = make_connector(feed, variant, port, addr, ctx, sample_interval)
+    stats = LatencyStats() if sample_interval else None
+    node = DataNode('BenchNode', receiver=PullReceiver(addr, ctx=ctx), publisher=publisher,
+                    stats=stats)
+    node.start()
+    runner = threading.Thread(target=node.run)
+    runner.start()
+
+    cpu, start = time.process_time(), time.perf_counter()
+    stop_connector = run_connector(conn)
+    deadline = start + 60
+    # Connectors may push a few messages of their own; wait for all messages of the feed
+    while len(publisher.latencies) < count and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+
+    stop_connector()
+    node._running = False  # pylint: disable=protected-access
+    runner.join()
+    node.stop()
+    exchange.terminate()
+    exchange.join()
+
+    latencies = sorted(publisher.latencies)
+    n = len(latencies)
+    return {'scenario': scenario, 'messages': n, 'rate': n / elapsed,
+            'p50': percentile(latencies, 0.5) / 1e3, 'p99': percentile(latencies, 0.99) / 1e3,
+            'p999': percentile(latencies, 0.999) / 1e3, 'cpu': cpu / n * 1e6 if n else 0,
+            'stages': stats.snapshot()['connectors'] if stats else {}}
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rate', type=float, default=2000)
+    parser.add_argument('--burst', type=int, default=1)
+    parser.add_argument('--count', type=int, default=50000)
+    parser.add_argument('--sample-interval', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="print results as JSON lines")
+    parser.add_argument('scenarios', nargs='*', default=['binance', 'binance:async', 'gdax',
+                                                         'gdax:async', 'bitfinex', 'bitstamp'])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    for run, scenario in enumerate(args.scenarios):
+        result = bench(scenario, args.rate, args.burst, args.count, run, args.sample_interval)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print("%(scenario)-14s %(messages)7d msgs %(rate)9.0f msg/s  p50 %(p50)9.0f us  "
+                  "p99 %(p99)9.0f us  p999 %(p999)9.0f us  cpu %(cpu)6.1f us/msg" % result)
+            for connector, stages in result['stages'].items():
+                print("    %s: %s" % (connector, '  '.join(
+                    '%s p50 %.0f p99 %.0f us' % (stage, summary['p50'] / 1e3,
+                                                 summary['p99'] / 1e3)
+                    for stage, summary in stages.items())))
+
+
+if __name__ == '__main__':
+    main()
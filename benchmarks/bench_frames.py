@@ -0,0 +1,63 @@
+"""Compare the former text frame path with the raw-bytes, binary-timestamp frame path.
+
+Measures the connector side (building and sending frames) and the node side (receiving
+frames and extracting the payload and timestamp) for a typical depth update payload.
+
+Usage::
+
+    python benchmarks/bench_frames.py [n_messages] [payload_size]
+"""
+
+# Import Built-Ins
+import sys
+import time
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.core.frames import pack_frames, send_frames, unpack_ts
+
+
+def text_path(push, pull, payload, n_messages):
+    """Former path: decode payload, re-encode it and send the timestamp as text."""
+    start = time.perf_counter()
+    for _ in range(n_messages):
+        data = payload.decode('UTF-8')
+        recv_at = time.time()
+        push.send_multipart([b'diff_book_BNBBTC', data.encode('UTF-8'),
+                             str(recv_at).encode('UTF-8')])
+        _, data, ts = pull.recv_multipart()
+        data, ts = data.decode('UTF-8'), float(ts.decode('UTF-8'))
+    return time.perf_counter() - start
+
+
+def raw_path(push, pull, payload, n_messages):
+    """New path: pass the payload untouched and send the timestamp as packed integer."""
+    start = time.perf_counter()
+    for _ in range(n_messages):
+        send_frames(push, pack_frames(b'diff_book_BNBBTC', payload, time.time_ns()))
+        _, data, ts = pull.recv_multipart(copy=False)
+        ts = unpack_ts(ts)
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    payload_size = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    payload = (b'{"e":"depthUpdate","b":[' + b'["0.0024","10"],' * (payload_size // 16) +
+               b'["0.0024","10"]]}')
+
+    ctx = zmq.Context()
+    push, pull = ctx.socket(zmq.PUSH), ctx.socket(zmq.PULL)
+    push.bind('inproc://bench_frames')
+    pull.connect('inproc://bench_frames')
+    print("payload: %d bytes, messages: %d" % (len(payload), n_messages))
+    for name, path in (('text', text_path), ('raw', raw_path)):
+        elapsed = path(push, pull, payload, n_messages)
+        print("%-5s %6.2f us/msg" % (name, elapsed / n_messages * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Measure the startup cost of importing Thoth in a fresh interpreter.
+
+Runs each statement in a new ``python`` process, and reports the median wall time over
+``n_runs`` runs, less the time of starting an interpreter which imports nothing. A sidecar
+process only running a single exchange pays for ``import thoth`` and its connector's
+dependencies, not for those of every connector.
+
+Usage::
+
+    python benchmarks/bench_import.py [n_runs]
+"""
+
+# Import Built-Ins
+import statistics
+import subprocess
+import sys
+import time
+
+# Import Third-Party
+
+# Import Home-grown
+
+STATEMENTS = [('import thoth', 'import thoth'),
+              ('import thoth.connectors', 'import thoth.connectors'),
+              ('get_connector(binance)',
+               'from thoth.connectors import get_connector; get_connector("binance")'),
+              ('get_connector(bitstamp)',
+               'from thoth.connectors import get_connector; get_connector("bitstamp")'),
+              ('all connectors',
+               'from thoth import connectors; '
+               '[connectors.get_connector(n) for n in connectors.available_connectors()]')]
+
+
+def run(statement, n_runs):
+    """Return the median wall time in seconds of running the statement in a new process."""
+    times = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    """Run the benchmark."""
+    n_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    baseline = run('pass', n_runs)
+    print('interpreter start-up: %8.1fms' % (baseline * 1e3))
+    for name, statement in STATEMENTS:
+        print('%-24s %8.1fms' % (name + ':', (run(statement, n_runs) - baseline) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
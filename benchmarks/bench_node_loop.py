@@ -0,0 +1,114 @@
+"""Compare the polling and the poller-based :meth:`thoth.DataNode.run` loops.
+
+Reports the CPU used by an idle node and the throughput of a saturated node, publishing to a
+publisher stand-in that only counts envelopes.
+
+Usage::
+
+    python benchmarks/bench_node_loop.py [n_messages]
+"""
+
+# Import Built-Ins
+import queue
+import sys
+import threading
+import time
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.core.node import DataNode
+from thoth.core.frames import pack_frames
+from thoth.core.receiver import PullReceiver
+
+
+class CountingPublisher:
+    """Publisher stand-in counting published envelopes."""
+
+    name = 'CountingPublisher'
+
+    def __init__(self):
+        """Initialize the instance."""
+        self.count = 0
+
+    def start(self):
+        """Nothing to start."""
+
+    def stop(self):
+        """Nothing to stop."""
+
+    def publish(self, envelope):
+        """Count the envelope."""
+        self.count += 1
+
+
+class PollingReceiver(PullReceiver):
+    """Receiver hiding its socket, forcing the node to use the polling loop."""
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the instance."""
+        super(PollingReceiver, self).__init__(*args, **kwargs)
+        self._sock = None
+
+    def start(self):
+        """Create the socket under a private name."""
+        super(PollingReceiver, self).start()
+        self._sock, self.sock = self.sock, None
+
+    def stop(self, timeout=None):
+        """Close the private socket."""
+        self.sock = self._sock
+        super(PollingReceiver, self).stop(timeout)
+
+    def recv(self, block=False, timeout=None):
+        """Receive from the private socket."""
+        try:
+            return self._sock.recv_multipart(zmq.NOBLOCK)
+        except zmq.Again:
+            raise queue.Empty
+
+
+def bench(receiver_cls, n_messages):
+    """Return idle CPU share and saturated throughput of a node with the given receiver."""
+    ctx = zmq.Context.instance()
+    push = ctx.socket(zmq.PUSH)
+    addr = 'inproc://bench_node_loop_%s' % receiver_cls.__name__
+    push.bind(addr)
+    publisher = CountingPublisher()
+    node = DataNode('BenchNode', receiver=receiver_cls(addr, ctx=ctx),
+                    publisher=publisher)
+    node.start()
+    runner = threading.Thread(target=node.run)
+    runner.start()
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    time.sleep(1)
+    idle = (time.process_time() - cpu) / (time.perf_counter() - wall)
+
+    frames = pack_frames('diff_book_BNBBTC', b'{"e":"depthUpdate","b":[["0.0024","10"]]}',
+                         time.time_ns())
+    start = time.perf_counter()
+    for _ in range(n_messages):
+        push.send_multipart(frames)
+    while publisher.count < n_messages:
+        time.sleep(0.001)
+    rate = n_messages / (time.perf_counter() - start)
+
+    node._running = False  # pylint: disable=protected-access
+    runner.join()
+    node.stop()
+    push.close()
+    return idle, rate
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for name, receiver_cls in (('polling', PollingReceiver), ('poller', PullReceiver)):
+        idle, rate = bench(receiver_cls, n_messages)
+        print("%-8s idle CPU: %5.1f%%  saturated: %8.0f msg/s" % (name, idle * 100, rate))
+
+
+if __name__ == '__main__':
+    main()
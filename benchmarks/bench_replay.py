@@ -0,0 +1,101 @@
+"""Measure the throughput of a :class:`thoth.DataNode` by replaying a capture through it.
+
+Replays a capture as fast as possible into a node with a :class:`thoth.core.receiver.
+PullReceiver` and a publisher that serializes every envelope, and reports how many messages per
+second the node processed. Without a capture directory, a synthetic capture of Binance depth
+updates is created first, so the number is repeatable.
+
+Usage::
+
+    python benchmarks/bench_replay.py [capture_dir [n_runs]]
+"""
+
+# Import Built-Ins
+import sys
+import tempfile
+import threading
+import time
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.core.node import DataNode
+from thoth.core.capture import CaptureWriter, CaptureReader
+from thoth.core.receiver import PullReceiver
+from thoth.core.replay import ReplayConnector
+
+
+class SerializingPublisher:
+    """Publisher stand-in serializing and counting envelopes."""
+
+    name = 'SerializingPublisher'
+
+    def __init__(self):
+        """Initialize the instance."""
+        self.count = 0
+
+    def start(self):
+        """Nothing to start."""
+
+    def stop(self):
+        """Nothing to stop."""
+
+    def publish(self, envelope):
+        """Serialize and count the envelope."""
+        envelope.convert_to_frames()
+        self.count += 1
+
+
+def make_capture(directory, n_messages=200000):
+    """Capture synthetic Binance depth updates for 20 symbols."""
+    writer = CaptureWriter(directory, fsync_interval=None)
+    writer.start()
+    ts = time.time_ns()
+    for i in range(n_messages):
+        symbol = 'SYM%d' % (i % 20)
+        data = ('{"e":"depthUpdate","E":%d,"s":"%s","U":%d,"u":%d,"b":[["0.0024","10"]],'
+                '"a":[["0.0026","100"]]}' % (ts // 10 ** 6, symbol, i, i)).encode()
+        writer.write(('diff_book_' + symbol).encode(), data, ts + i * 10 ** 5)
+    writer.stop()
+
+
+def bench(directory, n_messages, run):
+    """Replay the capture through a node and return the node's throughput."""
+    ctx = zmq.Context.instance()
+    addr = 'inproc://bench_replay_%s' % run
+    replay = ReplayConnector(directory, zmq_addr=addr, ctx=ctx, speed=None, batch_size=100)
+    publisher = SerializingPublisher()
+    node = DataNode('BenchNode', receiver=PullReceiver(addr, ctx=ctx), publisher=publisher)
+    node.start()
+    runner = threading.Thread(target=node.run)
+    runner.start()
+
+    start = time.perf_counter()
+    replay.start()
+    while publisher.count < n_messages:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    node._running = False  # pylint: disable=protected-access
+    runner.join()
+    node.stop()
+    replay.stop()
+    return n_messages / elapsed
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = sys.argv[1] if len(sys.argv) > 1 else tmp_dir
+        if directory == tmp_dir:
+            make_capture(directory)
+        n_messages = sum(1 for _ in CaptureReader(directory))
+        rates = [bench(directory, n_messages, run) for run in range(n_runs)]
+    print("%s messages, %s runs: %s msg/s (best %.0f)" % (
+        n_messages, n_runs, ', '.join('%.0f' % rate for rate in rates), max(rates)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Compare routing messages by scanning their raw bytes with parsing them.
+
+Feeds typical Binance combined-stream depth updates and GDAX level2 updates to the connectors'
+``_on_message`` methods, with pushing stubbed out, and reports the time per message of the
+prefix scan and of the full parse fallback (forced by disabling the scan).
+
+Also compares building and encoding GDAX topics per message with looking them up in the
+connector's pre-encoded :class:`thoth.core.topics.TopicTable`.
+
+Usage::
+
+    python benchmarks/bench_routing.py [n_messages]
+"""
+
+# Import Built-Ins
+import json
+import sys
+import time
+from unittest import mock
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.connectors.binance import BinanceConnector
+from thoth.connectors.gdax import GDAXConnector
+from thoth.core.frames import as_bytes
+
+
+def binance_message(i, levels=20):
+    """Return a combined-stream depth update with the given number of levels per side."""
+    event = {'e': 'depthUpdate', 'E': 1523000000000 + i, 's': 'BNBBTC', 'U': i, 'u': i,
+             'b': [['0.%08d' % (2400 + j), '%d.00' % j] for j in range(levels)],
+             'a': [['0.%08d' % (2600 + j), '%d.00' % j] for j in range(levels)]}
+    return json.dumps({'stream': 'bnbbtc@depth', 'data': event}, separators=(',', ':')).encode()
+
+
+def gdax_message(i):
+    """Return a level2 update."""
+    return json.dumps({'type': 'l2update', 'product_id': 'BTC-USD',
+                       'time': '2018-04-01T00:00:00.%06dZ' % (i % 10 ** 6),
+                       'changes': [['buy', '6500.%02d' % (i % 100), '0.5']]},
+                      separators=(',', ':')).encode()
+
+
+def bench(conn, messages, module):
+    """Return the time per message of routing with prefix scans and with full parses."""
+    conn.push = lambda *args: None
+    results = []
+    for name in ('scan_field', 'scan_fields'):
+        if hasattr(module, name):
+            target = '%s.%s' % (module.__name__, name)
+    for patch in (None, mock.patch(target, return_value=None)):
+        if patch:
+            patch.start()
+        on_message = conn._on_message
+        start = time.perf_counter()
+        for message in messages:
+            on_message(None, message)
+        results.append((time.perf_counter() - start) / len(messages))
+        if patch:
+            patch.stop()
+    return results
+
+
+def bench_topics(conn, keys):
+    """Return the time per message of building and encoding topics, and of table lookups."""
+    results = []
+    for topic_of in (lambda key: as_bytes(conn._topic(*key)),
+                     lambda key: as_bytes(conn.topics.get(key))):
+        start = time.perf_counter()
+        for key in keys:
+            topic_of(key)
+        results.append((time.perf_counter() - start) / len(keys))
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    ctx = zmq.Context.instance()
+    binance = BinanceConnector(['bnbbtc'], zmq_addr='inproc://bench_routing_1', ctx=ctx)
+    gdax = GDAXConnector(['BTC-USD'], zmq_addr='inproc://bench_routing_2', ctx=ctx)
+    for name, conn, messages in (
+            ('binance', binance, [binance_message(i) for i in range(n_messages)]),
+            ('gdax', gdax, [gdax_message(i) for i in range(n_messages)])):
+        module = sys.modules[type(conn).__module__]
+        scan, parse = bench(conn, messages, module)
+        print("%-8s %5d bytes/msg  scan %6.2f us/msg  parse %6.2f us/msg  (%.1fx)" % (
+            name, len(messages[0]), scan * 1e6, parse * 1e6, parse / scan))
+
+    keys = [(mtype, 'BTC-USD') for mtype in ('l2update', 'match', 'ticker', 'done')] * (
+        n_messages // 4)
+    build, lookup = bench_topics(gdax, keys)
+    print("topics   build %6.3f us/msg  lookup %6.3f us/msg  (%.1fx)" % (
+        build * 1e6, lookup * 1e6, build / lookup))
+    for conn in (binance, gdax):
+        conn.q.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Measure the throughput of a :class:`thoth.core.sharding.ShardedDataNode` per worker count.
+
+Messages for 64 topics are pushed in batches, as by connectors with batching enabled. Each
+worker runs a plain :class:`thoth.DataNode`, whose publisher serializes every envelope and
+reports the number of published envelopes back to the benchmark. A single, unsharded
+:class:`thoth.DataNode` is measured as baseline.
+
+Throughput can only scale with the number of workers as long as there are idle cores; the
+number of available cores is printed along with the results.
+
+Usage::
+
+    python benchmarks/bench_sharding.py [n_messages [max_workers]]
+"""
+
+# Import Built-Ins
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.core.node import DataNode
+from thoth.core.batching import BATCH_MARKER, RECORD_HEADER
+from thoth.core.frames import pack_frames
+from thoth.core.receiver import PullReceiver
+from thoth.core.sharding import ShardedDataNode
+
+BATCH_SIZE = 100
+
+
+class ReportingPublisher:
+    """Publisher stand-in serializing envelopes and reporting how many were published."""
+
+    name = 'ReportingPublisher'
+
+    def __init__(self, addr):
+        """Initialize the instance."""
+        self.addr = addr
+        self.sock = None
+
+    def start(self):
+        """Connect to the benchmark's result socket."""
+        self.sock = zmq.Context.instance().socket(zmq.PUSH)
+        self.sock.connect(self.addr)
+
+    def stop(self):
+        """Close the socket."""
+        self.sock.close(linger=1000)
+
+    def publish(self, envelope):
+        """Serialize the envelope and report it."""
+        self.publish_many([envelope])
+
+    def publish_many(self, envelopes):
+        """Serialize the envelopes and report their number."""
+        for envelope in envelopes:
+            envelope.convert_to_frames()
+        self.sock.send(b'%d' % len(envelopes))
+
+
+class NodeFactory:
+    """Create worker nodes publishing to a :class:`ReportingPublisher`."""
+
+    def __init__(self, addr):
+        """Initialize the instance."""
+        self.addr = addr
+
+    def __call__(self, name, receiver):
+        """Create the node."""
+        return DataNode(name, receiver=receiver, publisher=ReportingPublisher(self.addr))
+
+
+def make_batch():
+    """Return the frames of a batch of messages spread over 64 topics."""
+    parts = []
+    for i in range(BATCH_SIZE):
+        frames = pack_frames('diff_book_SYM%s' % (i % 64),
+                             b'{"e":"depthUpdate","b":[["0.0024","10"]],"a":[]}', time.time_ns())
+        parts += [RECORD_HEADER.pack(*map(len, frames))] + frames
+    return [BATCH_MARKER, b''.join(parts)]
+
+
+def bench(workers, n_messages, tmp_dir):
+    """Return the throughput with the given number of workers; 0 runs an unsharded node."""
+    ctx = zmq.Context.instance()
+    prefix = 'ipc://%s/%s' % (tmp_dir, workers)
+    results = ctx.socket(zmq.PULL)
+    results.bind(prefix + '_results')
+    push = ctx.socket(zmq.PUSH)
+    push.bind(prefix + '_connector')
+    receiver = PullReceiver(prefix + '_connector', ctx=ctx)
+    factory = NodeFactory(prefix + '_results')
+    if workers:
+        node = ShardedDataNode('BenchNode', receiver, factory, workers=workers,
+                               addr=prefix + '_shard',
+                               mp_context=multiprocessing.get_context('fork'))
+    else:
+        node = factory('BenchNode', receiver)
+    node.start()
+    runner = threading.Thread(target=node.run)
+    runner.start()
+    time.sleep(0.5)
+
+    batch = make_batch()
+    start = time.perf_counter()
+    for _ in range(n_messages // BATCH_SIZE):
+        push.send_multipart(batch)
+    count = 0
+    while count < n_messages // BATCH_SIZE * BATCH_SIZE:
+        count += int(results.recv())
+    rate = count / (time.perf_counter() - start)
+
+    node._running = False  # pylint: disable=protected-access
+    runner.join()
+    node.stop()
+    push.close()
+    results.close()
+    return rate
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(4, os.cpu_count())
+    print("%s CPUs available" % len(os.sched_getaffinity(0)))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        baseline = bench(0, n_messages, tmp_dir)
+        print("unsharded   %8.0f msg/s" % baseline)
+        for workers in range(1, max_workers + 1):
+            rate = bench(workers, n_messages, tmp_dir)
+            print("%2s workers  %8.0f msg/s  (%.2fx)" % (workers, rate, rate / baseline))
+
+
+if __name__ == '__main__':
+    main()
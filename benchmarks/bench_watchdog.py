@@ -0,0 +1,93 @@
+"""Benchmark the per-message cost of connection time-out handling.
+
+Compares the former approach (cancelling and starting a :class:`threading.Timer` on every
+message) against updating ``last_seen`` on a connector watched by the shared watchdog.
+
+Usage::
+
+    python benchmarks/bench_watchdog.py [n_messages]
+"""
+
+# Import Built-Ins
+import sys
+import time
+from threading import Timer
+
+# Import Home-grown
+from thoth.core.watchdog import get_watchdog
+
+
+class TimerConnector:
+    """Replica of the previous per-message timer handling."""
+
+    def __init__(self):
+        """Initialize the instance."""
+        self.connection_timer = None
+        self.connection_timeout = 10
+
+    def _connection_timed_out(self):
+        """Never reached within the benchmark."""
+
+    def _stop_timers(self):
+        """Cancel the running timer."""
+        if self.connection_timer:
+            self.connection_timer.cancel()
+
+    def _start_timers(self):
+        """Start a new timer thread."""
+        self._stop_timers()
+        self.connection_timer = Timer(self.connection_timeout, self._connection_timed_out)
+        self.connection_timer.start()
+
+    def on_message(self):
+        """Handle a message as WebSocketConnector._on_message used to."""
+        self._stop_timers()
+        self._start_timers()
+
+
+class WatchedConnector:
+    """Connector registered with the shared watchdog."""
+
+    def __init__(self):
+        """Initialize the instance."""
+        self.last_seen = time.monotonic()
+        self.connection_timeout = 10
+
+    def _connection_timed_out(self):
+        """Never reached within the benchmark."""
+
+    def on_message(self):
+        """Handle a message as WebSocketConnector._on_message does now."""
+        self.last_seen = time.monotonic()
+
+
+def bench(connector, n_messages):
+    """Return the mean cost per message in nanoseconds."""
+    on_message = connector.on_message
+    start = time.perf_counter()
+    for _ in range(n_messages):
+        on_message()
+    return (time.perf_counter() - start) / n_messages * 1e9
+
+
+def main():
+    """Run the benchmark and print the results."""
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    timer_connector = TimerConnector()
+    before = bench(timer_connector, n_messages)
+    timer_connector._stop_timers()  # pylint: disable=protected-access
+
+    watched_connector = WatchedConnector()
+    get_watchdog().watch(watched_connector)
+    after = bench(watched_connector, n_messages)
+    get_watchdog().unwatch(watched_connector)
+
+    print("messages:               %d" % n_messages)
+    print("threading.Timer:        %10.1f ns/msg" % before)
+    print("watchdog (last_seen):   %10.1f ns/msg" % after)
+    print("speed-up:               %10.1fx" % (before / after))
+
+
+if __name__ == '__main__':
+    main()
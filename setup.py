@@ -16,4 +16,6 @@ setup(name='thoth',
                    'Programming Language :: Python :: 3 :: Only',
                    'Topic :: Office/Business :: Financial :: Investment'],
       install_requires=['hermes-zmq', 'websocket-client', 'requests', 'autobahn', 'pysher'],
+      extras_require={'msgpack': ['msgpack']},
+      entry_points={'console_scripts': ['thoth-supervisor = thoth.core.supervisor:main']},
       package_data={'': ['*.md', '*.rst']})
@@ -0,0 +1,152 @@
+import json
+from concurrent.futures import Future
+from unittest import mock
+
+import zmq
+
+from thoth.connectors.binance import BinanceBookSync, BinanceConnector
+
+
+class ImmediateExecutor:
+    """Executor stand-in running submitted calls right away."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class SnapshotProvider:
+    """Local stand-in for the /depth endpoint."""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = []
+
+    def __call__(self, symbol):
+        self.calls.append(symbol)
+        return self.snapshots.pop(0)
+
+
+def snapshot(last_update_id, bids=(), asks=()):
+    return {'lastUpdateId': last_update_id, 'bids': [list(b) for b in bids],
+            'asks': [list(a) for a in asks]}
+
+
+def diff(first_id, final_id, bids=(), asks=(), symbol='BNBBTC'):
+    return {'e': 'depthUpdate', 's': symbol, 'U': first_id, 'u': final_id,
+            'b': [list(b) for b in bids], 'a': [list(a) for a in asks]}
+
+
+def published(messages):
+    return {topic.decode(): json.loads(data) for topic, data in messages}
+
+
+def test_book_sync_merges_buffered_updates_with_snapshot():
+    provider = SnapshotProvider(snapshot(10, bids=[('0.9', '1')], asks=[('1.1', '1')]))
+    sync = BinanceBookSync(provider, executor=ImmediateExecutor())
+    # Fully covered by the snapshot - dropped
+    messages = published(sync.on_diff('BNBBTC', diff(5, 10, bids=[('0.9', '5')])))
+    assert provider.calls == ['BNBBTC']
+    assert messages['book_BNBBTC'] == {'lastUpdateId': 10, 'bids': [['0.9', '1']],
+                                       'asks': [['1.1', '1']]}
+
+    messages = published(sync.on_diff('BNBBTC', diff(11, 12, bids=[('0.95', '2')],
+                                                     asks=[('1.1', '0.00000000')])))
+    assert messages['book_BNBBTC'] == {'lastUpdateId': 12, 'bids': [['0.95', '2'], ['0.9', '1']],
+                                       'asks': []}
+    assert messages['top_BNBBTC'] == {'u': 12, 's': 'BNBBTC', 'b': '0.95', 'B': '2', 'a': None,
+                                      'A': None}
+
+
+def test_book_sync_waits_for_snapshot_and_replays_buffer():
+    pending = Future()
+    executor = mock.Mock()
+    executor.submit.return_value = pending
+    sync = BinanceBookSync(mock.Mock(), executor=executor)
+
+    assert sync.on_diff('BNBBTC', diff(8, 11, bids=[('0.9', '1')])) == []
+    assert sync.on_diff('BNBBTC', diff(12, 13, bids=[('0.8', '1')])) == []
+    pending.set_result(snapshot(10, bids=[('0.9', '3'), ('0.7', '1')]))
+    messages = published(sync.on_diff('BNBBTC', diff(14, 14, bids=[('0.7', '0')])))
+    assert messages['book_BNBBTC']['bids'] == [['0.9', '1'], ['0.8', '1']]
+    assert messages['book_BNBBTC']['lastUpdateId'] == 14
+
+
+def test_book_sync_resyncs_only_affected_symbol_on_gap():
+    provider = SnapshotProvider(snapshot(10), snapshot(20), snapshot(30))
+    sync = BinanceBookSync(provider, executor=ImmediateExecutor())
+    assert sync.on_diff('BNBBTC', diff(11, 11, bids=[('0.9', '1')]))
+    assert sync.on_diff('ETHBTC', diff(21, 21, symbol='ETHBTC'))
+
+    # Updates 12-14 are missing
+    assert sync.on_diff('BNBBTC', diff(15, 16)) == []
+    assert provider.calls == ['BNBBTC', 'ETHBTC', 'BNBBTC']
+    assert not sync.states['BNBBTC'].book
+    assert sync.states['ETHBTC'].last_update_id == 21
+    assert sync.tracker.recovering('BNBBTC') and not sync.tracker.recovering('ETHBTC')
+    # The new snapshot is applied with the next update
+    messages = published(sync.on_diff('BNBBTC', diff(31, 31, asks=[('1.1', '1')])))
+    assert messages['book_BNBBTC'] == {'lastUpdateId': 31, 'bids': [], 'asks': [['1.1', '1']]}
+    stats = sync.tracker.snapshot()
+    assert stats['gaps'] == 1 and stats['channels']['BNBBTC']['missed'] == 3
+    assert stats['recovery']['count'] == 1
+
+
+def test_book_sync_refetches_snapshot_on_failure():
+    provider = mock.Mock(side_effect=[IOError('unreachable'), snapshot(10)])
+    sync = BinanceBookSync(provider, executor=ImmediateExecutor())
+    assert sync.on_diff('BNBBTC', diff(11, 11)) == []
+    assert sync.on_diff('BNBBTC', diff(12, 12, bids=[('0.9', '1')]))
+    assert provider.call_count == 2
+
+
+def test_connector_publishes_books_if_syncing(request):
+    addr = 'inproc://test_binance_%s' % request.node.name
+    conn = BinanceConnector(['bnbbtc'], sync_books=True, zmq_addr=addr,
+                            ctx=zmq.Context.instance(),
+                            snapshot_provider=SnapshotProvider(snapshot(10)))
+    conn.book_sync.executor = ImmediateExecutor()
+    conn.push = mock.Mock()
+    try:
+        event = diff(11, 11, bids=[('0.9', '1')])
+        conn._on_message(None, json.dumps({'stream': 'bnbbtc@depth', 'data': event}).encode())
+        topics = [call[0][0] for call in conn.push.call_args_list]
+        assert topics == [b'diff_book_BNBBTC', b'book_BNBBTC', b'top_BNBBTC']
+    finally:
+        conn.q.close()
+
+
+def test_connector_routes_messages_without_parsing_them(request):
+    addr = 'inproc://test_binance_%s' % request.node.name
+    conn = BinanceConnector(['bnbbtc'], zmq_addr=addr, ctx=zmq.Context.instance())
+    conn.push = mock.Mock()
+    try:
+        with mock.patch('thoth.connectors.binance.json.loads') as loads:
+            for stream in ('bnbbtc@trade', 'bnbbtc@aggTrade', 'bnbbtc@kline_1m', 'bnbbtc@ticker',
+                           'bnbbtc@depth'):
+                conn._on_message(None, json.dumps({'stream': stream, 'data': {}}).encode())
+        assert not loads.called
+        topics = [call[0][0] for call in conn.push.call_args_list]
+        assert topics == [b'trades_BNBBTC', b'aggTrade_BNBBTC', b'candle_BNBBTC/1m',
+                          b'ticker_BNBBTC', b'diff_book_BNBBTC']
+        # Topics of subscribed streams are pre-built, and shared by all their messages
+        assert topics[0] is conn.topics.get('bnbbtc@trade')
+    finally:
+        conn.q.close()
+
+
+def test_connector_parses_messages_of_unknown_shape(request):
+    addr = 'inproc://test_binance_%s' % request.node.name
+    conn = BinanceConnector(['bnbbtc'], zmq_addr=addr, ctx=zmq.Context.instance())
+    conn.push = mock.Mock()
+    try:
+        # Raw streams carry no stream name
+        conn._on_message(None, b'{"e":"24hrTicker","E":1,"s":"BNBBTC"}')
+        conn._on_message(None, b'{"stream":"bnbbtc@depth20","data":{"e":"unknown"}}')
+        assert [call[0][0] for call in conn.push.call_args_list] == [b'ticker_BNBBTC']
+    finally:
+        conn.q.close()
@@ -0,0 +1,68 @@
+import json
+from unittest import mock
+
+import zmq
+
+from thoth.connectors.gdax import GDAXConnector
+
+
+def test_connector_routes_messages_by_type_and_product(request):
+    addr = 'inproc://test_gdax_%s' % request.node.name
+    conn = GDAXConnector(['BTC-USD'], zmq_addr=addr, ctx=zmq.Context.instance())
+    conn.push = mock.Mock()
+    messages = [{'type': 'l2update', 'product_id': 'BTC-USD', 'changes': []},
+                {'type': 'ticker', 'sequence': 1, 'product_id': 'BTC-USD'},
+                {'type': 'match', 'product_id': 'BTC-USD'},
+                {'type': 'heartbeat', 'product_id': 'BTC-USD'}]
+    try:
+        with mock.patch('thoth.connectors.gdax.json.loads') as loads:
+            for message in messages:
+                conn._on_message(None, json.dumps(message).encode())
+        assert not loads.called
+        assert [call[0][:2] for call in conn.push.call_args_list] == [
+            (b'order_book_BTC-USD/l2update', json.dumps(messages[0]).encode()),
+            (b'ticker_BTC-USD', json.dumps(messages[1]).encode()),
+            (b'full_order_book_BTC-USD/match', json.dumps(messages[2]).encode()),
+            (b'heartbeat_BTC-USD', json.dumps(messages[3]).encode())]
+    finally:
+        conn.q.close()
+
+
+def test_connector_parses_messages_of_unknown_shape(request):
+    addr = 'inproc://test_gdax_%s' % request.node.name
+    conn = GDAXConnector(['BTC-USD'], zmq_addr=addr, ctx=zmq.Context.instance())
+    conn.push = mock.Mock()
+    try:
+        conn._on_message(None, b'{"type":"subscriptions","channels":[]}')
+        conn._on_message(None, b'{"type":"error","message":"Failed to subscribe"}')
+        # Product id beyond the scanned prefix
+        conn._on_message(None, json.dumps({'type': 'l2update', 'changes': [['buy', '1', '1']] * 20,
+                                           'product_id': 'BTC-USD'}).encode())
+        assert [call[0][0] for call in conn.push.call_args_list] == [
+            b'order_book_BTC-USD/l2update']
+    finally:
+        conn.q.close()
+
+
+def test_connector_resubscribes_product_on_sequence_gap(request):
+    addr = 'inproc://test_gdax_%s' % request.node.name
+    conn = GDAXConnector(['BTC-USD', 'ETH-USD'], track_sequences=True, zmq_addr=addr,
+                         ctx=zmq.Context.instance())
+    conn.push = mock.Mock()
+    conn.send = mock.Mock()
+    try:
+        for product, sequence in (('BTC-USD', 1), ('ETH-USD', 7), ('BTC-USD', 2), ('BTC-USD', 4),
+                                  ('ETH-USD', 8)):
+            conn._on_message(None, json.dumps({'type': 'match', 'product_id': product,
+                                               'sequence': sequence}).encode())
+        # Messages are passed on regardless; only the affected product is resubscribed
+        assert conn.push.call_count == 5
+        assert [call[0][0]['type'] for call in conn.send.call_args_list] == [
+            'unsubscribe', 'subscribe']
+        assert all(call[0][0]['product_ids'] == ['BTC-USD'] for call in conn.send.call_args_list)
+        assert conn.sequences.recovering('BTC-USD')
+        conn._on_message(None, b'{"type":"snapshot","product_id":"BTC-USD","bids":[],"asks":[]}')
+        assert not conn.sequences.recovering('BTC-USD')
+        assert conn.sequences.snapshot()['recovery']['count'] == 1
+    finally:
+        conn.q.close()
@@ -0,0 +1,49 @@
+import json
+import time
+
+import zmq
+
+from thoth.connectors.hitbtc import HitBTCConnector, CHANNELS
+from thoth.core.frames import unpack_ts
+from thoth.core.receiver import PullReceiver
+from thoth.testing.exchange import FakeExchange
+
+
+def test_connector_subscribes_each_connection_and_pushes_its_data(request):
+    exchange = FakeExchange('hitbtc', rate=500)
+    exchange.start()
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_hitbtc_%s' % request.node.name
+    receiver = PullReceiver(addr, ctx=ctx)
+    symbols = ['SYM%d' % i for i in range(50)]
+    conn = HitBTCConnector(symbols, subscription_rate=1000, zmq_addr=addr, ctx=ctx)
+    conn.url = exchange.url
+    receiver.start()
+    conn.start()
+    try:
+        # Tickers stream once subscribed to; all requests are acknowledged on the connection
+        assert receiver.sock.poll(5000)
+        topic, data, ts = receiver.recv()
+        assert conn.scheduler.wait(5)
+        first = conn.conn
+        coverage = conn.scheduler.last_coverage
+        assert conn.scheduler.snapshot()['acknowledged'] == len(symbols) * len(CHANNELS)
+
+        # A replacement connection subscribes again by itself
+        conn.reconnect()
+        deadline = time.monotonic() + 5
+        while conn.scheduler.snapshot()['time_to_coverage']['count'] < 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert conn.conn is not first
+        assert conn.scheduler.snapshot()['acknowledged'] == len(symbols) * len(CHANNELS)
+    finally:
+        conn.stop()
+        receiver.stop()
+        exchange.stop()
+    # At 1000 requests per second, 200 requests cover all channels well within a second
+    assert coverage < 1
+    assert bytes(topic).decode().startswith('Ticker_SYM')
+    # Tickers are preformatted; their time of reception is passed on
+    bid, ask, *_, timestamp = json.loads(bytes(data))
+    assert bid == ask and int(timestamp) * 10 ** 6 <= unpack_ts(ts)
@@ -0,0 +1,16 @@
+import zmq
+
+from thoth.connectors.quoinex import QuoinexConnector
+from thoth.core.metadata import SymbolRegistry
+
+
+def test_connector_adds_listed_symbols(request):
+    registry = SymbolRegistry('quoinex', lambda: {'BTCUSD': {}, 'ETHUSD': {}}, cache_dir=False)
+    conn = QuoinexConnector(['BTCUSD'], 'key', registry=registry, ctx=zmq.Context.instance(),
+                            zmq_addr='inproc://test_quoinex_%s' % request.node.name)
+    try:
+        assert conn.pairs == ['BTCUSD']
+        registry.refresh()
+        assert conn.pairs == ['BTCUSD', 'ETHUSD']
+    finally:
+        conn.q.close()
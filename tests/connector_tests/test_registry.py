@@ -0,0 +1,53 @@
+import subprocess
+import sys
+from unittest import mock
+
+import pytest
+
+from thoth import connectors
+from thoth.connectors.binance import BinanceConnector
+
+
+def test_import_thoth_imports_no_dependencies():
+    code = ('import sys, thoth, thoth.connectors, thoth.core; '
+            'print(sorted(m for m in ("zmq", "websocket", "pysher", "autobahn", "requests") '
+            'if m in sys.modules))')
+    assert subprocess.check_output([sys.executable, '-c', code]).strip() == b'[]'
+
+
+def test_get_connector_resolves_names():
+    assert connectors.get_connector('binance') is BinanceConnector
+    assert connectors.BinanceConnector is BinanceConnector
+    for name in connectors.available_connectors():
+        assert isinstance(connectors.get_connector(name), type)
+    with pytest.raises(KeyError):
+        connectors.get_connector('unknown')
+
+
+def test_unsupported_connectors_fail_their_lookup():
+    assert not set(connectors.UNSUPPORTED_CONNECTORS) & set(connectors.available_connectors())
+    with pytest.raises(NotImplementedError, match="'bitfinex' is not supported yet"):
+        connectors.get_connector('bitfinex')
+    # Registering a working connector under the name takes precedence
+    with mock.patch.dict(connectors.CONNECTORS):
+        connectors.register_connector('bitfinex', BinanceConnector)
+        assert connectors.get_connector('bitfinex') is BinanceConnector
+
+
+def test_broken_connector_only_fails_its_lookup():
+    with mock.patch.dict(connectors.CONNECTORS):
+        connectors.register_connector('broken', 'thoth.connectors.missing:Connector')
+        with pytest.raises(ImportError):
+            connectors.get_connector('broken')
+        assert connectors.get_connector('gdax').__name__ == 'GDAXConnector'
+
+
+def test_get_connector_falls_back_to_entry_points():
+    entry_point = mock.Mock()
+    entry_point.load.return_value = BinanceConnector
+    with mock.patch.dict(connectors.CONNECTORS), \
+            mock.patch.object(connectors, '_entry_points', return_value={'plugin': entry_point}):
+        assert 'plugin' in connectors.available_connectors()
+        assert connectors.get_connector('plugin') is BinanceConnector
+        assert connectors.get_connector('plugin') is BinanceConnector
+    entry_point.load.assert_called_once_with()
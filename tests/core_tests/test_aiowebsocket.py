@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import zmq
+from autobahn.asyncio.websocket import WebSocketServerProtocol, WebSocketServerFactory
+
+from thoth.core.aiowebsocket import AsyncWebSocketConnector
+
+
+class EchoTopicServer(WebSocketServerProtocol):
+    """Reply to every received command with two data messages."""
+
+    def onMessage(self, payload, isBinary):
+        command = json.loads(payload.decode('UTF-8'))
+        for i in range(2):
+            self.sendMessage(json.dumps({'channel': command['channel'], 'i': i}).encode())
+
+
+class DroppingServer(WebSocketServerProtocol):
+    """Drop every connection right after accepting it."""
+
+    connections = 0
+
+    def onOpen(self):
+        DroppingServer.connections += 1
+        self.transport.abort()
+
+
+class DummyConnector(AsyncWebSocketConnector):
+    def _on_open(self, ws):
+        super(DummyConnector, self)._on_open(ws)
+        if not self.history:
+            self.send({'channel': 'trades'})
+
+    def _on_message(self, ws, data):
+        message = json.loads(data)
+        super(DummyConnector, self)._on_message(ws, (message['channel'], data, 1.0))
+
+
+def run_with_server(test_coro, protocol=EchoTopicServer):
+    loop = asyncio.new_event_loop()
+
+    async def main():
+        factory = WebSocketServerFactory()
+        factory.protocol = protocol
+        server = await loop.create_server(factory, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            await test_coro(loop, 'ws://127.0.0.1:%s' % port)
+        finally:
+            server.close()
+
+    try:
+        loop.run_until_complete(asyncio.wait_for(main(), 5))
+    finally:
+        loop.close()
+
+
+def make_connector(url, ctx, addr, **kwargs):
+    connector = DummyConnector(url, zmq_addr=addr, ctx=ctx, **kwargs)
+    pull = ctx.socket(zmq.PULL)
+    pull.connect(addr)
+    return connector, pull
+
+
+async def recv_frames(pull, n):
+    frames = []
+    while len(frames) < n:
+        try:
+            frames.append(pull.recv_multipart(zmq.NOBLOCK))
+        except zmq.Again:
+            await asyncio.sleep(0.01)
+    return frames
+
+
+def test_messages_are_pushed_from_the_event_loop():
+    ctx = zmq.Context()
+
+    async def check(loop, url):
+        connector, pull = make_connector(url, ctx, 'inproc://test_aio_push')
+        connector.start(loop)
+        frames = await recv_frames(pull, 2)
+        assert frames[0][0] == b'trades'
+        assert json.loads(frames[1][1].decode()) == {'channel': 'trades', 'i': 1}
+        connector.stop()
+        pull.close()
+
+    run_with_server(check)
+
+
+def test_many_connectors_share_one_loop():
+    ctx = zmq.Context()
+
+    async def check(loop, url):
+        pairs = [make_connector(url, ctx, 'inproc://test_aio_many_%s' % i) for i in range(5)]
+        for connector, _ in pairs:
+            connector.start(loop)
+        for connector, pull in pairs:
+            assert len(await recv_frames(pull, 2)) == 2
+            connector.stop()
+            pull.close()
+
+    run_with_server(check)
+
+
+def test_history_is_replayed_on_reconnect():
+    ctx = zmq.Context()
+
+    async def check(loop, url):
+        connector, pull = make_connector(url, ctx, 'inproc://test_aio_reconnect',
+                                         reconnect_interval=0.01)
+        connector.start(loop)
+        await recv_frames(pull, 2)
+        connector.reconnect()
+        frames = await recv_frames(pull, 2)
+        assert [f[0] for f in frames] == [b'trades', b'trades']
+        assert connector.history == [{'channel': 'trades'}]
+        connector.stop()
+        pull.close()
+
+    run_with_server(check)
+
+
+def test_connection_times_out_without_data():
+    ctx = zmq.Context()
+
+    async def check(loop, url):
+        connector, pull = make_connector(url, ctx, 'inproc://test_aio_timeout', timeout=0.05,
+                                         reconnect_interval=0.01)
+        timed_out = loop.create_future()
+        connector._connection_timed_out = lambda: timed_out.done() or timed_out.set_result(1)
+        connector.start(loop)
+        await asyncio.wait_for(timed_out, 1)
+        connector.stop()
+        pull.close()
+
+    run_with_server(check)
+
+
+def test_connections_dropped_after_opening_are_backed_off():
+    ctx = zmq.Context()
+
+    async def check(loop, url):
+        connector, pull = make_connector(url, ctx, 'inproc://test_aio_dropped')
+        connector.start(loop)
+        await asyncio.sleep(1)
+        connector.stop()
+        pull.close()
+        # Attempts back off from 0.25s: 0, 0.125-0.25, 0.25-0.5, 0.5-1s
+        assert 2 <= DroppingServer.connections <= 5
+
+    run_with_server(check, DroppingServer)
@@ -0,0 +1,67 @@
+import time
+import unittest.mock as mock
+
+import pytest
+
+from thoth.core.batching import PushBatcher, BATCH_MARKER, iter_batch, iter_messages
+
+
+def message(i):
+    return [b'topic', b'data_%d' % i, b'%d' % i]
+
+
+def sent_messages(sock):
+    messages = []
+    for call in sock.send_multipart.call_args_list:
+        marker, body = call[0][0]
+        assert marker == BATCH_MARKER
+        messages.append([list(m) for m in iter_batch(body)])
+    return messages
+
+
+def test_batch_is_sent_once_batch_size_is_reached():
+    sock = mock.Mock()
+    batcher = PushBatcher(sock, batch_size=3, batch_delay=10)
+    for i in range(2):
+        batcher.push(message(i))
+    sock.send_multipart.assert_not_called()
+    batcher.push(message(2))
+    assert sent_messages(sock) == [[message(0), message(1), message(2)]]
+
+
+def test_batch_is_sent_once_batch_delay_passed():
+    sock = mock.Mock()
+    batcher = PushBatcher(sock, batch_size=100, batch_delay=0.01)
+    batcher.push(message(0))
+    batcher.push(message(1))
+    time.sleep(0.1)
+    assert sent_messages(sock) == [[message(0), message(1)]]
+
+
+def test_flush_sends_partial_batch_and_cancels_deadline():
+    sock = mock.Mock()
+    scheduled = mock.Mock()
+    batcher = PushBatcher(sock, batch_size=100, batch_delay=1,
+                          call_later=mock.Mock(return_value=scheduled))
+    batcher.push(message(0))
+    batcher.flush()
+    assert sent_messages(sock) == [[message(0)]]
+    scheduled.cancel.assert_called_once_with()
+    batcher.flush()
+    assert sock.send_multipart.call_count == 1
+
+
+def test_iter_messages_unpacks_single_messages_and_batches():
+    sock = mock.Mock()
+    batcher = PushBatcher(sock, batch_size=2)
+    batcher.push(message(0))
+    batcher.push(message(1))
+    batch = sock.send_multipart.call_args[0][0]
+    assert list(iter_messages(message(0))) == [tuple(message(0))]
+    assert list(iter_messages(batch)) == [tuple(message(0)), tuple(message(1))]
+
+
+@pytest.mark.parametrize('frames', [None, [], [b'topic', b'data'], message(0) + message(1)])
+def test_iter_messages_rejects_incomplete_frames(frames):
+    with pytest.raises(ValueError):
+        iter_messages(frames)
@@ -0,0 +1,87 @@
+import json
+from unittest import mock
+
+from hermes import Publisher, Receiver
+
+from thoth.core.bbo import (extract_book, extract_top, extract_levels, extract_top_level,
+                            BBOTracker, BBODataNode)
+
+
+def book(bids, asks, **kwargs):
+    return json.dumps(dict(bids=bids, asks=asks, **kwargs)).encode()
+
+
+def test_extractors_return_top_of_book():
+    assert extract_book(book([['0.9', '1'], ['0.8', '2']], [['1.1', '3']])) == (
+        '0.9', '1', '1.1', '3')
+    assert extract_book(book([], [['1.1', '3']])) == (None, None, '1.1', '3')
+    assert extract_book(b'{"type": "l2update", "changes": []}') is None
+    top = b'{"u": 1, "s": "BNBBTC", "b": "0.9", "B": "1", "a": "1.1", "A": "3"}'
+    assert extract_top(memoryview(top)) == ('0.9', '1', '1.1', '3')
+
+
+def test_list_extractors_return_top_of_book():
+    # HitBTC books, as pushed by the connector: levels of price, size and sequence, best first
+    hitbtc = json.dumps([[['0.9', '1', '7'], ['0.8', '2', '7']], [['1.1', '3', '7']],
+                         1520000000.5]).encode()
+    assert extract_levels(hitbtc) == ('0.9', '1', '1.1', '3')
+    # OKEx depth, asks listed from the highest price down
+    okex = json.dumps([[['0.9', '1', '15'], ['0.8', '2', '15']],
+                       [['1.3', '4', '15'], ['1.1', '3', '15']], 15]).encode()
+    assert extract_levels(okex) == ('0.9', '1', '1.1', '3')
+    assert extract_levels(b'[[], [["1.1", "3", "7"]], 1]') == (None, None, '1.1', '3')
+    top = json.dumps([['0.9', '1', '7'], None, 1520000000.5]).encode()
+    assert extract_top_level(memoryview(top)) == ('0.9', '1', None, None)
+
+
+def test_tracker_extracts_hitbtc_topics():
+    tracker = BBOTracker()
+    data = json.dumps([[['0.9', '1', '7']], [['1.1', '3', '7']], 1]).encode()
+    assert tracker.update('Book_ETHBTC', data) == ('0.9', '1', '1.1', '3')
+    top = json.dumps([['0.9', '1', '7'], ['1.1', '3', '7'], 1]).encode()
+    assert tracker.update('TopLevel_ETHBTC', top) == ('0.9', '1', '1.1', '3')
+    assert tracker.update('Ticker_ETHBTC', top) is None
+
+
+def test_tracker_suppresses_unchanged_top_of_book():
+    tracker = BBOTracker()
+    first = book([['0.9', '1'], ['0.8', '2']], [['1.1', '3']])
+    assert tracker.update('order_book_btceur/data', first) == ('0.9', '1', '1.1', '3')
+    assert tracker.update('order_book_btceur/data', first) is None
+    deeper_change = book([['0.9', '1'], ['0.7', '2']], [['1.1', '3']])
+    assert tracker.update('order_book_btceur/data', deeper_change) is None
+    size_change = book([['0.9', '1'], ['0.7', '2']], [['1.1', '4']])
+    assert tracker.update('order_book_btceur/data', size_change) == ('0.9', '1', '1.1', '4')
+    # Topics are tracked independently
+    assert tracker.update('order_book_ethbtc/data', first) == ('0.9', '1', '1.1', '3')
+
+
+def test_tracker_ignores_other_topics_and_bad_data():
+    tracker = BBOTracker()
+    assert tracker.update('trades_BNBBTC', b'{"bids": [], "asks": []}') is None
+    assert tracker.update('diff_order_book/data', book([['0.9', '1']], [])) is None
+    assert tracker.update('order_book/data', b'not json') is None
+    assert tracker.update('order_book/data', b'{"bids": 1, "asks": 2}') is None
+
+
+def test_node_publishes_bbo_only_on_change():
+    fake_pub = mock.Mock(spec=Publisher)
+    node = BBODataNode('TestBBONode', receiver=mock.Mock(spec=Receiver), publisher=fake_pub)
+    data = book([['0.9', '1']], [['1.1', '3']])
+    node.process_batch([(b'order_book/data', data, 1), (b'order_book/data', data, 2),
+                        (b'trades/data', b'{}', 3)])
+    topics = [call[0][0].topic for call in fake_pub.publish.call_args_list]
+    assert topics == ['order_book/data', 'bbo/order_book/data', 'order_book/data',
+                      'trades/data']
+    bbo = fake_pub.publish.call_args_list[1][0][0]
+    assert json.loads(bbo.data[0]) == ['0.9', '1', '1.1', '3'] and bbo.data[1] == 1
+
+
+def test_node_publishes_only_bbo_without_passthrough():
+    fake_pub = mock.Mock(spec=Publisher)
+    node = BBODataNode('TestBBONode', receiver=mock.Mock(spec=Receiver), publisher=fake_pub,
+                       passthrough=False)
+    node.process_frames(b'order_book/data', book([['0.9', '1']], [['1.1', '3']]), 1)
+    node.process_frames(b'trades/data', b'{}', 2)
+    topics = [call[0][0].topic for call in fake_pub.publish.call_args_list]
+    assert topics == ['bbo/order_book/data']
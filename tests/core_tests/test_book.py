@@ -0,0 +1,81 @@
+import random
+from decimal import Decimal
+
+from thoth.core.book import to_fixed, BookSide, OrderBook, _SortedKeys
+
+
+def test_to_fixed_converts_prices_without_float_rounding():
+    assert to_fixed('0.0024') == 240000
+    assert to_fixed('0.10') == to_fixed('0.1') == to_fixed(0.1) == 10000000
+    assert to_fixed('12') == to_fixed(12) == 1200000000
+    assert to_fixed('0.123456789') == 12345678
+    assert to_fixed('1e-8') == to_fixed(Decimal('0.00000001')) == 1
+    assert to_fixed('1.5', precision=2) == 150
+
+
+def test_book_side_keeps_levels_sorted():
+    bids, asks = BookSide(descending=True), BookSide()
+    for key in (3, 1, 2, 5, 4):
+        bids.set(key, (key, 'size'))
+        asks.set(key, (key, 'size'))
+    assert [level[0] for level in bids] == [5, 4, 3, 2, 1]
+    assert [level[0] for level in asks] == [1, 2, 3, 4, 5]
+    assert bids.best() == (5, 'size')
+    assert asks.top(2) == [(1, 'size'), (2, 'size')]
+
+    bids.set(5, (5, 'other size'))
+    bids.discard(4)
+    bids.discard(42)
+    assert bids.top() == [(5, 'other size'), (3, 'size'), (2, 'size'), (1, 'size')]
+    assert len(bids) == 4 and 4 not in bids
+
+
+def test_sorted_keys_stay_sorted_across_splits_and_joins():
+    rand = random.Random(42)
+    keys, expected = _SortedKeys(rand.sample(range(1000), 100), load=4), set()
+    expected.update(keys)
+    for _ in range(5000):
+        key = rand.randrange(1000)
+        if key in expected:
+            keys.remove(key)
+            expected.discard(key)
+        else:
+            keys.add(key)
+            expected.add(key)
+        assert len(keys) == len(expected)
+    assert list(keys) == sorted(expected)
+    assert keys.first() == min(expected) and keys.head(3) == sorted(expected)[:3]
+    assert all(0 < len(chunk) <= 8 for chunk in keys._chunks)
+    assert keys._maxes == [chunk[-1] for chunk in keys._chunks]
+    for key in sorted(expected):
+        keys.remove(key)
+    assert list(keys) == [] and not keys._chunks
+
+
+def test_book_side_best_returns_none_if_empty():
+    side = BookSide()
+    assert side.best() is None
+    side.set(1, (1, 'size'))
+    side.clear()
+    assert side.best() is None and side.top() == []
+
+
+def test_order_book_updates_and_removes_levels():
+    book = OrderBook()
+    book.snapshot([('0.9', '1', 1), ('0.95', '2', 1), ('0.8', '0.00', 1)],
+                  [('1.1', '1', 1), ('1.05', '2', 1)])
+    assert book.best_bid() == ('0.95', '2', 1)
+    assert book.best_ask() == ('1.05', '2', 1)
+    assert len(book.bids) == 2
+
+    book.update_bid('0.96', '3', 2)
+    book.update_bid('0.950', '0.00', 2)
+    book.update_ask('1.05', '0', 2)
+    book.update_ask('1.10', '5', 2)
+    book.update_ask('1.2', '0.00', 2)
+    assert book.top() == ([('0.96', '3', 2), ('0.9', '1', 1)], [('1.10', '5', 2)])
+    assert book.top(1) == ([('0.96', '3', 2)], [('1.10', '5', 2)])
+
+    book.clear()
+    assert not book
+    assert book.best_bid() is None and book.best_ask() is None
@@ -0,0 +1,82 @@
+import os
+from unittest import mock
+
+import pytest
+from hermes import Publisher, Receiver
+
+from thoth.core.capture import CaptureWriter, CaptureReader, iter_segment, read_index
+from thoth.core.frames import pack_ts
+from thoth.core.node import DataNode
+
+
+def messages(n, start=0):
+    return [(b'topic_%d' % (i % 3), b'{"i": %d}' % i, pack_ts(1000 + i))
+            for i in range(start, start + n)]
+
+
+def test_writer_appends_records_and_rolls_over(tmp_path):
+    writer = CaptureWriter(str(tmp_path), segment_size=256, index_interval=64,
+                           fsync_interval=None)
+    writer.start()
+    writer.write_many(messages(20))
+    writer.write(memoryview(b'topic_0'), b'raw', 2000)
+    writer.stop()
+
+    segments = CaptureReader(str(tmp_path)).segments()
+    assert len(segments) > 1
+    assert all(os.path.getsize(path) == 256 for path in segments)
+    records = list(CaptureReader(str(tmp_path)))
+    assert records == [(topic, data, 1000 + i) for i, (topic, data, _) in
+                       enumerate(messages(20))] + [(b'topic_0', b'raw', 2000)]
+    assert writer.records == 21
+    assert read_index(segments[0])[0] == (-1, 8)
+
+
+def test_writer_rejects_records_larger_than_a_segment(tmp_path):
+    writer = CaptureWriter(str(tmp_path), segment_size=64, fsync_interval=None)
+    writer.start()
+    with pytest.raises(ValueError):
+        writer.write(b'topic', b'x' * 64, 1)
+    writer.stop()
+
+
+def test_writer_continues_after_existing_segments(tmp_path):
+    for start in (0, 10):
+        writer = CaptureWriter(str(tmp_path), segment_size=4096, fsync_interval=0.01)
+        writer.start()
+        writer.write_many(messages(10, start))
+        writer.stop()
+    reader = CaptureReader(str(tmp_path))
+    assert [os.path.basename(path) for path in reader.segments()] == [
+        'capture-000000.seg', 'capture-000001.seg']
+    assert [ts for _, _, ts in reader] == list(range(1000, 1020))
+    # The index of the second writer accounts for the records of the first
+    assert read_index(reader.segments()[1])[0] == (1009, 8)
+
+
+def test_reader_seeks_by_time(tmp_path):
+    writer = CaptureWriter(str(tmp_path), segment_size=512, index_interval=32,
+                           fsync_interval=None)
+    writer.start()
+    writer.write_many(messages(100))
+    writer.stop()
+    reader = CaptureReader(str(tmp_path))
+    assert [ts for _, _, ts in reader.read(start=1050, end=1059)] == list(range(1050, 1060))
+    assert [ts for _, _, ts in reader.read(start=1095)] == list(range(1095, 1100))
+    assert list(reader.read(start=2000)) == []
+
+    # Seeking skips the segments and records before start
+    with mock.patch('thoth.core.capture.iter_segment', wraps=iter_segment) as iter_mock:
+        next(reader.read(start=1095))
+    path, offset = iter_mock.call_args[0]
+    assert path == reader.segments()[-1] and offset > 8
+
+
+def test_node_captures_received_messages(tmp_path):
+    writer = CaptureWriter(str(tmp_path), fsync_interval=None)
+    node = DataNode('TestDataNode', receiver=mock.Mock(spec=Receiver),
+                    publisher=mock.Mock(spec=Publisher), capture=writer)
+    node.start()
+    node._dispatch(messages(3))
+    node.stop()
+    assert len(list(CaptureReader(str(tmp_path)))) == 3
@@ -0,0 +1,70 @@
+import pytest
+import zmq
+
+from thoth.core.codecs import Codec, get_codec, register_codec
+from thoth.core.structs import ThothEnvelope
+
+BOOK = {'lastUpdateId': 160, 'bids': [['0.0024', '10']], 'asks': [['0.0026', '100']]}
+
+
+def roundtrip(envelope):
+    return ThothEnvelope.load_from_frames(envelope.convert_to_frames())
+
+
+@pytest.mark.parametrize('codec', ['json', 'msgpack'])
+def test_structured_data_roundtrip(codec):
+    envelope = ThothEnvelope('book_BNBBTC', 'node', BOOK, codec=codec)
+    loaded = roundtrip(envelope)
+    assert (loaded.topic, loaded.origin, loaded.data) == ('book_BNBBTC', 'node', BOOK)
+    assert loaded.ts == envelope.ts
+    assert loaded.codec is get_codec(codec)
+
+
+@pytest.mark.parametrize('codec', ['msgpack', 'struct'])
+def test_opaque_payloads_roundtrip_as_bytes(codec):
+    envelope = ThothEnvelope('trades', 'node', (memoryview(b'{"e":"trade"}'), 42), codec=codec)
+    assert list(roundtrip(envelope).data) == [b'{"e":"trade"}', 42]
+
+
+def test_struct_codec_keeps_str_payloads():
+    envelope = ThothEnvelope('trades', 'node', '{"e":"trade"}', codec='struct')
+    assert roundtrip(envelope).data == '{"e":"trade"}'
+
+
+def test_json_codec_decodes_bytes_payloads_and_float_timestamps():
+    envelope = ThothEnvelope('trades', 'node', (b'{"e":"trade"}', 1514764800.5), ts=1.5)
+    frames = envelope.convert_to_frames()
+    assert frames[0] == b'trades'
+    assert frames[1] == b'\x01'
+    assert roundtrip(envelope).data == ['{"e":"trade"}', 1514764800.5]
+
+
+def test_frames_can_be_loaded_from_zmq_frames():
+    frames = ThothEnvelope('trades', 'node', 'data', codec='struct').convert_to_frames()
+    loaded = ThothEnvelope.load_from_frames([zmq.Frame(f) for f in frames])
+    assert (loaded.topic, loaded.data) == ('trades', 'data')
+
+
+def test_unknown_codecs_raise_value_error():
+    with pytest.raises(ValueError):
+        get_codec('xml')
+    with pytest.raises(ValueError):
+        ThothEnvelope.load_from_frames([b'topic', b'\xff', b''])
+
+
+def test_custom_codecs_can_be_registered():
+    class ReprCodec(Codec):
+        codec_id = 200
+        name = 'repr'
+
+        def encode(self, origin, data, ts, encoding):
+            return [repr((origin, data, ts)).encode(encoding)]
+
+        def decode(self, frames, encoding):
+            return eval(frames[0].decode(encoding))
+
+    register_codec(ReprCodec())
+    envelope = ThothEnvelope('topic', 'node', [1, 2], codec='repr')
+    assert roundtrip(envelope).data == [1, 2]
+    with pytest.raises(ValueError):
+        register_codec(type('Clash', (ReprCodec,), {'name': 'other'})())
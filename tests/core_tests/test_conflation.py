@@ -0,0 +1,75 @@
+from unittest import mock
+
+import pytest
+from hermes import Publisher, Receiver
+
+from thoth.core.conflation import Conflator, LATEST
+from thoth.core.node import DataNode
+
+
+def msg(topic, data):
+    return topic, data, b'ts'
+
+
+def test_policies_resolve_by_longest_prefix():
+    conflator = Conflator({'order_book': LATEST, 'order_book_btc': 10, 'trades': None},
+                          default=100, flush_interval=0.2)
+    assert conflator.interval_for(b'order_book_eth/data') == 0.2
+    assert conflator.interval_for(b'order_book_btceur/data') == 0.1
+    assert conflator.interval_for(b'trades/data') is None
+    assert conflator.interval_for(b'ticker') == 0.01
+    assert Conflator().interval_for(b'ticker') is None
+
+
+def test_unknown_policy_raises_value_error():
+    with pytest.raises(ValueError):
+        Conflator({'order_book': 'fastest'})
+    with pytest.raises(ValueError):
+        Conflator(default=0)
+
+
+def test_passthrough_topics_are_not_held_back():
+    conflator = Conflator({'book': LATEST})
+    messages = [msg(b'trades', str(i)) for i in range(5)]
+    assert conflator.admit(messages, 0) == messages
+    assert conflator.next_deadline() is None
+
+
+def test_latest_publishes_first_and_most_recent_message():
+    conflator = Conflator({'book': LATEST}, flush_interval=1)
+    messages = [msg(b'book', i) for i in range(5)]
+    assert conflator.admit(messages, 10) == [messages[0]]
+    assert conflator.conflated == 3
+    assert conflator.conflated_by_topic == {'book': 3}
+    assert conflator.next_deadline() == 11
+
+    assert conflator.flush_due(10.5) == []
+    assert conflator.flush_due(11) == [messages[4]]
+    assert conflator.next_deadline() is None
+    # The interval restarts with the flushed message
+    assert conflator.admit([msg(b'book', 5)], 11.5) == []
+    assert conflator.flush_due(12) == [msg(b'book', 5)]
+    assert conflator.admit([msg(b'book', 6)], 13.5) == [msg(b'book', 6)]
+
+
+def test_max_rate_limits_topics_independently():
+    conflator = Conflator(default=2)
+    messages = [msg(b'a', 1), msg(b'b', 1), msg(b'a', 2), msg(b'b', 2), msg(b'a', 3)]
+    assert conflator.admit(messages, 0) == [msg(b'a', 1), msg(b'b', 1)]
+    assert conflator.conflated_by_topic == {'a': 1}
+    assert conflator.flush_due(0.5) == [msg(b'a', 3), msg(b'b', 2)]
+
+
+def test_node_publishes_conflated_messages_when_due():
+    fake_pub = mock.Mock(spec=Publisher)
+    node = DataNode('TestDataNode', receiver=mock.Mock(spec=Receiver), publisher=fake_pub,
+                    conflator=Conflator({'book': LATEST}, flush_interval=0.01))
+    node._dispatch([(b'book', b'1', 1), (b'book', b'2', 2), (b'trades', b'3', 3)])
+    assert [call[0][0].data[0] for call in fake_pub.publish.call_args_list] == ['1', '3']
+    assert 0 <= node._poll_timeout_ms() <= 10
+
+    deadline = node.conflator.next_deadline()
+    with mock.patch('thoth.core.node.time.monotonic', return_value=deadline):
+        node._dispatch([])
+    assert fake_pub.publish.call_args[0][0].data[0] == '2'
+    assert node._poll_timeout_ms() == 1000
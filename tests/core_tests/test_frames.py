@@ -0,0 +1,53 @@
+import unittest.mock as mock
+
+import zmq
+
+from thoth.core.frames import (pack_ts, unpack_ts, pack_frames, send_frames, as_str,
+                               pack_trace, unpack_trace, pack_traced_frames, ZERO_COPY_THRESHOLD)
+
+
+def test_timestamps_are_packed_as_8_byte_nanoseconds():
+    assert len(pack_ts(1514764800123456789)) == 8
+    assert unpack_ts(pack_ts(1514764800123456789)) == 1514764800123456789
+    assert abs(unpack_ts(pack_ts(1514764800.5)) - 1514764800500000000) < 1000
+
+
+def test_unpack_ts_accepts_memoryviews_frames_and_numbers():
+    packed = pack_ts(42)
+    assert unpack_ts(memoryview(packed)) == 42
+    assert unpack_ts(zmq.Frame(packed)) == 42
+    assert unpack_ts(42) == 42
+
+
+def test_pack_frames_passes_bytes_payloads_on_untouched():
+    payload = b'{"e":"trade"}'
+    topic, data, ts = pack_frames('trades_BNBBTC', payload, 42)
+    assert topic == b'trades_BNBBTC'
+    assert data is payload
+    assert unpack_ts(ts) == 42
+
+
+def test_as_str_decodes_all_frame_types():
+    for frame in (b'topic', memoryview(b'topic'), zmq.Frame(b'topic'), 'topic'):
+        assert as_str(frame) == 'topic'
+
+
+def test_send_frames_only_avoids_copies_for_large_data_frames():
+    sock = mock.Mock()
+    small = pack_frames('topic', b'x', 1)
+    large = pack_frames('topic', b'x' * ZERO_COPY_THRESHOLD, 1)
+    send_frames(sock, small)
+    send_frames(sock, large)
+    assert sock.send_multipart.call_args_list == [mock.call(small, copy=True),
+                                                  mock.call(large, copy=False)]
+
+
+def test_trace_frames_carry_timestamp_stages_and_source():
+    topic, data, ts = pack_traced_frames('topic', b'data', 42, 10, 20, b'BinanceConnector')
+    assert (topic, data) == (b'topic', b'data')
+    assert unpack_ts(ts) == unpack_ts(zmq.Frame(ts)) == 42
+    socket_at, parsed_at, source = unpack_trace(memoryview(ts))
+    assert (socket_at, parsed_at) == (10, 20)
+    assert source == 'BinanceConnector'
+    assert unpack_trace(pack_ts(42)) is None
+    assert unpack_ts(pack_trace(42.0, 1, 2, b'')) == 42 * 10 ** 9
@@ -0,0 +1,59 @@
+import logging
+from unittest import mock
+
+from thoth.core.logsetup import RateLimitFilter, configure_logging, stop_logging
+
+
+def make_record(msg='Received %s', args=(1,), name='thoth.test', level=logging.DEBUG):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_filter_drops_repeated_messages_and_counts_them():
+    log_filter = RateLimitFilter(rate=10, burst=2)
+    with mock.patch('thoth.core.logsetup.time.monotonic', return_value=100.0) as monotonic:
+        assert [log_filter.filter(make_record(args=(i,))) for i in range(5)] == [
+            True, True, False, False, False]
+        # Other messages have buckets of their own
+        assert log_filter.filter(make_record(msg='Sent %s'))
+        monotonic.return_value = 100.15
+        record = make_record()
+        assert log_filter.filter(record)
+        assert record.getMessage() == 'Received 1 [3 similar messages suppressed]'
+        assert not log_filter.filter(make_record())
+
+
+def test_rate_limit_filter_passes_records_above_max_level():
+    log_filter = RateLimitFilter(rate=1, burst=1, max_level=logging.WARNING)
+    assert all(log_filter.filter(make_record(level=logging.ERROR)) for _ in range(5))
+
+
+def test_rate_limit_filter_forgets_refilled_buckets():
+    log_filter = RateLimitFilter(rate=10, burst=1, max_groups=10)
+    with mock.patch('thoth.core.logsetup.time.monotonic', return_value=100.0) as monotonic:
+        for i in range(10):
+            log_filter.filter(make_record(msg='Message %d' % i))
+        assert not log_filter.filter(make_record(msg='Message 0'))
+        monotonic.return_value = 101.0
+        assert log_filter.filter(make_record(msg='Message 10'))
+        # Only the suppressed message's bucket is kept, besides the new one
+        assert len(log_filter._buckets) == 2
+        for i in range(100):
+            log_filter.filter(make_record(msg='Message %d' % i))
+        assert len(log_filter._buckets) <= 10
+
+
+def test_configure_logging_writes_records_on_background_thread(tmp_path):
+    path = tmp_path / 'thoth.log'
+    listener = configure_logging(str(path), level=logging.DEBUG, rate=0,
+                                 logger='thoth.test_logsetup')
+    try:
+        logger = logging.getLogger('thoth.test_logsetup.child')
+        for i in range(100):
+            logger.debug("Message %s", i)
+    finally:
+        stop_logging(listener)
+    # Stopping again, e.g. at exit, does nothing
+    stop_logging(listener)
+    lines = path.read_text().splitlines()
+    assert len(lines) == 100
+    assert lines[-1].endswith('Message 99')
@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+from thoth.core.metadata import (CACHE_VERSION, RestFetcher, SymbolRegistry, get_registry,
+                                 shared_session)
+
+
+class FakeFetcher:
+    """Local stand-in for an exchange's symbol endpoint."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_registry_notifies_listeners_of_changes(tmp_path):
+    fetcher = FakeFetcher({'A': {'id': 1}, 'B': {'id': 2}}, {'B': {'id': 2}, 'C': {'id': 3}})
+    registry = SymbolRegistry('test', fetcher, cache_dir=str(tmp_path))
+    changes = []
+    registry.subscribe(lambda added, removed: changes.append((added, removed)))
+    assert not registry.wait(0)
+
+    registry.refresh()
+    assert registry.wait(0)
+    assert registry['A'] == {'id': 1} and 'B' in registry
+    registry.refresh()
+    assert changes == [({'A': {'id': 1}, 'B': {'id': 2}}, {}),
+                       ({'C': {'id': 3}}, {'A': {'id': 1}})]
+    assert sorted(registry) == ['B', 'C']
+
+
+def test_registry_starts_from_cache(tmp_path):
+    SymbolRegistry('test', FakeFetcher({'A': {'id': 1}}), cache_dir=str(tmp_path)).refresh()
+
+    fetcher = FakeFetcher(IOError('unreachable'))
+    registry = SymbolRegistry('test', fetcher, cache_dir=str(tmp_path))
+    # Available before fetching anything
+    assert registry.wait(0) and registry.get('A') == {'id': 1}
+    changes = []
+    registry.subscribe(lambda added, removed: changes.append(added))
+    assert changes == [{'A': {'id': 1}}]
+
+    # A failed refresh keeps the cached symbols
+    registry.start()
+    registry.stop(timeout=1)
+    assert fetcher.calls == 1
+    assert registry.get('A') == {'id': 1}
+
+
+def test_registry_ignores_cache_of_other_version(tmp_path):
+    (tmp_path / 'test.json').write_text(json.dumps(
+        {'version': CACHE_VERSION + 1, 'fetched_at': 0, 'symbols': {'A': {}}}))
+    assert not SymbolRegistry('test', FakeFetcher(), cache_dir=str(tmp_path)).wait(0)
+    (tmp_path / 'test.json').write_text('{')
+    assert not SymbolRegistry('test', FakeFetcher(), cache_dir=str(tmp_path)).wait(0)
+
+
+def test_registry_refreshes_in_background(tmp_path):
+    registry = SymbolRegistry('test', FakeFetcher({'A': {}}, {'A': {}, 'B': {}}),
+                              cache_dir=False, refresh_interval=0.01)
+    added = threading.Event()
+    registry.subscribe(lambda new, removed: 'B' in new and added.set())
+    registry.start()
+    try:
+        assert added.wait(2)
+    finally:
+        registry.stop(timeout=1)
+    assert not list(tmp_path.iterdir())
+
+
+def test_rest_fetcher_parses_response():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            body = json.dumps([{'currency_pair_code': 'BTCUSD'}]).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        fetcher = RestFetcher('http://127.0.0.1:%d/products' % server.server_port,
+                              parse=lambda data: {d['currency_pair_code']: d for d in data})
+        assert fetcher.session is shared_session()
+        assert fetcher() == {'BTCUSD': {'currency_pair_code': 'BTCUSD'}}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_get_registry_creates_registries_anew_in_forked_processes(tmp_path):
+    registries = []
+    try:
+        registries.append(get_registry('test-fork', dict, cache_dir=str(tmp_path)))
+        assert get_registry('test-fork') is registries[0]
+        with mock.patch('thoth.core.metadata.os.getpid', return_value=os.getpid() + 1):
+            registries.append(get_registry('test-fork', dict, cache_dir=str(tmp_path)))
+        assert registries[1] is not registries[0]
+        assert registries[1]._thread.is_alive()
+    finally:
+        for registry in registries:
+            registry.stop(1)
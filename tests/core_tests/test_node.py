@@ -1,9 +1,16 @@
 import logging
+import queue
+import threading
+import time
 import unittest.mock as mock
 
 import pytest
+import zmq
 
-from thoth.core import DataNode
+from thoth.core import DataNode, ThothEnvelope
+from thoth.core.batching import PushBatcher
+from thoth.core.frames import pack_ts, pack_frames
+from thoth.core.receiver import PullReceiver
 from hermes import Publisher, Receiver
 
 
@@ -66,17 +73,176 @@ Cases:
 """
 
 
+def stopping_recv(node, results):
+    """Return a recv side effect returning/raising the given results, then stopping the node."""
+    results = list(results)
+
+    def recv(*args, **kwargs):
+        result = results.pop(0)
+        if not results:
+            node._running = False
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return recv
+
+
 def test_case_1_queue_empty_exception(dummy_node):
-    pytest.fail("Finish this test!")
+    dummy_node.recv = mock.Mock(side_effect=stopping_recv(dummy_node, [
+        queue.Empty(), ('topic', 'data', 1)]))
+    dummy_node._running = True
+    dummy_node.run()
+    assert dummy_node.recv.call_count == 2
+    dummy_node.process_frames.assert_called_once_with('topic', 'data', 1)
+
+
+def test_case_2_timeout_exception_on_recv_call(dummy_node):
+    dummy_node.recv = mock.Mock(side_effect=stopping_recv(dummy_node, [
+        TimeoutError(), ('topic', 'data', 1)]))
+    dummy_node._running = True
+    dummy_node.run()
+    assert dummy_node.recv.call_count == 2
+    dummy_node.process_frames.assert_called_once_with('topic', 'data', 1)
+
+
+def test_case_3_value_error_on_tuple_unpacking(dummy_node, caplog):
+    dummy_node.recv = mock.Mock(side_effect=stopping_recv(dummy_node, [
+        ('topic', 'data'), ('topic', 'data', 1)]))
+    dummy_node._running = True
+    with caplog.at_level(logging.ERROR):
+        dummy_node.run()
+    assert "('topic', 'data')" in caplog.text
+    dummy_node.process_frames.assert_called_once_with('topic', 'data', 1)
+
+
+def test_case_4_recv_and_unpack_successful_result_in_process_frames_called(dummy_node):
+    dummy_node.recv = mock.Mock(side_effect=stopping_recv(dummy_node, [
+        ('topic', 'data', 1), ('topic', 'data', 2)]))
+    dummy_node._running = True
+    dummy_node.run()
+    dummy_node.process_frames.assert_has_calls([mock.call('topic', 'data', 1),
+                                                mock.call('topic', 'data', 2)])
+
+
+def test_run_unpacks_batched_messages():
+    class TestDataNode(DataNode):
+        def process_frames(self, topic, data, ts):
+            pass
+
+    sock = mock.Mock()
+    batcher = PushBatcher(sock, batch_size=2)
+    batcher.push([b'topic', b'data_1', b'1'])
+    batcher.push([b'topic', b'data_2', b'2'])
+    batch = sock.send_multipart.call_args[0][0]
 
+    node = TestDataNode('TestDataNode', publisher=mock.Mock(), receiver=mock.Mock(spec=Receiver))
+    node.process_frames = mock.Mock()
 
-def test_case_2_timeout_exception_on_recv_call():
-    pytest.fail("Finish this test!")
+    def recv(*args, **kwargs):
+        node._running = False
+        return batch
 
+    node.recv = recv
+    node._running = True
+    node.run()
+    node.process_frames.assert_has_calls([mock.call(b'topic', b'data_1', b'1'),
+                                          mock.call(b'topic', b'data_2', b'2')])
+
+
+def test_process_frames_accepts_zmq_frames_and_memoryviews():
+    class TestDataNode(DataNode):
+        def process_frames(self, topic, data, ts):
+            super(TestDataNode, self).process_frames(topic, data, ts)
+
+    fake_pub = mock.Mock(spec=Publisher)
+    node = TestDataNode('TestDataNode', publisher=fake_pub, receiver=mock.Mock(spec=Receiver))
+    node.process_frames(zmq.Frame(b'topic'), memoryview(b'this is data'), pack_ts(12345))
+    envelope = fake_pub.publish.call_args[0][0]
+    assert envelope.topic == 'topic'
+    assert envelope.data == ('this is data', 12345)
 
-def test_case_3_value_error_on_tuple_unpacking():
-    pytest.fail("Finish this test!")
 
+def test_process_frames_publishes_thoth_envelopes_if_codec_is_set():
+    class TestDataNode(DataNode):
+        def process_frames(self, topic, data, ts):
+            super(TestDataNode, self).process_frames(topic, data, ts)
+
+    fake_pub = mock.Mock(spec=Publisher)
+    node = TestDataNode('TestDataNode', publisher=fake_pub, receiver=mock.Mock(spec=Receiver),
+                        codec='struct')
+    node.process_frames(b'topic', b'this is data', pack_ts(12345))
+    envelope = fake_pub.publish.call_args[0][0]
+    assert isinstance(envelope, ThothEnvelope)
+    assert ThothEnvelope.load_from_frames(envelope.convert_to_frames()).data == (
+        b'this is data', 12345)
+
+
+def run_with_pull_receiver(node_cls, frames, **node_kwargs):
+    """Push the given multipart messages to a node using a PullReceiver and run it."""
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_node_poller_%s' % id(frames)
+    push = ctx.socket(zmq.PUSH)
+    push.bind(addr)
+    receiver = PullReceiver(addr, ctx=ctx)
+    node = node_cls('TestDataNode', publisher=mock.Mock(spec=Publisher), receiver=receiver,
+                    poll_timeout=0.01, **node_kwargs)
+    receiver.start()
+    node._running = True
+    for message in frames:
+        push.send_multipart(message)
+    runner = threading.Thread(target=node.run)
+    runner.start()
+    return node, push, runner
+
+
+def stop(node, push, runner):
+    node._running = False
+    runner.join(1)
+    node.receiver.stop()
+    push.close()
+    assert not runner.is_alive()
+
+
+def test_poller_loop_drains_messages_into_batches():
+    class TestDataNode(DataNode):
+        pass
+
+    messages = [pack_frames('topic', b'data_%d' % i, i) for i in range(5)]
+    node, push, runner = run_with_pull_receiver(TestDataNode, messages, drain_limit=3)
+    node.process_batch = mock.Mock()
+    try:
+        for _ in range(100):
+            if sum(len(c[0][0]) for c in node.process_batch.call_args_list) == 5:
+                break
+            time.sleep(0.01)
+        batches = [c[0][0] for c in node.process_batch.call_args_list]
+        assert all(len(batch) <= 3 for batch in batches)
+        assert [m[1] for batch in batches for m in batch] == [b'data_%d' % i for i in range(5)]
+    finally:
+        stop(node, push, runner)
+
+
+def test_process_batch_publishes_all_envelopes():
+    class TestDataNode(DataNode):
+        pass
+
+    fake_pub = mock.Mock(spec=Publisher)
+    node = TestDataNode('TestDataNode', publisher=fake_pub, receiver=mock.Mock(spec=Receiver))
+    node.process_batch([(b'topic', b'data_1', pack_ts(1)), (b'topic', b'data_2', pack_ts(2))])
+    assert [c[0][0].data for c in fake_pub.publish.call_args_list] == [('data_1', 1),
+                                                                       ('data_2', 2)]
+    fake_pub.publish_many = mock.Mock()
+    node.process_batch([(b'topic', b'data_3', pack_ts(3))])
+    assert fake_pub.publish_many.call_args[0][0][0].data == ('data_3', 3)
+
+
+def test_process_batch_falls_back_to_overridden_process_frames():
+    class TestDataNode(DataNode):
+        def process_frames(self, topic, data, ts):
+            self.processed.append(data)
 
-def test_case_4_recv_and_unpack_successful_result_in_process_frames_called():
-    pytest.fail("Finish this test!")
+    node = TestDataNode('TestDataNode', publisher=mock.Mock(spec=Publisher),
+                        receiver=mock.Mock(spec=Receiver))
+    node.processed = []
+    node.process_batch([(b'topic', b'data_1', 1), (b'topic', b'data_2', 2)])
+    assert node.processed == [b'data_1', b'data_2']
@@ -0,0 +1,238 @@
+import functools
+import json
+
+import zmq
+
+from thoth.connectors.binance import BinanceConnector
+from thoth.connectors.gdax import GDAXConnector
+from thoth.core.receiver import PullReceiver
+from thoth.core.pool import (ConnectionPool, Deduplicator, plan_moves, plan_shards,
+                             topic_symbol)
+from thoth.testing.exchange import FakeExchange
+
+
+class FakeConnector:
+    """Connector stand-in recording its lifecycle and pushed messages."""
+
+    def __init__(self, symbols, zmq_addr, events, connects=True):
+        self.symbols = symbols
+        self.zmq_addr = zmq_addr
+        self.events = events
+        self.connected = False
+        self.connects = connects
+        self.pushed = []
+
+    def push(self, topic, data, recv_at):
+        self.pushed.append((topic, data))
+
+    def start(self):
+        self.events.append(('start', self.zmq_addr, self.symbols))
+        self.connected = self.connects
+
+    def stop(self):
+        self.events.append(('stop', self.zmq_addr, self.symbols))
+        self.connected = False
+
+
+def make_pool(events, connects=True, **kwargs):
+    def factory(symbols, addr):
+        return FakeConnector(symbols, addr, events, connects)
+    return ConnectionPool(factory, ['a', 'b', 'c', 'd'], 'inproc://pool', connect_timeout=0.05,
+                          **kwargs)
+
+
+def test_topic_symbol():
+    assert topic_symbol('diff_book_BNBBTC') == 'BNBBTC'
+    assert topic_symbol(b'order_book_BTC-USD/l2update') == 'BTC-USD'
+    assert topic_symbol(b'candle_BNBBTC/1m') == 'BNBBTC'
+
+
+def test_plan_shards_respects_symbol_limit_and_weights():
+    assert plan_shards('abcde', max_symbols=2) == [['a', 'd'], ['b', 'e'], ['c']]
+    assert plan_shards('abcd', 2, weights={'a': 10, 'b': 6, 'c': 3, 'd': 1}) == [
+        ['a'], ['b', 'c', 'd']]
+
+
+def test_plan_moves_moves_heavy_symbols_to_idle_shards():
+    shards = [['a', 'b', 'c'], ['d']]
+    rates = {'a': 50, 'b': 30, 'c': 20, 'd': 0}
+    assert plan_moves(shards, rates) == [('a', 0, 1)]
+    # Balanced enough
+    assert plan_moves([['a'], ['b', 'c']], rates) == []
+    # A single heavy symbol cannot be split
+    assert plan_moves([['a'], ['d']], rates) == []
+    assert plan_moves(shards, rates, max_symbols=1) == []
+
+
+def test_deduplicator_forwards_first_copy_and_records_leads():
+    dedup = Deduplicator(sequence_of=lambda topic, data: int(data), window=2)
+    assert dedup.admit(0, 't', '1')
+    assert not dedup.admit(1, 't', '1')
+    assert dedup.admit(1, 't', '2')
+    assert not dedup.admit(0, 't', '2')
+    assert dedup.admit(0, 'u', '2')
+    # Falls out of the window
+    assert dedup.admit(1, 't', '1')
+    snapshot = dedup.snapshot()
+    assert snapshot['duplicates'] == 2
+    assert snapshot['legs'][0]['wins'] == 2 and snapshot['legs'][1]['wins'] == 2
+    assert snapshot['legs'][0]['lead']['count'] == 1
+
+
+def test_deduplicator_falls_back_to_payload():
+    dedup = Deduplicator(sequence_of=lambda topic, data: None)
+    assert dedup.admit(0, 't', b'x')
+    assert not dedup.admit(1, 't', b'x')
+    assert dedup.admit(1, 't', b'y')
+    assert not dedup.admit(0, 't', 'y')
+
+
+def test_deduplicator_forwards_repeated_payloads_of_the_same_leg():
+    dedup = Deduplicator()
+    # An unchanged ticker, sent twice by the exchange and received by both legs
+    assert dedup.admit(0, 'ticker', b'{"bid": 1}')
+    assert dedup.admit(0, 'ticker', b'{"bid": 1}')
+    assert not dedup.admit(1, 'ticker', b'{"bid": 1}')
+    assert not dedup.admit(1, 'ticker', b'{"bid": 1}')
+    assert dedup.snapshot()['duplicates'] == 2
+    assert dedup.admit(1, 'ticker', memoryview(b'{"bid": 2}'))
+
+
+def test_pool_opens_legs_and_deduplicates_them():
+    events = []
+    pool = make_pool(events, connections=2, legs=2)
+    pool.start()
+    try:
+        assert len(pool.connectors) == 4
+        assert len(pool.addrs) == 8
+        assert {conn.zmq_addr for conn in pool.connectors.values()} <= set(pool.addrs)
+        leg_0, leg_1 = pool.connectors[(0, 0)], pool.connectors[(0, 1)]
+        leg_0.push('trades_a', b'1', 0)
+        leg_1.push('trades_a', b'1', 0)
+        leg_1.push('trades_a', b'2', 0)
+        assert leg_0.pushed == [('trades_a', b'1')]
+        assert leg_1.pushed == [('trades_a', b'2')]
+        assert pool.deduplicator.snapshot()['duplicates'] == 1
+    finally:
+        pool.stop()
+    assert not pool.connectors
+
+
+def test_pool_measures_rates_and_moves_symbols_make_before_break():
+    events = []
+    pool = make_pool(events, connections=2)
+    pool.start()
+    try:
+        assert pool.shards == [['a', 'c'], ['b', 'd']]
+        for _ in range(30):
+            pool.connectors[(0, 0)].push(b'trades_A', b'', 0)
+        for _ in range(20):
+            pool.connectors[(0, 0)].push(b'trades_C/x', b'', 0)
+        rates = pool.rates()
+        assert rates['a'] > rates['c'] > rates['b'] == 0
+        del events[:]
+        assert pool.move('c', 0, 1)
+        assert pool.shards == [['a'], ['b', 'd', 'c']]
+        # Replacements bind the shards' other addresses and start before the old ones stop
+        assert events == [('start', 'inproc://pool_1_0_1', ['b', 'd', 'c']),
+                          ('start', 'inproc://pool_0_0_1', ['a']),
+                          ('stop', 'inproc://pool_1_0_0', ['b', 'd']),
+                          ('stop', 'inproc://pool_0_0_0', ['a', 'c'])]
+    finally:
+        pool.stop()
+
+
+def test_pool_keeps_connection_if_replacement_fails():
+    events = []
+    pool = make_pool(events, connects=False, connections=2)
+    pool.start()
+    try:
+        old = pool.connectors[(1, 0)]
+        assert not pool.move('c', 0, 1)
+        assert pool.connectors[(1, 0)] is old
+        assert pool.shards == [['a', 'c'], ['b', 'd']]
+    finally:
+        pool.stop()
+
+
+def test_pool_keeps_both_shards_if_source_replacement_fails():
+    events = []
+
+    def factory(symbols, addr):
+        # Only the source's replacement, for the remaining symbol, fails to connect
+        return FakeConnector(symbols, addr, events, connects=symbols != ['a'])
+
+    pool = ConnectionPool(factory, ['a', 'b', 'c', 'd'], 'inproc://pool', connections=2,
+                          legs=2, connect_timeout=0.05)
+    pool.start()
+    try:
+        old = dict(pool.connectors)
+        assert not pool.move('c', 0, 1)
+        assert pool.connectors == old
+        assert pool.shards == [['a', 'c'], ['b', 'd']]
+        # The destination's replacements were closed again
+        started = [addr for event, addr, _ in events if event == 'start']
+        stopped = [addr for event, addr, _ in events if event == 'stop']
+        assert sorted(started[4:]) == sorted(stopped)
+    finally:
+        pool.stop()
+
+
+def test_rebalance_moves_heavy_symbols():
+    events = []
+    pool = make_pool(events, connections=2)
+    pool.start()
+    try:
+        for topic, count in ((b'trades_A', 50), (b'trades_C', 30), (b'trades_B', 5)):
+            conn = pool.connectors[(0 if topic in (b'trades_A', b'trades_C') else 1, 0)]
+            for _ in range(count):
+                conn.push(topic, b'', 0)
+        assert pool.rebalance() == [('c', 0, 1)]
+        assert pool.shards == [['a'], ['b', 'd', 'c']]
+    finally:
+        pool.stop()
+
+
+def test_connectors_read_sequence_numbers():
+    assert GDAXConnector.sequence_of(b'ticker_BTC-USD',
+                                     b'{"type":"ticker","sequence":42,"product_id":"BTC-USD"}') \
+        == 42
+    data = b'{"stream":"bnbbtc@depth","data":{"e":"depthUpdate","E":7,"U":3,"u":5}}'
+    assert BinanceConnector.sequence_of(b'diff_book_BNBBTC', data) == 5
+    assert BinanceConnector.sequence_of(b'ticker_BNBBTC', data) == 7
+    assert BinanceConnector.sequence_of(b'trades_BNBBTC', data) is None
+
+
+def test_pool_merges_redundant_legs_of_local_exchange(request):
+    exchange = FakeExchange('binance', count=20)
+    exchange.start()
+    ctx = zmq.Context.instance()
+
+    def factory(symbols, zmq_addr):
+        conn = BinanceConnector(symbols, zmq_addr=zmq_addr, ctx=ctx)
+        conn.url = exchange.url + '/stream?streams=bnbbtc@depth/bnbbtc@trade'
+        # The connector thread exits once websocket-client's select() times out; don't wait
+        conn.stop = functools.partial(conn.stop, timeout=0.1)
+        return conn
+
+    pool = ConnectionPool(factory, ['bnbbtc'], 'inproc://test_pool_%s' % request.node.name,
+                          legs=2, sequence_of=BinanceConnector.sequence_of)
+    receiver = PullReceiver(pool.addrs, ctx=ctx)
+    receiver.start()
+    pool.start()
+    try:
+        messages = []
+        while receiver.sock.poll(1000):
+            topic, data, _ = receiver.recv()
+            messages.append((bytes(topic), json.loads(data)['data']))
+    finally:
+        pool.stop()
+        receiver.stop()
+        exchange.stop()
+
+    # Both legs received all messages, each was published once
+    assert len(messages) == 20
+    assert sorted(event.get('u', event.get('t')) for _, event in messages) == list(range(20))
+    snapshot = pool.deduplicator.snapshot()
+    assert snapshot['duplicates'] == 20
+    assert sum(leg['wins'] for leg in snapshot['legs'].values()) == 20
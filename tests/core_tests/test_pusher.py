@@ -0,0 +1,44 @@
+import logging
+import time
+
+import pytest
+import zmq
+
+from thoth.connectors.bitstamp import BitstampConnector
+from thoth.core.receiver import PullReceiver
+from thoth.testing.exchange import FakeExchange, BitstampFeed
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange('bitstamp', count=1000)
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+def test_connector_subscribes_and_pushes_events_of_local_exchange(request, exchange):
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_pusher_%s' % request.node.name
+    receiver = PullReceiver(addr, ctx=ctx)
+    conn = BitstampConnector(custom_host=exchange.host, port=exchange.port, secure=False,
+                             zmq_addr=addr, ctx=ctx, log_level=logging.WARNING)
+    receiver.start()
+    conn.start()
+    expected = {'live_trades_btceur/data', 'order_book_btceur/data',
+                'diff_order_book_btceur/data', 'live_orders_btceur/order_created'}
+    messages = []
+    started = time.monotonic()
+    try:
+        # Events are spread over all subscribed channels, which are subscribed one by one
+        while not expected <= {topic for topic, _ in messages} and receiver.sock.poll(5000):
+            topic, data, _ = receiver.recv()
+            messages.append((bytes(topic).decode(), bytes(data)))
+        # Received messages count as signs of life, e.g. for supervised workers
+        assert conn.last_seen > started
+    finally:
+        conn.stop()
+        receiver.stop()
+
+    assert expected <= {topic for topic, _ in messages}
+    assert all(BitstampFeed.sent_at(data) for _, data in messages)
@@ -0,0 +1,33 @@
+import queue
+
+import pytest
+import zmq
+
+from thoth.core.receiver import PullReceiver
+
+
+@pytest.fixture
+def connected(request):
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_receiver_%s' % request.node.name
+    push = ctx.socket(zmq.PUSH)
+    push.bind(addr)
+    receiver = PullReceiver([addr], ctx=ctx)
+    receiver.start()
+    yield push, receiver
+    receiver.stop()
+    push.close()
+
+
+def test_recv_raises_queue_empty_if_no_data_is_available(connected):
+    _, receiver = connected
+    with pytest.raises(queue.Empty):
+        receiver.recv()
+    with pytest.raises(queue.Empty):
+        receiver.recv(block=True, timeout=0.01)
+
+
+def test_recv_returns_frames(connected):
+    push, receiver = connected
+    push.send_multipart([b'topic', b'data', b'ts'])
+    assert receiver.recv(block=True, timeout=1) == [b'topic', b'data', b'ts']
@@ -0,0 +1,63 @@
+import zmq
+import pytest
+
+from thoth.core.batching import iter_messages
+from thoth.core.capture import CaptureWriter
+from thoth.core.frames import unpack_ts
+from thoth.core.receiver import PullReceiver
+from thoth.core.replay import ReplayConnector
+
+
+@pytest.fixture
+def capture_dir(tmp_path):
+    writer = CaptureWriter(str(tmp_path), segment_size=1024, index_interval=64,
+                           fsync_interval=None)
+    writer.start()
+    for i in range(50):
+        # One message per ms
+        writer.write(b'topic_%d' % (i % 2), b'data_%d' % i, 10 ** 9 + i * 10 ** 6)
+    writer.stop()
+    return str(tmp_path)
+
+
+def replay(request, capture_dir, **kwargs):
+    """Replay the capture to a PullReceiver and return the received messages."""
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_replay_%s' % request.node.name
+    connector = ReplayConnector(capture_dir, zmq_addr=addr, ctx=ctx, **kwargs)
+    receiver = PullReceiver(addr, ctx=ctx)
+    receiver.start()
+    connector.start()
+    connector.done.wait(5)
+    received = []
+    while receiver.sock.poll(100):
+        received += [(bytes(topic), bytes(data), unpack_ts(ts))
+                     for topic, data, ts in iter_messages(receiver.recv())]
+    connector.stop()
+    receiver.stop()
+    return connector, received
+
+
+def test_replays_all_messages_as_fast_as_possible(request, capture_dir):
+    connector, received = replay(request, capture_dir, speed=None, batch_size=10)
+    assert [data for _, data, _ in received] == [b'data_%d' % i for i in range(50)]
+    assert received[1] == (b'topic_1', b'data_1', 10 ** 9 + 10 ** 6)
+    assert connector.count == 50 and connector.rate > 0
+
+
+def test_replays_time_range_and_topics(request, capture_dir):
+    _, received = replay(request, capture_dir, speed=None, topics=['topic_0'],
+                         start=10 ** 9 + 10 * 10 ** 6, end=10 ** 9 + 19 * 10 ** 6)
+    assert [data for _, data, _ in received] == [b'data_%d' % i for i in range(10, 20, 2)]
+
+
+def test_replays_with_scaled_timing(request, capture_dir):
+    connector, received = replay(request, capture_dir, speed=2)
+    assert len(received) == 50
+    # 49ms of captured traffic at twice the speed
+    assert 0.024 <= connector.elapsed < 1
+
+
+def test_restamps_messages(request, capture_dir):
+    _, received = replay(request, capture_dir, speed=None, restamp=True)
+    assert all(ts > 10 ** 18 for _, _, ts in received)
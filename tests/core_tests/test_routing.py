@@ -0,0 +1,28 @@
+import json
+
+from thoth.core.routing import scan_field, scan_fields
+
+
+def test_scan_field_reads_string_values_from_raw_messages():
+    data = b'{"stream":"bnbbtc@depth","data":{"e":"depthUpdate","s":"BNBBTC"}}'
+    assert scan_field(data, b'stream') == 'bnbbtc@depth'
+    assert scan_field(data, b'e') == 'depthUpdate'
+    assert scan_field(data.decode(), b's') == 'BNBBTC'
+    # Whitespace as produced by json.dumps() with default separators
+    assert scan_field(json.dumps({'type': 'ticker'}).encode(), b'type') == 'ticker'
+
+
+def test_scan_field_gives_up_on_values_requiring_a_parse():
+    assert scan_field(b'{"type":"l2update"}', b'product_id') is None
+    assert scan_field(b'{"sequence":12,"type":"a"}', b'sequence') is None
+    assert scan_field(b'{"type":"a\\"b"}', b'type') is None
+    assert scan_field(b'{"type":"unterminated', b'type') is None
+    # Keys beyond the scanned prefix are not found
+    assert scan_field(b'{"pad":"' + b'x' * 300 + b'","type":"a"}', b'type') is None
+    assert scan_field(b'{"pad":"' + b'x' * 300 + b'","type":"a"}', b'type', limit=400) == 'a'
+
+
+def test_scan_fields_requires_all_keys():
+    data = b'{"type":"l2update","product_id":"BTC-USD"}'
+    assert scan_fields(data, (b'type', b'product_id')) == ('l2update', 'BTC-USD')
+    assert scan_fields(data, (b'type', b'sequence')) is None
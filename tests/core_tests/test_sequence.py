@@ -0,0 +1,55 @@
+from unittest import mock
+
+from thoth.core.sequence import SequenceTracker
+
+
+def test_tracker_detects_gaps_per_channel():
+    recover = mock.Mock()
+    tracker = SequenceTracker(recover)
+    assert tracker.check('a', 1)
+    assert tracker.check('b', 10)
+    assert tracker.check('a', 2)
+    assert not tracker.check('a', 5)
+    recover.assert_called_once_with('a', 3, 5)
+    # Only the affected channel recovers; further messages do not trigger recoveries
+    assert tracker.recovering('a') and not tracker.recovering('b')
+    assert not tracker.check('a', 9)
+    assert recover.call_count == 1
+    assert tracker.check('b', 11)
+
+
+def test_tracker_counts_stale_messages():
+    tracker = SequenceTracker()
+    assert tracker.check('a', 1)
+    assert tracker.check('a', 2)
+    assert not tracker.check('a', 2)
+    assert tracker.snapshot()['channels']['a'] == {'gaps': 0, 'missed': 0, 'stale': 1,
+                                                   'recovering': False}
+
+
+def test_tracker_records_recovery_times():
+    tracker = SequenceTracker()
+    tracker.check('a', 1)
+    tracker.check('a', 4)
+    tracker.resynced('a')
+    # The next message sets the channel's base
+    assert tracker.check('a', 100)
+    assert tracker.check('a', 101)
+    tracker.gap('a', 102, 110)
+    tracker.resynced('a', 120)
+    assert tracker.check('a', 121)
+    stats = tracker.snapshot()
+    assert stats['gaps'] == 2
+    assert stats['channels']['a']['missed'] == 10
+    assert stats['recovery']['count'] == 2
+    assert stats['gaps_per_hour'] > 0
+
+
+def test_tracker_reset_abandons_recovery():
+    tracker = SequenceTracker()
+    tracker.check('a', 1)
+    tracker.check('a', 3)
+    tracker.reset()
+    assert not tracker.recovering('a')
+    assert tracker.check('a', 0)
+    assert tracker.snapshot()['recovery']['count'] == 0
@@ -0,0 +1,128 @@
+import multiprocessing
+import threading
+import zlib
+
+import pytest
+import zmq
+
+from thoth.core.batching import iter_messages
+from thoth.core.frames import pack_frames
+from thoth.core.node import DataNode
+from thoth.core.receiver import PullReceiver
+from thoth.core.sharding import shard_of, ShardedDataNode
+
+
+def test_shard_of_is_stable_and_within_range():
+    topics = [('topic_%s' % i).encode() for i in range(100)]
+    shards = [shard_of(topic, 4) for topic in topics]
+    assert all(0 <= shard < 4 for shard in shards)
+    assert shards == [zlib.crc32(topic) % 4 for topic in topics]
+    assert shard_of(memoryview(b'topic_1'), 4) == shard_of(zmq.Frame(b'topic_1'), 4)
+    assert len(set(shards)) == 4
+
+
+@pytest.fixture
+def front_end(request):
+    ctx = zmq.Context.instance()
+    node = ShardedDataNode('TestShardedNode', receiver=None, node_factory=None, workers=3,
+                           addr='inproc://test_sharding_%s' % request.node.name, ctx=ctx)
+    node._bind_shards()
+    pulls = []
+    for addr in node.addrs:
+        pull = ctx.socket(zmq.PULL)
+        pull.connect(addr)
+        pulls.append(pull)
+    yield node, pulls
+    for pull in pulls:
+        pull.close()
+    for sock in node.socks:
+        sock.close()
+
+
+def received(pulls):
+    """Return the (topic, data) pairs received per shard."""
+    result = []
+    for pull in pulls:
+        messages = []
+        while pull.poll(100):
+            messages += [(bytes(topic), bytes(data))
+                         for topic, data, _ in iter_messages(pull.recv_multipart())]
+        result.append(messages)
+    return result
+
+
+def test_process_batch_partitions_by_topic_and_preserves_order(front_end):
+    node, pulls = front_end
+    messages = [pack_frames('topic_%s' % (i % 10), str(i), i) for i in range(100)]
+    node.process_batch([tuple(frames) for frames in messages])
+
+    shards = received(pulls)
+    assert sum(len(messages) for messages in shards) == 100
+    for shard, shard_messages in enumerate(shards):
+        for topic, _ in shard_messages:
+            assert shard_of(topic, 3) == shard
+        for topic in {topic for topic, _ in shard_messages}:
+            data = [int(data) for t, data in shard_messages if t == topic]
+            assert data == sorted(data)
+
+
+def test_process_frames_forwards_single_messages(front_end):
+    node, pulls = front_end
+    node.process_frames(*pack_frames('topic_1', b'data', 1))
+    shards = received(pulls)
+    assert shards[shard_of(b'topic_1', 3)] == [(b'topic_1', b'data')]
+
+
+class ForwardingPublisher:
+    """Publisher forwarding the topic and data of each envelope to an address."""
+
+    name = 'ForwardingPublisher'
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.sock = None
+
+    def start(self):
+        self.sock = zmq.Context.instance().socket(zmq.PUSH)
+        self.sock.connect(self.addr)
+
+    def stop(self):
+        self.sock.close(linger=1000)
+
+    def publish(self, envelope):
+        self.sock.send_multipart([envelope.topic.encode(), envelope.data[0].encode()])
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason="requires fork start method")
+def test_sharded_node_runs_workers(tmp_path):
+    results_addr = 'ipc://%s/results' % tmp_path
+    ctx = zmq.Context.instance()
+    results = ctx.socket(zmq.PULL)
+    results.bind(results_addr)
+    push = ctx.socket(zmq.PUSH)
+    push.bind('ipc://%s/connector' % tmp_path)
+
+    def node_factory(name, receiver):
+        return DataNode(name, receiver=receiver, publisher=ForwardingPublisher(results_addr),
+                        poll_timeout=0.05)
+
+    node = ShardedDataNode('TestShardedNode', PullReceiver('ipc://%s/connector' % tmp_path),
+                           node_factory, workers=2, addr='ipc://%s/shard' % tmp_path,
+                           mp_context=multiprocessing.get_context('fork'), poll_timeout=0.05)
+    node.start()
+    runner = threading.Thread(target=node.run)
+    runner.start()
+    try:
+        for i in range(20):
+            push.send_multipart(pack_frames('topic_%s' % (i % 4), str(i), i))
+        got = [results.recv_multipart() for _ in range(20) if results.poll(5000)]
+    finally:
+        node._running = False
+        runner.join()
+        node.stop(timeout=2)
+        push.close()
+        results.close()
+    assert sorted(int(data) for _, data in got) == list(range(20))
+    assert {topic for topic, _ in got} == {('topic_%s' % i).encode() for i in range(4)}
+    assert not node.workers
@@ -0,0 +1,98 @@
+import json
+import random
+import unittest.mock as mock
+
+import pytest
+
+from hermes import Publisher, Receiver
+from thoth.core import DataNode
+from thoth.core.frames import pack_ts, pack_trace, unpack_trace
+from thoth.core.stats import Histogram, LatencyStats, topic_family, STATS_TOPIC, STAGES
+
+
+def test_histogram_percentiles_are_within_precision():
+    values = [random.randint(1, 10 ** 9) for _ in range(10000)]
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = values[int(len(values) * q + 0.5) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.01)
+    assert (histogram.min, histogram.max, histogram.count) == (values[0], values[-1], 10000)
+
+
+def test_histogram_records_small_values_exactly_and_clamps_large_ones():
+    histogram = Histogram(max_value=10 ** 6)
+    for value in (-5, 0, 3, 255, 10 ** 9):
+        histogram.record(value)
+    assert histogram.percentile(0.2) == 0
+    assert histogram.percentile(0.8) == 255
+    assert histogram.max == 10 ** 6
+    assert Histogram().percentile(0.5) is None
+
+
+def test_histogram_merge_and_reset():
+    a, b = Histogram(), Histogram()
+    a.record(100)
+    b.record(300)
+    a.merge(b)
+    assert a.summary()['count'] == 2 and a.summary()['mean'] == 200
+    assert (a.min, a.max) == (100, 300)
+    with pytest.raises(ValueError):
+        a.merge(Histogram(significant_bits=4))
+    a.reset()
+    assert a.count == 0 and a.percentile(0.5) is None
+
+
+def test_topic_family_strips_symbols():
+    assert topic_family('diff_book_BNBBTC') == 'diff_book'
+    assert topic_family('order_book_BTC-USD/l2update') == 'order_book'
+    assert topic_family('heartbeat') == 'heartbeat'
+
+
+def test_latency_stats_record_stages_of_traced_messages_only():
+    stats = LatencyStats()
+    traced = pack_trace(0, 1000, 3000, b'BinanceConnector')
+    # Received by the node 1ms after it was parsed, published 1ms later
+    _, parsed_at, _ = unpack_trace(traced)
+    stats.record_batch([(b'diff_book_BNBBTC', b'', traced), (b'trades_BNBBTC', b'', pack_ts(1)),
+                        (b'trades_BNBBTC', b'', 1)], parsed_at + 10 ** 6, parsed_at + 2 * 10 ** 6)
+
+    assert stats.traced == 1
+    snapshot = stats.snapshot()
+    assert list(snapshot['families']) == ['diff_book']
+    stages = snapshot['connectors']['BinanceConnector']
+    assert set(stages) == set(STAGES)
+    assert stages['parse']['p50'] == 2000
+    assert stages['transport']['max'] == pytest.approx(10 ** 6, rel=0.01)
+    assert stages['node']['max'] == pytest.approx(10 ** 6, rel=0.01)
+
+
+def test_latency_stats_are_due_every_interval():
+    stats = LatencyStats(interval=5)
+    now = stats._next_publish
+    assert not stats.due(now - 1)
+    assert stats.due(now)
+    assert not stats.due(now + 4)
+    assert stats.due(now + 5)
+
+
+def test_node_records_and_publishes_stats():
+    class TestDataNode(DataNode):
+        pass
+
+    publisher = mock.Mock(spec=Publisher)
+    stats = LatencyStats(interval=60)
+    node = TestDataNode('TestDataNode', publisher=publisher, receiver=mock.Mock(spec=Receiver),
+                        stats=stats)
+    node._dispatch([(b'diff_book_BNBBTC', b'data', pack_trace(1, 1, 2, b'TestConnector'))])
+    assert stats.traced == 1
+    assert publisher.publish.call_count == 1
+
+    stats._next_publish = 0
+    node._dispatch([])
+    envelope = publisher.publish.call_args[0][0]
+    assert envelope.topic == STATS_TOPIC
+    data, _ = envelope.data
+    assert json.loads(data)['connectors']['TestConnector']['total']['count'] == 1
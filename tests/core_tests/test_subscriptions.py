@@ -0,0 +1,109 @@
+import time
+
+from thoth.core.subscriptions import SubscriptionScheduler, TokenBucket, batched
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_batched():
+    assert batched('abcde', 2) == [['a', 'b'], ['c', 'd'], ['e']]
+    assert batched([], 2) == []
+
+
+def test_token_bucket_allows_burst_then_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Callers queue up behind each other
+    assert abs(bucket.reserve() - 0.1) < 1e-9
+    assert abs(bucket.reserve() - 0.2) < 1e-9
+    clock.now = 1
+    assert bucket.reserve() == 0
+
+
+def test_scheduler_sends_round_at_rate_and_records_coverage():
+    sent = []
+    scheduler = SubscriptionScheduler(rate=200, burst=5)
+    started = time.monotonic()
+    scheduler.start(sent.append, range(25))
+    assert scheduler.wait(5)
+    elapsed = time.monotonic() - started
+    assert sent == list(range(25))
+    # A burst of 5, then 20 requests at 200/s
+    assert 0.09 < elapsed < 1
+    snapshot = scheduler.snapshot()
+    assert snapshot['sent'] == 25 and snapshot['covered']
+    assert snapshot['time_to_coverage']['count'] == 1
+    assert snapshot['last_coverage'] >= 0.09
+
+
+def test_scheduler_waits_for_acknowledgements():
+    scheduler = SubscriptionScheduler(rate=1000, burst=10)
+    scheduler.start(lambda request: None, range(3), acknowledged=True).join(1)
+    assert not scheduler.wait(0)
+    scheduler.acknowledge()
+    scheduler.acknowledge()
+    assert not scheduler.snapshot()['covered']
+    scheduler.acknowledge()
+    assert scheduler.wait(0)
+    assert scheduler.snapshot()['acknowledged'] == 3
+
+
+def test_new_round_cancels_previous_one():
+    sent = []
+    scheduler = SubscriptionScheduler(rate=10)
+    first = scheduler.start(sent.append, ['old'] * 10)
+    scheduler.start(sent.append, ['new'])
+    first.join(1)
+    assert not first.is_alive()
+    assert scheduler.wait(1)
+    assert sent.count('old') < 10 and sent[-1] == 'new'
+
+
+def test_schedulers_share_bucket():
+    bucket = TokenBucket(rate=100, burst=1)
+    sent = []
+    schedulers = [SubscriptionScheduler(None, bucket=bucket) for _ in range(2)]
+    started = time.monotonic()
+    for i, scheduler in enumerate(schedulers):
+        scheduler.start(sent.append, [i] * 5)
+    assert all(scheduler.wait(5) for scheduler in schedulers)
+    # 10 requests at 100/s in total
+    assert time.monotonic() - started >= 0.085
+    assert sorted(sent) == [0] * 5 + [1] * 5
+
+
+def test_extend_adds_to_running_round_or_starts_new_one():
+    sent = []
+    scheduler = SubscriptionScheduler(rate=100)
+    scheduler.start(sent.append, range(3))
+    assert scheduler.extend(sent.append, [3]) is None
+    assert scheduler.wait(1)
+    assert sent == [0, 1, 2, 3]
+    scheduler.extend(sent.append, [4]).join(1)
+    assert sent[-1] == 4
+    assert scheduler.snapshot()['time_to_coverage']['count'] == 2
+
+
+def test_extend_credits_outstanding_acks_to_the_round_which_sent_them():
+    sent = []
+    scheduler = SubscriptionScheduler(rate=1000, burst=10)
+    scheduler.start(sent.append, range(2), acknowledged=True).join(1)
+    scheduler.acknowledge()
+    # All requests were sent, one acknowledgement is outstanding
+    scheduler.extend(sent.append, [2], acknowledged=True).join(1)
+    assert sent == [0, 1, 2]
+    scheduler.acknowledge()
+    assert not scheduler.wait(0)
+    scheduler.acknowledge()
+    assert scheduler.wait(0)
+    snapshot = scheduler.snapshot()
+    assert snapshot['requests'] == snapshot['acknowledged'] == 3
+    assert snapshot['time_to_coverage']['count'] == 1
@@ -0,0 +1,215 @@
+import functools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import pytest
+import zmq
+
+from thoth.connectors.binance import BinanceConnector
+from thoth.core.node import DataNode
+from thoth.core.supervisor import ConnectorFactory, Supervisor, from_config, run_connectors
+from thoth.testing.exchange import FakeExchange
+
+ctx = multiprocessing.get_context('fork')
+
+
+def idle(stopped, beat):
+    while not stopped.wait(0.01):
+        beat()
+
+
+def stuck(stopped, beat):
+    stopped.wait()
+
+
+def report_affinity(queue, stopped, beat):
+    queue.put(sorted(os.sched_getaffinity(0)))
+    idle(stopped, beat)
+
+
+class ExitingConnector(threading.Thread):
+    """Connector stand-in whose thread exits shortly after starting."""
+
+    def __init__(self, zmq_addr):
+        super().__init__(target=time.sleep, args=(0.1,), daemon=True)
+        self.last_seen = time.monotonic()
+
+    def stop(self):
+        pass
+
+
+class QuietConnector(threading.Thread):
+    """Connector stand-in running until stopped, without a ``last_seen`` attribute."""
+
+    def __init__(self, zmq_addr):
+        super().__init__(daemon=True)
+        self.stopped = threading.Event()
+
+    def run(self):
+        self.stopped.wait()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class PushingPublisher:
+    """Publisher stand-in pushing the topics of published envelopes to the test."""
+
+    name = 'PushingPublisher'
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.sock = None
+
+    def start(self):
+        self.sock = zmq.Context.instance().socket(zmq.PUSH)
+        self.sock.connect(self.addr)
+
+    def stop(self):
+        self.sock.close(linger=1000)
+
+    def publish(self, envelope):
+        self.sock.send_string(envelope.topic)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def supervisor(request):
+    supervisor = Supervisor('ipc:///tmp/test_supervisor_%s' % request.node.name,
+                            heartbeat_interval=0.05, heartbeat_timeout=0.5, mp_context=ctx)
+    yield supervisor
+    supervisor.stop(timeout=1)
+
+
+def test_restarts_crashed_worker_only(supervisor):
+    supervisor.add_worker('crashing', idle)
+    supervisor.add_worker('other', idle)
+    supervisor.start()
+    before = supervisor.snapshot()
+    os.kill(before['crashing']['pid'], signal.SIGKILL)
+    wait_for(lambda: supervisor.snapshot()['crashing']['restarts'] == 1)
+    wait_for(lambda: supervisor.snapshot()['crashing']['alive'])
+    after = supervisor.snapshot()
+    assert after['crashing']['pid'] != before['crashing']['pid']
+    assert after['other']['pid'] == before['other']['pid'] and after['other']['restarts'] == 0
+
+
+def test_restarts_worker_missing_heartbeats(supervisor):
+    supervisor.add_worker('hanging', idle)
+    supervisor.start()
+    pid = supervisor.snapshot()['hanging']['pid']
+    os.kill(pid, signal.SIGSTOP)
+    wait_for(lambda: supervisor.snapshot()['hanging']['restarts'] == 1)
+    wait_for(lambda: supervisor.snapshot()['hanging']['heartbeat_age'] < 0.5)
+    assert supervisor.snapshot()['hanging']['pid'] != pid
+
+
+def test_restarts_worker_making_no_progress(supervisor):
+    supervisor.add_worker('stuck', stuck)
+    supervisor.start()
+    pid = supervisor.snapshot()['stuck']['pid']
+    # The process is alive, but its work does not beat
+    wait_for(lambda: supervisor.snapshot()['stuck']['restarts'] == 1)
+    assert supervisor.snapshot()['stuck']['pid'] != pid
+
+
+def test_restarts_group_whose_connector_died(supervisor):
+    supervisor.add_group('exiting', [ExitingConnector])
+    supervisor.start()
+    pid = supervisor.snapshot()['exiting']['pid']
+    wait_for(lambda: supervisor.snapshot()['exiting']['restarts'] == 1)
+    assert supervisor.snapshot()['exiting']['pid'] != pid
+
+
+def test_connectors_without_last_seen_are_judged_by_their_thread(supervisor):
+    supervisor.add_worker('quiet', functools.partial(
+        run_connectors, [QuietConnector], ['unused'], interval=0.05, stale_after=0.1))
+    supervisor.start()
+    # Well past stale_after and the heartbeat timeout, the group still beats
+    time.sleep(1)
+    snapshot = supervisor.snapshot()['quiet']
+    assert snapshot['restarts'] == 0 and snapshot['heartbeat_age'] < 0.5
+
+
+def test_backs_off_restarts_of_failing_worker():
+    supervisor = Supervisor(heartbeat_interval=60, max_restart_delay=10, mp_context=ctx)
+    supervisor.add_worker('failing', lambda stopped, beat: None)
+    supervisor.start()
+    try:
+        worker = supervisor.workers['failing']
+        worker.process.join(1)
+        # Restarted right away at first, then after a delay
+        assert supervisor.check() == ['failing'] and worker.restart_at is None
+        worker.process.join(1)
+        assert supervisor.check() == ['failing'] and worker.restart_at > time.monotonic()
+        assert supervisor.check() == []
+    finally:
+        supervisor.stop(timeout=1)
+
+
+def test_pins_workers_to_cpus(supervisor):
+    queue = ctx.Queue()
+    supervisor.add_worker('pinned', functools.partial(report_affinity, queue), cpus=[0])
+    supervisor.start()
+    assert queue.get(timeout=5) == [0]
+
+
+def test_wires_connector_groups_to_nodes(supervisor, request):
+    exchange = FakeExchange('binance', rate=200)
+    exchange.start()
+    test_addr = 'ipc:///tmp/test_supervisor_%s_out' % request.node.name
+    sock = zmq.Context.instance().socket(zmq.PULL)
+    sock.bind(test_addr)
+
+    def connector(zmq_addr):
+        conn = BinanceConnector(['bnbbtc'], zmq_addr=zmq_addr)
+        conn.url = exchange.url + '/stream?streams=bnbbtc@depth/bnbbtc@trade'
+        return conn
+
+    def node(name, receiver):
+        return DataNode(name, receiver=receiver, publisher=PushingPublisher(test_addr))
+
+    addrs = supervisor.add_group('binance', [connector, connector])
+    supervisor.add_node('node', node)
+    try:
+        supervisor.start()
+        assert len(addrs) == 2
+        topics = set()
+        while len(topics) < 2 and sock.poll(5000):
+            topics.add(sock.recv_string())
+        assert topics == {'diff_book_BNBBTC', 'trades_BNBBTC'}
+
+        # Data flows again once the crashed connector group is restarted
+        os.kill(supervisor.snapshot()['binance']['pid'], signal.SIGKILL)
+        wait_for(lambda: supervisor.snapshot()['binance']['restarts'] == 1)
+        while sock.poll(0):
+            sock.recv_string()
+        assert sock.poll(5000)
+        assert supervisor.snapshot()['node']['restarts'] == 0
+    finally:
+        supervisor.stop(timeout=1)
+        sock.close(linger=0)
+        exchange.stop()
+
+
+def test_builds_supervisor_from_config():
+    supervisor = from_config({
+        'addr': 'ipc:///tmp/thoth', 'heartbeat_timeout': 3,
+        'nodes': [{'name': 'node', 'pub_addr': 'tcp://127.0.0.1:5555', 'cpus': [0]}],
+        'groups': [{'name': 'binance', 'cpus': [1], 'connectors': [
+            {'connector': 'binance', 'kwargs': {'pairs': ['bnbbtc']}}]}]})
+    assert supervisor.heartbeat_timeout == 3
+    assert supervisor.nodes['node'][1] == [0]
+    factories, addrs, node, cpus = supervisor.groups['binance']
+    assert addrs == ['ipc:///tmp/thoth_binance_0'] and node is None and cpus == [1]
+    assert isinstance(factories[0], ConnectorFactory)
+    assert factories[0].kwargs == {'pairs': ['bnbbtc']}
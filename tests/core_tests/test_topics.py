@@ -0,0 +1,43 @@
+from thoth.core.topics import TopicTable
+
+
+def test_topics_are_encoded_once():
+    table = TopicTable()
+    topic = table.add(('trade', 'btcusd'), 'trades_btcusd')
+    assert topic == b'trades_btcusd'
+    assert table.get(('trade', 'btcusd')) is topic
+    assert ('trade', 'btcusd') in table
+    assert table.get(('trade', 'ethusd')) is None
+
+
+def test_templates_are_expanded_for_all_pairs():
+    table = TopicTable()
+    table.add_templates(['BTC-USD', 'ETH-USD'], {'ticker': 'ticker_{pair}',
+                                                 'l2update': 'order_book_{pair}/l2update'})
+    assert len(table) == 4
+    assert table.get(('l2update', 'ETH-USD')) == b'order_book_ETH-USD/l2update'
+    assert table.topics() == ['order_book_BTC-USD/l2update', 'order_book_ETH-USD/l2update',
+                              'ticker_BTC-USD', 'ticker_ETH-USD']
+
+
+def test_unknown_keys_are_resolved_by_factory_once_if_found():
+    calls = []
+
+    def factory(key):
+        calls.append(key)
+        return None if key == 'unknown' else 'topic_' + key
+
+    table = TopicTable(factory)
+    assert table.get('a') == b'topic_a'
+    assert table.get('a') == b'topic_a'
+    assert table.get('unknown') is None
+    assert table.get('unknown') is None
+    assert calls == ['a', 'unknown', 'unknown']
+    assert table.topics() == ['topic_a']
+    assert 'unknown' not in table
+
+
+def test_resolved_topics_are_capped():
+    table = TopicTable(lambda key: 'topic_' + key, max_resolved=2)
+    assert [table.get(key) for key in 'abc'] == [b'topic_a', b'topic_b', b'topic_c']
+    assert len(table) == 2 and 'c' not in table
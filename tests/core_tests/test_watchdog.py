@@ -0,0 +1,70 @@
+import time
+import threading
+
+from thoth.core.watchdog import Watchdog, get_watchdog
+
+
+class FakeConnector:
+    def __init__(self, timeout):
+        self.last_seen = time.monotonic()
+        self.connection_timeout = timeout
+        self.timed_out = threading.Event()
+
+    def _connection_timed_out(self):
+        self.timed_out.set()
+
+
+def test_get_watchdog_returns_running_singleton():
+    watchdog = get_watchdog()
+    assert watchdog is get_watchdog()
+    assert watchdog.is_alive()
+
+
+def test_call_later_executes_callbacks_in_deadline_order():
+    watchdog = Watchdog()
+    watchdog.start()
+    calls = []
+    done = threading.Event()
+    watchdog.call_later(0.05, lambda: (calls.append(2), done.set()))
+    watchdog.call_later(0.01, lambda: calls.append(1))
+    assert done.wait(1)
+    assert calls == [1, 2]
+
+
+def test_cancelled_call_is_not_executed():
+    watchdog = Watchdog()
+    watchdog.start()
+    calls = []
+    call = watchdog.call_later(0.01, lambda: calls.append(1))
+    call.cancel()
+    time.sleep(0.05)
+    assert calls == []
+
+
+def test_watched_connector_times_out_without_data():
+    watchdog = Watchdog()
+    watchdog.start()
+    connector = FakeConnector(0.05)
+    watchdog.watch(connector)
+    assert connector.timed_out.wait(1)
+
+
+def test_updating_last_seen_pushes_back_the_deadline():
+    watchdog = Watchdog()
+    watchdog.start()
+    connector = FakeConnector(0.1)
+    watchdog.watch(connector)
+    for _ in range(5):
+        time.sleep(0.04)
+        connector.last_seen = time.monotonic()
+    assert not connector.timed_out.is_set()
+    assert connector.timed_out.wait(1)
+
+
+def test_unwatched_connector_does_not_time_out():
+    watchdog = Watchdog()
+    watchdog.start()
+    connector = FakeConnector(0.02)
+    watchdog.watch(connector)
+    watchdog.unwatch(connector)
+    assert not connector.timed_out.wait(0.1)
@@ -0,0 +1,150 @@
+import json
+import time
+
+import pytest
+import zmq
+
+from thoth.connectors.binance import BinanceConnector
+from thoth.core.frames import unpack_ts, unpack_trace
+from thoth.core.receiver import PullReceiver
+from thoth.core.websocket import backoff_delay
+from thoth.testing.exchange import FakeExchange, BinanceFeed
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange('binance', count=20)
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+def receive(receiver, n):
+    messages = []
+    while len(messages) < n and receiver.sock.poll(5000):
+        topic, data, ts = receiver.recv()
+        messages.append((bytes(topic).decode(), bytes(data), unpack_ts(ts)))
+    return messages
+
+
+def test_connector_pushes_messages_of_local_exchange(request, exchange):
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_websocket_%s' % request.node.name
+    receiver = PullReceiver(addr, ctx=ctx)
+    conn = BinanceConnector(['bnbbtc'], zmq_addr=addr, ctx=ctx)
+    conn.url = exchange.url + '/stream?streams=bnbbtc@depth/bnbbtc@trade'
+    receiver.start()
+    conn.start()
+    try:
+        messages = receive(receiver, 20)
+    finally:
+        # The connector thread exits once websocket-client's select() times out; don't wait
+        conn.stop(timeout=0.1)
+        receiver.stop()
+
+    assert len(messages) == 20
+    assert [topic for topic, _, _ in messages[:4]] == ['diff_book_BNBBTC'] * 3 + ['trades_BNBBTC']
+    # Data is passed on untouched and received after it was sent
+    for i, (_, data, recv_at) in enumerate(messages):
+        event = json.loads(data)['data']
+        assert event['_sent'] == BinanceFeed.sent_at(data) <= recv_at
+        assert event.get('u', event.get('t')) == i
+
+
+def test_sampled_messages_are_stamped_once_parsed(request, exchange):
+    class SlowParsingConnector(BinanceConnector):
+        def _on_message(self, ws, data):
+            time.sleep(0.005)
+            super()._on_message(ws, data)
+
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_websocket_%s' % request.node.name
+    receiver = PullReceiver(addr, ctx=ctx)
+    conn = SlowParsingConnector(['bnbbtc'], zmq_addr=addr, ctx=ctx, sample_interval=2)
+    conn.url = exchange.url + '/stream?streams=bnbbtc@depth/bnbbtc@trade'
+    receiver.start()
+    conn.start()
+    try:
+        traces = []
+        while len(traces) < 10 and receiver.sock.poll(5000):
+            traces.append(unpack_trace(receiver.recv()[2]))
+    finally:
+        conn.stop(timeout=0.1)
+        receiver.stop()
+
+    assert [trace is not None for trace in traces] == [False, True] * 5
+    for socket_at, parsed_at, source in traces[1::2]:
+        assert parsed_at - socket_at >= 0.005e9
+        assert source == 'SlowParsingConnector'
+
+
+def test_backoff_delay_only_backs_off_repeated_failures():
+    assert backoff_delay(0, 10) == 0
+    assert 0.125 <= backoff_delay(1, 10) <= 0.25
+    assert 0.5 <= backoff_delay(3, 10) <= 1
+    assert 5 <= backoff_delay(20, 10) <= 10
+
+
+class DroppingExchange(FakeExchange):
+    """Exchange closing every connection right after accepting it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def on_open(self, proto):
+        self.connections += 1
+        proto.sendClose()
+
+
+def test_connections_dropped_after_opening_are_backed_off(request):
+    exchange = DroppingExchange('binance')
+    exchange.start()
+    addr = 'inproc://test_websocket_%s' % request.node.name
+    conn = BinanceConnector(['bnbbtc'], zmq_addr=addr, ctx=zmq.Context.instance())
+    conn.url = exchange.url + '/stream?streams=bnbbtc@depth'
+    conn.start()
+    try:
+        time.sleep(1)
+    finally:
+        conn.stop()
+        exchange.stop()
+    # Attempts back off from 0.25s: 0, 0.125-0.25, 0.25-0.5, 0.5-1s
+    assert 2 <= exchange.connections <= 5
+    assert conn._failures >= 2
+
+
+def test_reconnect_switches_over_make_before_break(request):
+    exchange = FakeExchange('binance', rate=500)
+    exchange.start()
+    ctx = zmq.Context.instance()
+    addr = 'inproc://test_websocket_%s' % request.node.name
+    receiver = PullReceiver(addr, ctx=ctx)
+    conn = BinanceConnector(['bnbbtc'], zmq_addr=addr, ctx=ctx)
+    conn.url = exchange.url + '/stream?streams=bnbbtc@depth/bnbbtc@trade'
+    receiver.start()
+    conn.start()
+    try:
+        messages = receive(receiver, 50)
+        first = conn.conn
+        conn.reconnect()
+        # Sequence numbers restart with the replacement connection
+        while receiver.sock.poll(5000):
+            messages += receive(receiver, 1)
+            event = json.loads(messages[-1][1])['data']
+            if event.get('u', event.get('t')) == 0:
+                break
+        messages += receive(receiver, 50)
+        assert conn.conn is not first
+        assert len(exchange.streams) == 1
+        started = time.monotonic()
+    finally:
+        conn.stop()
+        receiver.stop()
+        exchange.stop()
+    # Stopping does not wait for the connection's socket to time out
+    assert time.monotonic() - started < 2
+    recv_ats = [recv_at for _, _, recv_at in messages]
+    assert len(messages) > 100
+    # No gap in the data while switching over
+    assert max(b - a for a, b in zip(recv_ats, recv_ats[1:])) < 0.5e9
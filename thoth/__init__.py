@@ -1,5 +1,17 @@
-"""Module loader."""
-from thoth.core.node import DataNode
-from thoth.core.pusher import PusherConnector
-from thoth.core.websocket import WebSocketConnector
-from thoth import connectors
+"""Module loader.
+
+Names are imported on first access, so ``import thoth`` does not import any connector or
+third-party dependency.
+"""
+from thoth._lazy import lazy_attributes
+
+_ATTRIBUTES = {'DataNode': 'thoth.core.node',
+               'PusherConnector': 'thoth.core.pusher',
+               'WebSocketConnector': 'thoth.core.websocket',
+               'AsyncWebSocketConnector': 'thoth.core.aiowebsocket',
+               'connectors': None,
+               'core': None}
+
+__all__ = sorted(_ATTRIBUTES)
+
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES)
@@ -0,0 +1,43 @@
+"""Lazy attributes of packages, imported on first access (:pep:`562`).
+
+Importing a package's modules up front makes every process pay for all their
+dependencies - ``zmq``, ``websocket``, ``autobahn`` and ``pysher`` - even if it uses none of
+them. Packages re-export their names lazily instead::
+
+    __getattr__, __dir__ = lazy_attributes(__name__, {'DataNode': 'thoth.core.node'})
+"""
+
+# Import Built-Ins
+import importlib
+import sys
+
+# Import Third-Party
+
+# Import Home-grown
+
+
+def lazy_attributes(package, attributes):
+    """Return ``__getattr__`` and ``__dir__`` functions importing attributes on access.
+
+    :param package: name of the package, i.e. its ``__name__``
+    :param attributes: dict mapping attribute names to the modules defining them; attributes
+                       mapped to None are submodules of the package
+    :return: tuple of the package's ``__getattr__`` and ``__dir__`` functions
+    """
+    def __getattr__(name):
+        try:
+            module = attributes[name]
+        except KeyError:
+            raise AttributeError("module %r has no attribute %r" % (package, name)) from None
+        if module is None:
+            value = importlib.import_module('%s.%s' % (package, name))
+        else:
+            value = getattr(importlib.import_module(module), name)
+        # Cache on the package, so further accesses don't go through __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
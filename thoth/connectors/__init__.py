@@ -1,4 +1,124 @@
-"""Connector module loader."""
-from thoth.connectors.binance import BinanceConnector
-from thoth.connectors.gdax import GDAXConnector
-from thoth.connectors.bitstamp import BitstampConnector
+"""Connector registry.
+
+Connectors are resolved by name, importing only the requested connector's module and its
+dependencies::
+
+    BinanceConnector = get_connector('binance')
+
+Connectors shipped with Thoth are listed in :data:`CONNECTORS`. Further connectors are
+registered with :func:`register_connector`, or by installed packages through entry points of
+the ``thoth.connectors`` group, e.g. in their ``setup.py``::
+
+    entry_points={'thoth.connectors': ['kraken = thoth_kraken:KrakenConnector']}
+
+Entry points are only searched for names not found otherwise, since scanning the installed
+distributions takes longer than importing most connectors. A connector failing to import
+only fails its own lookup.
+
+Connector modules which cannot run on the current connector base classes yet are listed in
+:data:`UNSUPPORTED_CONNECTORS` instead; looking them up raises :class:`NotImplementedError`,
+unless a connector of that name was registered.
+
+The connector classes remain available as attributes of this package, imported on first
+access.
+"""
+# Import Built-Ins
+import importlib
+import logging
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth._lazy import lazy_attributes
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+#: Entry point group of connectors provided by other packages.
+ENTRY_POINT_GROUP = 'thoth.connectors'
+
+#: Connectors by name, as ``'module:class'`` references or classes.
+CONNECTORS = {'binance': 'thoth.connectors.binance:BinanceConnector',
+              'binance-async': 'thoth.connectors.binance:AsyncBinanceConnector',
+              'bitstamp': 'thoth.connectors.bitstamp:BitstampConnector',
+              'gdax': 'thoth.connectors.gdax:GDAXConnector',
+              'gdax-async': 'thoth.connectors.gdax:AsyncGDAXConnector',
+              'hitbtc': 'thoth.connectors.hitbtc:HitBTCConnector',
+              'quoinex': 'thoth.connectors.quoinex:QuoinexConnector'}
+
+#: Connectors shipped with Thoth which do not work yet, as ``'module:class'`` references and
+#: the reason why.
+UNSUPPORTED_CONNECTORS = {
+    'bitfinex': ('thoth.connectors.bitfinex:BitfinexConnector',
+                 'it fails to initialize and does not handle received messages'),
+    'cexio': ('thoth.connectors.cexio:CEXIOConnector',
+              'it does not handle received messages'),
+    'gemini': ('thoth.connectors.gemini:GeminiConnector',
+               'it does not handle received messages'),
+    'okex': ('thoth.connectors.okex:OKExConnector',
+             'it does not handle received messages'),
+    'poloniex': ('thoth.connectors.poloniex:PoloniexConnector',
+                 'it does not handle received messages'),
+    'rocktrading': ('thoth.connectors.rocktrading:RockTradingConnector',
+                    'it passes data to a queue the connector no longer has')}
+
+
+def _entry_points():
+    """Return the installed entry points of :data:`ENTRY_POINT_GROUP`, by name."""
+    from importlib import metadata  # pylint: disable=import-outside-toplevel
+    eps = metadata.entry_points()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=ENTRY_POINT_GROUP)
+    else:
+        eps = eps.get(ENTRY_POINT_GROUP, [])
+    return {ep.name: ep for ep in eps}
+
+
+def register_connector(name, connector):
+    """Register a connector under the given name, replacing any connector of that name.
+
+    :param name: name of the connector, e.g. ``'kraken'``
+    :param connector: connector class, or ``'module:class'`` reference to import it from
+    :return: :class:`None`
+    """
+    CONNECTORS[name] = connector
+
+
+def get_connector(name):
+    """Return the connector class of the given name, importing it if necessary.
+
+    :param name: name of the connector, e.g. ``'binance'``
+    :return: connector class
+    :raises KeyError: if no connector of the given name is known
+    :raises NotImplementedError: if the connector is listed in :data:`UNSUPPORTED_CONNECTORS`
+    :raises ImportError: if the connector's module, or one of its dependencies, fails to import
+    """
+    try:
+        connector = CONNECTORS[name]
+    except KeyError:
+        try:
+            connector = _entry_points()[name].load()
+        except KeyError:
+            if name in UNSUPPORTED_CONNECTORS:
+                raise NotImplementedError("Connector %r is not supported yet: %s"
+                                          % (name, UNSUPPORTED_CONNECTORS[name][1])) from None
+            raise KeyError("Unknown connector %r; available: %s"
+                           % (name, ', '.join(available_connectors()))) from None
+    if isinstance(connector, str):
+        module, _, attribute = connector.partition(':')
+        connector = getattr(importlib.import_module(module), attribute)
+    CONNECTORS[name] = connector
+    return connector
+
+
+def available_connectors():
+    """Return the names of all usable connectors, without importing them.
+
+    :return: sorted list of names
+    """
+    return sorted(set(CONNECTORS) | set(_entry_points()))
+
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    ref.partition(':')[2]: ref.partition(':')[0]
+    for ref in list(CONNECTORS.values()) + [ref for ref, _ in UNSUPPORTED_CONNECTORS.values()]})
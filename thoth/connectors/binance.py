@@ -3,44 +3,296 @@
 import logging
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from thoth.core.book import OrderBook
+from thoth.core.metadata import shared_session
+from thoth.core.routing import scan_field, scan_number
+from thoth.core.sequence import SequenceTracker
+from thoth.core.topics import TopicTable
 from thoth.core.websocket import WebSocketConnector
+from thoth.core.aiowebsocket import AsyncWebSocketConnector
 
 
 log = logging.getLogger(__name__)
 
+#: Topic prefixes by channel of a combined stream, e.g. ``bnbbtc@depth``; klines are handled
+#: separately, since their topics include the interval.
+STREAM_TOPICS = {'trade': 'trades_', 'aggTrade': 'aggTrade_', 'ticker': 'ticker_',
+                 'depth': 'diff_book_'}
+
+#: Keys identifying the events of a topic family: update, trade and aggregate trade ids;
+#: other events are identified by their event time (``E``).
+SEQUENCE_KEYS = ((b'diff_book_', b'u'), (b'trades_', b't'), (b'aggTrade_', b'a'))
+
+
+class RestSnapshotProvider:
+    """Fetch order book snapshots from Binance's REST API ``/depth`` endpoint."""
+
+    def __init__(self, url=None, limit=1000, timeout=10, session=None):
+        """Initialize the instance.
+
+        :param url: URL of the depth endpoint
+        :param limit: number of levels per side to request
+        :param timeout: request time-out in seconds
+        :param session: :class:`requests.Session` to use for requests; defaults to
+                        :func:`thoth.core.metadata.shared_session`
+        """
+        self.url = url or 'https://api.binance.com/api/v3/depth'
+        self.limit = limit
+        self.timeout = timeout
+        self.session = session or shared_session()
+
+    def __call__(self, symbol):
+        """Return the snapshot for the given symbol.
+
+        :param symbol: symbol, as sent in depth updates (e.g. ``'BNBBTC'``)
+        :return: dict with ``lastUpdateId``, ``bids`` and ``asks`` keys
+        """
+        resp = self.session.get(self.url, params={'symbol': symbol.upper(), 'limit': self.limit},
+                                timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+
+class _SymbolState:
+    """Synchronization state of a single symbol's book."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, symbol):
+        """Initialize the instance.
+
+        :param symbol: symbol of the book, as sent in depth updates
+        """
+        self.book_topic = ('book_' + symbol).encode('UTF-8')
+        self.top_topic = ('top_' + symbol).encode('UTF-8')
+        self.book = OrderBook()
+        self.last_update_id = None
+        self.first = True
+        self.buffer = []
+        self.snapshot = None
+
+
+class BinanceBookSync:
+    """Maintain local order books from Binance depth updates and ``/depth`` snapshots.
+
+    Follows Binance's procedure for managing a local order book: depth updates are buffered
+    until a snapshot was fetched; updates up to the snapshot's ``lastUpdateId`` are dropped,
+    the first applied update must span ``lastUpdateId + 1`` and each further update must start
+    at the previous update's ``u + 1``. On a gap, the affected symbol's book is discarded and
+    resynchronized from a fresh snapshot, while other symbols are unaffected.
+
+    Snapshots are fetched in the background; a fetched snapshot is applied with the next depth
+    update of its symbol, so all book handling happens on the connector's thread.
+
+    Gaps and the time until their symbol's snapshot was applied are recorded by
+    :attr:`tracker`, see :meth:`thoth.core.sequence.SequenceTracker.snapshot`.
+    """
+
+    def __init__(self, snapshot_provider=None, executor=None, depth=None, max_buffer=1000):
+        """Initialize the instance.
+
+        :param snapshot_provider: callable(symbol), returning a snapshot dict as returned by
+                                  the ``/depth`` endpoint; defaults to
+                                  :class:`RestSnapshotProvider`
+        :param executor: :class:`concurrent.futures.Executor` to fetch snapshots with
+        :param depth: number of levels per side to publish; publishes all levels if None
+        :param max_buffer: maximum number of updates to buffer per symbol while waiting for a
+                           snapshot
+        """
+        self.snapshot_provider = snapshot_provider or RestSnapshotProvider()
+        self.executor = executor or ThreadPoolExecutor(max_workers=4)
+        self.depth = depth
+        self.max_buffer = max_buffer
+        self.states = {}
+        self.tracker = SequenceTracker(name='BinanceBookSync')
+
+    def _request_snapshot(self, symbol, state):
+        """Discard the symbol's book and fetch a new snapshot."""
+        state.book.clear()
+        state.last_update_id = None
+        state.snapshot = self.executor.submit(self.snapshot_provider, symbol)
+
+    def _apply_snapshot(self, symbol, state):
+        """Load the fetched snapshot into the book, if available.
+
+        :return: :class:`bool`, whether the snapshot was applied
+        """
+        if not state.snapshot.done():
+            return False
+        try:
+            snapshot = state.snapshot.result()
+        except Exception as e:  # pylint: disable=broad-except
+            log.exception(e)
+            log.error("Could not fetch snapshot for %s - retrying..", symbol)
+            self._request_snapshot(symbol, state)
+            return False
+        state.book.snapshot(snapshot['bids'], snapshot['asks'])
+        state.last_update_id = snapshot['lastUpdateId']
+        state.first = True
+        state.snapshot = None
+        self.tracker.resynced(symbol, state.last_update_id)
+        return True
+
+    def on_diff(self, symbol, update):
+        """Process the given depth update.
+
+        :param symbol: symbol of the update
+        :param update: decoded ``depthUpdate`` event
+        :return: list of (topic, data) tuples to publish, topics as :class:`bytes`; empty if
+                 the book did not change or is not synchronized
+        """
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = _SymbolState(symbol)
+            self._request_snapshot(symbol, state)
+
+        if state.last_update_id is None:
+            state.buffer.append(update)
+            if len(state.buffer) > self.max_buffer:
+                log.warning("Buffered too many updates for %s - refetching snapshot..", symbol)
+                state.buffer = [update]
+                self._request_snapshot(symbol, state)
+            if not self._apply_snapshot(symbol, state):
+                return []
+            # The book became available, publish it even if all updates are outdated
+            updates, state.buffer, changed = state.buffer, [], True
+        else:
+            updates, changed = [update], False
+
+        book = state.book
+        for i, update in enumerate(updates):
+            first_id, final_id = update['U'], update['u']
+            if final_id <= state.last_update_id:
+                continue
+            expected = state.last_update_id + 1
+            # The first update after a snapshot may start before it, all others must be gapless
+            if first_id > expected or (not state.first and first_id != expected):
+                log.warning("Gap in depth updates for %s (expected update %s, got %s-%s) - "
+                            "resynchronizing..", symbol, expected, first_id, final_id)
+                self.tracker.gap(symbol, expected, first_id)
+                state.buffer = updates[i:]
+                self._request_snapshot(symbol, state)
+                return []
+            for price, size in update['b']:
+                book.update_bid(price, size)
+            for price, size in update['a']:
+                book.update_ask(price, size)
+            state.last_update_id, state.first, changed = final_id, False, True
+        return self._render(symbol, state) if changed else []
+
+    def _render(self, symbol, state):
+        """Return the book and top-of-book messages of the given symbol."""
+        bids, asks = state.book.top(self.depth)
+        book = {'lastUpdateId': state.last_update_id, 'bids': bids, 'asks': asks}
+        best_bid, best_ask = bids[0] if bids else (None, None), asks[0] if asks else (None, None)
+        top = {'u': state.last_update_id, 's': symbol, 'b': best_bid[0], 'B': best_bid[1],
+               'a': best_ask[0], 'A': best_ask[1]}
+        return [(state.book_topic, json.dumps(book)), (state.top_topic, json.dumps(top))]
+
+
+class BinanceMixin:
+    """Binance message handling, shared by the threaded and the asyncio connector."""
 
-class BinanceConnector(WebSocketConnector):
-    """Class to pre-process HitBTC data, before passing it up to a Node."""
     channels = ['%s@trade', '%s@aggTrade', '%s@kline_1m', '%s@ticker', '%s@depth']
 
-    def __init__(self, pairs, **conn_ops):
-        """Initialize a PoloniexConnector instance."""
+    def __init__(self, pairs, sync_books=False, snapshot_provider=None, book_depth=None,
+                 **conn_ops):
+        """Initialize a BinanceConnector instance.
+
+        :param pairs: list of symbols to subscribe to, e.g. ``['bnbbtc']``
+        :param sync_books: if True, maintain local order books from the depth updates (see
+                           :class:`BinanceBookSync`) and publish them as ``book_<symbol>``
+                           and ``top_<symbol>`` in addition to the updates themselves
+        :param snapshot_provider: callable(symbol) returning a ``/depth`` snapshot, used when
+                                  syncing books; defaults to :class:`RestSnapshotProvider`
+        :param book_depth: number of levels per side to publish when syncing books; publishes
+                           all levels if None
+        :param conn_ops: keyword arguments for the connector base class
+        """
         streams = []
         for pair in pairs:
             for chan in self.channels:
                 streams.append(chan % pair)
         url = 'wss://stream.binance.com:9443/stream?streams=' + '/'.join(streams)
-        super(BinanceConnector, self).__init__(url, **conn_ops)
+        super(BinanceMixin, self).__init__(url, **conn_ops)
         self.pairs = pairs
+        # Topics by stream name, for all subscribed streams; unsubscribed streams are added
+        # when first seen
+        self.topics = TopicTable(factory=self._topic_of_stream)
+        for stream in streams:
+            self.topics.add(stream, self._topic_of_stream(stream))
+        self.book_sync = None
+        if sync_books:
+            self.book_sync = BinanceBookSync(snapshot_provider, depth=book_depth)
 
-    def _on_message(self, ws, data):
-        message = json.loads(data)
-        mtype = message['e']
+    @staticmethod
+    def _topic_of_stream(stream):
+        """Return the topic of the given combined stream's messages, or None if unknown."""
+        symbol, _, channel = stream.partition('@')
+        if channel.startswith('kline_'):
+            return 'candle_' + symbol.upper() + '/' + channel[len('kline_'):]
+        if channel in STREAM_TOPICS:
+            return STREAM_TOPICS[channel] + symbol.upper()
+        return None
 
+    @staticmethod
+    def _topic_of_event(message):
+        """Return the topic of the given parsed event, or None if unknown."""
+        mtype = message.get('e')
         if mtype in ('aggTrade',):
-            topic = 'aggTrade_' + data['s']
-        elif mtype in ('trade',):
-            topic = 'trades_' + data['s']
-        elif mtype in ('kline',):
-            topic = 'candle_' + data['s'] + '/' + data['k']['i']
-        elif mtype == '24h_ticker':
-            topic = 'ticker_' + data['s']
-        elif mtype == 'depthUpdate':
-            topic = 'diff_book_' + data['s']
-        else:
-            log.error(message)
-            return
-        super(BinanceConnector, self)._on_message(ws, (topic, data, time.time()))
+            return 'aggTrade_' + message['s']
+        if mtype in ('trade',):
+            return 'trades_' + message['s']
+        if mtype in ('kline',):
+            return 'candle_' + message['s'] + '/' + message['k']['i']
+        if mtype == '24hrTicker':
+            return 'ticker_' + message['s']
+        if mtype == 'depthUpdate':
+            return 'diff_book_' + message['s']
+        return None
+
+    @staticmethod
+    def sequence_of(topic, data):
+        """Return the id of the given event, or None if it cannot be read.
+
+        :param topic: :class:`bytes` topic of the message
+        :param data: raw message
+        :return: :class:`int` or None
+        """
+        for prefix, key in SEQUENCE_KEYS:
+            if topic.startswith(prefix):
+                return scan_number(data, key)
+        return scan_number(data, b'E')
+
+    def _on_message(self, ws, data):
+        # Combined streams lead with the stream's name, which determines the topic; the
+        # message is only parsed if it is of unknown shape, or needed to sync books.
+        stream = scan_field(data, b'stream')
+        topic = self.topics.get(stream) if stream is not None else None
+        message = None
+        if topic is None:
+            message = json.loads(data)
+            # Combined streams wrap events as {"stream": <name>, "data": <event>}
+            message = message.get('data', message)
+            topic = self._topic_of_event(message)
+            if topic is None:
+                log.error(message)
+                return
+            topic = topic.encode('UTF-8')
+        recv_at = time.time_ns()
+        super(BinanceMixin, self)._on_message(ws, (topic, data, recv_at))
+        if self.book_sync is not None and topic.startswith(b'diff_book_'):
+            if message is None:
+                message = json.loads(data)['data']
+            for topic, book_data in self.book_sync.on_diff(message['s'], message):
+                self.push(topic, book_data, recv_at)
+
+
+class BinanceConnector(BinanceMixin, WebSocketConnector):
+    """Class to pre-process HitBTC data, before passing it up to a Node."""
 
 
+class AsyncBinanceConnector(BinanceMixin, AsyncWebSocketConnector):
+    """Binance Connector running on an asyncio event loop."""
@@ -10,12 +10,16 @@ from collections import OrderedDict
 import websocket
 
 # Import Homebrew
-from thoth.core.websocket import WebsocketConnector
+from thoth.core.websocket import WebSocketConnector
+from thoth.core.subscriptions import SubscriptionScheduler
 # Init Logging Facilities
 log = logging.getLogger(__name__)
 
+#: Subscription requests per second sent when resubscribing, by default.
+SUBSCRIPTION_RATE = 10
 
-class BitfinexConnector(WebsocketConnector):
+
+class BitfinexConnector(WebSocketConnector):
     """Websocket Connection Thread For Bitfinex.
 
     It handles all low-level system messages, such a reconnects, pausing of
@@ -25,7 +29,7 @@ class BitfinexConnector(WebsocketConnector):
     lists contain data.
     """
     def __init__(self, url, timeout=None, reconnect_interval=None, log_level=None,
-                 q_maxsize=None):
+                 q_maxsize=None, subscription_rate=None):
         """Initialize a WebSocketConnection Instance.
 
         :param data_q: Queue(), connection to the Client Class
@@ -36,6 +40,8 @@ class BitfinexConnector(WebsocketConnector):
                                    defaults to 10s.
         :param log_level: logging level for the connection Logger. Defaults to
                           logging.INFO.
+        :param subscription_rate: subscription requests sent per second when resubscribing;
+                                  defaults to :data:`SUBSCRIPTION_RATE`
         """
         super(BitfinexConnector, self).__init__(url, timeout=timeout, log_level=log_level,
                                                 reconnect_interval=reconnect_interval,
@@ -43,9 +49,14 @@ class BitfinexConnector(WebsocketConnector):
 
         # Dict to store all subscribe commands for reconnects
         self.channel_configs = OrderedDict()
+        self.scheduler = SubscriptionScheduler(subscription_rate or SUBSCRIPTION_RATE,
+                                               name=type(self).__name__)
+
+    def send(self, api_key=None, secret=None, list_data=None, auth=False, conn=None, **kwargs):
+        """Sends the given Payload to the API via the websocket connection.
 
-    def send(self, api_key=None, secret=None, list_data=None, auth=False, **kwargs):
-        """Sends the given Payload to the API via the websocket connection."""
+        :param conn: connection to send on; defaults to the active connection
+        """
         if auth:
             nonce = str(int(time.time() * 10000000))
             auth_string = 'AUTH' + nonce
@@ -60,7 +71,7 @@ class BitfinexConnector(WebsocketConnector):
             payload = kwargs
         self.log.debug("send(): Sending payload to API: %s", payload)
         try:
-            super(BitfinexConnector, self).send(payload)
+            super(BitfinexConnector, self).send(payload, conn=conn)
         except websocket.WebSocketConnectionClosedException:
             self.log.error("send(): Did not send out payload %s - client not connected. ", kwargs)
 
@@ -99,10 +110,10 @@ class BitfinexConnector(WebsocketConnector):
 
     def _heartbeat_handler(self):
         """Handles heartbeat messages."""
-        # Restart our timers since we received some data
+        # Push back the time-out deadline since we received some data
         self.log.debug("_heartbeat_handler(): Received a heart beat "
                        "from connection!")
-        self._start_timers()
+        self.last_seen = time.monotonic()
 
     def _pong_handler(self):
         """Handle a pong response."""
@@ -120,31 +131,36 @@ class BitfinexConnector(WebsocketConnector):
         :param ts:
         :return:
         """
-        self.log.debug("_system_handler(): Received a system message: %s", data)
+        # Records are built only if debug logging is enabled; this runs for every message
+        debug = self.log.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.log.debug("_system_handler(): Received a system message: %s", data)
         # Unpack the data
         event = data.pop('event')
         if event == 'pong':
-            self.log.debug("_system_handler(): Distributing %s to _pong_handler..",
-                      data)
+            if debug:
+                self.log.debug("_system_handler(): Distributing %s to _pong_handler..", data)
             self._pong_handler()
         elif event == 'info':
-            self.log.debug("_system_handler(): Distributing %s to _info_handler..",
-                      data)
+            if debug:
+                self.log.debug("_system_handler(): Distributing %s to _info_handler..", data)
             self._info_handler(data)
         elif event == 'error':
-            self.log.debug("_system_handler(): Distributing %s to _error_handler..",
-                      data)
+            if debug:
+                self.log.debug("_system_handler(): Distributing %s to _error_handler..", data)
             self._error_handler(data)
         elif event in ('subscribed', 'unsubscribed', 'conf', 'auth', 'unauth'):
-            self.log.debug("_system_handler(): Distributing %s to "
-                           "_response_handler..", data)
+            if debug:
+                self.log.debug("_system_handler(): Distributing %s to "
+                               "_response_handler..", data)
             self._response_handler(event, data, ts)
         else:
             self.log.error("Unhandled event: %s, data: %s", event, data)
 
     def _response_handler(self,event, data, ts):
         """Handle responses to (un)subscribe and conf commands."""
-        self.log.debug("_response_handler(): Passing %s to client..", data)
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("_response_handler(): Passing %s to client..", data)
         self.push(event, data, ts)
 
     def _info_handler(self, data):
@@ -201,28 +217,21 @@ class BitfinexConnector(WebsocketConnector):
     def _resubscribe(self, soft=False):
         """Resubscribes to all channels found in self.channel_configs.
 
+        The requests are sent in the background, at the subscription rate, on the connection
+        active when resubscribing; a replacement connection re-subscribes by itself.
+
         :param soft: if True, unsubscribes first.
-        :return: None
+        :return: :class:`threading.Thread` sending the requests
         """
-        q_list = []
-        while True:
-            try:
-                identifier, q = self.channel_configs.popitem(last=True if soft else False)
-            except KeyError:
-                break
-            q_list.append((identifier, q.copy()))
+        configs = list(self.channel_configs.items())
+        requests = []
+        for identifier, q in (reversed(configs) if soft else configs):
             if identifier == 'auth':
-                self.send(**q, auth=True)
-                continue
-            if soft:
-                q['event'] = 'unsubscribe'
-            self.send(**q)
-
-        # Resubscribe for soft start.
+                requests.append((q, True))
+            else:
+                requests.append((dict(q, event='unsubscribe') if soft else q, False))
         if soft:
-            for identifier, q in reversed(q_list):
-                self.channel_configs[identifier] = q
-                self.send(**q)
-        else:
-            for identifier, q in q_list:
-                self.channel_configs[identifier] = q
+            requests += [(q, False) for identifier, q in configs if identifier != 'auth']
+        conn = self.conn
+        return self.scheduler.start(
+            lambda request: self.send(**request[0], auth=request[1], conn=conn), requests)
@@ -2,62 +2,56 @@
 
 import time
 import logging
+from functools import partial
 
 from thoth.core.pusher import PusherConnector
+from thoth.core.topics import TopicTable
 
 
 log = logging.getLogger(__name__)
 
+#: Events bound per channel, and the suffix of their topics (``<channel>/<suffix>``).
+CHANNEL_EVENTS = {
+    'live_trades%s': {'trade': 'data'},
+    'order_book%s': {'data': 'data'},
+    'diff_order_book%s': {'data': 'data'},
+    'live_orders%s': {'order_deleted': 'order_deleted', 'order_changed': 'order_changed',
+                      'order_created': 'order_created'},
+}
+
 
 class BitstampConnector(PusherConnector):
     """Websocket Connector for the Pusher-based Bitstamp API."""
-    channels = ['live_trades%s', 'order_book%s', 'diff_order_book%s', 'live_orders%s']
+    channels = list(CHANNEL_EVENTS)
 
     def __init__(self, *args, **kwargs):
         """Initialize Connector."""
         pairs = 'btceur,eurusd,xrpusd,xrpeur,xrpbtc,ltcusd,ltceur,ltcbtc,ethusd,etheur,ethbtc,' \
                 'bchusd,bcheur,bchbtc'.split(',')
         super(BitstampConnector, self).__init__(pairs, 'de504dc5763aeef9ff52', *args, **kwargs)
+        # Topics by (channel, event) of all channels of all pairs
+        self.topics = TopicTable()
+        for pair in pairs:
+            for channel, events in CHANNEL_EVENTS.items():
+                channel = channel % self._channel_suffix(pair)
+                for event, suffix in events.items():
+                    self.topics.add((channel, event), channel + '/' + suffix)
+
+    @staticmethod
+    def _channel_suffix(pair):
+        """Return the suffix of the given pair's channel names."""
+        return '' if pair == 'btcusd' else '_' + pair
+
+    def _handle_event(self, topic, data):
+        """Push an event's data to the given topic."""
+        self.push(topic, data, time.time_ns())
 
     # pylint: disable=unused-argument
     def _base_callback(self, data, pair):
-        """Put data on respective queue."""
-        pair = '' if pair == 'btcusd' else '_' + pair
-
-        trades, book, diff_book, orders = [chan % pair for chan in BitstampConnector.channels]
-
-        def _handle_trades(data):
-            """Put data on q with correct channel name."""
-            topic = trades + '/data'
-            self.push(topic, data, time.time())
-
-        def _handle_book(data):
-            topic = book + '/data'
-            self.push(topic, data, time.time())
-
-        def _handle_diff_book(data):
-            topic = diff_book + '/data'
-            self.push(topic, data, time.time())
-
-        def _handle_orders_deleted(data):
-            topic = orders + '/order_deleted'
-            self.push(topic, data, time.time())
-
-        def _handle_orders_changed(data):
-            topic = orders + '/order_changed'
-            self.push(topic, data, time.time())
-
-        def _handle_orders_created(data):
-            topic = orders + '/order_created'
-            self.push(topic, data, time.time())
-
-        channel1 = self.subscribe(trades)
-        channel1.bind('trade', _handle_trades)
-        channel2 = self.subscribe(book)
-        channel2.bind('data', _handle_book)
-        channel3 = self.subscribe(diff_book)
-        channel3.bind('data', _handle_diff_book)
-        channel4 = self.subscribe(orders)
-        channel4.bind('order_deleted', _handle_orders_deleted)
-        channel4.bind('order_changed', _handle_orders_changed)
-        channel4.bind('order_created', _handle_orders_created)
+        """Subscribe to the pair's channels, pushing their events to the pre-built topics."""
+        for channel, events in CHANNEL_EVENTS.items():
+            channel = channel % self._channel_suffix(pair)
+            subscription = self.subscribe(channel)
+            for event in events:
+                topic = self.topics.get((channel, event))
+                subscription.bind(event, partial(self._handle_event, topic))
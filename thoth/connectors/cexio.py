@@ -4,13 +4,12 @@ import time
 import logging
 import hmac
 import hashlib
-from threading import Timer
-from thoth.connectors.base import WebsocketConnector
+from thoth.core.websocket import WebSocketConnector
 
 log = logging.getLogger(__name__)
 
 
-class CEXIOConnector(WebsocketConnector):
+class CEXIOConnector(WebSocketConnector):
     """CEX.io Websocket Connector."""
 
     def __init__(self, key, secret, **conn_ops):
@@ -20,15 +19,6 @@ class CEXIOConnector(WebsocketConnector):
         self.last_seq = None
         super(CEXIOConnector, self).__init__(url, **conn_ops)
 
-    def _start_timers(self):
-        """Reset and start timers for API connection."""
-        self._stop_timers()
-
-        # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
-
     @staticmethod
     def nonce():
         """Generate a Nonce value as string."""
@@ -42,11 +32,6 @@ class CEXIOConnector(WebsocketConnector):
         """Send a pong response to the server."""
         self.send({'e': 'pong'})
 
-    def _stop_timers(self):
-        """Stop connection timer."""
-        if self.connection_timer:
-            self.connection_timer.cancel()
-
     def authenticate(self):
         """Authenticate with CEXio."""
         ts = self.nonce()
@@ -63,4 +48,5 @@ class CEXIOConnector(WebsocketConnector):
         :param recv_at:
         :return:
         """
-        print(data, recv_at)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Received %s at %s", data, recv_at)
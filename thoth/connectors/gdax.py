@@ -4,48 +4,133 @@ import logging
 import json
 import time
 
+from thoth.core.routing import scan_fields, scan_number
+from thoth.core.sequence import SequenceTracker
+from thoth.core.topics import TopicTable
 from thoth.core.websocket import WebSocketConnector
+from thoth.core.aiowebsocket import AsyncWebSocketConnector
 
 
 log = logging.getLogger(__name__)
 
+#: Message types published as ``order_book_<product>/<type>``.
+ORDER_BOOK_TYPES = ('snapshot', 'l2update')
+
+#: Message types of the ``full`` channel, published as ``full_order_book_<product>/<type>``.
+FULL_TYPES = ('match', 'received', 'open', 'done', 'change', 'margin_profile_update', 'activate')
+
+
+class GDAXMixin:
+    """GDAX message handling, shared by the threaded and the asyncio connector."""
 
-class GDAXConnector(WebSocketConnector):
-    """Class to pre-process HitBTC data, before passing it up to a Node."""
     channels = ['level2', 'heartbeat', 'ticker', 'full']
 
-    def __init__(self, pairs, **conn_ops):
-        """Initialize a PoloniexConnector instance."""
+    def __init__(self, pairs, track_sequences=False, **conn_ops):
+        """Initialize a PoloniexConnector instance.
+
+        :param pairs: list of product ids to subscribe to, e.g. ``['BTC-USD']``
+        :param track_sequences: if True, check the sequence numbers of each product's ``full``
+                                channel messages; on a gap, only the product is resubscribed,
+                                which also publishes a fresh ``level2`` snapshot. Gaps and
+                                recovery times are recorded by :attr:`sequences`
+        :param conn_ops: keyword arguments for the connector base class
+        """
         url = 'wss://ws-feed.gdax.com'
-        super(GDAXConnector, self).__init__(url, **conn_ops)
+        super(GDAXMixin, self).__init__(url, **conn_ops)
         self.pairs = pairs
         self.session_sequence = 0
+        self.sequences = None
+        if track_sequences:
+            self.sequences = SequenceTracker(self._recover_product, name=type(self).__name__)
+        # Topics by (type, product id) of all messages of the subscribed products
+        self.topics = TopicTable(factory=lambda key: self._topic(*key) if key[1] else None)
+        for pair in pairs:
+            for mtype in ORDER_BOOK_TYPES + FULL_TYPES + ('ticker', 'heartbeat'):
+                self.topics.add((mtype, pair), self._topic(mtype, pair))
 
     def _on_open(self, ws):
         """Send subscription on open connection."""
-        super(GDAXConnector, self)._on_open(ws)
+        super(GDAXMixin, self)._on_open(ws)
+        if self.sequences is not None:
+            self.sequences.reset()
         subscription_request = {'type': 'subscribe', 'product_ids': self.pairs,
                                 'channels': self.channels}
         self.send(subscription_request)
 
+    def resubscribe(self, product_id):
+        """Unsubscribe from and resubscribe to all channels of the given product.
+
+        The requests are not replayed after reconnecting.
+
+        :param product_id: product id, e.g. ``'BTC-USD'``
+        :return: :class:`None`
+        """
+        for request_type in ('unsubscribe', 'subscribe'):
+            self.send({'type': request_type, 'product_ids': [product_id],
+                       'channels': self.channels}, remember=False)
+
+    # pylint: disable=unused-argument
+    def _recover_product(self, product_id, expected, received):
+        """Resubscribe to the product, recovering it from a gap in its sequence numbers."""
+        self.resubscribe(product_id)
+
+    def _check_sequence(self, mtype, product_id, data):
+        """Check the sequence of a ``full`` channel message; resync on ``level2`` snapshots."""
+        if mtype in FULL_TYPES:
+            sequence = scan_number(data, b'sequence')
+            if sequence is not None:
+                self.sequences.check(product_id, sequence)
+        elif mtype == 'snapshot' and self.sequences.recovering(product_id):
+            self.sequences.resynced(product_id)
+
+    @staticmethod
+    def _topic(mtype, product_id):
+        """Return the topic of a message of the given type and product, or None if unknown."""
+        if mtype in ORDER_BOOK_TYPES:
+            return 'order_book_' + product_id + '/' + mtype
+        if mtype in ('ticker',):
+            return 'ticker_' + product_id
+        if mtype in FULL_TYPES:
+            return 'full_order_book_' + product_id + '/' + mtype
+        if mtype == 'heartbeat':
+            return 'heartbeat_' + product_id
+        return None
+
+    @staticmethod
+    def sequence_of(topic, data):
+        """Return the sequence number of the given message, or None if it carries none.
+
+        Sequence numbers are per product; ``level2`` messages carry none.
+
+        :param topic: topic of the message
+        :param data: raw message
+        :return: :class:`int` or None
+        """
+        return scan_number(data, b'sequence')
+
     def _on_message(self, ws, data):
-        message = json.loads(data)
-        mtype = message['type']
-        if mtype in ('snapshot', 'l2update'):
-            topic = 'order_book_' + message['product_id'] + '/' + mtype
-        elif mtype in ('ticker',):
-            topic = 'ticker_' + message['product_id']
-        elif mtype in ('match','received', 'open', 'done', 'change', 'margin_profile_update',
-                       'activate'):
-            topic = 'full_order_book_' + message['product_id'] + '/' + mtype
-        elif mtype == 'heartbeat':
-            topic = 'heartbeat_' + message['product_id']
-        elif mtype == 'subscription':
-            log.debug(message)
-            return
-        else:
-            log.error(message)
-            return
-        super(GDAXConnector, self)._on_message(ws, (topic, data, time.time()))
+        # Messages lead with their type and product id; only parse messages of unknown shape
+        fields = scan_fields(data, (b'type', b'product_id'))
+        topic = self.topics.get(fields) if fields is not None else None
+        if topic is None:
+            message = json.loads(data)
+            mtype = message['type']
+            if mtype == 'subscriptions':
+                log.debug(message)
+                return
+            fields = (mtype, message.get('product_id'))
+            topic = self.topics.get(fields)
+            if topic is None:
+                log.error(message)
+                return
+        if self.sequences is not None:
+            self._check_sequence(*fields, data)
+        super(GDAXMixin, self)._on_message(ws, (topic, data, time.time_ns()))
+
+
+class GDAXConnector(GDAXMixin, WebSocketConnector):
+    """Class to pre-process HitBTC data, before passing it up to a Node."""
 
 
+class AsyncGDAXConnector(GDAXMixin, AsyncWebSocketConnector):
+    """GDAX Connector running on an asyncio event loop."""
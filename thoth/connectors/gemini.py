@@ -2,40 +2,32 @@
 
 import time
 import logging
-from threading import Timer
-from thoth.connectors.base import WebsocketConnector
+from thoth.core.websocket import WebSocketConnector
+from thoth.core.sequence import SequenceTracker
 
 log = logging.getLogger(__name__)
 
 
-class GeminiConnector(WebsocketConnector):
+class GeminiConnector(WebSocketConnector):
     """Gemini Websocket Connector."""
 
     def __init__(self, pair, **conn_ops):
         """Initialize GeminiConnector."""
         url = 'wss://api.gemini.com/v1/marketdata/' + pair
         self.pair = pair
-        self.last_seq = None
         super(GeminiConnector, self).__init__(url, **conn_ops)
+        # Each connection carries a single symbol, so reconnecting is its cheapest recovery
+        self.sequences = SequenceTracker(lambda *_: self.reconnect(), name='GeminiConnector')
 
-    def _start_timers(self):
-        """Reset and start timers for API connection."""
-        self._stop_timers()
-
-        # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
+    def _on_open(self, ws):
+        """Start a new sequence; socket sequence numbers restart with every connection."""
+        super(GeminiConnector, self)._on_open(ws)
+        self.sequences.resynced(self.pair)
 
     def send_ping(self):
         """Override the send_ping method."""
         return
 
-    def _stop_timers(self):
-        """Stop connection timer."""
-        if self.connection_timer:
-            self.connection_timer.cancel()
-
     # pylint: disable=too-many-locals,too-many-branches,too-many-statements
     def pass_up(self, data, recv_at):
         """Preformat gemini Market data and pass it on to data node.
@@ -56,14 +48,8 @@ class GeminiConnector(WebsocketConnector):
                 return event, time.time(), data
             raise
 
-        sock_seq = data['socket_sequence']
-        if self.last_seq and sock_seq != self.last_seq + 1:
-            log.error("Socket sequence out of order! Last: %s, Current: %s",
-                      self.last_seq, sock_seq)
-            self.reconnect()
+        if not self.sequences.check(self.pair, data['socket_sequence']):
             return
-        else:
-            self.last_seq = sock_seq
 
         if event == 'heartbeat':
             return
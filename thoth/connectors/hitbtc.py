@@ -1,30 +1,65 @@
 """HitBTC Connector which pre-formats incoming data to the CTS standard."""
 
+import itertools
 import logging
 import time
 import json
-from threading import Timer
 
 from collections import defaultdict
+from functools import partial
 
-import requests
-
-from thoth.connectors.base import WebsocketConnector
+from thoth.core.websocket import WebSocketConnector
+from thoth.core.book import OrderBook
+from thoth.core.metadata import RestFetcher, get_registry
+from thoth.core.subscriptions import SubscriptionScheduler
 
 
 log = logging.getLogger(__name__)
 
+#: REST endpoint listing the symbols and their metadata.
+SYMBOLS_URL = 'https://api.hitbtc.com/api/2/public/symbol'
+
+#: Subscription requests per second sent per connection, by default.
+SUBSCRIPTION_RATE = 10
+
+#: Channels subscribed to for each symbol, with their extra parameters.
+CHANNELS = (('subscribeTicker', {}), ('subscribeOrderbook', {}), ('subscribeTrades', {}),
+            ('subscribeCandles', {'period': 'M1'}))
+
 # pylint: disable=duplicate-code
 
 
-class HitBTCConnector(WebsocketConnector):
-    """Class to pre-process HitBTC data, before passing it up to a Node."""
+class HitBTCConnector(WebSocketConnector):
+    """Class to pre-process HitBTC data, before passing it up to a Node.
+
+    Every connection subscribes to the channels of all symbols once it opens, pipelining the
+    requests at the subscription rate (see :meth:`subscribe`). Data is pushed to the topic
+    ``<kind>_<symbol>``, e.g. ``Ticker_ETHBTC``, as JSON-encoded preformatted tuples.
+    """
+
+    def __init__(self, symbols=None, subscription_rate=None, subscription_bucket=None,
+                 registry=None, **conn_ops):
+        """Initialize a HitBTCConnector instance.
 
-    def __init__(self, **conn_ops):
-        """Initialize a HitBTCConnector instance."""
+        :param symbols: symbols to subscribe to; defaults to all symbols listed by the API,
+                        including symbols listed later on
+        :param subscription_rate: subscription requests sent per second; defaults to
+                                  :data:`SUBSCRIPTION_RATE`
+        :param subscription_bucket: :class:`thoth.core.subscriptions.TokenBucket` shared with
+                                    other connections, if the limit applies to all of them
+        :param registry: :class:`thoth.core.metadata.SymbolRegistry` listing the symbols if
+                         ``symbols`` is None; defaults to the shared ``hitbtc`` registry
+        :param conn_ops: keyword arguments for the connector base class
+        """
         url = 'wss://api.hitbtc.com/api/2/ws'
         super(HitBTCConnector, self).__init__(url, **conn_ops)
-        self.books = defaultdict(dict)
+        self.symbols = list(symbols or [])
+        # Connection the current subscription round is sent on
+        self._subscribing = None
+        self.scheduler = SubscriptionScheduler(subscription_rate or SUBSCRIPTION_RATE,
+                                               bucket=subscription_bucket,
+                                               name=type(self).__name__)
+        self.books = defaultdict(OrderBook)
         self.channel_handlers = {'ticker': self._handle_ticker,
                                  'snapshotOrderbook': self._handle_book,
                                  'updateOrderbook': self._handle_book,
@@ -33,20 +68,25 @@ class HitBTCConnector(WebsocketConnector):
                                  'snapshotCandles': self._handle_candles,
                                  'updateCandles': self._handle_candles}
         self.requests = {}
+        self._request_ids = itertools.count(1)
+        self.registry = None
+        if symbols is None:
+            if registry is None:
+                registry = get_registry('hitbtc', RestFetcher(
+                    SYMBOLS_URL, parse=lambda data: {d['id']: d for d in data}))
+            self.registry = registry
+            self.registry.subscribe(self._on_symbols)
 
-    def _start_timers(self):
-        """Reset and start timers for API connection."""
-        self._stop_timers()
-
-        # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
+    def _on_open(self, ws):
+        """Subscribe to the channels of all symbols on every new connection."""
+        super(HitBTCConnector, self)._on_open(ws)
+        self.subscribe(ws)
 
-    def _stop_timers(self):
-        """Stop connection timer."""
-        if self.connection_timer:
-            self.connection_timer.cancel()
+    def _on_message(self, ws, message):
+        """Decode the message and pass it to its handler."""
+        # We've received data, push back the time-out deadline
+        self.last_seen = time.monotonic()
+        self.pass_up(json.loads(message), time.time_ns())
 
     # pylint: disable=arguments-differ,unused-argument
     def pass_up(self, decoded_message, ts):
@@ -65,9 +105,14 @@ class HitBTCConnector(WebsocketConnector):
                 except Exception as e:
                     self.log.exception(e)
                     self.log.error(decoded_message)
-                self.channel_handlers[method](method, symbol, params)
+                    return
+                self.channel_handlers[method](method, symbol, params, ts)
         return
 
+    def _put(self, symbol, kind, data, recv_at):
+        """Push the preformatted data of the given kind to the symbol's topic."""
+        self.push('%s_%s' % (kind, symbol), json.dumps(data), recv_at)
+
     def _handle_response(self, decoded_msg):
         """Handle JSONRPC response objects."""
         try:
@@ -78,8 +123,12 @@ class HitBTCConnector(WebsocketConnector):
             self.log.error("An expected Key was not found in %s", decoded_msg)
             raise
         try:
-            request = self.requests.pop(i_d)
+            request, conn = self.requests.pop(i_d)
             state = 'was processed successfully' if result is True else 'failed'
+            # Responses to the requests of a replaced connection don't count
+            if (result is True and request['method'].startswith('subscribe') and
+                    conn is self._subscribing):
+                self.scheduler.acknowledge()
             self.log.info("Request #%s (Payload %s) %s!", i_d, request, state)
         except KeyError as e:
             log.exception(e)
@@ -92,49 +141,35 @@ class HitBTCConnector(WebsocketConnector):
         log.error(decoded_msg)
 
     # pylint: disable=unused-argument
-    def _handle_ticker(self, method, symbol, params):
+    def _handle_ticker(self, method, symbol, params, recv_at):
         """Handle streamed ticker data."""
         bid_price, ask_price = params['bid'], params['ask']
         open_, high, low, last = params['open'], params['high'], params['low'], params['last']
         vol, quote_vol = params['volume'], params['volumeQuote']
         timestamp = params['timestamp']
-        self.q.put((symbol, 'Ticker', (bid_price, ask_price, open_, high, low, last, vol, quote_vol,
-                                       timestamp)))
+        self._put(symbol, 'Ticker', (bid_price, ask_price, open_, high, low, last, vol,
+                                     quote_vol, timestamp), recv_at)
 
     # pylint: disable=unused-argument
-    def _handle_book(self, method, symbol, params):
+    def _handle_book(self, method, symbol, params, recv_at):
         """Handle streamed order book data."""
-        ts = time.time()
-        bids, asks, sequence = params['bid'], params['ask'], params['sequence']
-        bids = {bid['price']: (bid['price'], bid['size'], str(sequence)) for bid in bids}
-        asks = {ask['price']: (ask['price'], ask['size'], str(sequence)) for ask in asks}
-        if not self.books[symbol]:
-            self.books[symbol]['bids'] = bids
-            self.books[symbol]['asks'] = asks
+        ts = recv_at / 1e9
+        bids, asks, sequence = params['bid'], params['ask'], str(params['sequence'])
+        book = self.books[symbol]
+        if method == 'snapshotOrderbook':
+            book.snapshot([(bid['price'], bid['size'], sequence) for bid in bids],
+                          [(ask['price'], ask['size'], sequence) for ask in asks])
         else:
-            for price in bids:
-                if bids[price][1] == '0.00':
-                    self.books[symbol]['bids'].pop(price)
-                else:
-                    self.books[symbol]['bids'][price] = bids[price]
-            for price in asks:
-                if asks[price][1] == '0.00':
-                    self.books[symbol]['asks'].pop(asks[price])
-                else:
-                    self.books[symbol]['asks'][price] = asks[price]
-
-        prepped_bids = sorted([self.books[symbol]['bids'][bid]
-                               for bid in self.books[symbol]['bids']],
-                              key=lambda x: float(x[0]), reverse=True)
-        prepped_asks = sorted([self.books[symbol]['asks'][ask]
-                               for ask in self.books[symbol]['asks']],
-                              key=lambda x: float(x[0]))
-
-        self.q.put((symbol, 'Book', (prepped_bids, prepped_asks, ts)))
-        self.q.put((symbol, 'TopLevel', (prepped_bids[0], prepped_asks[0], ts)))
+            for bid in bids:
+                book.update_bid(bid['price'], bid['size'], sequence)
+            for ask in asks:
+                book.update_ask(ask['price'], ask['size'], sequence)
+
+        self._put(symbol, 'Book', (book.bids.top(), book.asks.top(), ts), recv_at)
+        self._put(symbol, 'TopLevel', (book.best_bid(), book.best_ask(), ts), recv_at)
 
     # pylint: disable=unused-argument
-    def _handle_trades(self, method, symbol, params):
+    def _handle_trades(self, method, symbol, params, recv_at):
         """Handle streamed trades data."""
         trades = params['data']
         prepped_trades = []
@@ -144,41 +179,75 @@ class HitBTCConnector(WebsocketConnector):
             side = 'ask' if trade['side'] == 'sell' else 'bid'
             uid = trade['id']
             prepped_trades.append((symbol, price, size, side, uid, None, ts))
-        self.q.put((symbol, 'Trades', prepped_trades))
+        self._put(symbol, 'Trades', prepped_trades, recv_at)
 
     # pylint: disable=unused-argument
-    def _handle_candles(self, method, symbol, params):
+    def _handle_candles(self, method, symbol, params, recv_at):
         """Handle streamed candle data."""
         period, candles = params['period'], params['data']
         for candle in candles:
             ts = candle['timestamp']
             open_, close, low, high = candle['open'], candle['close'], candle['min'], candle['max']
-            self.q.put((symbol, 'Candle-%s' % period, (open_, high, low, close, ts)))
-
-    def subscribe(self):
-        """Subscribe to all available channels."""
-        channels = ['subscribeticker', 'subscribeOrderbook', 'subscribeTrades', 'subscribeCandles']
-        response = requests.get('https://api.hitbtc.com/api/2/public/symbol').json()
-        pairs = [d['id'] for d in response]
-        for pair in pairs:
-            for channel in channels:
-                if channel == 'subscribeCandles':
-                    self.send(channel, symbol=pair, period='M1')
-                else:
-                    self.send(channel, symbol=pair)
-                time.sleep(.5)
+            self._put(symbol, 'Candle-%s' % period, (open_, high, low, close, ts), recv_at)
+
+    def subscribe(self, ws):
+        """Subscribe to all channels of the symbols on the given connection.
+
+        The requests are sent in the background, at the subscription rate; the API accepts a
+        single symbol per request. Progress and the time to full coverage - until all
+        requests were acknowledged - are reported by
+        :meth:`thoth.core.subscriptions.SubscriptionScheduler.snapshot` of :attr:`scheduler`.
+
+        Called by :meth:`_on_open` for every new connection; a replacement's round cancels
+        the round of the connection it replaces.
+
+        :param ws: connection to send the requests on
+        :return: :class:`threading.Thread` sending the requests
+        """
+        self._subscribing = ws
+        return self.scheduler.start(partial(self._send_request, ws),
+                                    self._subscriptions(self.symbols), acknowledged=True)
+
+    @staticmethod
+    def _subscriptions(symbols):
+        """Return the subscription requests of the given symbols."""
+        return [(channel, dict(params, symbol=symbol))
+                for symbol in symbols for channel, params in CHANNELS]
+
+    def _send_request(self, ws, request):
+        """Send a ``(method, params)`` request on the given connection."""
+        method, params = request
+        self._send(ws, method, params)
+
+    # pylint: disable=unused-argument
+    def _on_symbols(self, added, removed):
+        """Add newly listed symbols, subscribing to them if already subscribed."""
+        new = [symbol for symbol in added if symbol not in self.symbols]
+        self.symbols.extend(new)
+        ws = self._subscribing
+        if new and ws is not None:
+            self.scheduler.extend(partial(self._send_request, ws), self._subscriptions(new),
+                                  acknowledged=True)
 
     # pylint: disable=arguments-differ
     def send(self, method, **params):
         """
         Send the given Payload to the API via the websocket connection.
 
+        Requests sent while a connection opens go out on that connection.
+
         :param kwargs: payload parameters as key=value pairs
         """
-        payload = {'method': method, 'params': params, 'id': int(10000 * time.time())}
-        self.requests[payload['id']] = payload
-        self.log.debug("Sending: %s", payload)
-        self.conn.send(json.dumps(payload))
+        self._send(getattr(self._opening, 'conn', None) or self.conn, method, params)
+
+    def _send(self, ws, method, params):
+        """Send a request on the given connection, remembering it for its response."""
+        # Pipelined requests may be sent within the same clock tick; number them instead
+        payload = {'method': method, 'params': params, 'id': next(self._request_ids)}
+        self.requests[payload['id']] = payload, ws
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("Sending: %s", payload)
+        ws.send(json.dumps(payload))
 
     def send_ping(self):
         """Override ping command since HitBTC does not support this."""
@@ -1,10 +1,9 @@
 """OKEx Connector which pre-formats incoming data to the CTS standard."""
 
+import json
 import logging
-from threading import Timer
 
-
-from thoth.connectors.base import WebsocketConnector
+from thoth.core.websocket import WebSocketConnector
 
 
 log = logging.getLogger(__name__)
@@ -12,7 +11,7 @@ log = logging.getLogger(__name__)
 # pylint: disable=duplicate-code
 
 
-class OKExConnector(WebsocketConnector):
+class OKExConnector(WebSocketConnector):
     """Class to pre-process HitBTC data, before passing it up to a Node."""
 
     def __init__(self, **conn_ops):
@@ -20,20 +19,6 @@ class OKExConnector(WebsocketConnector):
         url = 'wss://real.okex.com:10441/websocket '
         super(OKExConnector, self).__init__(url, **conn_ops)
 
-    def _start_timers(self):
-        """Reset and start timers for API connection."""
-        self._stop_timers()
-
-        # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
-
-    def _stop_timers(self):
-        """Stop connection timer."""
-        if self.connection_timer:
-            self.connection_timer.cancel()
-
     # pylint: disable=unused-variable
     def _on_open(self, ws):
         """Subscribe upon connecting."""
@@ -54,9 +39,9 @@ class OKExConnector(WebsocketConnector):
             bids = [[str(price), str(size), str(recv_at)] for price, size in bids]
             asks = [[str(price), str(size), str(recv_at)] for price, size in asks]
             pair, *_ = channel[12:].rsplit('_', maxsplit=2)
-            self.q.put((pair, 'Book', (bids, asks, recv_at)))
+            self.push('Book_%s' % pair, json.dumps([bids, asks, recv_at]), recv_at)
             quotes = [[pair, p, s, 'ask', None, ts] for p, s, ts in bids]
             quotes += [[pair, p, s, 'ask', None, ts] for p, s, ts in asks]
-            self.q.put((pair, 'Quotes', quotes))
+            self.push('Quotes_%s' % pair, json.dumps(quotes), recv_at)
         except (IndexError, KeyError):
-            print(data)
+            log.error("Malformed book message: %s", data)
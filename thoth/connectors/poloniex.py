@@ -1,41 +1,42 @@
 """Poloniex Connector which pre-formats incoming data to the CTS standard."""
 
 import logging
-from threading import Timer
 
-import requests
-
-from thoth.connectors.base import WebsocketConnector
+from thoth.core.websocket import WebSocketConnector
+from thoth.core.metadata import RestFetcher, get_registry
 
 
 log = logging.getLogger(__name__)
 
+#: REST endpoint listing the markets, with their channel ids.
+TICKER_URL = 'https://poloniex.com/public?command=returnTicker'
+
 # pylint: disable=duplicate-code
 
 
-class PoloniexConnector(WebsocketConnector):
+class PoloniexConnector(WebSocketConnector):
     """Class to pre-process HitBTC data, before passing it up to a Node."""
 
-    def __init__(self, **conn_ops):
-        """Initialize a PoloniexConnector instance."""
+    def __init__(self, registry=None, **conn_ops):
+        """Initialize a PoloniexConnector instance.
+
+        :param registry: :class:`thoth.core.metadata.SymbolRegistry` of the markets; defaults
+                         to the shared ``poloniex`` registry
+        :param conn_ops: keyword arguments for the connector base class
+        """
         url = 'wss://api2.poloniex.com/'
         super(PoloniexConnector, self).__init__(url, **conn_ops)
-        pair_dict = requests.get('https://poloniex.com/public?command=returnTicker').json()
-        self.pairs = {pair_dict[k]['id']: k for k in pair_dict}
-
-    def _start_timers(self):
-        """Reset and start timers for API connection."""
-        self._stop_timers()
-
-        # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
+        # Market names by channel id
+        self.pairs = {}
+        if registry is None:
+            registry = get_registry('poloniex', RestFetcher(TICKER_URL))
+        self.registry = registry
+        self.registry.subscribe(self._on_symbols)
 
-    def _stop_timers(self):
-        """Stop connection timer."""
-        if self.connection_timer:
-            self.connection_timer.cancel()
+    # pylint: disable=unused-argument
+    def _on_symbols(self, added, removed):
+        """Map the channel ids of newly listed markets to their names."""
+        self.pairs.update({ticker['id']: pair for pair, ticker in added.items()})
 
     # pylint: disable=too-many-locals,broad-except,too-many-branches,too-many-statements
     def pass_up(self, data, recv_at):
@@ -48,9 +49,9 @@ class PoloniexConnector(WebsocketConnector):
                 channel, ack = data
                 log.info("Subscription to channel %s: %s", channel, True if ack else False)
             elif len(data) == 1:
-                print("Heartbeat:", data)
+                log.debug("Heartbeat: %s", data)
             else:
-                print("ERROR:", data)
+                log.error("Unexpected message: %s", data)
                 log.exception(e)
             return
         if channel in (1002, '1002'):
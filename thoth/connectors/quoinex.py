@@ -1,41 +1,58 @@
 """Quoinex Websocket connector."""
 
 import logging
-import requests
 
+from thoth.core.metadata import RestFetcher, get_registry
 from thoth.core.pusher import PusherConnector
 
 
 log = logging.getLogger(__name__)
 
+#: REST endpoint listing the products.
+PRODUCTS_URL = 'https://api.quoine.com/products'
+
 
 class QuoinexConnector(PusherConnector):
     """Quoinex Websocket Connector."""
 
-    def __init__(self, *args, **kwargs):
-        """Initialize the instance."""
+    def __init__(self, *args, registry=None, **kwargs):
+        """Initialize the instance.
+
+        :param registry: :class:`thoth.core.metadata.SymbolRegistry` of the products, adding
+                         their currency pairs to :attr:`pairs`; defaults to the shared
+                         ``quoinex`` registry
+        """
         super(QuoinexConnector, self).__init__(*args, **kwargs)
-        response_data = requests.get('https://api.quoine.com/products').json()
-        self.pairs = [d['currency_pair_code'] for d in response_data]
+        self.pairs = list(self.pairs)
+        if registry is None:
+            registry = get_registry('quoinex', RestFetcher(
+                PRODUCTS_URL, parse=lambda data: {d['currency_pair_code']: d for d in data}))
+        self.registry = registry
+        self.registry.subscribe(self._on_symbols)
+
+    # pylint: disable=unused-argument
+    def _on_symbols(self, added, removed):
+        """Add the currency pairs of newly listed products."""
+        self.pairs.extend(pair for pair in added if pair not in self.pairs)
 
     # pylint: disable=unused-argument,arguments-differ
     def _base_callback(self):
         """Put data on respective queue."""
         def ticker(data):
             """Put data on q with correct channel name."""
-            print(data)
+            log.debug("ticker: %s", data)
 
         def book(data):
             """Put data on q with correct channel name."""
-            print(data)
+            log.debug("book: %s", data)
 
         def orders(data):
             """Put data on q with correct channel name."""
-            print(data)
+            log.debug("orders: %s", data)
 
         def executions(data):
             """Put data on q with correct channel name."""
-            print(data)
+            log.debug("executions: %s", data)
 
         channel1 = self.subscribe('')
         channel1.bind('trade', ticker)
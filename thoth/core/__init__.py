@@ -1,4 +1,16 @@
-from thoth.core.node import DataNode
-from thoth.core.websocket import WebSocketConnector
-from thoth.core.pusher import PusherConnector
-from thoth.core.structs import ThothEnvelope
\ No newline at end of file
+"""Core classes, imported on first access."""
+from thoth._lazy import lazy_attributes
+
+_ATTRIBUTES = {'DataNode': 'thoth.core.node',
+               'WebSocketConnector': 'thoth.core.websocket',
+               'AsyncWebSocketConnector': 'thoth.core.aiowebsocket',
+               'PusherConnector': 'thoth.core.pusher',
+               'PullReceiver': 'thoth.core.receiver',
+               'ShardedDataNode': 'thoth.core.sharding',
+               'ConnectionPool': 'thoth.core.pool',
+               'Supervisor': 'thoth.core.supervisor',
+               'ThothEnvelope': 'thoth.core.structs'}
+
+__all__ = sorted(_ATTRIBUTES)
+
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES)
@@ -0,0 +1,55 @@
+"""Autobahn protocol of :class:`thoth.core.aiowebsocket.AsyncWebSocketConnector` connections."""
+
+# Import Built-Ins
+import logging
+
+# Import Third-Party
+from autobahn.asyncio.websocket import WebSocketClientProtocol, WebSocketClientFactory
+
+# Import home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+__all__ = ['ConnectorProtocol', 'WebSocketClientFactory']
+
+
+class ConnectorProtocol(WebSocketClientProtocol):
+    """Protocol forwarding websocket events to its :class:`AsyncWebSocketConnector`."""
+
+    connector = None
+
+    def __init__(self):
+        """Initialize the instance."""
+        super(ConnectorProtocol, self).__init__()
+        self.closed = self.connector.loop.create_future()
+        # pylint: disable=protected-access
+        self._handle_message = (self.connector._on_frame if self.connector.sample_interval
+                                else self.connector._on_message)
+
+    def onOpen(self):  # pylint: disable=invalid-name
+        """Pass the opened connection to the connector."""
+        self.connector._on_open(self)  # pylint: disable=protected-access
+
+    def onMessage(self, payload, isBinary):  # pylint: disable=invalid-name
+        """Pass received messages to the connector, as received in :class:`bytes`."""
+        self._handle_message(self, payload)
+
+    def onClose(self, wasClean, code, reason):  # pylint: disable=invalid-name
+        """Notify the connector and resolve :attr:`ConnectorProtocol.closed`."""
+        if not wasClean:
+            self.connector._on_error(self, reason)  # pylint: disable=protected-access
+        self.connector._on_close(self, code, reason)  # pylint: disable=protected-access
+        if not self.closed.done():
+            self.closed.set_result(code)
+
+    def send(self, payload):
+        """Send the given string payload as a text message."""
+        self.sendMessage(payload.encode('UTF-8'))
+
+    def close(self):
+        """Close the connection, dropping it if its opening handshake is still going on."""
+        if self.state == self.STATE_CONNECTING:
+            self.dropConnection(abort=True)
+        else:
+            self.sendClose()
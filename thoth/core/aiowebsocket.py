@@ -0,0 +1,368 @@
+"""Asyncio Websocket Connector Base class.
+
+Uses zeromq to pass data upward, using PUSH/PULL.
+
+Passes data without touching it.
+
+Unlike :class:`thoth.core.websocket.WebSocketConnector`, instances of
+:class:`thoth.core.aiowebsocket.AsyncWebSocketConnector` do not run in a thread of their own.
+Any number of them may be hosted on a single :mod:`asyncio` event loop, which also handles their
+connection time-outs, avoiding the thread switches of running one connector per thread.
+
+The hooks (``_on_open``, ``_on_message``, ``_on_close``, ``_on_error``) as well as ``send``,
+``push`` and the history-based re-subscription match those of
+:class:`thoth.core.websocket.WebSocketConnector`, so connectors can be ported by swapping their
+base class.
+
+Connections are replaced break-before-make: a lost or timed-out connection is closed before
+its replacement is opened and re-subscribed, so data is missed until the replacement
+delivers. Make-before-break replacement, as done by
+:class:`thoth.core.websocket.WebSocketConnector`, is not implemented for this connector.
+Reconnects back off like those of :class:`thoth.core.websocket.WebSocketConnector`: only
+connections which delivered data and stayed up for ``timeout`` seconds reset the backoff.
+
+The autobahn protocol of the connections, :class:`thoth.core.aioprotocol.ConnectorProtocol`,
+is imported when the first connection is opened, so importing connector modules does not
+import autobahn.
+"""
+
+# pylint: disable=too-many-arguments
+
+# Import Built-Ins
+import logging
+import asyncio
+import json
+import ssl
+import time
+from abc import abstractmethod
+from functools import partial
+
+# Import Third-Party
+import zmq
+
+# Import home-grown
+from thoth.core.batching import PushBatcher
+from thoth.core.frames import pack_frames, pack_traced_frames, send_frames
+from thoth.core.websocket import backoff_delay
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class AsyncWebSocketConnector:
+    """Websocket Connector running on an asyncio event loop."""
+
+    # pylint: disable=too-many-instance-attributes, too-many-arguments,unused-argument
+
+    def __init__(self, url, zmq_addr=None, timeout=None, reconnect_interval=None, log_level=None,
+                 ctx=None, loop=None, batch_size=None, batch_delay=None, sample_interval=None):
+        """Initialize an AsyncWebSocketConnector Instance.
+
+        :param url: websocket address
+        :param zmq_addr: address for zmq socket to bind to.
+        :param timeout: timeout for connection; defaults to 10s
+        :param reconnect_interval: maximum interval between repeated attempts to reconnect;
+                                   defaults to 10s.
+        :param log_level: logging level for the connection Logger. Defaults to
+                          logging.INFO.
+        :param ctx: :class:`zmq.Context` to create the PUSH socket with
+        :param loop: event loop to run on; defaults to the loop passed to
+                     :meth:`AsyncWebSocketConnector.start`
+        :param batch_size: if given, push messages in batches of up to this many messages
+        :param batch_delay: maximum time in seconds a message is held back when batching;
+                            defaults to 500us
+        :param sample_interval: if given, trace every n-th received message through its stages
+                                (see :mod:`thoth.core.stats`)
+        """
+        # Queue used to pass data up to Node
+        self.ctx = ctx or zmq.Context()
+        self.q = self.ctx.socket(zmq.PUSH)
+        self.zmq_addr = zmq_addr or 'ipc:///tmp/wss'
+        self.q.bind(self.zmq_addr)
+        self.batcher = None
+        if batch_size:
+            self.batcher = PushBatcher(self.q, batch_size, batch_delay,
+                                       call_later=lambda *args: self.loop.call_later(*args))
+        self._send_frames = self.batcher.push if self.batcher else partial(send_frames, self.q)
+
+        # Tracing of sampled messages
+        self.sample_interval = sample_interval
+        self._countdown = sample_interval
+        self._socket_at = None
+        self._parsed_at = None
+        self._trace_source = type(self).__name__.encode('UTF-8')
+
+        # Connection Settings
+        self.url = url
+        self.conn = None
+        self.loop = loop
+        self._task = None
+
+        # Connection Handling Attributes
+        self._is_connected = False
+        self.disconnect_called = False
+        self.reconnect_required = False
+        self.reconnect_interval = reconnect_interval if reconnect_interval else 10
+        self.paused = False
+
+        # Set up history of sent commands for re-subscription
+        self.history = []
+
+        # Time-out attributes; checked by a callback on the event loop
+        self.last_seen = 0
+        self.connection_timeout = timeout if timeout else 10
+        self._opened_at = None
+        self._timeout_handle = None
+
+        self.log = logging.getLogger(self.__module__)
+        self.log.setLevel(level=log_level if log_level else logging.INFO)
+
+    def start(self, loop=None):
+        """Schedule the connector on the given event loop.
+
+        :param loop: event loop to run on; defaults to :attr:`AsyncWebSocketConnector.loop` or
+                     the current event loop.
+        :return: :class:`asyncio.Task` running the connection
+        """
+        self.loop = loop or self.loop or asyncio.get_event_loop()
+        self._task = self.loop.create_task(self._connect())
+        return self._task
+
+    def stop(self):
+        """Disconnect and close the internal zmq socket."""
+        self.disconnect()
+        if self._task:
+            self._task.cancel()
+        if self.batcher:
+            self.batcher.flush()
+        self.q.close()
+
+    @property
+    def connected(self):
+        """Return whether the websocket connection is open."""
+        return self._is_connected
+
+    def disconnect(self):
+        """Disconnect from the websocket connection."""
+        self.reconnect_required = False
+        self.disconnect_called = True
+        self._is_connected = False
+        if self.conn:
+            self.conn.close()
+
+    def reconnect(self):
+        """Issue a reconnection by setting the reconnect_required flag."""
+        # Reconnect attempt at self.reconnect_interval
+        self.reconnect_required = True
+        self._is_connected = False
+        if self.conn:
+            self.conn.close()
+
+    async def _open_connection(self):
+        """Open a websocket connection to :attr:`AsyncWebSocketConnector.url`.
+
+        :return: :class:`thoth.core.aioprotocol.ConnectorProtocol` instance
+        """
+        # Imports autobahn, only needed once a connection is opened
+        # pylint: disable=import-outside-toplevel
+        from thoth.core.aioprotocol import ConnectorProtocol, WebSocketClientFactory
+        factory = WebSocketClientFactory(self.url, loop=self.loop)
+        factory.protocol = type('ConnectorProtocol', (ConnectorProtocol,), {'connector': self})
+        ssl_context = ssl.create_default_context() if factory.isSecure else None
+        _, protocol = await self.loop.create_connection(factory, factory.host, factory.port,
+                                                        ssl=ssl_context)
+        return protocol
+
+    async def _connect(self):
+        """Create a websocket connection.
+
+        Automatically reconnects connection if it was severed unintentionally.
+        """
+        failures = 0
+        while True:
+            self._opened_at = None
+            try:
+                self.conn = await self._open_connection()
+                await self.conn.closed
+            except OSError as e:
+                self._on_error(None, e)
+            failures = 0 if self._proved_stable() else failures + 1
+            if not self.reconnect_required or self.disconnect_called:
+                break
+            # Reconnect right away, backing off only if connecting fails repeatedly
+            delay = backoff_delay(failures, self.reconnect_interval)
+            self.log.info("Attempting to connect again in %.2f seconds.", delay)
+            await asyncio.sleep(delay)
+
+    def _proved_stable(self):
+        """Return whether the last connection delivered data and stayed up long enough.
+
+        Only such connections count as successful attempts, resetting the backoff.
+        """
+        return (self._opened_at is not None and self.last_seen > self._opened_at and
+                self.loop.time() - self._opened_at >= self.connection_timeout)
+
+    def _on_frame(self, ws, message):
+        """Stamp every ``sample_interval``-th message at reception, then handle it.
+
+        :param ws: :class:`ConnectorProtocol` obj
+        :param message: message as received
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._countdown = self.sample_interval
+            self._socket_at = time.time_ns()
+        self._on_message(ws, message)
+        self._socket_at = self._parsed_at = None
+
+    @abstractmethod
+    def _on_message(self, ws, message):
+        """Handle and pass received data to the appropriate handlers.
+
+        Updates :attr:`AsyncWebSocketConnector.last_seen` for the time-out check and logs
+        exceptions during parsing.
+
+        :param ws: :class:`ConnectorProtocol` obj
+        :param message: tuple or list of topic, data, timestamp
+        :return:
+        """
+        self.last_seen = self.loop.time()
+        if self._socket_at is not None:
+            # Parsing is done; the time until the node receives the message is transport
+            self._parsed_at = time.time_ns()
+
+        try:
+            self.push(*message)
+        except Exception as e:
+            log.exception(e)
+            log.error(message)
+            raise
+
+    def _on_close(self, ws, *args):
+        """Log the close and stop the time-out check.
+
+        :param ws: :class:`ConnectorProtocol` obj
+        :param *args: additional arguments
+        """
+        self.log.info("Connection closed")
+        self._is_connected = False
+        self._stop_timers()
+
+    def _on_open(self, ws):
+        """Log connection status, start the time-out check and re-subscribe if required.
+
+        If the connection was previously severed unintentionally, it re-subscribes
+        to the channels by executing the commands found in self.history, in
+        chronological order.
+
+        :param ws: :class:`ConnectorProtocol` obj
+        """
+        self.log.info("Connection opened")
+        self._is_connected = True
+        self._start_timers()
+        self._opened_at = self.last_seen
+        if self.reconnect_required:
+            self.log.info("Reconnection successful, re-subscribing to"
+                          "channels..")
+            hist = self.history
+            self.history = []
+            for cmd in hist:
+                self.send(cmd)
+
+    def _on_error(self, ws, error):
+        """Log the error, reset the self._is_connected flag and issue a reconnect.
+
+        :param ws: :class:`ConnectorProtocol` obj
+        :param error: Error message
+        """
+        self.log.info("Connection Error - %s", error)
+        self._is_connected = False
+        self.reconnect_required = True
+
+    def _stop_timers(self):
+        """Cancel the time-out check."""
+        if self._timeout_handle:
+            self._timeout_handle.cancel()
+            self._timeout_handle = None
+
+    def _start_timers(self):
+        """Reset the time-out deadline and schedule its check on the event loop."""
+        self._stop_timers()
+        self.last_seen = self.loop.time()
+        self._timeout_handle = self.loop.call_at(self.last_seen + self.connection_timeout,
+                                                 self._check_timeout)
+
+    def _check_timeout(self):
+        """Issue a time-out, unless data arrived since the check was scheduled."""
+        deadline = self.last_seen + self.connection_timeout
+        if self.loop.time() < deadline:
+            self._timeout_handle = self.loop.call_at(deadline, self._check_timeout)
+        else:
+            self._timeout_handle = None
+            self._connection_timed_out()
+
+    def send(self, data, remember=True):
+        """Send the given Payload to the API via the websocket connection.
+
+        Furthermore adds the sent payload to self.history.
+
+        :param data: data to be sent
+        :param remember: whether to add the payload to self.history, replaying it after
+                         reconnecting; pass False for one-off requests
+        :return:
+        """
+        if self._is_connected:
+            payload = json.dumps(data)
+            if remember:
+                self.history.append(data)
+            self.conn.send(payload)
+        else:
+            log.error("Cannot send payload! Connection not established!")
+
+    def push(self, topic, data, recv_at):
+        """Push data up to the :cls:`DataNode` via the internal :cls:`zmq.Socket`.
+
+        The socket type is :cls:`zmq.PUSH`.
+
+        The data is passed on untouched if it is :class:`bytes`; the time of reception is sent
+        as packed 8-byte integer of nanoseconds (see :mod:`thoth.core.frames`).
+
+        :param topic: The topic of the message to send.
+        :param data: data to be pushed, :class:`bytes` or :class:`str`
+        :param recv_at: int, nanoseconds (or float, seconds) since the epoch at reception
+        :return:
+        """
+        if self._socket_at is None:
+            self._send_frames(pack_frames(topic, data, recv_at))
+            return
+        # Only the first message pushed for a sampled message is traced; connectors pushing
+        # without passing through _on_message() finished parsing when calling push()
+        socket_at, self._socket_at = self._socket_at, None
+        parsed_at = self._parsed_at or time.time_ns()
+        self._send_frames(pack_traced_frames(topic, data, recv_at, socket_at, parsed_at,
+                                             self._trace_source))
+
+    def _connection_timed_out(self):
+        """Issue a reconnection."""
+        self.reconnect()
+
+
+def run_connectors(*connectors, loop=None):
+    """Run the given connectors on a single event loop until interrupted.
+
+    :param connectors: :class:`AsyncWebSocketConnector` instances
+    :param loop: event loop to use; defaults to a new event loop
+    :return: :class:`None`
+    """
+    loop = loop or asyncio.new_event_loop()
+    for connector in connectors:
+        connector.start(loop)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for connector in connectors:
+            connector.stop()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
@@ -0,0 +1,131 @@
+"""Micro-batching of frames pushed to a :class:`thoth.DataNode`.
+
+Instead of issuing one ``send_multipart`` call per message, a
+:class:`thoth.core.batching.PushBatcher` collects the ``(topic, data, ts)`` frames of several
+messages and sends them as a single batch, once either ``batch_size`` messages were collected
+or ``batch_delay`` seconds passed since the first message of the batch was buffered.
+The added latency is therefore bounded by ``batch_delay``.
+
+A batch is a 2-frame multipart message: :data:`BATCH_MARKER`, followed by a body of
+length-prefixed records::
+
+    !HIH header (topic length, data length, ts length) | topic | data | ts
+
+Packing the messages into a single frame matters, since with zmq the per-message overhead is
+mostly per *frame*. :func:`thoth.core.batching.iter_messages` unpacks single messages and
+batches alike, which is how :meth:`thoth.DataNode.run` handles batches transparently.
+"""
+
+# Import Built-Ins
+import logging
+import struct
+from threading import Lock
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.watchdog import get_watchdog
+from thoth.core.frames import as_buffer, ZERO_COPY_THRESHOLD
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+#: First frame of a batch; cannot collide with a topic, since topics never start with a NUL.
+BATCH_MARKER = b'\x00thoth.batch'
+
+#: Number of frames making up a single message.
+FRAMES_PER_MESSAGE = 3
+
+RECORD_HEADER = struct.Struct('!HIH')
+
+
+class PushBatcher:
+    """Buffer messages for a :class:`zmq.PUSH` socket and send them as batches."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, sock, batch_size=None, batch_delay=None, call_later=None):
+        """Initialize the instance.
+
+        :param sock: :class:`zmq.Socket` to send batches on
+        :param batch_size: maximum number of messages per batch; defaults to 100
+        :param batch_delay: maximum time in seconds a message is held back; defaults to 500us
+        :param call_later: callable(delay, callback), returning a handle with a ``cancel()``
+                           method, used to schedule the deadline flush; defaults to the
+                           process-wide watchdog's
+                           :meth:`thoth.core.watchdog.Watchdog.call_later`
+        """
+        self.sock = sock
+        self.batch_size = batch_size or 100
+        self.batch_delay = batch_delay or 0.0005
+        self._call_later = call_later or get_watchdog().call_later
+        self._parts = []
+        self._count = 0
+        self._flush_call = None
+        self._lock = Lock()
+
+    def push(self, frames):
+        """Add the given frames to the current batch, sending it if it is full.
+
+        :param frames: list of :class:`bytes`, topic, data and timestamp of a message
+        :return: :class:`None`
+        """
+        topic, data, ts = frames
+        with self._lock:
+            self._parts += (RECORD_HEADER.pack(len(topic), len(data), len(ts)), topic, data, ts)
+            self._count += 1
+            if self._count >= self.batch_size:
+                self._flush()
+            elif self._flush_call is None:
+                self._flush_call = self._call_later(self.batch_delay, self.flush)
+
+    def flush(self):
+        """Send the current batch, if any messages are buffered."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """Send the current batch; the caller must hold the lock."""
+        if self._flush_call is not None:
+            self._flush_call.cancel()
+            self._flush_call = None
+        if self._parts:
+            parts, self._parts, self._count = self._parts, [], 0
+            body = b''.join(parts)
+            self.sock.send_multipart([BATCH_MARKER, body], copy=len(body) < ZERO_COPY_THRESHOLD)
+
+
+def iter_batch(body):
+    """Iterate over the ``(topic, data, ts)`` records packed into a batch body.
+
+    :param body: bytes-like batch body or :class:`zmq.Frame`
+    :return: generator of 3-item tuples of bytes-like objects, slices of the body
+    """
+    body = as_buffer(body)
+    unpack_from, header_size = RECORD_HEADER.unpack_from, RECORD_HEADER.size
+    offset, end = 0, len(body)
+    while offset < end:
+        topic_len, data_len, ts_len = unpack_from(body, offset)
+        offset += header_size
+        topic = body[offset:offset + topic_len]
+        offset += topic_len
+        data = body[offset:offset + data_len]
+        offset += data_len
+        ts = body[offset:offset + ts_len]
+        offset += ts_len
+        yield topic, data, ts
+
+
+def iter_messages(frames):
+    """Split a single message or a batch into ``(topic, data, ts)`` tuples.
+
+    :param frames: list of frames as received from a connector
+    :raises ValueError: if the frames are neither a message nor a batch
+    :return: iterator of 3-item tuples
+    """
+    if frames and len(frames) == FRAMES_PER_MESSAGE:
+        return iter((tuple(frames),))
+    if frames and len(frames) == 2 and as_buffer(frames[0]) == BATCH_MARKER:
+        return iter_batch(frames[1])
+    raise ValueError("Cannot split %s frames into (topic, data, ts) messages!" %
+                     (len(frames) if frames else 0))
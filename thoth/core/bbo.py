@@ -0,0 +1,208 @@
+"""Change-suppressed best bid and offer (BBO) streams derived from order book messages.
+
+Many consumers only need the best bid and ask, yet connectors publish whole books - on every
+update. A :class:`thoth.core.bbo.BBODataNode` extracts the top of book from the book messages
+it receives, and publishes a compact ``[bid, bid_size, ask, ask_size]`` record on
+``bbo/<topic>`` only if any of these values changed since the last record of that topic.
+
+The top of book is extracted by the first extractor whose topic prefix matches; an extractor
+is a callable(data), returning a ``(bid, bid_size, ask, ask_size)`` tuple or None if the
+message does not hold a book. The defaults cover the book data produced by the connectors:
+
+    ``top_``
+        Binance top of book, as published with ``sync_books`` enabled
+    ``book_``
+        Binance maintained books, as published with ``sync_books`` enabled
+    ``order_book``
+        Bitstamp ``order_book`` snapshots and GDAX ``snapshot`` messages; GDAX
+        ``l2update`` diffs hold no book and are skipped
+    ``Book_``
+        HitBTC maintained books and OKEx depth snapshots, ``[bids, asks, ts]`` lists of
+        ``[price, size, ...]`` levels
+    ``TopLevel_``
+        HitBTC top of book, ``[bid, ask, ts]`` lists of a level or null each
+
+Prefixes are matched case-sensitively; ``Book_`` and ``book_`` are told apart.
+"""
+
+# Import Built-Ins
+import logging
+import json
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.node import DataNode
+from thoth.core.frames import as_buffer, as_str
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+def extract_book(data):
+    """Extract the top of book from a JSON book with ``bids`` and ``asks`` lists, best first.
+
+    :param data: bytes-like or :class:`str`, JSON-encoded book
+    :return: tuple of bid, bid size, ask and ask size, or None if the data holds no book
+    """
+    book = json.loads(as_str(data))
+    bids, asks = book.get('bids'), book.get('asks')
+    if bids is None or asks is None:
+        return None
+    bid = bids[0] if bids else (None, None)
+    ask = asks[0] if asks else (None, None)
+    return bid[0], bid[1], ask[0], ask[1]
+
+
+def extract_top(data):
+    """Extract the top of book from a Binance top of book record.
+
+    :param data: bytes-like or :class:`str`, JSON-encoded record
+    :return: tuple of bid, bid size, ask and ask size
+    """
+    top = json.loads(as_str(data))
+    return top['b'], top['B'], top['a'], top['A']
+
+
+def _best(levels, pick):
+    """Return the price and size of the level picked by price, or Nones if there are none."""
+    if not levels:
+        return None, None
+    level = pick(levels, key=lambda level: float(level[0]))
+    return level[0], level[1]
+
+
+def extract_levels(data):
+    """Extract the top of book from a JSON ``[bids, asks, ts]`` list.
+
+    The best levels are picked by price, as not all exchanges list the asks best first - OKEx
+    lists them from the highest price down.
+
+    :param data: bytes-like or :class:`str`, JSON-encoded list
+    :return: tuple of bid, bid size, ask and ask size
+    """
+    bids, asks, _ = json.loads(as_str(data))
+    return _best(bids, max) + _best(asks, min)
+
+
+def extract_top_level(data):
+    """Extract the top of book from a JSON ``[bid, ask, ts]`` list of levels or nulls.
+
+    :param data: bytes-like or :class:`str`, JSON-encoded list
+    :return: tuple of bid, bid size, ask and ask size
+    """
+    bid, ask, _ = json.loads(as_str(data))
+    bid, ask = bid or (None, None), ask or (None, None)
+    return bid[0], bid[1], ask[0], ask[1]
+
+
+#: Default (topic prefix, extractor) pairs, in order of precedence.
+DEFAULT_EXTRACTORS = (('top_', extract_top), ('book_', extract_book),
+                      ('order_book', extract_book), ('Book_', extract_levels),
+                      ('TopLevel_', extract_top_level))
+
+
+class BBOTracker:
+    """Extract the top of book of book messages and detect whether it changed per topic."""
+
+    def __init__(self, extractors=None):
+        """Initialize the instance.
+
+        :param extractors: iterable of (topic prefix, extractor) pairs; defaults to
+                           :data:`DEFAULT_EXTRACTORS`
+        """
+        self.extractors = list(DEFAULT_EXTRACTORS if extractors is None else extractors)
+        self.last = {}
+        self._extractor_cache = {}
+
+    def extractor_for(self, topic):
+        """Return the extractor for the given topic, or None if it carries no books.
+
+        :param topic: :class:`str`
+        :return: callable or None
+        """
+        try:
+            return self._extractor_cache[topic]
+        except KeyError:
+            pass
+        extractor = None
+        for prefix, func in self.extractors:
+            if topic.startswith(prefix):
+                extractor = func
+                break
+        self._extractor_cache[topic] = extractor
+        return extractor
+
+    def update(self, topic, data):
+        """Process a message and return its top of book, if it changed.
+
+        :param topic: :class:`str`, topic of the message
+        :param data: payload of the message
+        :return: tuple of bid, bid size, ask and ask size, or None if the topic carries no
+                 books, the message holds none or the top of book is unchanged
+        """
+        extractor = self.extractor_for(topic)
+        if extractor is None:
+            return None
+        try:
+            bbo = extractor(data)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            log.exception(e)
+            log.error("Could not extract top of book from %s message %r", topic, data)
+            return None
+        if bbo is None or self.last.get(topic) == bbo:
+            return None
+        self.last[topic] = bbo
+        return bbo
+
+
+class BBODataNode(DataNode):
+    """Publish change-suppressed top of book records on ``bbo/<topic>``."""
+
+    def __init__(self, name, receiver=None, publisher=None, passthrough=True, extractors=None,
+                 **node_kwargs):
+        """Initialize the instance.
+
+        :param name: name of the node
+        :param receiver: receiver facility
+        :param publisher: publisher facility
+        :param passthrough: whether to publish all received messages as well
+        :param extractors: iterable of (topic prefix, extractor) pairs, see
+                           :class:`thoth.core.bbo.BBOTracker`
+        :param node_kwargs: further keyword arguments for :class:`thoth.DataNode`
+        """
+        super(BBODataNode, self).__init__(name, receiver=receiver, publisher=publisher,
+                                          **node_kwargs)
+        self.passthrough = passthrough
+        self.tracker = BBOTracker(extractors)
+
+    def _envelopes(self, topic, data, ts):
+        """Return the envelopes to publish for the given message."""
+        envelopes = [self._envelope(topic, data, ts)] if self.passthrough else []
+        topic = as_str(topic)
+        bbo = self.tracker.update(topic, as_buffer(data))
+        if bbo is not None:
+            envelopes.append(self._envelope('bbo/' + topic, json.dumps(bbo), ts))
+        return envelopes
+
+    def process_frames(self, topic, data, ts):
+        """Publish the given message and its top of book, if it changed.
+
+        :param topic: topic tree
+        :param data: Data Struct or string
+        :param ts: packed timestamp frame (see :mod:`thoth.core.frames`) or number
+        :return: :class:`None`
+        """
+        self._publish_envelopes(self._envelopes(topic, data, ts))
+
+    def process_batch(self, messages):
+        """Publish the given batch of messages and their tops of book, where they changed.
+
+        :param messages: list of (topic, data, ts) tuples
+        :return: :class:`None`
+        """
+        envelopes = []
+        for topic, data, ts in messages:
+            envelopes += self._envelopes(topic, data, ts)
+        if envelopes:
+            self._publish_envelopes(envelopes)
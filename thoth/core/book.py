@@ -0,0 +1,310 @@
+"""Incrementally sorted order books.
+
+Prices are keyed as fixed-point integers (see :func:`thoth.core.book.to_fixed`), so lookups
+neither depend on the exchange's string formatting of a price (``'0.10'`` vs ``'0.1'``) nor on
+float rounding.
+
+Each side of an :class:`thoth.core.book.OrderBook` is a :class:`thoth.core.book.BookSide`,
+which keeps its levels in a dict and the price keys in a chunked sorted list, sorted from best
+to worst price - sorted lists of at most ``2 * load`` keys, indexed by their last keys:
+
+    - updating the size of an existing level is a dict assignment - O(1)
+    - adding or removing a level is a binary search over the chunks and an insert or delete
+      within one chunk - O(log n), as the memmove is bounded by the chunk size
+    - the best level is the first key's level - O(1)
+    - the top N levels are the first N keys - O(N)
+
+Levels are stored as tuples of ``(price, size, *extra)``, exactly as passed in, so connectors
+publish the exchange's original strings.
+"""
+
+# Import Built-Ins
+import logging
+from bisect import bisect_left, insort
+from decimal import Decimal
+from itertools import chain, islice
+
+# Import Third-Party
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+def to_fixed(price, precision=8):
+    """Convert the given price to a fixed-point integer with the given number of decimals.
+
+    Decimal strings are converted without going through float; digits beyond the precision are
+    truncated.
+
+    :param price: :class:`str`, :class:`int`, :class:`float` or :class:`decimal.Decimal`
+    :param precision: number of decimal places to keep
+    :return: :class:`int`
+    """
+    if isinstance(price, str):
+        whole, _, frac = price.partition('.')
+        if whole.isdigit() and (not frac or frac.isdigit()):
+            return int(whole) * 10 ** precision + int(frac[:precision].ljust(precision, '0'))
+        price = Decimal(price)
+    elif isinstance(price, float):
+        return int(round(price * 10 ** precision))
+    return int(price * 10 ** precision)
+
+
+def is_zero(size):
+    """Return whether the given size denotes a removed level.
+
+    :param size: :class:`str` or number
+    :return: :class:`bool`
+    """
+    return float(size) == 0
+
+
+class _SortedKeys:
+    """Sorted list of unique keys, split into chunks to bound the cost of inserts and deletes."""
+
+    def __init__(self, keys=(), load=256):
+        """Initialize the instance.
+
+        :param keys: iterable of keys
+        :param load: chunks are split beyond twice, and joined below half this many keys
+        """
+        self.load = load
+        self._chunks = []
+        # Last key of each chunk
+        self._maxes = []
+        self._len = 0
+        self.replace(keys)
+
+    def __len__(self):
+        """Return the number of keys."""
+        return self._len
+
+    def __iter__(self):
+        """Iterate over the keys in ascending order."""
+        return chain.from_iterable(self._chunks)
+
+    def replace(self, keys):
+        """Replace all keys with the given ones, sorting them once."""
+        keys, load = sorted(keys), self.load
+        self._chunks = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._len = len(keys)
+
+    def clear(self):
+        """Remove all keys."""
+        self.replace(())
+
+    def first(self):
+        """Return the smallest key; the list must not be empty."""
+        return self._chunks[0][0]
+
+    def head(self, n):
+        """Return the n smallest keys, as a list."""
+        return list(islice(chain.from_iterable(self._chunks), n))
+
+    def add(self, key):
+        """Insert the given key, which must not be present yet."""
+        chunks, maxes = self._chunks, self._maxes
+        self._len += 1
+        if not chunks:
+            chunks.append([key])
+            maxes.append(key)
+            return
+        i = bisect_left(maxes, key)
+        if i == len(maxes):
+            i -= 1
+            chunks[i].append(key)
+            maxes[i] = key
+        else:
+            insort(chunks[i], key)
+        chunk = chunks[i]
+        if len(chunk) > 2 * self.load:
+            half = len(chunk) // 2
+            chunks[i:i + 1] = [chunk[:half], chunk[half:]]
+            maxes[i:i + 1] = [chunk[half - 1], chunk[-1]]
+
+    def remove(self, key):
+        """Remove the given key, which must be present."""
+        chunks, maxes = self._chunks, self._maxes
+        i = bisect_left(maxes, key)
+        chunk = chunks[i]
+        del chunk[bisect_left(chunk, key)]
+        self._len -= 1
+        if not chunk:
+            del chunks[i]
+            del maxes[i]
+            return
+        maxes[i] = chunk[-1]
+        if len(chunk) < self.load // 2 and len(chunks) > 1:
+            # Join with a neighbour, splitting again if that grows too large
+            j = i if i + 1 < len(chunks) else i - 1
+            joined = chunks[j] + chunks[j + 1]
+            chunks[j:j + 2] = [joined]
+            maxes[j:j + 2] = [joined[-1]]
+            if len(joined) > 2 * self.load:
+                half = len(joined) // 2
+                chunks[j:j + 1] = [joined[:half], joined[half:]]
+                maxes[j:j + 1] = [joined[half - 1], joined[-1]]
+
+
+class BookSide:
+    """Price levels of one side of an order book, sorted from best to worst price."""
+
+    def __init__(self, descending=False):
+        """Initialize the instance.
+
+        :param descending: whether higher prices are better (bids) or not (asks)
+        """
+        self.descending = descending
+        self.levels = {}
+        # Sort keys, i.e. price keys negated for descending sides, best first
+        self._keys = _SortedKeys()
+        self._sign = -1 if descending else 1
+
+    def __len__(self):
+        """Return the number of levels."""
+        return len(self.levels)
+
+    def __contains__(self, key):
+        """Return whether a level exists for the given price key."""
+        return key in self.levels
+
+    def __iter__(self):
+        """Iterate over the levels from best to worst price."""
+        return iter(self.top())
+
+    def set(self, key, level):
+        """Add or replace the level at the given price key.
+
+        :param key: :class:`int`, fixed-point price
+        :param level: tuple of (price, size, *extra)
+        :return: :class:`None`
+        """
+        if key not in self.levels:
+            self._keys.add(key * self._sign)
+        self.levels[key] = level
+
+    def discard(self, key):
+        """Remove the level at the given price key, if it exists.
+
+        :param key: :class:`int`, fixed-point price
+        :return: :class:`None`
+        """
+        if self.levels.pop(key, None) is not None:
+            self._keys.remove(key * self._sign)
+
+    def clear(self):
+        """Remove all levels."""
+        self.levels.clear()
+        self._keys.clear()
+
+    def replace(self, levels):
+        """Replace all levels with the given ones, sorting them once.
+
+        :param levels: dict of fixed-point price keys to levels
+        :return: :class:`None`
+        """
+        self.levels = dict(levels)
+        sign = self._sign
+        self._keys.replace(key * sign for key in self.levels)
+
+    def best(self):
+        """Return the best level, or None if the side is empty."""
+        if not self._keys:
+            return None
+        return self.levels[self._keys.first() * self._sign]
+
+    def top(self, n=None):
+        """Return the best n levels, or all levels if n is None, best first.
+
+        :param n: number of levels
+        :return: list of levels
+        """
+        levels, sign = self.levels, self._sign
+        keys = self._keys if n is None else self._keys.head(n)
+        return [levels[key * sign] for key in keys]
+
+
+class OrderBook:
+    """Order book with incrementally sorted bid and ask sides."""
+
+    def __init__(self, precision=8):
+        """Initialize the instance.
+
+        :param precision: number of decimal places of prices to distinguish
+        """
+        self.precision = precision
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide()
+
+    def __bool__(self):
+        """Return whether the book holds any levels."""
+        return bool(self.bids.levels or self.asks.levels)
+
+    def key(self, price):
+        """Return the fixed-point key of the given price."""
+        return to_fixed(price, self.precision)
+
+    def _update(self, side, price, size, extra):
+        """Set or, if size is zero, remove the level at price on the given side."""
+        if is_zero(size):
+            side.discard(self.key(price))
+        else:
+            side.set(self.key(price), (price, size) + extra)
+
+    def update_bid(self, price, size, *extra):
+        """Set or, if size is zero, remove the bid level at the given price.
+
+        :param price: price as sent by the exchange
+        :param size: size as sent by the exchange
+        :param extra: further values to store with the level, e.g. a sequence number
+        :return: :class:`None`
+        """
+        self._update(self.bids, price, size, extra)
+
+    def update_ask(self, price, size, *extra):
+        """Set or, if size is zero, remove the ask level at the given price.
+
+        :param price: price as sent by the exchange
+        :param size: size as sent by the exchange
+        :param extra: further values to store with the level, e.g. a sequence number
+        :return: :class:`None`
+        """
+        self._update(self.asks, price, size, extra)
+
+    def snapshot(self, bids, asks):
+        """Replace the book's contents with the given levels.
+
+        Levels with a size of zero are skipped.
+
+        :param bids: iterable of (price, size, *extra) tuples
+        :param asks: iterable of (price, size, *extra) tuples
+        :return: :class:`None`
+        """
+        key = self.key
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            side.replace({key(level[0]): tuple(level) for level in levels
+                          if not is_zero(level[1])})
+
+    def clear(self):
+        """Remove all levels."""
+        self.bids.clear()
+        self.asks.clear()
+
+    def best_bid(self):
+        """Return the best bid level, or None if there are no bids."""
+        return self.bids.best()
+
+    def best_ask(self):
+        """Return the best ask level, or None if there are no asks."""
+        return self.asks.best()
+
+    def top(self, n=None):
+        """Return the best n bid and ask levels, or all levels if n is None.
+
+        :param n: number of levels per side
+        :return: tuple of lists of bid and ask levels, best first
+        """
+        return self.bids.top(n), self.asks.top(n)
@@ -0,0 +1,344 @@
+"""Append-only capture of connector traffic to memory-mapped segment files.
+
+A :class:`thoth.core.capture.CaptureWriter` records every ``(topic, data, ts)`` message, with
+the payload exactly as received from the exchange, into fixed-size segment files. Each segment
+is preallocated and memory-mapped, so appending a record is a copy into memory rather than a
+system call. Once a segment is full, the writer rolls over to the next one.
+
+Segment files are named ``<prefix>-<number>.seg`` and start with :data:`SEGMENT_MAGIC`,
+followed by records in the format used for batches (see :mod:`thoth.core.batching`)::
+
+    !HIH header (topic length, data length, ts length) | topic | data | ts
+
+The unused, zero-filled tail of a segment reads as a header of all zeros, which marks the end
+of its records.
+
+Next to each segment, a sparse time index ``<prefix>-<number>.idx`` holds ``!qQ`` entries of
+``(max_ts, offset)`` for every ``index_interval`` bytes of records, where ``max_ts`` is the
+highest timestamp of all records captured *before* ``offset``. All records before an entry with
+``max_ts < t`` are therefore older than ``t``, which allows
+:class:`thoth.core.capture.CaptureReader` to skip them when seeking.
+
+Flushing segments to disk (``msync``/``fsync``) happens on a background thread every
+``fsync_interval`` seconds, as does closing segments after rollover, so the writing thread
+never waits for the disk.
+"""
+
+# Import Built-Ins
+import logging
+import mmap
+import os
+import queue
+import re
+import struct
+from bisect import bisect_left
+from threading import Thread, Event
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.batching import RECORD_HEADER
+from thoth.core.frames import TIMESTAMP, pack_ts
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b'THOTHSEG'
+
+INDEX_ENTRY = struct.Struct('!qQ')
+
+SEGMENT_PATTERN = re.compile(r'^(?P<prefix>.+)-(?P<number>\d{6})\.seg$')
+
+
+class _Segment:
+    """An open, memory-mapped segment file and its index file."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, path, size):
+        """Create and map the segment file at the given path."""
+        self.path = path
+        self.file = open(path, 'w+b')
+        fd = self.file.fileno()
+        try:
+            # Allocate the blocks up front, instead of on first write to each page
+            os.posix_fallocate(fd, 0, size)
+        except (AttributeError, OSError):
+            os.ftruncate(fd, size)
+        self.mm = mmap.mmap(fd, size)
+        self.mm[:len(SEGMENT_MAGIC)] = SEGMENT_MAGIC
+        self.index = open(path[:-len('.seg')] + '.idx', 'wb')
+
+    def flush(self):
+        """Write the segment's and the index's contents to disk."""
+        self.mm.flush()
+        self.index.flush()
+        os.fsync(self.index.fileno())
+
+    def close(self):
+        """Flush and close the segment."""
+        self.flush()
+        self.mm.close()
+        self.file.close()
+        self.index.close()
+
+
+class CaptureWriter:
+    """Append messages to memory-mapped segment files."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+
+    def __init__(self, directory, prefix='capture', segment_size=None, index_interval=None,
+                 fsync_interval=1.0, name=None):
+        """Initialize the instance.
+
+        :param directory: directory to store segments in; created if necessary
+        :param prefix: file name prefix of the segments
+        :param segment_size: size of each segment file in bytes; defaults to 64MiB
+        :param index_interval: number of bytes between index entries; defaults to 64KiB
+        :param fsync_interval: seconds between flushes to disk by the background thread; if
+                               None, segments are only flushed when rolled over or closed,
+                               without a background thread
+        :param name: name of the facility
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_size = segment_size or 64 * 1024 * 1024
+        self.index_interval = index_interval or 64 * 1024
+        self.fsync_interval = fsync_interval
+        self.name = name or 'CaptureWriter'
+        self.records = 0
+        self._number = None
+        self._segment = None
+        self._mm = None
+        self._offset = self._end = self._next_index = 0
+        # Highest timestamp captured so far, as packed frame
+        self._max_ts_frame = b''
+        self._retired = queue.Queue()
+        self._stopped = Event()
+        self._syncer = None
+
+    def start(self):
+        """Open the first segment, numbered after any existing ones, and start syncing."""
+        os.makedirs(self.directory, exist_ok=True)
+        matches = map(SEGMENT_PATTERN.match, os.listdir(self.directory))
+        numbers = [int(m.group('number')) for m in matches
+                   if m and m.group('prefix') == self.prefix]
+        self._number = max(numbers, default=-1)
+        if numbers:
+            max_ts = self._last_max_ts(self._segment_path(self._number))
+            self._max_ts_frame = TIMESTAMP.pack(max_ts) if max_ts >= 0 else b''
+        self._open_segment()
+        if self.fsync_interval is not None:
+            self._stopped.clear()
+            self._syncer = Thread(target=self._sync, name='%s-sync' % self.name, daemon=True)
+            self._syncer.start()
+
+    def stop(self, timeout=None):
+        """Close the current segment and stop syncing.
+
+        :param timeout: seconds to wait for the background thread to finish
+        """
+        if self._segment is None:
+            return
+        self._retire(self._segment)
+        self._segment = self._mm = None
+        if self._syncer is not None:
+            self._stopped.set()
+            self._syncer.join(timeout)
+            self._syncer = None
+
+    def _segment_path(self, number):
+        """Return the path of the segment with the given number."""
+        return os.path.join(self.directory, '%s-%06d.seg' % (self.prefix, number))
+
+    @staticmethod
+    def _last_max_ts(path):
+        """Return the highest timestamp captured up to the end of the given segment."""
+        entries = read_index(path)
+        max_ts, offset = entries[-1] if entries else (-1, None)
+        for _, _, ts in iter_segment(path, offset):
+            max_ts = max(max_ts, ts)
+        return max_ts
+
+    def _open_segment(self):
+        """Open the next segment."""
+        self._number += 1
+        path = self._segment_path(self._number)
+        log.debug("Opening capture segment %s..", path)
+        self._segment = _Segment(path, self.segment_size)
+        self._mm = self._segment.mm
+        self._offset = self._next_index = len(SEGMENT_MAGIC)
+        self._end = self.segment_size
+
+    def _retire(self, segment):
+        """Close the given segment, on the background thread if there is one."""
+        if self._syncer is not None:
+            self._retired.put(segment)
+        else:
+            segment.close()
+
+    def _sync(self):
+        """Periodically flush the current segment and close retired ones."""
+        while not self._stopped.wait(self.fsync_interval):
+            self._close_retired()
+            segment = self._segment
+            if segment is not None:
+                try:
+                    segment.flush()
+                except (ValueError, OSError) as e:
+                    # The segment was closed in the meantime
+                    log.debug(e)
+        self._close_retired()
+
+    def _close_retired(self):
+        """Close all retired segments."""
+        while True:
+            try:
+                self._retired.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def write(self, topic, data, ts):
+        """Append the given message.
+
+        :param topic: bytes-like topic
+        :param data: bytes-like payload
+        :param ts: packed timestamp frame (see :mod:`thoth.core.frames`) or number
+        :raises ValueError: if the record is larger than a segment
+        :return: :class:`None`
+        """
+        if isinstance(ts, (int, float)):
+            ts = pack_ts(ts)
+        # Joining accepts any buffer, including memoryviews and zmq.Frames, without converting
+        record = b''.join((RECORD_HEADER.pack(len(topic), len(data), len(ts)), topic, data, ts))
+        size = len(record)
+        offset = self._offset
+        if offset + size > self._end:
+            if len(SEGMENT_MAGIC) + size > self.segment_size:
+                raise ValueError("Record of %s bytes exceeds the segment size!" % size)
+            self._retire(self._segment)
+            self._open_segment()
+            offset = self._offset
+        if offset >= self._next_index:
+            max_ts = TIMESTAMP.unpack(self._max_ts_frame)[0] if self._max_ts_frame else -1
+            self._segment.index.write(INDEX_ENTRY.pack(max_ts, offset))
+            self._next_index = offset + self.index_interval
+        self._offset = offset + size
+        self._mm[offset:offset + size] = record
+        # Packed big-endian timestamps of positive values compare like the values themselves;
+        # traced messages carry their trace after the timestamp
+        ts = record[size - len(ts):size - len(ts) + TIMESTAMP.size]
+        if ts > self._max_ts_frame:
+            self._max_ts_frame = ts
+        self.records += 1
+
+    def write_many(self, messages):
+        """Append the given messages.
+
+        :param messages: iterable of (topic, data, ts) tuples
+        :return: :class:`None`
+        """
+        write = self.write
+        for topic, data, ts in messages:
+            write(topic, data, ts)
+
+
+def iter_segment(path, offset=None):
+    """Iterate over the records of the given segment file.
+
+    :param path: path of the segment file
+    :param offset: offset of the first record to read; defaults to the first record
+    :return: generator of (topic, data, ts) tuples of :class:`bytes`, with ``ts`` as integer
+             of nanoseconds
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(SEGMENT_MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                raise ValueError("%s is not a capture segment!" % path)
+            unpack_from, header_size = RECORD_HEADER.unpack_from, RECORD_HEADER.size
+            offset = offset or len(SEGMENT_MAGIC)
+            while offset + header_size <= size:
+                topic_len, data_len, ts_len = unpack_from(mm, offset)
+                if not topic_len:
+                    return
+                offset += header_size
+                topic = mm[offset:offset + topic_len]
+                offset += topic_len
+                data = mm[offset:offset + data_len]
+                offset += data_len
+                ts = TIMESTAMP.unpack_from(mm, offset)[0]
+                offset += ts_len
+                yield topic, data, ts
+
+
+def read_index(path):
+    """Read the index of the given segment file.
+
+    :param path: path of the segment file
+    :return: list of (max_ts, offset) tuples
+    """
+    try:
+        with open(path[:-len('.seg')] + '.idx', 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return []
+    raw = raw[:len(raw) - len(raw) % INDEX_ENTRY.size]
+    return list(INDEX_ENTRY.iter_unpack(raw))
+
+
+class CaptureReader:
+    """Read the records captured by a :class:`thoth.core.capture.CaptureWriter`."""
+
+    def __init__(self, directory, prefix='capture'):
+        """Initialize the instance.
+
+        :param directory: directory the segments are stored in
+        :param prefix: file name prefix of the segments
+        """
+        self.directory = directory
+        self.prefix = prefix
+
+    def segments(self):
+        """Return the paths of all segments, in the order they were written."""
+        matches = [m for m in map(SEGMENT_PATTERN.match, sorted(os.listdir(self.directory)))
+                   if m and m.group('prefix') == self.prefix]
+        return [os.path.join(self.directory, m.group(0)) for m in matches]
+
+    def _seek(self, segments, start):
+        """Return the index of the segment and the offset to start reading at for start."""
+        # Find the last index entry before which all records are older than start
+        entries = [(max_ts, i, offset) for i, path in enumerate(segments)
+                   for max_ts, offset in read_index(path)]
+        pos = bisect_left([max_ts for max_ts, _, _ in entries], start) - 1
+        if pos < 0:
+            return 0, None
+        _, i, offset = entries[pos]
+        return i, offset
+
+    def __iter__(self):
+        """Iterate over all records."""
+        return self.read()
+
+    def read(self, start=None, end=None):
+        """Iterate over the records captured in the given time range.
+
+        Records are returned in the order they were captured. Reading stops at the first
+        record captured after ``end``.
+
+        :param start: int, nanoseconds since the epoch; skips older records
+        :param end: int, nanoseconds since the epoch
+        :return: generator of (topic, data, ts) tuples of :class:`bytes`, with ``ts`` as integer
+                 of nanoseconds
+        """
+        segments = self.segments()
+        first, offset = (0, None) if start is None else self._seek(segments, start)
+        for i, path in enumerate(segments[first:]):
+            for topic, data, ts in iter_segment(path, offset if i == 0 else None):
+                if end is not None and ts > end:
+                    return
+                if start is None or ts >= start:
+                    yield topic, data, ts
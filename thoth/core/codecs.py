@@ -0,0 +1,188 @@
+"""Codecs for serializing :class:`thoth.ThothEnvelope` instances.
+
+A :class:`thoth.ThothEnvelope` is sent as the following frames:
+
+    1. topic - UTF-8 encoded, so subscribers may filter by topic prefix
+    2. codec id - a single byte, identifying the codec used for the remaining frames
+    3. body - origin, data and timestamp, as encoded by the codec
+
+Since the codec id travels with the message, subscribers can decode messages of any registered
+codec. The following codecs are available:
+
+    ``json`` (id 1)
+        Human-readable; bytes-like data is decoded as UTF-8 string.
+    ``msgpack`` (id 2)
+        Compact binary; requires the optional ``msgpack`` package.
+    ``struct`` (id 3)
+        Fixed, struct-packed header followed by an opaque payload; data must be a
+        :class:`bytes`/:class:`str` payload or a ``(payload, ts)`` pair of payload and integer
+        timestamp, as published by :class:`thoth.DataNode`.
+
+Further codecs may be added using :func:`thoth.core.codecs.register_codec`.
+"""
+
+# Import Built-Ins
+import logging
+import json
+import struct
+from abc import ABC, abstractmethod
+
+# Import Third-Party
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Import Home-grown
+from thoth.core.frames import as_buffer
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+_CODECS = {}
+
+
+class Codec(ABC):
+    """Base class for codecs; subclasses must set a unique id and name."""
+
+    codec_id = None
+    name = None
+
+    def __init__(self):
+        """Initialize the instance."""
+        self.id_frame = bytes((self.codec_id,))
+
+    @abstractmethod
+    def encode(self, origin, data, ts, encoding):
+        """Encode the given envelope attributes.
+
+        :param origin: :class:`str`, sender of the envelope
+        :param data: data transported by the envelope
+        :param ts: float, timestamp of the envelope
+        :param encoding: encoding to use for strings
+        :return: list of bytes-like frames
+        """
+
+    @abstractmethod
+    def decode(self, frames, encoding):
+        """Decode the given body frames.
+
+        :param frames: list of bytes-like frames, as returned by :meth:`Codec.encode`
+        :param encoding: encoding to use for strings
+        :return: tuple of origin, data, ts
+        """
+
+
+class JSONCodec(Codec):
+    """Encode origin, data and timestamp as a single JSON array."""
+
+    codec_id = 1
+    name = 'json'
+
+    @staticmethod
+    def _default(obj):
+        """Serialize bytes-like objects as string."""
+        try:
+            return str(as_buffer(obj), 'UTF-8')
+        except TypeError:
+            raise TypeError("%r is not JSON serializable" % obj)
+
+    def encode(self, origin, data, ts, encoding):
+        """Encode the given envelope attributes as JSON."""
+        return [json.dumps([origin, data, ts], default=self._default).encode(encoding)]
+
+    def decode(self, frames, encoding):
+        """Decode the JSON-encoded envelope attributes."""
+        origin, data, ts = json.loads(str(as_buffer(frames[0]), encoding))
+        return origin, data, ts
+
+
+class MsgpackCodec(Codec):
+    """Encode origin, data and timestamp as a single msgpack array."""
+
+    codec_id = 2
+    name = 'msgpack'
+
+    def encode(self, origin, data, ts, encoding):
+        """Encode the given envelope attributes using msgpack."""
+        return [msgpack.packb((origin, data, ts), use_bin_type=True)]
+
+    def decode(self, frames, encoding):
+        """Decode the msgpack-encoded envelope attributes."""
+        origin, data, ts = msgpack.unpackb(as_buffer(frames[0]), raw=False)
+        return origin, data, ts
+
+
+class StructCodec(Codec):
+    """Encode the envelope as a fixed, struct-packed header followed by an opaque payload.
+
+    The header consists of the envelope's timestamp (float64), the data's timestamp (int64,
+    ``-1`` if the data carries none), a payload type flag and the length of the origin.
+    """
+
+    codec_id = 3
+    name = 'struct'
+
+    HEADER = struct.Struct('!dqBH')
+    BYTES, STR = 0, 1
+
+    def encode(self, origin, data, ts, encoding):
+        """Encode the given envelope attributes into a single frame."""
+        if isinstance(data, tuple):
+            payload, data_ts = data
+        else:
+            payload, data_ts = data, -1
+        if isinstance(payload, str):
+            payload, flag = payload.encode(encoding), self.STR
+        else:
+            flag = self.BYTES
+        origin = origin.encode(encoding)
+        header = self.HEADER.pack(ts, data_ts, flag, len(origin))
+        return [b''.join((header, origin, payload))]
+
+    def decode(self, frames, encoding):
+        """Decode the envelope attributes from the header and payload."""
+        body = as_buffer(frames[0])
+        ts, data_ts, flag, origin_len = self.HEADER.unpack_from(body)
+        offset = self.HEADER.size
+        origin = str(body[offset:offset + origin_len], encoding)
+        payload = bytes(body[offset + origin_len:])
+        if flag == self.STR:
+            payload = payload.decode(encoding)
+        return origin, (payload if data_ts == -1 else (payload, data_ts)), ts
+
+
+def register_codec(codec):
+    """Register the given codec instance under its id and name.
+
+    :param codec: :class:`thoth.core.codecs.Codec` instance
+    :raises ValueError: if another codec uses the same id or name
+    :return: :class:`None`
+    """
+    for key in (codec.codec_id, codec.name):
+        if key in _CODECS and _CODECS[key] is not codec:
+            raise ValueError("A codec is already registered as %r!" % key)
+    _CODECS[codec.codec_id] = codec
+    _CODECS[codec.name] = codec
+
+
+def get_codec(codec):
+    """Look up the codec with the given id or name.
+
+    :param codec: :class:`int` id, :class:`str` name or :class:`thoth.core.codecs.Codec`
+    :raises ValueError: if no such codec is registered
+    :return: :class:`thoth.core.codecs.Codec` instance
+    """
+    if isinstance(codec, Codec):
+        return codec
+    try:
+        return _CODECS[codec]
+    except KeyError:
+        raise ValueError("Unknown codec %r! Registered codecs: %s" %
+                         (codec, sorted(k for k in _CODECS if isinstance(k, str))))
+
+
+register_codec(JSONCodec())
+register_codec(StructCodec())
+if msgpack is not None:
+    register_codec(MsgpackCodec())
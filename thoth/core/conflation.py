@@ -0,0 +1,133 @@
+"""Per-topic conflation and rate limiting for slow consumers.
+
+A :class:`thoth.core.conflation.Conflator` limits how often messages of a topic are
+published. Per topic prefix, one of the following policies applies:
+
+    ``None``
+        Pass-through; every message is published.
+    ``'latest'``
+        Latest value only; at most one message per ``flush_interval`` is published, and
+        messages arriving in between replace each other, so the most recent one is published
+        once the interval passed.
+    number
+        At most this many messages per second, conflated like ``'latest'``.
+
+The first message of a quiet topic is always published right away; only bursts are
+conflated. Conflation drops messages, so it only suits topics carrying state (books, tickers,
+top of book) - not diffs or trades, which should be passed through.
+
+Conflated messages are counted in :attr:`Conflator.conflated` and, per topic, in
+:attr:`Conflator.conflated_by_topic`.
+"""
+
+# Import Built-Ins
+import logging
+import heapq
+from collections import Counter
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.frames import as_buffer
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+LATEST = 'latest'
+
+
+class Conflator:
+    """Hold back and conflate messages according to per-topic policies."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, policies=None, default=None, flush_interval=None):
+        """Initialize the instance.
+
+        :param policies: dict of topic prefixes to policies; the longest matching prefix wins
+        :param default: policy for topics not matching any prefix; defaults to pass-through
+        :param flush_interval: interval in seconds of the ``'latest'`` policy; defaults to 50ms
+        """
+        self.flush_interval = flush_interval or 0.05
+        self.policies = sorted(((prefix.encode('UTF-8') if isinstance(prefix, str) else prefix,
+                                 self._interval(policy))
+                                for prefix, policy in (policies or {}).items()),
+                               key=lambda item: len(item[0]), reverse=True)
+        self.default = self._interval(default)
+        self.conflated = 0
+        self.conflated_by_topic = Counter()
+        self._intervals = {}
+        self._next_allowed = {}
+        self._slots = {}
+        self._due = []
+
+    def _interval(self, policy):
+        """Return the minimum interval between messages of the given policy."""
+        if policy is None:
+            return None
+        if policy == LATEST:
+            return self.flush_interval
+        if isinstance(policy, (int, float)) and policy > 0:
+            return 1.0 / policy
+        raise ValueError("Unknown conflation policy %r!" % policy)
+
+    def interval_for(self, topic):
+        """Return the minimum interval between messages of the given topic.
+
+        :param topic: :class:`bytes`
+        :return: interval in seconds, or None for pass-through
+        """
+        try:
+            return self._intervals[topic]
+        except KeyError:
+            pass
+        interval = self.default
+        for prefix, prefix_interval in self.policies:
+            if topic.startswith(prefix):
+                interval = prefix_interval
+                break
+        self._intervals[topic] = interval
+        return interval
+
+    def admit(self, messages, now):
+        """Return the given messages which may be published now, holding back the others.
+
+        :param messages: list of (topic, data, ts) tuples
+        :param now: current time, as per :func:`time.monotonic`
+        :return: list of (topic, data, ts) tuples, in the order given
+        """
+        out = []
+        slots, next_allowed = self._slots, self._next_allowed
+        for message in messages:
+            topic = bytes(as_buffer(message[0]))
+            interval = self.interval_for(topic)
+            if interval is None:
+                out.append(message)
+            elif topic in slots:
+                slots[topic] = message
+                self.conflated += 1
+                self.conflated_by_topic[topic.decode('UTF-8', 'replace')] += 1
+            elif now >= next_allowed.get(topic, now):
+                out.append(message)
+                next_allowed[topic] = now + interval
+            else:
+                slots[topic] = message
+                heapq.heappush(self._due, (next_allowed[topic], topic))
+        return out
+
+    def flush_due(self, now):
+        """Return the held back messages whose interval passed.
+
+        :param now: current time, as per :func:`time.monotonic`
+        :return: list of (topic, data, ts) tuples
+        """
+        out, due = [], self._due
+        while due and due[0][0] <= now:
+            _, topic = heapq.heappop(due)
+            out.append(self._slots.pop(topic))
+            self._next_allowed[topic] = now + self._intervals[topic]
+        return out
+
+    def next_deadline(self):
+        """Return the time the next held back message is due, or None if there is none."""
+        return self._due[0][0] if self._due else None
@@ -0,0 +1,163 @@
+"""Frame encoding for data passed from connectors to a :class:`thoth.DataNode`.
+
+Each message consists of three frames:
+
+    1. topic - UTF-8 encoded topic
+    2. data - the payload exactly as received from the exchange
+    3. ts - time of reception as a packed, big-endian 8-byte integer in nanoseconds
+
+Sampled messages may carry a longer ts frame: the timestamp, followed by the times the
+connector's socket received the message and the connector finished parsing it, and the name of
+the connector (see :func:`pack_trace`). Readers only interpret the first 8 bytes, unless they
+look for traces.
+
+Data frames of at least :data:`ZERO_COPY_THRESHOLD` bytes are sent without copying them
+(``copy=False``); for smaller frames, copying is cheaper than tracking the buffer.
+
+Frames received by a :class:`thoth.DataNode` may be :class:`bytes`, :class:`memoryview` or
+:class:`zmq.Frame` objects; they are only converted where their content is actually needed,
+typically when publishing.
+"""
+
+# Import Built-Ins
+import logging
+import struct
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+TIMESTAMP = struct.Struct('!q')
+
+#: Timestamp, followed by the socket receive and parse times of a sampled message.
+TRACE = struct.Struct('!qqq')
+
+#: Minimum size in bytes of a data frame to send it with ``copy=False``.
+ZERO_COPY_THRESHOLD = zmq.COPY_THRESHOLD
+
+
+def pack_ts(recv_at):
+    """Pack the given timestamp into an 8-byte frame.
+
+    :param recv_at: int, nanoseconds since the epoch (as per :func:`time.time_ns`), or float,
+                    seconds since the epoch (as per :func:`time.time`)
+    :return: :class:`bytes`
+    """
+    if isinstance(recv_at, float):
+        recv_at = int(recv_at * 1e9)
+    return TIMESTAMP.pack(recv_at)
+
+
+def unpack_ts(frame):
+    """Unpack a timestamp frame to an integer of nanoseconds since the epoch.
+
+    Numbers are returned as they are.
+
+    :param frame: bytes-like or :class:`zmq.Frame`, as packed by :func:`pack_ts`
+    :return: :class:`int`
+    """
+    if isinstance(frame, (int, float)):
+        return frame
+    return TIMESTAMP.unpack_from(as_buffer(frame))[0]
+
+
+def pack_trace(recv_at, socket_at, parsed_at, source):
+    """Pack the given timestamp and trace of a sampled message into a ts frame.
+
+    :param recv_at: int nanoseconds or float seconds since the epoch
+    :param socket_at: int, nanoseconds since the epoch at which the socket received the message
+    :param parsed_at: int, nanoseconds since the epoch at which the connector parsed it
+    :param source: :class:`bytes`, name of the connector
+    :return: :class:`bytes`
+    """
+    if isinstance(recv_at, float):
+        recv_at = int(recv_at * 1e9)
+    return TRACE.pack(recv_at, socket_at, parsed_at) + source
+
+
+def unpack_trace(frame):
+    """Unpack the trace of a ts frame packed by :func:`pack_trace`.
+
+    :param frame: bytes-like or :class:`zmq.Frame`
+    :return: tuple of socket receive and parse times and the connector's name, or None if the
+             frame carries no trace
+    """
+    frame = as_buffer(frame)
+    if len(frame) < TRACE.size:
+        return None
+    _, socket_at, parsed_at = TRACE.unpack_from(frame)
+    return socket_at, parsed_at, bytes(frame[TRACE.size:]).decode('UTF-8')
+
+
+def as_buffer(frame):
+    """Return a bytes-like view of the given frame without copying it.
+
+    :param frame: :class:`bytes`, :class:`memoryview` or :class:`zmq.Frame`
+    :return: bytes-like object
+    """
+    if isinstance(frame, zmq.Frame):
+        return frame.buffer
+    return frame
+
+
+def as_bytes(value):
+    """Return the given payload as bytes-like object, encoding strings as UTF-8.
+
+    :param value: :class:`str`, bytes-like or :class:`zmq.Frame`
+    :return: bytes-like object
+    """
+    if isinstance(value, str):
+        return value.encode('UTF-8')
+    return as_buffer(value)
+
+
+def as_str(frame):
+    """Decode the given frame as UTF-8 string; strings are returned as they are.
+
+    :param frame: :class:`str`, bytes-like or :class:`zmq.Frame`
+    :return: :class:`str`
+    """
+    if isinstance(frame, str):
+        return frame
+    if isinstance(frame, zmq.Frame):
+        return frame.bytes.decode('UTF-8')
+    return str(frame, 'UTF-8')
+
+
+def pack_frames(topic, data, recv_at):
+    """Create the frames for a single message.
+
+    :param topic: :class:`str` or :class:`bytes`, topic of the message
+    :param data: :class:`bytes` (passed on untouched) or :class:`str` payload
+    :param recv_at: int nanoseconds or float seconds since the epoch
+    :return: list of bytes-like objects
+    """
+    return [as_bytes(topic), as_bytes(data), pack_ts(recv_at)]
+
+
+def pack_traced_frames(topic, data, recv_at, socket_at, parsed_at, source):
+    """Create the frames for a single, sampled message, carrying its trace.
+
+    :param topic: :class:`str` or :class:`bytes`, topic of the message
+    :param data: :class:`bytes` (passed on untouched) or :class:`str` payload
+    :param recv_at: int nanoseconds or float seconds since the epoch
+    :param socket_at: int, nanoseconds since the epoch at which the socket received the message
+    :param parsed_at: int, nanoseconds since the epoch at which the connector parsed it
+    :param source: :class:`bytes`, name of the connector
+    :return: list of bytes-like objects
+    """
+    return [as_bytes(topic), as_bytes(data), pack_trace(recv_at, socket_at, parsed_at, source)]
+
+
+def send_frames(sock, frames):
+    """Send the given message frames, avoiding a copy of large data frames.
+
+    :param sock: :class:`zmq.Socket`
+    :param frames: list of bytes-like objects, as returned by :func:`pack_frames`
+    :return: :class:`None`
+    """
+    sock.send_multipart(frames, copy=len(frames[1]) < ZERO_COPY_THRESHOLD)
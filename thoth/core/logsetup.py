@@ -0,0 +1,155 @@
+"""Non-blocking logging for connectors and nodes.
+
+Connectors log from their websocket threads and event loops; a handler writing to disk or a
+terminal there stalls message handling whenever the write does, which shows up as latency
+spikes and, if long enough, as false connection time-outs.
+
+:func:`configure_logging` attaches a single :class:`logging.handlers.QueueHandler` to the
+``thoth`` logger instead. Records are put on an unbounded queue, never blocking the logging
+thread, and written by the handlers of a :class:`logging.handlers.QueueListener` running on
+its own thread. A :class:`RateLimitFilter` on the queue handler drops repeated records
+beyond a per-message rate, so hot paths logging every message cannot flood the queue; the
+number of dropped records is added to the next record let through.
+
+Usage::
+
+    listener = configure_logging('thoth.log', level=logging.DEBUG)
+    ...
+    stop_logging(listener)
+"""
+
+# Import Built-Ins
+import atexit
+import logging
+import logging.handlers
+import queue
+import time
+
+# Import Third-Party
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+DEFAULT_FORMAT = '%(asctime)s:%(name)s:%(levelname)s\t%(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most ``rate`` records per second of each message, with bursts.
+
+    Records are grouped by logger, level and unformatted message, so a debug call logging
+    every received message counts as a single message regardless of its arguments. Each
+    group has a token bucket holding up to ``burst`` tokens, refilled at ``rate`` tokens per
+    second; records finding the bucket empty are dropped and counted, and the count is
+    appended to the group's next record let through.
+
+    Once there are more than ``max_groups`` groups, those whose buckets refilled completely -
+    which behave as new ones - are forgotten; if that is not enough, all are.
+    """
+
+    def __init__(self, rate=None, burst=None, max_level=None, max_groups=1024):
+        """Initialize the instance.
+
+        :param rate: records per second let through per message; defaults to 10
+        :param burst: number of records let through back-to-back per message; defaults to
+                      ``rate``
+        :param max_level: records above this level are always let through; defaults to
+                          :data:`logging.CRITICAL`, limiting all records
+        :param max_groups: number of groups to keep buckets of
+        """
+        super(RateLimitFilter, self).__init__()
+        self.rate = rate or 10
+        self.burst = burst or self.rate
+        self.max_level = max_level if max_level is not None else logging.CRITICAL
+        self.max_groups = max_groups
+        self._buckets = {}
+
+    def filter(self, record):
+        """Return whether the record is let through, noting suppressed records on it."""
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        try:
+            tokens, last, suppressed = self._buckets[key]
+        except KeyError:
+            tokens, last, suppressed = self.burst, now, 0
+            if len(self._buckets) >= self.max_groups:
+                self._prune(now)
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now, suppressed + 1)
+            return False
+        self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record.msg = '%s [%d similar messages suppressed]' % (record.msg, suppressed)
+        return True
+
+    def _prune(self, now):
+        """Forget the buckets refilled completely, or all buckets if none are."""
+        refill = self.burst / self.rate
+        buckets = {key: bucket for key, bucket in self._buckets.items()
+                   if bucket[2] or now - bucket[1] < refill}
+        self._buckets = buckets if len(buckets) < self.max_groups else {}
+
+
+_listeners = set()
+
+
+def configure_logging(filename=None, level=None, fmt=None, rate=None, burst=None,
+                      handlers=None, logger='thoth'):
+    """Route the records of the given logger through a queue to a background writer.
+
+    The logger stops propagating records to its ancestors, whose handlers would otherwise
+    be called on the logging thread.
+
+    :param filename: file to append records to; records are written to stderr if None
+    :param level: level of the logger; defaults to :data:`logging.INFO`
+    :param fmt: format of the records; defaults to :data:`DEFAULT_FORMAT`
+    :param rate: records per second let through per message, see :class:`RateLimitFilter`;
+                 pass 0 to disable rate-limiting
+    :param burst: number of records let through back-to-back per message
+    :param handlers: handlers writing the records, replacing the file or stream handler
+    :param logger: name of the logger to configure
+    :return: the started :class:`logging.handlers.QueueListener`
+    """
+    if handlers is None:
+        handler = logging.FileHandler(filename) if filename else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(fmt or DEFAULT_FORMAT))
+        handlers = [handler]
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    if rate != 0:
+        queue_handler.addFilter(RateLimitFilter(rate, burst))
+
+    target = logging.getLogger(logger)
+    for existing in list(target.handlers):
+        if isinstance(existing, logging.handlers.QueueHandler):
+            target.removeHandler(existing)
+    target.addHandler(queue_handler)
+    target.setLevel(level or logging.INFO)
+    target.propagate = False
+
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.add(listener)
+    atexit.register(stop_logging, listener)
+    return listener
+
+
+def stop_logging(listener):
+    """Write all queued records and stop the given listener.
+
+    :param listener: :class:`logging.handlers.QueueListener`, as returned by
+                     :func:`configure_logging`
+    :return: :class:`None`
+    """
+    # Stopped explicitly, the listener is stopped again at exit
+    if listener not in _listeners:
+        return
+    _listeners.discard(listener)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
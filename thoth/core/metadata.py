@@ -0,0 +1,264 @@
+"""Symbol metadata of exchanges, cached on disk and refreshed in the background.
+
+Connectors need an exchange's list of symbols (and their ids, precisions, etc.) before they
+can subscribe. Fetching it from a REST endpoint in the connector's constructor stalls
+startup for as long as the endpoint takes to respond, and fails startup if it is down.
+
+A :class:`SymbolRegistry` loads the symbols of its last successful fetch from an on-disk
+cache right away, and refreshes them from its fetcher on a background thread. Listeners
+registered with :meth:`SymbolRegistry.subscribe` are notified of the symbols added and
+removed by each refresh - at first, of all symbols loaded from the cache - so connectors can
+subscribe to new symbols as they are listed.
+
+A fetcher is any callable returning a dict of metadata by symbol; :class:`RestFetcher` gets
+it from a REST endpoint through a pooled :class:`requests.Session` shared by all fetchers.
+Registries are shared per exchange through :func:`get_registry`.
+
+Usage::
+
+    registry = get_registry('poloniex', RestFetcher(url, parse=parse_tickers))
+    registry.subscribe(lambda added, removed: subscribe_to(added))
+    registry.start()
+"""
+
+# Import Built-Ins
+import json
+import logging
+import os
+import time
+from threading import Thread, Event, Lock
+
+# Import Third-Party
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+#: Version of the cache file format; caches of other versions are ignored.
+CACHE_VERSION = 1
+
+#: Directory caching the symbols, unless overridden by the ``THOTH_CACHE_DIR`` variable.
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'thoth')
+
+_session = None
+_registries = {}
+_registries_pid = None
+_lock = Lock()
+
+
+def shared_session():
+    """Return the process-wide :class:`requests.Session`, pooling connections per host."""
+    global _session  # pylint: disable=global-statement
+    # Imported here, as connectors may never make any request
+    import requests  # pylint: disable=import-outside-toplevel
+    import requests.adapters  # pylint: disable=import-outside-toplevel
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+class RestFetcher:
+    """Fetch symbol metadata from a REST endpoint."""
+
+    def __init__(self, url, parse=None, timeout=10, session=None):
+        """Initialize the instance.
+
+        :param url: URL of the endpoint
+        :param parse: callable(decoded response), returning a dict of metadata by symbol;
+                      by default, the response must be such a dict
+        :param timeout: request time-out in seconds
+        :param session: :class:`requests.Session` to use; defaults to :func:`shared_session`
+        """
+        self.url = url
+        self.parse = parse
+        self.timeout = timeout
+        self.session = session or shared_session()
+
+    def __call__(self):
+        """Return the metadata of all symbols, by symbol."""
+        resp = self.session.get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        return self.parse(data) if self.parse else data
+
+
+class SymbolRegistry:
+    """Symbol metadata of an exchange, cached on disk and refreshed in the background."""
+
+    def __init__(self, name, fetcher, cache_dir=None, refresh_interval=3600):
+        """Initialize the instance, loading the cached symbols.
+
+        :param name: name of the exchange, naming the cache file
+        :param fetcher: callable returning a dict of metadata by symbol
+        :param cache_dir: directory of the cache file; defaults to ``THOTH_CACHE_DIR`` or
+                          :data:`DEFAULT_CACHE_DIR`. Pass False to disable caching
+        :param refresh_interval: seconds between refreshes of a started registry
+        """
+        self.name = name
+        self.fetcher = fetcher
+        if cache_dir is None:
+            cache_dir = os.environ.get('THOTH_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.path = os.path.join(cache_dir, '%s.json' % name) if cache_dir else None
+        self.refresh_interval = refresh_interval
+        self.symbols = {}
+        self.fetched_at = None
+        self.ready = Event()
+        self._listeners = []
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread = None
+        self._load()
+
+    def _load(self):
+        """Load the symbols from the cache file, if it exists and is of the current version."""
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as f:
+                cache = json.load(f)
+            if cache.get('version') != CACHE_VERSION:
+                log.info("%s: Ignoring cache of version %s.", self.name, cache.get('version'))
+                return
+            self.symbols = cache['symbols']
+            self.fetched_at = cache['fetched_at']
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("%s: Ignoring unreadable cache %s: %s", self.name, self.path, e)
+            return
+        self.ready.set()
+
+    def _store(self):
+        """Write the symbols to the cache file, replacing it atomically."""
+        if self.path is None:
+            return
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'fetched_at': self.fetched_at,
+                           'symbols': self.symbols}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("%s: Could not write cache %s: %s", self.name, self.path, e)
+
+    def __contains__(self, symbol):
+        """Return whether the given symbol is listed."""
+        return symbol in self.symbols
+
+    def __getitem__(self, symbol):
+        """Return the metadata of the given symbol."""
+        return self.symbols[symbol]
+
+    def __iter__(self):
+        """Iterate over a copy of the listed symbols."""
+        return iter(list(self.symbols))
+
+    def __len__(self):
+        """Return the number of listed symbols."""
+        return len(self.symbols)
+
+    def get(self, symbol, default=None):
+        """Return the metadata of the given symbol, or ``default`` if it is not listed."""
+        return self.symbols.get(symbol, default)
+
+    def subscribe(self, callback):
+        """Notify the given callback of added and removed symbols.
+
+        The callback is called right away with all symbols known so far, if any, and then
+        after each refresh changing the symbols - on the refreshing thread.
+
+        :param callback: callable(added, removed), receiving dicts of metadata by symbol
+        :return: :class:`None`
+        """
+        with self._lock:
+            self._listeners.append(callback)
+            symbols = dict(self.symbols)
+        if symbols:
+            callback(symbols, {})
+
+    def refresh(self):
+        """Fetch the symbols, update the cache and notify listeners of changes.
+
+        :return: tuple of dicts of the added and removed symbols' metadata
+        """
+        symbols = self.fetcher()
+        with self._lock:
+            old = self.symbols
+            added = {s: m for s, m in symbols.items() if s not in old}
+            removed = {s: m for s, m in old.items() if s not in symbols}
+            self.symbols = symbols
+            self.fetched_at = time.time()
+            listeners = list(self._listeners)
+        self._store()
+        self.ready.set()
+        if added or removed:
+            log.info("%s: %d symbols added, %d removed.", self.name, len(added), len(removed))
+            for callback in listeners:
+                try:
+                    callback(added, removed)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("%s: Listener %r failed.", self.name, callback)
+        return added, removed
+
+    def start(self):
+        """Refresh the symbols now and every :attr:`refresh_interval` seconds, in the background.
+
+        :return: :class:`None`
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, daemon=True, name='%s-symbols' % self.name)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop refreshing the symbols."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        """Refresh the symbols until stopped; failed refreshes keep the previous symbols."""
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("%s: Refreshing symbols failed: %s", self.name, e)
+            self._stopped.wait(self.refresh_interval)
+
+    def wait(self, timeout=None):
+        """Wait until symbols are available, from the cache or a refresh.
+
+        :param timeout: seconds to wait at most
+        :return: :class:`bool`, whether symbols are available
+        """
+        return self.ready.wait(timeout)
+
+
+def get_registry(name, fetcher=None, **kwargs):
+    """Return the registry of the given exchange, creating and starting it if necessary.
+
+    Forked child processes create registries of their own, since the refreshing threads of
+    the parent's registries do not survive the fork.
+
+    :param name: name of the exchange
+    :param fetcher: fetcher of the registry, required when creating it
+    :param kwargs: further keyword arguments for :class:`SymbolRegistry`
+    :return: :class:`SymbolRegistry`
+    """
+    global _registries, _registries_pid  # pylint: disable=global-statement
+    with _lock:
+        if _registries_pid != os.getpid():
+            _registries, _registries_pid = {}, os.getpid()
+        registry = _registries.get(name)
+        if registry is None:
+            registry = _registries[name] = SymbolRegistry(name, fetcher, **kwargs)
+            registry.start()
+        return registry
@@ -4,13 +4,20 @@
 
 # Import Built-Ins
 import logging
+import json
 import queue
+import time
 from abc import abstractmethod
 
 # Import Third-Party
+import zmq
 
 # Import Home-grown
 from hermes import Node, Envelope
+from thoth.core.batching import iter_messages
+from thoth.core.frames import as_buffer, as_str, unpack_ts
+from thoth.core.stats import STATS_TOPIC
+from thoth.core.structs import ThothEnvelope
 
 # Init Logging Facilities
 log = logging.getLogger(__name__)
@@ -21,6 +28,48 @@ class DataNode(Node):
 
     # pylint: disable=too-many-instance-attributes
 
+    def __init__(self, name, receiver=None, publisher=None, codec=None, drain_limit=None,
+                 poll_timeout=None, conflator=None, capture=None, stats=None):
+        """Initialize the instance.
+
+        :param name: name of the node
+        :param receiver: receiver facility, returning frames from connectors; if it exposes its
+                         zmq socket as ``sock`` attribute (e.g.
+                         :class:`thoth.core.receiver.PullReceiver`), the node waits on it using
+                         a :class:`zmq.Poller`.
+        :param publisher: publisher facility
+        :param codec: if given, publish :class:`thoth.ThothEnvelope` instances serialized with
+                      this codec (see :mod:`thoth.core.codecs`) instead of JSON-serialized
+                      :class:`hermes.Envelope` instances; the data is then published without
+                      being decoded first.
+        :param drain_limit: maximum number of zmq messages read per batch; defaults to 1000
+        :param poll_timeout: seconds to wait for data before checking whether the node is still
+                             running; defaults to 1s
+        :param conflator: :class:`thoth.core.conflation.Conflator`, conflating messages of
+                          topics that must not be published at full rate
+        :param capture: :class:`thoth.core.capture.CaptureWriter`, recording all received
+                        messages; it is started and stopped along with the node
+        :param stats: :class:`thoth.core.stats.LatencyStats`, recording the latencies of
+                      messages traced by connectors, which are published periodically on the
+                      :data:`thoth.core.stats.STATS_TOPIC` topic
+        """
+        super(DataNode, self).__init__(name, receiver=receiver, publisher=publisher)
+        self.codec = codec
+        self.drain_limit = drain_limit or 1000
+        self.poll_timeout = poll_timeout or 1
+        self.conflator = conflator
+        self.capture = capture
+        self.stats = stats
+        if capture is not None:
+            self._facilities.append(capture)
+
+    def _envelope(self, topic, data, ts):
+        """Create the envelope to publish the given frames with."""
+        if self.codec is None:
+            return Envelope(as_str(topic), self.name, (as_str(data), unpack_ts(ts)))
+        return ThothEnvelope(as_str(topic), self.name, (as_buffer(data), unpack_ts(ts)),
+                             codec=self.codec)
+
     @abstractmethod
     def process_frames(self, topic, data, ts):
         """Publish the given data to channel, if it is available.
@@ -28,17 +77,53 @@ class DataNode(Node):
         The object must implement a ``publish(envelope)`` method, otherwise a
         :exception:``NotImplementedError`` is raised.
 
-        :param channel: topic tree
+        Frames may be passed as :class:`bytes`, :class:`memoryview` or :class:`zmq.Frame`
+        objects; unless a codec was set, they are decoded here, since :class:`hermes.Envelope`
+        serializes to JSON.
+
+        :param topic: topic tree
         :param data: Data Struct or string
+        :param ts: packed timestamp frame (see :mod:`thoth.core.frames`) or number
         :return: :class:`None`
         """
-        envelope = Envelope(topic, self.name, (data, ts))
+        envelope = self._envelope(topic, data, ts)
         try:
             self.publisher.publish(envelope)
         except AttributeError:
             raise NotImplementedError
 
-    # def pull(self, block=False, timeout=None):
+    def process_batch(self, messages):
+        """Publish the given batch of messages.
+
+        If :meth:`thoth.DataNode.process_frames` was overridden, it is called for each message,
+        honoring the per-message contract. Otherwise, envelopes for all messages are created
+        and handed to the publisher at once, using its ``publish_many(envelopes)`` method if
+        available.
+
+        :param messages: list of (topic, data, ts) tuples
+        :return: :class:`None`
+        """
+        if getattr(self.process_frames, '__func__', None) is not DataNode.process_frames:
+            process_frames = self.process_frames
+            for topic, data, ts in messages:
+                process_frames(topic, data, ts)
+            return
+
+        envelope = self._envelope
+        self._publish_envelopes([envelope(topic, data, ts) for topic, data, ts in messages])
+
+    def _publish_envelopes(self, envelopes):
+        """Hand the given envelopes to the publisher, at once if it supports it."""
+        try:
+            publish_many = getattr(self.publisher, 'publish_many', None)
+            if publish_many is not None:
+                publish_many(envelopes)
+            else:
+                publish = self.publisher.publish
+                for env in envelopes:
+                    publish(env)
+        except AttributeError:
+            raise NotImplementedError
 
     def run(self):
         """Execute main loop.
@@ -48,18 +133,97 @@ class DataNode(Node):
             (topic, data, timestamp)
 
         Of course any other 3-item tuple would be valid as well; Once data is packaged by the
-        Connector class, we do not touch it again.
-
+        Connector class, we do not touch it again - frames are handed to
+        :meth:`thoth.DataNode.process_frames` as received, which may be :class:`bytes`,
+        :class:`memoryview` or :class:`zmq.Frame` objects.
+
+        Batches of messages, as sent by connectors with batching enabled, are unpacked
+        transparently (see :mod:`thoth.core.batching`). If a conflator is set, messages pass
+        through it first, and held back messages are published once they are due. If a
+        capture is set, all messages are recorded before that. If stats are set, the latencies
+        of traced messages are recorded once they were published.
+
+        If the receiver exposes its zmq socket, the node sleeps on a :class:`zmq.Poller` while
+        idle; once woken, it drains up to :attr:`thoth.DataNode.drain_limit` messages and hands
+        them to :meth:`thoth.DataNode.process_batch`. Otherwise, the receiver is polled and
+        the messages of each receive are handed to :meth:`thoth.DataNode.process_batch`.
         """
+        sock = getattr(self.receiver, 'sock', None)
+        if sock is not None:
+            self._run_poller(sock)
+            return
+
         while self._running:
             try:
                 frames = self.recv(block=False, timeout=3)
             except (TimeoutError, queue.Empty):
+                self._dispatch([])
                 continue
             try:
-                topic, data, ts = frames
+                messages = list(iter_messages(frames))
             except ValueError as e:
                 log.exception(e)
                 log.error(frames)
                 continue
-            self.process_frames(topic, data, ts)
+            self._dispatch(messages)
+
+    def _run_poller(self, sock):
+        """Wait for data on the given socket and process all available messages in batches.
+
+        :param sock: :class:`zmq.Socket` to receive frames from
+        :return: :class:`None`
+        """
+        poller = zmq.Poller()
+        poller.register(sock, zmq.POLLIN)
+        recv_multipart, noblock = sock.recv_multipart, zmq.NOBLOCK
+        while self._running:
+            try:
+                if not poller.poll(self._poll_timeout_ms()):
+                    self._dispatch([])
+                    continue
+            except zmq.ZMQError:
+                if not self._running:
+                    # The socket was closed by stop() while we were waiting
+                    break
+                raise
+            batch = []
+            for _ in range(self.drain_limit):
+                try:
+                    frames = recv_multipart(noblock)
+                except zmq.Again:
+                    break
+                try:
+                    batch.extend(iter_messages(frames))
+                except ValueError as e:
+                    log.exception(e)
+                    log.error(frames)
+            self._dispatch(batch)
+
+    def _poll_timeout_ms(self):
+        """Return the time to wait for data, in ms, without missing a conflation deadline."""
+        timeout = self.poll_timeout
+        deadline = self.conflator.next_deadline() if self.conflator is not None else None
+        if deadline is not None:
+            timeout = min(timeout, max(deadline - time.monotonic(), 0))
+        return timeout * 1000
+
+    def _dispatch(self, batch):
+        """Capture the batch and pass it through the conflator, if any, and process it."""
+        stats = self.stats
+        received_at = time.time_ns() if stats is not None else None
+        if self.capture is not None and batch:
+            self.capture.write_many(batch)
+        if self.conflator is not None:
+            now = time.monotonic()
+            batch = self.conflator.flush_due(now) + self.conflator.admit(batch, now)
+        if batch:
+            self.process_batch(batch)
+            if stats is not None:
+                stats.record_batch(batch, received_at, time.time_ns())
+        if stats is not None and stats.due(time.monotonic()):
+            self.publish_stats()
+
+    def publish_stats(self):
+        """Publish the snapshot of :attr:`thoth.DataNode.stats` on the stats topic."""
+        data = json.dumps(self.stats.snapshot()).encode('UTF-8')
+        self._publish_envelopes([self._envelope(STATS_TOPIC, data, time.time_ns())])
@@ -0,0 +1,522 @@
+"""Split a symbol universe over several connections, and rebalance them by message rate.
+
+Exchanges limit the number of streams per connection, and a single connection carrying all
+symbols puts the whole exchange on one socket and one parsing thread. A
+:class:`thoth.core.pool.ConnectionPool` splits the symbols into shards of at most
+``max_symbols`` symbols, and opens a connector per shard using a user-supplied factory.
+
+Rebalancing
+    The pool counts the messages pushed per symbol. If rebalancing is enabled, it
+    periodically compares the message rates of its shards, and moves heavy symbols from the
+    busiest shard to the least busy one while the busiest carries more than ``imbalance``
+    times the average rate. Since connectors subscribe when they connect, the connectors of
+    both shards are replaced; each replacement is made before the connection it replaces is
+    broken, so no data is lost while moving symbols. Messages received by both connections
+    during the overlap are delivered twice, unless they are deduplicated (see below).
+
+Redundant legs
+    With ``legs=2`` or more, each shard is opened as several identical connections, its
+    legs. A :class:`Deduplicator` shared by all legs forwards whichever copy of a message
+    arrives first, and drops the others. Messages are identified by topic and sequence
+    number, as returned by the ``sequence_of`` callable (e.g.
+    :meth:`thoth.connectors.gdax.GDAXMixin.sequence_of`), or by their payload if they carry
+    none. The deduplicator counts the messages each leg won, and records by how much it led
+    the other legs. A lost connection on one leg no longer interrupts the data.
+
+Processes
+    :func:`start_pool_processes` splits the universe over several processes, each running a
+    pool of its own; symbols are rebalanced within a process, but not across processes.
+
+Each connector binds its PUSH socket to one of two addresses per shard and leg, alternating
+on every replacement (see :meth:`ConnectionPool.addresses`); a
+:class:`thoth.core.receiver.PullReceiver` connected to all of them receives all messages
+of the pool. Connectors are started with ``start()`` and stopped with ``stop()``, so threaded
+connectors (:class:`thoth.WebSocketConnector`, :class:`thoth.PusherConnector`) are
+supported; their pushes are wrapped by the pool to count and deduplicate messages.
+"""
+
+# pylint: disable=too-many-arguments,too-many-instance-attributes
+
+# Import Built-Ins
+import logging
+import math
+import multiprocessing
+import signal
+import threading
+import time
+from hashlib import blake2b
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.stats import Histogram
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+def topic_symbol(topic):
+    """Return the symbol of the given topic, its name without family and event.
+
+    For example, ``diff_book_BNBBTC`` and ``order_book_BTC-USD/l2update`` belong to the
+    symbols ``BNBBTC`` and ``BTC-USD``.
+
+    :param topic: :class:`str` or bytes-like
+    :return: :class:`str`
+    """
+    if not isinstance(topic, str):
+        topic = bytes(topic).decode('UTF-8')
+    return topic.partition('/')[0].rpartition('_')[2]
+
+
+def plan_shards(symbols, n_shards=None, max_symbols=None, weights=None):
+    """Split the given symbols into shards of similar weight.
+
+    Symbols are assigned heaviest first, each to the lightest shard with room left; without
+    weights, symbols are spread evenly.
+
+    :param symbols: iterable of symbols
+    :param n_shards: minimum number of shards; defaults to 1
+    :param max_symbols: maximum number of symbols per shard; more shards are planned if
+                        necessary
+    :param weights: dict of symbols to weights, e.g. message rates; missing symbols weigh 0
+    :return: list of lists of symbols
+    """
+    symbols = list(symbols)
+    n_shards = n_shards or 1
+    if max_symbols:
+        n_shards = max(n_shards, math.ceil(len(symbols) / max_symbols))
+    weights = weights or {}
+    shards = [[] for _ in range(n_shards)]
+    loads = [0] * n_shards
+    for symbol in sorted(symbols, key=lambda s: -weights.get(s, 0)):
+        i = min((i for i in range(n_shards) if not max_symbols or len(shards[i]) < max_symbols),
+                key=lambda i: (loads[i], len(shards[i])))
+        shards[i].append(symbol)
+        loads[i] += weights.get(symbol, 0)
+    return shards
+
+
+def plan_moves(shards, rates, max_symbols=None, imbalance=1.5, max_moves=None):
+    """Return the symbol moves balancing the message rates of the given shards.
+
+    While the busiest shard carries more than ``imbalance`` times the average rate, the
+    symbol best halving the difference to the least busy shard is moved there.
+
+    :param shards: list of lists of symbols
+    :param rates: dict of symbols to message rates
+    :param max_symbols: maximum number of symbols per shard
+    :param imbalance: ratio of the busiest shard's rate to the average rate tolerated
+    :param max_moves: maximum number of moves; defaults to the number of shards
+    :return: list of (symbol, source shard, destination shard) tuples
+    """
+    shards = [list(shard) for shard in shards]
+    loads = [sum(rates.get(symbol, 0) for symbol in shard) for shard in shards]
+    max_moves = max_moves or len(shards)
+    moves = []
+    while len(moves) < max_moves:
+        mean = sum(loads) / len(loads)
+        src = max(range(len(shards)), key=loads.__getitem__)
+        dsts = [i for i in range(len(shards)) if not max_symbols or len(shards[i]) < max_symbols]
+        if mean <= 0 or loads[src] <= imbalance * mean or not dsts:
+            break
+        dst = min(dsts, key=loads.__getitem__)
+        gap = loads[src] - loads[dst]
+        # Only moves leaving the source busier than the destination improve the balance
+        candidates = [symbol for symbol in shards[src] if 0 < rates.get(symbol, 0) < gap]
+        if src == dst or not candidates:
+            break
+        symbol = min(candidates, key=lambda s: abs(gap / 2 - rates[s]))
+        shards[src].remove(symbol)
+        shards[dst].append(symbol)
+        loads[src] -= rates[symbol]
+        loads[dst] += rates[symbol]
+        moves.append((symbol, src, dst))
+    return moves
+
+
+class Deduplicator:
+    """Forward the first copy of each message received by redundant connections.
+
+    Messages are identified by their topic and sequence number, or by their topic and a
+    128-bit digest of their payload if ``sequence_of`` returns None. The identities of the
+    last ``window`` messages are kept; copies arriving later than that are forwarded again.
+
+    Without a sequence number, identical payloads may be distinct messages, e.g. unchanged
+    tickers or heartbeats; a message is then only dropped as a copy if another leg delivered
+    it first. Repeats on the leg which delivered it first are forwarded.
+    """
+
+    def __init__(self, sequence_of=None, window=None, significant_bits=None):
+        """Initialize the instance.
+
+        :param sequence_of: callable(topic, data), returning the sequence number of a
+                            message, or None if it has none
+        :param window: number of messages remembered; defaults to 100000
+        :param significant_bits: precision of the lead histograms, see
+                                 :class:`thoth.core.stats.Histogram`
+        """
+        self.sequence_of = sequence_of
+        self.window = window or 100000
+        self.significant_bits = significant_bits
+        self.wins = {}
+        self.leads = {}
+        self.duplicates = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def admit(self, leg, topic, data):
+        """Return whether the given message is the first copy, recording its leg.
+
+        :param leg: identifier of the connection the message was received by
+        :param topic: topic of the message
+        :param data: :class:`bytes` or :class:`str` payload
+        :return: :class:`bool`
+        """
+        sequence = self.sequence_of(topic, data) if self.sequence_of else None
+        by_payload = sequence is None
+        if by_payload:
+            sequence = blake2b(data.encode('UTF-8') if isinstance(data, str) else data,
+                               digest_size=16).digest()
+        key = (topic, sequence)
+        now = time.monotonic_ns()
+        with self._lock:
+            first = self._seen.get(key)
+            if first is not None and by_payload and first[0] == leg:
+                # A repeat of the payload by the same leg is a new message
+                del self._seen[key]
+                first = None
+            if first is None:
+                self._seen[key] = (leg, now)
+                if len(self._seen) > self.window:
+                    del self._seen[next(iter(self._seen))]
+                self.wins[leg] = self.wins.get(leg, 0) + 1
+                return True
+            self.duplicates += 1
+            winner, first_at = first
+            if winner != leg:
+                try:
+                    lead = self.leads[winner]
+                except KeyError:
+                    lead = self.leads[winner] = Histogram(self.significant_bits)
+                lead.record(now - first_at)
+            return False
+
+    def snapshot(self):
+        """Return the messages won per leg and their lead over the other legs, in nanoseconds.
+
+        :return: dict with ``duplicates`` and ``legs`` keys; the latter a dict of legs to
+                 dicts with the leg's ``wins`` and the :meth:`Histogram.summary` of its
+                 ``lead``, or None if no other leg delivered a copy of its messages yet
+        """
+        with self._lock:
+            legs = {leg: {'wins': wins, 'lead': self.leads[leg].summary()
+                          if leg in self.leads else None}
+                    for leg, wins in self.wins.items()}
+            return {'duplicates': self.duplicates, 'legs': legs}
+
+
+class ConnectionPool:
+    """Open a connector per shard of a symbol universe, and rebalance them by message rate."""
+
+    def __init__(self, factory, symbols, addr, connections=None, max_symbols=None, legs=1,
+                 sequence_of=None, dedup=None, dedup_window=None, rebalance_interval=None,
+                 imbalance=1.5, max_moves=None, connect_timeout=10, symbol_of=None):
+        """Initialize the instance.
+
+        :param factory: callable(symbols, zmq_addr), returning an unstarted connector
+                        subscribing to the given symbols and binding its PUSH socket to the
+                        given address
+        :param symbols: the symbol universe
+        :param addr: address prefix of the connectors' sockets, see :meth:`addresses`
+        :param connections: minimum number of shards; defaults to 1
+        :param max_symbols: maximum number of symbols per shard, e.g. the exchange's stream
+                            limit per connection divided by the streams per symbol
+        :param legs: number of identical connections opened per shard
+        :param sequence_of: callable(topic, data), returning a message's sequence number;
+                            used to deduplicate messages
+        :param dedup: whether to deduplicate messages; defaults to True if ``legs > 1``
+        :param dedup_window: number of messages remembered by the :class:`Deduplicator`
+        :param rebalance_interval: seconds between rebalancing rounds; symbols are not
+                                   rebalanced if None
+        :param imbalance: ratio of the busiest shard's message rate to the average rate
+                          tolerated
+        :param max_moves: maximum number of symbols moved per round
+        :param connect_timeout: seconds to wait for a replacement connection to connect and
+                                receive data
+        :param symbol_of: callable(topic), returning the symbol of a topic; defaults to
+                          :func:`topic_symbol`. Symbols are matched case-insensitively
+        """
+        self.factory = factory
+        self.symbols = list(symbols)
+        self.addr = addr
+        self.max_symbols = max_symbols
+        self.shards = plan_shards(self.symbols, connections, max_symbols)
+        self.legs = legs
+        self.addrs = self.addresses(addr, len(self.shards), legs)
+        if dedup is None:
+            dedup = legs > 1
+        self.deduplicator = Deduplicator(sequence_of, dedup_window) if dedup else None
+        self.rebalance_interval = rebalance_interval
+        self.imbalance = imbalance
+        self.max_moves = max_moves
+        self.connect_timeout = connect_timeout
+        self.symbol_of = symbol_of or topic_symbol
+        self.connectors = {}
+        self.counts = [{} for _ in self.shards]
+        self._slots = {}
+        self._symbols = {symbol.upper(): symbol for symbol in self.symbols}
+        self._topic_symbols = {}
+        self._measured_at = time.monotonic()
+        self._stopped = threading.Event()
+        self._rebalancer = None
+
+    @staticmethod
+    def addresses(addr, n_shards, legs=1):
+        """Return the addresses the connectors of a pool bind to.
+
+        :param addr: address prefix of the pool
+        :param n_shards: number of shards of the pool
+        :param legs: number of legs per shard
+        :return: list of addresses, two per shard and leg
+        """
+        return [ConnectionPool._address(addr, shard, leg, slot)
+                for shard in range(n_shards) for leg in range(legs) for slot in (0, 1)]
+
+    @staticmethod
+    def _address(addr, shard, leg, slot):
+        """Return the address of the given slot of a shard's leg."""
+        return '%s_%d_%d_%d' % (addr, shard, leg, slot)
+
+    def start(self):
+        """Open the connections of all shards, and start rebalancing, if enabled."""
+        log.info("Starting pool of %s connections for %s symbols..",
+                 len(self.shards) * self.legs, len(self.symbols))
+        self._stopped.clear()
+        for shard, symbols in enumerate(self.shards):
+            if symbols:
+                for leg in range(self.legs):
+                    self.connectors[(shard, leg)], _ = self._open(shard, leg, 0, symbols)
+                    self._slots[(shard, leg)] = 0
+        self._measured_at = time.monotonic()
+        if self.rebalance_interval:
+            self._rebalancer = threading.Thread(target=self._rebalance_periodically,
+                                                name='ConnectionPool-rebalancer', daemon=True)
+            self._rebalancer.start()
+
+    def stop(self):
+        """Stop rebalancing, and close all connections."""
+        log.info("Stopping pool..")
+        self._stopped.set()
+        if self._rebalancer:
+            self._rebalancer.join()
+            self._rebalancer = None
+        for key in list(self.connectors):
+            self.connectors.pop(key).stop()
+
+    def _open(self, shard, leg, slot, symbols):
+        """Create and start a connector for the given shard's leg, bound to the given slot.
+
+        :return: tuple of the connector and a :class:`threading.Event`, set once it pushed
+                 its first message
+        """
+        conn = self.factory(list(symbols), self._address(self.addr, shard, leg, slot))
+        pushed = threading.Event()
+        conn.push = self._wrap_push(conn.push, shard, leg, pushed)
+        conn.start()
+        return conn, pushed
+
+    def _wrap_push(self, push, shard, leg, pushed):
+        """Return the given push method, counting and deduplicating messages."""
+        dedup = self.deduplicator
+
+        def counting_push(topic, data, recv_at):
+            """Count the message and push it, if it is the first copy."""
+            if not pushed.is_set():
+                pushed.set()
+            if dedup is not None and not dedup.admit(leg, topic, data):
+                return
+            counts = self.counts[shard]
+            counts[topic] = counts.get(topic, 0) + 1
+            push(topic, data, recv_at)
+
+        return counting_push
+
+    def _symbol(self, topic):
+        """Return the universe's symbol of the given topic, or None if it has none."""
+        try:
+            return self._topic_symbols[topic]
+        except KeyError:
+            symbol = self._topic_symbols[topic] = self._symbols.get(
+                self.symbol_of(topic).upper())
+            return symbol
+
+    def rates(self):
+        """Return the messages per second pushed per symbol since the last call.
+
+        :return: dict of symbols to message rates
+        """
+        now = time.monotonic()
+        elapsed, self._measured_at = max(now - self._measured_at, 1e-9), now
+        counts, self.counts = self.counts, [{} for _ in self.shards]
+        rates = dict.fromkeys(self.symbols, 0.0)
+        for shard_counts in counts:
+            for topic, count in list(shard_counts.items()):
+                symbol = self._symbol(topic)
+                if symbol is not None:
+                    rates[symbol] += count / elapsed
+        return rates
+
+    def rebalance(self):
+        """Move heavy symbols from busy shards to idle ones, based on their recent rates.
+
+        :return: list of (symbol, source shard, destination shard) tuples of symbols moved
+        """
+        moves = plan_moves(self.shards, self.rates(), self.max_symbols, self.imbalance,
+                           self.max_moves)
+        return [move for move in moves if self.move(*move)]
+
+    def move(self, symbol, src, dst):
+        """Move the symbol from one shard to another, without interrupting its data.
+
+        The connections of both shards are replaced make-before-break: the replacements of
+        all their legs are opened while the old connections keep running, and the old
+        connections are only closed once every replacement connected. If any replacement
+        fails, all of them are closed, and both shards keep their connections and symbols.
+
+        :param symbol: symbol to move
+        :param src: index of the shard currently receiving the symbol
+        :param dst: index of the shard to receive the symbol
+        :return: :class:`bool`, whether the symbol was moved
+        """
+        log.info("Moving %s from shard %s to shard %s..", symbol, src, dst)
+        dst_symbols = self.shards[dst] + [symbol]
+        src_symbols = [s for s in self.shards[src] if s != symbol]
+        replacements = self._prepare(dst, dst_symbols)
+        if replacements is not None:
+            src_replacements = self._prepare(src, src_symbols)
+            if src_replacements is None:
+                self._discard(replacements)
+                replacements = None
+            else:
+                replacements.update(src_replacements)
+        if replacements is None:
+            log.warning("Could not move %s to shard %s - keeping it on shard %s.",
+                        symbol, dst, src)
+            return False
+        self._commit(dst, replacements)
+        self._commit(src, replacements)
+        self.shards[dst], self.shards[src] = dst_symbols, src_symbols
+        return True
+
+    def _prepare(self, shard, symbols):
+        """Open replacements of the shard's connections for the given symbols.
+
+        Replacements bind the other slot of their leg, so they run alongside the old ones.
+
+        :return: dict of (connector, slot) tuples by (shard, leg) - empty if no symbols are
+                 left - or None if a replacement failed to connect; the replacements opened
+                 so far are closed then
+        """
+        replacements = {}
+        if not symbols:
+            return replacements
+        for leg in range(self.legs):
+            slot = 1 - self._slots.get((shard, leg), 1)
+            new, pushed = self._open(shard, leg, slot, symbols)
+            replacements[(shard, leg)] = new, slot
+            if not self._await_data(new, pushed):
+                self._discard(replacements)
+                return None
+        return replacements
+
+    @staticmethod
+    def _discard(replacements):
+        """Close the given replacements, as returned by :meth:`_prepare`."""
+        for conn, _ in replacements.values():
+            conn.stop()
+
+    def _commit(self, shard, replacements):
+        """Make the shard's replacements its connections, and close the old connections."""
+        for leg in range(self.legs):
+            key = (shard, leg)
+            old = self.connectors.pop(key, None)
+            if key in replacements:
+                self.connectors[key], self._slots[key] = replacements[key]
+            if old is not None:
+                old.stop()
+
+    def _await_data(self, conn, pushed):
+        """Wait for the connector to connect and push data.
+
+        Quiet feeds may not push data in time; connected connectors are accepted regardless.
+
+        :return: :class:`bool`, whether the connector connected in time
+        """
+        deadline = time.monotonic() + self.connect_timeout
+        while not pushed.is_set() and time.monotonic() < deadline:
+            if self._stopped.wait(0.01):
+                break
+        return pushed.is_set() or conn.connected
+
+    def _rebalance_periodically(self):
+        """Rebalance the shards every :attr:`rebalance_interval` seconds until stopped."""
+        while not self._stopped.wait(self.rebalance_interval):
+            try:
+                self.rebalance()
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception(e)
+
+
+def run_pool(factory, symbols, addr, **pool_kw):
+    """Run a :class:`ConnectionPool` until SIGTERM is received.
+
+    :param factory: connector factory, see :class:`ConnectionPool`
+    :param symbols: symbols of the pool
+    :param addr: address prefix of the pool's sockets
+    :param pool_kw: keyword arguments for :class:`ConnectionPool`
+    :return: :class:`None`
+    """
+    pool = ConnectionPool(factory, symbols, addr, **pool_kw)
+    stopped = threading.Event()
+
+    def shutdown(*_):
+        """Let the pool's process leave its main loop."""
+        stopped.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    pool.start()
+    try:
+        while not stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+def start_pool_processes(factory, symbols, addr, processes, mp_context=None, **pool_kw):
+    """Split the symbols over several processes, each running a :class:`ConnectionPool`.
+
+    :param factory: connector factory, see :class:`ConnectionPool`; must be picklable unless
+                    processes are forked
+    :param symbols: the symbol universe
+    :param addr: address prefix of the pools' sockets; must be an ipc or tcp address
+    :param processes: number of processes
+    :param mp_context: :mod:`multiprocessing` context to start the processes with
+    :param pool_kw: keyword arguments for :class:`ConnectionPool`
+    :return: tuple of the started processes, and the addresses of all their connectors
+    """
+    mp_context = mp_context or multiprocessing.get_context()
+    started, addrs = [], []
+    for i, process_symbols in enumerate(plan_shards(symbols, processes)):
+        process_addr = '%s_p%d' % (addr, i)
+        n_shards = len(plan_shards(process_symbols, pool_kw.get('connections'),
+                                   pool_kw.get('max_symbols')))
+        addrs += ConnectionPool.addresses(process_addr, n_shards, pool_kw.get('legs', 1))
+        process = mp_context.Process(target=run_pool, name='ConnectionPool-%d' % i,
+                                     args=(factory, process_symbols, process_addr),
+                                     kwargs=pool_kw, daemon=True)
+        process.start()
+        started.append(process)
+    return started, addrs
@@ -11,12 +11,15 @@ Passes data without touching it.
 import logging
 import time
 import abc
+from functools import partial
 
 # Import Third-party
 from pysher import Pusher
 import zmq
 
 # Import home-grown
+from thoth.core.batching import PushBatcher
+from thoth.core.frames import pack_frames, pack_traced_frames, send_frames
 
 # Init Logging Facilities
 log = logging.getLogger(__name__)
@@ -32,29 +35,88 @@ class PusherConnector(Pusher):
     do not have to handle several pairs, or want to handle all pairs in a single method instead.
     """
 
-    def __init__(self, pairs, *pusher_args, ctx=None, zmq_addr=None, **pusher_kwargs):
-        """Initialize Connector."""
+    def __init__(self, pairs, *pusher_args, ctx=None, zmq_addr=None, batch_size=None,
+                 batch_delay=None, sample_interval=None, **pusher_kwargs):
+        """Initialize Connector.
+
+        :param pairs: pairs to subscribe to
+        :param ctx: :class:`zmq.Context` to create the PUSH socket with
+        :param zmq_addr: address for zmq socket to bind to.
+        :param batch_size: if given, push messages in batches of up to this many messages
+        :param batch_delay: maximum time in seconds a message is held back when batching;
+                            defaults to 500us
+        :param sample_interval: if given, trace every n-th received message through its stages
+                                (see :mod:`thoth.core.stats`); since events are parsed by
+                                pysher, they are stamped as parsed once pushed
+        """
         super(PusherConnector, self).__init__(*pusher_args, **pusher_kwargs)
         self.pairs = pairs
         self.ctx = ctx or zmq.Context()
         self.q = self.ctx.socket(zmq.PUSH)
         self.zmq_addr = zmq_addr
         self.q.bind(self.zmq_addr)
+        self.batcher = PushBatcher(self.q, batch_size, batch_delay) if batch_size else None
+        self._send_frames = self.batcher.push if self.batcher else partial(send_frames, self.q)
+        self.sample_interval = sample_interval
+        self._countdown = sample_interval
+        self._socket_at = None
+        self._trace_source = type(self).__name__.encode('UTF-8')
+        # Monotonic time of the last message received, pings included
+        self.last_seen = 0
+        # Note and stamp messages as pysher's socket receives them, before pysher parses them
+        self.connection._on_message = partial(  # pylint: disable=protected-access
+            self._on_frame, self.connection._on_message)  # pylint: disable=protected-access
         self.connection.bind('pusher:connection_established', self._connect_channels)
 
+    def _on_frame(self, handle, *args):
+        """Note the reception of a message, then let pysher handle it.
+
+        Every ``sample_interval``-th message is stamped at reception, if sampling.
+
+        :param handle: pysher's message handler
+        :param args: arguments of the message handler, the message being the last
+        """
+        self.last_seen = time.monotonic()
+        if not self.sample_interval:
+            handle(*args)
+            return
+        self._countdown -= 1
+        if not self._countdown:
+            self._countdown = self.sample_interval
+            self._socket_at = time.time_ns()
+        handle(*args)
+        self._socket_at = None
+
     def push(self, topic, data, recv_at):
-        """Push data upwards."""
-        payload = [topic.encode('UTF-8'), data.encode('UTF-8'), str(recv_at).encode('UTF-8')]
-        self.q.send_multipart(payload)
+        """Push data upwards.
+
+        :param topic: The topic of the message to send.
+        :param data: data to be pushed, :class:`bytes` or :class:`str`
+        :param recv_at: int, nanoseconds (or float, seconds) since the epoch at reception
+        """
+        if self._socket_at is None:
+            self._send_frames(pack_frames(topic, data, recv_at))
+            return
+        # Events are pushed by the callbacks pysher calls once it parsed them
+        socket_at, self._socket_at = self._socket_at, None
+        self._send_frames(pack_traced_frames(topic, data, recv_at, socket_at, time.time_ns(),
+                                             self._trace_source))
 
     def _connect_channels(self, data):
         """Connect all available channels to this connector."""
         for pair in self.pairs:
             self._base_callback(data, pair)
 
+    @property
+    def connected(self):
+        """Return whether the connection to Pusher is established."""
+        return self.connection.state == 'connected'
+
     def stop(self):
         """Stop the connector."""
         self.disconnect()
+        if self.batcher:
+            self.batcher.flush()
         self.q.close()
 
     def start(self):
@@ -80,13 +142,13 @@ class PusherConnector(Pusher):
         """
         def callback_a(data):
             """Put data on q with correct channel name."""
-            print(data)
-            self.push('raw', data, time.time())
+            log.debug("%s", data)
+            self.push('raw', data, time.time_ns())
 
         def callback_b(data):
             """Put data on q with correct channel name."""
-            print(data)
-            self.push('raw_2', data, time.time())
+            log.debug("%s", data)
+            self.push('raw_2', data, time.time_ns())
 
         channel1 = self.subscribe('Channel_A')
         channel1.bind('EVENT_NAME', callback_a)
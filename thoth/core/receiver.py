@@ -0,0 +1,68 @@
+"""Receiver facility collecting data pushed by connectors.
+
+Connectors bind a :class:`zmq.PUSH` socket each; a :class:`thoth.core.receiver.PullReceiver`
+connects a single :class:`zmq.PULL` socket to all of them. It exposes this socket as
+:attr:`PullReceiver.sock`, which allows :meth:`thoth.DataNode.run` to wait on it using a
+:class:`zmq.Poller` instead of polling :meth:`PullReceiver.recv`.
+"""
+
+# Import Built-Ins
+import logging
+import queue
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class PullReceiver:
+    """Receive frames from one or more connectors via a :class:`zmq.PULL` socket."""
+
+    def __init__(self, addrs, name=None, ctx=None):
+        """Initialize the instance.
+
+        :param addrs: address or list of addresses the connectors' PUSH sockets are bound to
+        :param name: name of the facility
+        :param ctx: :class:`zmq.Context` to create the socket with
+        """
+        self.addrs = [addrs] if isinstance(addrs, str) else list(addrs)
+        self.name = name or 'PullReceiver'
+        self.ctx = ctx or zmq.Context.instance()
+        self.sock = None
+
+    def start(self):
+        """Create the socket and connect it to all addresses."""
+        self.sock = self.ctx.socket(zmq.PULL)
+        for addr in self.addrs:
+            log.info("Connecting %s to %s..", self.name, addr)
+            self.sock.connect(addr)
+
+    def stop(self, timeout=None):
+        """Close the socket.
+
+        :param timeout: unused; supported for compatibility with other facilities
+        """
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def recv(self, block=False, timeout=None):
+        """Receive the frames of the next message.
+
+        :param block: whether or not to wait for a message
+        :param timeout: maximum time in seconds to wait, if blocking; waits indefinitely if None
+        :raises queue.Empty: if no message was available
+        :return: list of :class:`bytes`
+        """
+        if block:
+            if not self.sock.poll(None if timeout is None else timeout * 1000):
+                raise queue.Empty
+            return self.sock.recv_multipart()
+        try:
+            return self.sock.recv_multipart(zmq.NOBLOCK)
+        except zmq.Again:
+            raise queue.Empty
@@ -0,0 +1,122 @@
+"""Replay captured messages through a :class:`thoth.DataNode`.
+
+A :class:`thoth.core.replay.ReplayConnector` reads the messages recorded by a
+:class:`thoth.core.capture.CaptureWriter` and pushes them to a node via a :class:`zmq.PUSH`
+socket, exactly like a live connector - so the node, its receiver and its publisher run as
+they do in production.
+
+Messages are replayed with their original timing (``speed=1``), at a multiple of it
+(e.g. ``speed=10``), or as fast as possible (``speed=None``). A time range and topic prefixes
+may be given to replay only part of a capture; the capture's index is used to seek to the
+start of the range.
+"""
+
+# Import Built-Ins
+import logging
+import time
+from threading import Thread, Event
+from functools import partial
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.core.batching import PushBatcher
+from thoth.core.capture import CaptureReader
+from thoth.core.frames import pack_frames, send_frames
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class ReplayConnector(Thread):
+    """Push captured messages to a :class:`thoth.DataNode`, like a live connector."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+
+    def __init__(self, directory, zmq_addr=None, prefix='capture', speed=1.0, start=None,
+                 end=None, topics=None, restamp=False, ctx=None, batch_size=None,
+                 batch_delay=None):
+        """Initialize the instance.
+
+        :param directory: directory the capture's segments are stored in
+        :param zmq_addr: address for the zmq socket to bind to
+        :param prefix: file name prefix of the capture's segments
+        :param speed: factor to speed up the original timing by; replays as fast as possible
+                      if None
+        :param start: int, nanoseconds since the epoch; skips older messages
+        :param end: int, nanoseconds since the epoch; stops at the first message after it
+        :param topics: iterable of topic prefixes; only matching messages are replayed
+        :param restamp: if True, messages are stamped with the time they are replayed at,
+                        instead of their original reception time
+        :param ctx: :class:`zmq.Context` to create the PUSH socket with
+        :param batch_size: if given, push messages in batches of up to this many messages
+        :param batch_delay: maximum time in seconds a message is held back when batching
+        """
+        self.reader = CaptureReader(directory, prefix)
+        self.speed = speed
+        self.start_ts, self.end_ts = start, end
+        self.topics = tuple(t.encode('UTF-8') if isinstance(t, str) else t
+                            for t in topics) if topics else None
+        self.restamp = restamp
+
+        self.ctx = ctx or zmq.Context.instance()
+        self.q = self.ctx.socket(zmq.PUSH)
+        self.zmq_addr = zmq_addr or 'ipc:///tmp/replay'
+        self.q.bind(self.zmq_addr)
+        self.batcher = PushBatcher(self.q, batch_size, batch_delay) if batch_size else None
+        self._send_frames = self.batcher.push if self.batcher else partial(send_frames, self.q)
+
+        self.count = 0
+        self.elapsed = None
+        self.done = Event()
+        self._stopped = Event()
+        super(ReplayConnector, self).__init__()
+        self.daemon = True
+
+    @property
+    def rate(self):
+        """Return the number of messages pushed per second, once the replay finished."""
+        return self.count / self.elapsed if self.elapsed else None
+
+    def _messages(self):
+        """Iterate over the messages to replay."""
+        topics = self.topics
+        for message in self.reader.read(self.start_ts, self.end_ts):
+            if topics is None or message[0].startswith(topics):
+                yield message
+
+    def run(self):
+        """Push all messages to replay, keeping their timing as configured."""
+        send, speed, restamp = self._send_frames, self.speed, self.restamp
+        clock, sleep = time.perf_counter, time.sleep
+        started = clock()
+        first_ts = None
+        for topic, data, ts in self._messages():
+            if self._stopped.is_set():
+                break
+            if speed:
+                if first_ts is None:
+                    first_ts = ts
+                delay = started + (ts - first_ts) / 1e9 / speed - clock()
+                if delay > 0:
+                    sleep(delay)
+            send(pack_frames(topic, data, time.time_ns() if restamp else ts))
+            self.count += 1
+        if self.batcher:
+            self.batcher.flush()
+        self.elapsed = clock() - started
+        log.info("Replayed %s messages in %.3fs.", self.count, self.elapsed)
+        self.done.set()
+
+    def stop(self, timeout=None):
+        """Stop replaying and close the socket.
+
+        Supports stopping this thread via the hermes.Node._stop_facilities() method.
+
+        :param timeout: seconds to wait for the thread to finish
+        """
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.q.close()
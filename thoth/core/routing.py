@@ -0,0 +1,111 @@
+"""Parse-free routing of raw websocket messages.
+
+Connectors passing data through untouched only need a message's type and symbol to build its
+topic. Instead of parsing the whole message with :func:`json.loads`, the functions in this
+module scan a bounded prefix of the raw bytes for the string value of a given key - exchanges
+place these fields at the start of their messages (e.g. Binance's combined stream name, or
+GDAX's ``type`` and ``product_id``). Integer fields, such as sequence numbers, may be read
+with :func:`scan_number`.
+
+Scanning is a heuristic: a key is matched at its first occurrence, which is assumed to be the
+top-level one. If a key cannot be found in the prefix, its value is not a plain string, or it
+contains escape sequences, ``None`` is returned and the connector falls back to parsing the
+message.
+"""
+
+# Import Built-Ins
+import logging
+import re
+
+# Import Third-Party
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+#: Number of leading bytes scanned for routing fields by default.
+ROUTING_PREFIX = 256
+
+_PATTERNS = {}
+
+_NUMBER_PATTERNS = {}
+
+
+def _pattern(key):
+    """Return the compiled pattern matching the given key and its string value."""
+    try:
+        return _PATTERNS[key]
+    except KeyError:
+        pattern = _PATTERNS[key] = re.compile(b'"' + re.escape(key) + b'"\\s*:\\s*"([^"]*)"')
+        return pattern
+
+
+def _number_pattern(key):
+    """Return the compiled pattern matching the given key and its integer value."""
+    try:
+        return _NUMBER_PATTERNS[key]
+    except KeyError:
+        pattern = _NUMBER_PATTERNS[key] = re.compile(
+            b'"' + re.escape(key) + b'"\\s*:\\s*(-?\\d+)[\\s,}\\]]')
+        return pattern
+
+
+def scan_field(data, key, limit=None):
+    """Return the string value of the given key, read from the raw message.
+
+    :param data: :class:`bytes` or :class:`str`, JSON-encoded message
+    :param key: :class:`bytes`, key to look up
+    :param limit: number of leading bytes the key and its value must lie within; defaults to
+                  :data:`ROUTING_PREFIX`
+    :return: :class:`str`, or None if the value cannot be read without parsing the message
+    """
+    if isinstance(data, str):
+        data = data.encode('UTF-8')
+    match = _pattern(key).search(data, 0, limit or ROUTING_PREFIX)
+    if match is None:
+        return None
+    value = match.group(1)
+    # Escape sequences require a parse
+    if b'\\' in value:
+        return None
+    return value.decode('UTF-8')
+
+
+def scan_number(data, key, limit=None):
+    """Return the integer value of the given key, read from the raw message.
+
+    :param data: :class:`bytes` or :class:`str`, JSON-encoded message
+    :param key: :class:`bytes`, key to look up
+    :param limit: number of leading bytes the key and its value must lie within; defaults to
+                  :data:`ROUTING_PREFIX`
+    :return: :class:`int`, or None if the key cannot be found in the prefix or its value is
+             not an integer
+    """
+    if isinstance(data, str):
+        data = data.encode('UTF-8')
+    match = _number_pattern(key).search(data, 0, limit or ROUTING_PREFIX)
+    if match is None:
+        return None
+    return int(match.group(1))
+
+
+def scan_fields(data, keys, limit=None):
+    """Return the string values of the given keys, read from the raw message.
+
+    :param data: :class:`bytes` or :class:`str`, JSON-encoded message
+    :param keys: iterable of :class:`bytes`, keys to look up
+    :param limit: number of leading bytes the keys and their values must lie within; defaults
+                  to :data:`ROUTING_PREFIX`
+    :return: tuple of :class:`str` values, or None if any of them cannot be read without
+             parsing the message
+    """
+    if isinstance(data, str):
+        data = data.encode('UTF-8')
+    values = []
+    for key in keys:
+        value = scan_field(data, key, limit)
+        if value is None:
+            return None
+        values.append(value)
+    return tuple(values)
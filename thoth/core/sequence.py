@@ -0,0 +1,164 @@
+"""Per-channel sequence gap detection and recovery.
+
+Exchanges number the messages of a channel (e.g. a symbol's order book updates) so clients
+can detect lost messages. Reconnecting on every gap costs a full TLS handshake, the
+reconnect interval and a resubscription of all channels, although only one channel is
+affected. A :class:`thoth.core.sequence.SequenceTracker` tracks the sequence numbers of each
+channel separately and, on a gap, calls a recovery callback for just that channel - which
+may resubscribe the channel, or request a snapshot, whichever the exchange supports.
+
+A channel is recovering from the gap until the connector calls
+:meth:`SequenceTracker.resynced`, e.g. once the snapshot was applied; the time this took is
+recorded. :meth:`SequenceTracker.snapshot` returns the number of gaps and the recovery times
+per channel.
+"""
+
+# Import Built-Ins
+import logging
+import time
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.stats import Histogram
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class _ChannelState:
+    """Sequence state of a single channel."""
+
+    # pylint: disable=too-few-public-methods
+
+    __slots__ = ['last', 'gaps', 'missed', 'stale', 'recovering_since']
+
+    def __init__(self):
+        """Initialize the instance."""
+        self.last = None
+        self.gaps = 0
+        self.missed = 0
+        self.stale = 0
+        self.recovering_since = None
+
+
+class SequenceTracker:
+    """Detect gaps in the sequence numbers of channels, and trigger their recovery."""
+
+    def __init__(self, recover=None, name=None, significant_bits=None):
+        """Initialize the instance.
+
+        :param recover: callable(channel, expected, received), recovering the given channel;
+                        called once per gap. If None, gaps are only counted and logged
+        :param name: name used in log messages
+        :param significant_bits: precision of the recovery time histogram, see
+                                 :class:`thoth.core.stats.Histogram`
+        """
+        self.recover = recover
+        self.name = name or 'SequenceTracker'
+        self.channels = {}
+        self.recovery = Histogram(significant_bits)
+        self.started = time.monotonic()
+
+    def _state(self, channel):
+        """Return the state of the given channel, creating it if necessary."""
+        try:
+            return self.channels[channel]
+        except KeyError:
+            state = self.channels[channel] = _ChannelState()
+            return state
+
+    def check(self, channel, sequence):
+        """Check the sequence number of a message of the given channel.
+
+        The first message of a channel, and the first message after it was resynced without
+        a sequence number, set the channel's base.
+
+        :param channel: hashable channel identifier
+        :param sequence: :class:`int` sequence number of the message
+        :return: :class:`bool`, whether the message directly follows the previous one; False
+                 for stale messages, gaps and while the channel is recovering
+        """
+        state = self._state(channel)
+        if state.recovering_since is not None:
+            return False
+        last = state.last
+        if last is None or sequence == last + 1:
+            state.last = sequence
+            return True
+        if sequence <= last:
+            state.stale += 1
+            return False
+        self.gap(channel, last + 1, sequence)
+        return False
+
+    def gap(self, channel, expected, received):
+        """Record a gap in the given channel and trigger its recovery.
+
+        Connectors detecting gaps themselves (e.g. in ranges of update ids) may call this
+        directly.
+
+        :param channel: hashable channel identifier
+        :param expected: sequence number expected next
+        :param received: sequence number received instead
+        :return: :class:`None`
+        """
+        state = self._state(channel)
+        state.gaps += 1
+        state.missed += max(received - expected, 0)
+        if state.recovering_since is not None:
+            return
+        state.recovering_since = time.monotonic_ns()
+        log.warning("%s: gap in %s (expected %s, received %s) - recovering channel..",
+                    self.name, channel, expected, received)
+        if self.recover is not None:
+            self.recover(channel, expected, received)
+
+    def resynced(self, channel, sequence=None):
+        """Mark the channel as recovered, recording the time its recovery took.
+
+        :param channel: hashable channel identifier
+        :param sequence: sequence number of the snapshot or message the channel was resynced
+                         with; if None, the channel's next message sets its base
+        :return: :class:`None`
+        """
+        state = self._state(channel)
+        if state.recovering_since is not None:
+            self.recovery.record(time.monotonic_ns() - state.recovering_since)
+            log.info("%s: %s recovered.", self.name, channel)
+        state.recovering_since = None
+        state.last = sequence
+
+    def reset(self, channel=None):
+        """Forget the sequence numbers of the given channel, or all channels.
+
+        Use when sequence numbers restart, e.g. after reconnecting. Recoveries in progress
+        are abandoned.
+
+        :param channel: hashable channel identifier; all channels are reset if None
+        :return: :class:`None`
+        """
+        for state in (self.channels.values() if channel is None else [self._state(channel)]):
+            state.last = None
+            state.recovering_since = None
+
+    def recovering(self, channel):
+        """Return whether the given channel is recovering from a gap."""
+        state = self.channels.get(channel)
+        return state is not None and state.recovering_since is not None
+
+    def snapshot(self):
+        """Return gap and recovery statistics.
+
+        :return: dict with the total number of ``gaps``, their rate per hour
+                 (``gaps_per_hour``), the :meth:`Histogram.summary` of ``recovery`` times in
+                 nanoseconds, and per ``channels`` their gaps, missed and stale messages, and
+                 whether they are recovering
+        """
+        gaps = sum(state.gaps for state in self.channels.values())
+        hours = max(time.monotonic() - self.started, 1e-9) / 3600
+        return {'gaps': gaps, 'gaps_per_hour': gaps / hours, 'recovery': self.recovery.summary(),
+                'channels': {channel: {'gaps': state.gaps, 'missed': state.missed,
+                                       'stale': state.stale,
+                                       'recovering': state.recovering_since is not None}
+                             for channel, state in list(self.channels.items())}}
@@ -0,0 +1,175 @@
+"""Spread the work of a :class:`thoth.DataNode` over several processes.
+
+A :class:`thoth.core.sharding.ShardedDataNode` acts as a lightweight front end: it receives
+frames from the connectors and partitions them, by a stable hash of their topic, onto a number
+of worker processes. Each worker runs a regular :class:`thoth.DataNode`, created by a
+user-supplied factory, which builds envelopes and publishes them.
+
+Since all messages of a topic are handled by the same worker, and both the front end and the
+workers process messages in the order they were received, the order of messages within a topic
+is preserved. There is no ordering guarantee across topics.
+
+The front end only hashes topics and forwards frames, packing all messages for a worker drained
+in one go into a single batch (see :mod:`thoth.core.batching`), so it does not become the
+bottleneck before several workers are busy.
+"""
+
+# Import Built-Ins
+import logging
+import multiprocessing
+import os
+import signal
+import zlib
+
+# Import Third-Party
+import zmq
+
+# Import Home-grown
+from thoth.core.node import DataNode
+from thoth.core.batching import BATCH_MARKER, RECORD_HEADER
+from thoth.core.frames import as_buffer, send_frames, ZERO_COPY_THRESHOLD
+from thoth.core.receiver import PullReceiver
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+def shard_of(topic, n_shards):
+    """Return the shard the given topic belongs to.
+
+    The hash is stable across processes and interpreter runs, unlike :func:`hash`.
+
+    :param topic: bytes-like or :class:`zmq.Frame`, topic frame of a message
+    :param n_shards: number of shards
+    :return: :class:`int` in ``range(n_shards)``
+    """
+    return zlib.crc32(as_buffer(topic)) % n_shards
+
+
+def run_worker(node_factory, name, addr):
+    """Run a worker node, receiving frames from the given address, until SIGTERM is received.
+
+    :param node_factory: callable(name, receiver), returning a :class:`thoth.DataNode`
+    :param name: name of the worker node
+    :param addr: address of the front end's socket for this worker
+    :return: :class:`None`
+    """
+    node = node_factory(name, PullReceiver(addr, name='%s-receiver' % name))
+
+    def shutdown(*_):
+        """Let the node leave its main loop."""
+        node._running = False  # pylint: disable=protected-access
+
+    signal.signal(signal.SIGTERM, shutdown)
+    node.start()
+    try:
+        node.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        node.stop()
+
+
+class ShardedDataNode(DataNode):
+    """Front end partitioning incoming frames by topic onto worker processes."""
+
+    # pylint: disable=too-many-arguments
+
+    def __init__(self, name, receiver, node_factory, workers=None, addr=None, ctx=None,
+                 mp_context=None, drain_limit=None, poll_timeout=None):
+        """Initialize the instance.
+
+        :param name: name of the node; workers are named ``<name>-<shard>``
+        :param receiver: receiver facility, returning frames from connectors; should expose its
+                         socket (e.g. :class:`thoth.core.receiver.PullReceiver`), so frames
+                         are forwarded in batches
+        :param node_factory: callable(name, receiver), returning the :class:`thoth.DataNode`
+                             run by each worker; must be picklable unless processes are forked
+        :param workers: number of worker processes; defaults to the number of CPUs
+        :param addr: address prefix of the sockets connecting front end and workers; the
+                     shard's number is appended. Defaults to an ipc address unique to this
+                     process
+        :param ctx: :class:`zmq.Context` to create the front end's sockets with
+        :param mp_context: :mod:`multiprocessing` context to start workers with
+        :param drain_limit: maximum number of zmq messages read per batch; defaults to 1000
+        :param poll_timeout: seconds to wait for data before checking whether the node is still
+                             running; defaults to 1s
+        """
+        super(ShardedDataNode, self).__init__(name, receiver=receiver, drain_limit=drain_limit,
+                                              poll_timeout=poll_timeout)
+        self.node_factory = node_factory
+        self.n_workers = workers or os.cpu_count() or 1
+        addr = addr or 'ipc:///tmp/thoth_%s_%s' % (name, os.getpid())
+        self.addrs = ['%s_%s' % (addr, i) for i in range(self.n_workers)]
+        self.ctx = ctx or zmq.Context.instance()
+        self.mp_context = mp_context or multiprocessing.get_context()
+        self.socks = []
+        self.workers = []
+
+    def start(self):
+        """Bind the workers' sockets, start the workers and the receiver."""
+        log.info("Starting sharded node with %s workers..", self.n_workers)
+        self._bind_shards()
+        for i, addr in enumerate(self.addrs):
+            worker = self.mp_context.Process(
+                target=run_worker, args=(self.node_factory, '%s-%s' % (self.name, i), addr),
+                name='%s-%s' % (self.name, i), daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        self._start_facilities()
+        log.info("..done.")
+
+    def stop(self, timeout=5):
+        """Stop the receiver and the workers, and close the workers' sockets.
+
+        :param timeout: seconds to wait for each worker to exit before killing it
+        """
+        log.info("Stopping sharded node..")
+        self._stop_facilities()
+        for worker in self.workers:
+            worker.terminate()
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                log.warning("Worker %s did not exit in time - killing it!", worker.name)
+                worker.kill()
+                worker.join()
+        self.workers = []
+        for sock in self.socks:
+            sock.close(linger=int(timeout * 1000))
+        self.socks = []
+        log.info("..done.")
+
+    def _bind_shards(self):
+        """Create and bind a :class:`zmq.PUSH` socket per worker."""
+        for addr in self.addrs:
+            sock = self.ctx.socket(zmq.PUSH)
+            sock.bind(addr)
+            self.socks.append(sock)
+
+    def process_frames(self, topic, data, ts):
+        """Forward a single message to the worker handling its topic.
+
+        :param topic: topic frame
+        :param data: data frame
+        :param ts: packed timestamp frame
+        :return: :class:`None`
+        """
+        send_frames(self.socks[shard_of(topic, self.n_workers)], [topic, data, ts])
+
+    def process_batch(self, messages):
+        """Partition the given messages by topic and forward them as one batch per worker.
+
+        :param messages: list of (topic, data, ts) tuples of bytes-like objects
+        :return: :class:`None`
+        """
+        n_workers, crc32, pack = self.n_workers, zlib.crc32, RECORD_HEADER.pack
+        parts = [[] for _ in range(n_workers)]
+        for topic, data, ts in messages:
+            topic, data, ts = as_buffer(topic), as_buffer(data), as_buffer(ts)
+            parts[crc32(topic) % n_workers] += (pack(len(topic), len(data), len(ts)),
+                                                topic, data, ts)
+        for sock, shard_parts in zip(self.socks, parts):
+            if shard_parts:
+                body = b''.join(shard_parts)
+                sock.send_multipart([BATCH_MARKER, body], copy=len(body) < ZERO_COPY_THRESHOLD)
@@ -0,0 +1,270 @@
+"""Per-stage latency histograms of sampled messages.
+
+Connectors trace every ``sample_interval``-th message they receive: its ts frame then carries
+the times it was received by the socket and parsed by the connector, as well as the
+connector's name (see :func:`thoth.core.frames.pack_trace`). A
+:class:`thoth.DataNode` given a :class:`thoth.core.stats.LatencyStats` instance adds the times
+it received and published the message, and records the time spent in each stage:
+
+    ``parse``
+        socket receive to the end of the connector's parsing
+    ``transport``
+        end of parsing to :class:`thoth.DataNode` receive, including packing, batching,
+        sending and queueing
+    ``node``
+        :class:`thoth.DataNode` receive to publish
+    ``total``
+        socket receive to publish
+
+Histograms are kept per connector and per topic family, and may be queried in-process via
+:meth:`LatencyStats.snapshot`; the node also publishes the snapshot on the
+:data:`STATS_TOPIC` topic every ``interval`` seconds.
+
+Since only sampled messages are traced, untraced messages cost the node a length check of
+their ts frame; connectors not sampling add no cost at all.
+
+Histograms are not locked: each is written by the node's thread only, and readers take a
+copy of its counts.
+"""
+
+# Import Built-Ins
+import logging
+import time
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.frames import TRACE, unpack_trace
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+#: Topic the node publishes its latency statistics on.
+STATS_TOPIC = 'thoth.stats'
+
+STAGES = ('parse', 'transport', 'node', 'total')
+
+PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('p999', 0.999))
+
+
+def topic_family(topic):
+    """Return the family of the given topic, its name without the symbol.
+
+    For example, ``diff_book_BNBBTC`` and ``order_book_BTC-USD/l2update`` belong to the
+    families ``diff_book`` and ``order_book``.
+
+    :param topic: :class:`str`
+    :return: :class:`str`
+    """
+    family = topic.partition('/')[0].rpartition('_')[0]
+    return family or topic
+
+
+class Histogram:
+    """Log-linear histogram of non-negative integers, in the style of an HDR histogram.
+
+    Values are counted in buckets of exponentially growing width; each power of two is split
+    into ``2 ** (significant_bits - 1)`` buckets, so recorded values are kept with a relative
+    error below ``2 ** (1 - significant_bits)`` (below 1% by default). Values above
+    ``max_value`` are counted as ``max_value``.
+    """
+
+    __slots__ = ['significant_bits', 'max_value', 'counts', 'count', 'total', 'min', 'max']
+
+    def __init__(self, significant_bits=None, max_value=None):
+        """Initialize the instance.
+
+        :param significant_bits: number of significant bits kept of each value; defaults to 8
+        :param max_value: largest value to distinguish; defaults to one hour in nanoseconds
+        """
+        self.significant_bits = significant_bits or 8
+        self.max_value = max_value or 3600 * 10 ** 9
+        self.counts = [0] * (self._index(self.max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        """Return the index of the bucket counting the given value."""
+        shift = value.bit_length() - self.significant_bits
+        if shift <= 0:
+            return value
+        return (shift << (self.significant_bits - 1)) + (value >> shift)
+
+    def _value(self, index):
+        """Return the lowest value counted by the bucket of the given index."""
+        half = 1 << (self.significant_bits - 1)
+        if index < half << 1:
+            return index
+        shift = (index >> (self.significant_bits - 1)) - 1
+        return (index - (shift << (self.significant_bits - 1))) << shift
+
+    def record(self, value):
+        """Count the given value.
+
+        :param value: non-negative :class:`int`; negative values are counted as 0
+        :return: :class:`None`
+        """
+        value = min(max(value, 0), self.max_value)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Return the value below which the given fraction of the recorded values lie.
+
+        :param q: float between 0 and 1
+        :return: :class:`int`, or None if no values were recorded
+        """
+        if not self.count:
+            return None
+        rank = max(int(self.count * q + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(list(self.counts)):
+            seen += count
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def merge(self, other):
+        """Add the counts of another histogram of the same layout to this one.
+
+        :param other: :class:`Histogram`
+        :return: :class:`None`
+        """
+        if len(other.counts) != len(self.counts):
+            raise ValueError("Cannot merge histograms of different layouts!")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        """Discard all recorded values."""
+        self.counts = [0] * len(self.counts)
+        self.count = self.total = self.max = 0
+        self.min = None
+
+    def summary(self):
+        """Return count, min, max, mean and percentiles of the recorded values.
+
+        :return: :class:`dict`
+        """
+        summary = {'count': self.count, 'min': self.min, 'max': self.max,
+                   'mean': self.total / self.count if self.count else None}
+        for name, q in PERCENTILES:
+            summary[name] = self.percentile(q)
+        return summary
+
+
+class LatencyStats:
+    """Histograms of the time traced messages spent in each stage, per connector and family."""
+
+    def __init__(self, interval=None, family=None, significant_bits=None):
+        """Initialize the instance.
+
+        :param interval: seconds between publishing statistics on :data:`STATS_TOPIC`;
+                         defaults to 10s
+        :param family: callable(topic) returning a topic's family; defaults to
+                       :func:`topic_family`
+        :param significant_bits: precision of the histograms, see :class:`Histogram`
+        """
+        self.interval = interval or 10
+        self.family = family or topic_family
+        self.significant_bits = significant_bits
+        self.histograms = {}
+        self.traced = 0
+        self._families = {}
+        self._next_publish = time.monotonic() + self.interval
+
+    def histogram(self, scope, name, stage):
+        """Return the histogram of the given stage, creating it if necessary.
+
+        :param scope: ``'connectors'`` or ``'families'``
+        :param name: name of the connector or topic family
+        :param stage: one of :data:`STAGES`
+        :return: :class:`Histogram`
+        """
+        key = (scope, name, stage)
+        try:
+            return self.histograms[key]
+        except KeyError:
+            histogram = self.histograms[key] = Histogram(self.significant_bits)
+            return histogram
+
+    def record_batch(self, messages, received_at, published_at):
+        """Record the traced messages among the given ones.
+
+        :param messages: list of (topic, data, ts) tuples, as published
+        :param received_at: int, nanoseconds since the epoch at which the node received them
+        :param published_at: int, nanoseconds since the epoch at which the node published them
+        :return: :class:`None`
+        """
+        trace_size = TRACE.size
+        try:
+            traced = [message for message in messages if len(message[2]) >= trace_size]
+        except TypeError:
+            # Timestamps given as numbers carry no traces
+            traced = [message for message in messages
+                      if not isinstance(message[2], (int, float)) and len(message[2]) >= trace_size]
+        for topic, _, ts in traced:
+            self.record(topic, ts, received_at, published_at)
+
+    def record(self, topic, ts, received_at, published_at):
+        """Record the stages of a traced message.
+
+        :param topic: bytes-like topic of the message
+        :param ts: ts frame of the message, as packed by :func:`thoth.core.frames.pack_trace`
+        :param received_at: int, nanoseconds since the epoch at which the node received it
+        :param published_at: int, nanoseconds since the epoch at which the node published it
+        :return: :class:`None`
+        """
+        trace = unpack_trace(ts)
+        if trace is None:
+            return
+        socket_at, parsed_at, source = trace
+        topic = bytes(topic)
+        try:
+            family = self._families[topic]
+        except KeyError:
+            family = self._families[topic] = self.family(topic.decode('UTF-8'))
+        durations = (parsed_at - socket_at, received_at - parsed_at, published_at - received_at,
+                     published_at - socket_at)
+        for stage, duration in zip(STAGES, durations):
+            self.histogram('connectors', source, stage).record(duration)
+            self.histogram('families', family, stage).record(duration)
+        self.traced += 1
+
+    def snapshot(self):
+        """Return the summaries of all histograms, in nanoseconds.
+
+        :return: dict of ``'connectors'`` and ``'families'``, each a dict of names to dicts of
+                 stages to the histogram's :meth:`Histogram.summary`
+        """
+        snapshot = {'traced': self.traced, 'connectors': {}, 'families': {}}
+        for (scope, name, stage), histogram in list(self.histograms.items()):
+            snapshot[scope].setdefault(name, {})[stage] = histogram.summary()
+        return snapshot
+
+    def due(self, now):
+        """Return whether the statistics are due to be published, scheduling the next time.
+
+        :param now: :func:`time.monotonic` value
+        :return: :class:`bool`
+        """
+        if now < self._next_publish:
+            return False
+        self._next_publish = now + self.interval
+        return True
+
+    def reset(self):
+        """Discard all recorded values."""
+        self.histograms = {}
+        self.traced = 0
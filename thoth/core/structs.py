@@ -1,10 +1,10 @@
 """Data structs for use within the hermes ecosystem."""
 
 import logging
-import json
 import time
-import sys
-from functools import reduce
+
+from thoth.core.codecs import get_codec
+from thoth.core.frames import as_buffer
 
 
 log = logging.getLogger(__name__)
@@ -15,7 +15,8 @@ class ThothEnvelope:
 
     Transport Object for data being sent between :mod:`Thoth` components via ZMQ.
 
-    Serializes and deserializes date to and from json.
+    Serializes and deserializes data using a codec from :mod:`thoth.core.codecs`; the id of the
+    codec is sent along with the data, so any registered codec can be decoded.
 
     It tracka topic and origin of the data it transport, as well as the
     timestamp it was last updated at. Updates occur automatically whenever
@@ -24,9 +25,9 @@ class ThothEnvelope:
     to initiate the suicidal snail pattern.
     """
 
-    __slots__ = ['topic', 'origin', 'data', 'ts']
+    __slots__ = ['topic', 'origin', 'data', 'ts', 'codec']
 
-    def __init__(self, topic_tree, origin, data, ts=None):
+    def __init__(self, topic_tree, origin, data, ts=None, codec=None):
         """Initialize a :class:`thoth.ThothEnvelope` instance.
 
         .. Note::
@@ -39,44 +40,48 @@ class ThothEnvelope:
         :param data: data struct transported by this instance
         :param ts: timestamp of this instance, defaults to current unix ts if
                    None
+        :param codec: name, id or instance of the codec to serialize with; defaults to 'json'
         """
         self.topic = topic_tree
         self.origin = origin
         self.data = data
         self.ts = ts or time.time()
+        self.codec = get_codec(codec or 'json')
 
     def __repr__(self):
         """Construct a basic string-represenation of this class instance."""
-        return ("Envelope(topic=%r, origin=%r, data=%r, ts=%r)" %
-                (self.topic, self.origin, self.data, self.ts))
+        return ("Envelope(topic=%r, origin=%r, data=%r, ts=%r, codec=%r)" %
+                (self.topic, self.origin, self.data, self.ts, self.codec.name))
 
     @staticmethod
     def load_from_frames(frames, encoding=None):
         """
-        Load json to a new :class:`thoth.ThothEnvelope` instance.
+        Load a new :class:`thoth.ThothEnvelope` instance from the given frames.
 
-        Automatically converts to string if the passed object is
-        a :class:`bytes.encode()` object.
+        The codec is looked up using the id sent in the second frame.
 
         :param frames: Frames, as received by :meth:`zmq.socket.recv_multipart`
-        :param encoding: The encoding to use for :meth:`bytes.encode()`; default UTF-8
+        :param encoding: The encoding to use for strings; default UTF-8
         :return: :class:`thoth.ThothEnvelope` instance
         """
         encoding = encoding if encoding else 'utf-8'
-        topic, origin, data, ts = [json.loads(x.decode(encoding)) for x in frames]
+        topic, codec_id, *body = frames
+        codec = get_codec(as_buffer(codec_id)[0])
+        origin, data, ts = codec.decode(body, encoding)
 
-        return ThothEnvelope(topic, origin, data, ts)
+        return ThothEnvelope(str(as_buffer(topic), encoding), origin, data, ts, codec=codec)
 
     def convert_to_frames(self, encoding=None):
         """
-        Encode the :class:`thoth.ThothEnvelope` attributes as a list of json-serialized strings.
+        Encode the :class:`thoth.ThothEnvelope` attributes as list of frames.
 
         :param encoding: the encoding to us for :meth:`str.encode()`, default UTF-8
-        :return: list of :class:`bytes`
+        :return: list of bytes-like frames
         """
+        encoding = encoding or 'utf-8'
         self.update_ts()
-        return [json.dumps(x.encode(encoding or 'utf-8'))
-                for x in (self.topic,self.origin, self.data, self.ts)]
+        return ([self.topic.encode(encoding), self.codec.id_frame] +
+                self.codec.encode(self.origin, self.data, self.ts, encoding))
 
     def update_ts(self):
         """Update the :attr:`thoth.ThothEnvelope.ts` attribute with the current UNIX time."""
@@ -0,0 +1,246 @@
+"""Rate-limited, pipelined sending of subscription requests.
+
+Exchanges limit the number of requests a client may send per second, per connection or per
+IP address. Subscribing to hundreds of symbols with a fixed pause after each request is
+needlessly slow, and sending them all at once gets the connection dropped. A
+:class:`SubscriptionScheduler` sends a round of requests from a background thread as fast as
+a :class:`TokenBucket` allows - i.e. a burst, then at the documented rate - without blocking
+the connection's thread, which keeps receiving the data of channels subscribed so far.
+
+Requests are batched if the exchange accepts several symbols per request (see
+:func:`batched`). To spread the load across connections, each connection gets its own
+scheduler, e.g. by sharding the symbols with a :class:`thoth.core.pool.ConnectionPool`;
+schedulers of an exchange limiting requests per IP address share a single bucket.
+
+The time from starting a round until all its requests were sent - or acknowledged, if the
+connector passes the exchange's responses to :meth:`SubscriptionScheduler.acknowledge` - is
+the time to full coverage, recorded by :attr:`SubscriptionScheduler.coverage`.
+"""
+
+# Import Built-Ins
+import logging
+import time
+from threading import Thread, Event, Lock
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.stats import Histogram
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+def batched(items, size):
+    """Split the given items into lists of at most ``size`` items.
+
+    :param items: iterable of items, e.g. symbols
+    :param size: maximum number of items per batch
+    :return: list of lists
+    """
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class TokenBucket:
+    """Thread-safe token bucket, holding up to ``burst`` tokens refilled at ``rate`` per second."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        """Initialize the instance.
+
+        :param rate: tokens added per second
+        :param burst: maximum number of tokens; defaults to 1
+        :param clock: callable returning the current time in seconds
+        """
+        self.rate = rate
+        self.burst = burst or 1
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self._lock = Lock()
+
+    def reserve(self):
+        """Take a token, returning the time to wait until it is available.
+
+        The token is taken right away, so concurrent callers are queued up behind each other.
+
+        :return: float, seconds
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - 1
+            self.updated = now
+            return max(0, -self.tokens / self.rate)
+
+
+class _Round:
+    """State of a round of subscription requests."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, requests, acknowledged):
+        """Initialize the instance."""
+        self.requests = requests
+        self.acknowledged = acknowledged
+        self.sent = 0
+        self.acks = 0
+        self.finished = False
+        self.started = time.monotonic_ns()
+        self.covered = Event()
+        self.cancelled = Event()
+
+
+class SubscriptionScheduler:
+    """Send rounds of subscription requests as fast as the exchange's rate limit allows."""
+
+    def __init__(self, rate, burst=None, bucket=None, name=None, significant_bits=None):
+        """Initialize the instance.
+
+        :param rate: requests per second allowed by the exchange
+        :param burst: number of requests allowed back-to-back; defaults to 1
+        :param bucket: :class:`TokenBucket` to take tokens from, shared by the schedulers of
+                       connections subject to the same limit; ``rate`` and ``burst`` are
+                       ignored if given
+        :param name: name used in log messages
+        :param significant_bits: precision of the coverage time histogram, see
+                                 :class:`thoth.core.stats.Histogram`
+        """
+        self.bucket = bucket or TokenBucket(rate, burst)
+        self.name = name or 'SubscriptionScheduler'
+        self.coverage = Histogram(significant_bits)
+        self.last_coverage = None
+        self._round = None
+        self._lock = Lock()
+
+    def start(self, send, requests, acknowledged=False):
+        """Start sending a round of requests, cancelling the previous round.
+
+        Call this for every new connection, e.g. in its ``_on_open()`` handler.
+
+        :param send: callable sending a single request
+        :param requests: iterable of requests, passed to ``send``
+        :param acknowledged: if True, the round covers all channels once
+                             :meth:`acknowledge` was called for each request; otherwise, once
+                             all requests were sent
+        :return: :class:`threading.Thread` sending the requests
+        """
+        round_ = _Round(list(requests), acknowledged)
+        with self._lock:
+            if self._round is not None:
+                self._round.cancelled.set()
+            self._round = round_
+        return self._spawn(round_, send)
+
+    def _spawn(self, round_, send):
+        """Start the thread sending the unsent requests of the given round."""
+        thread = Thread(target=self._run, args=(round_, send), daemon=True,
+                        name='%s-subscriptions' % self.name)
+        thread.start()
+        return thread
+
+    def cancel(self):
+        """Stop sending the requests of the current round."""
+        with self._lock:
+            if self._round is not None:
+                self._round.cancelled.set()
+
+    def extend(self, send, requests, acknowledged=False):
+        """Add requests to the current round, e.g. for newly listed symbols.
+
+        The current round is extended until it covers all its channels - if it sent all its
+        requests but awaits acknowledgements, sending resumes with the added requests, so
+        the pending acknowledgements are credited to the round which sent their requests.
+        Starts a new round if the current round is covered or was cancelled.
+
+        :param send: callable sending a single request
+        :param requests: iterable of requests, passed to ``send``
+        :param acknowledged: whether a new round is covered once acknowledged, see
+                             :meth:`start`
+        :return: :class:`threading.Thread` sending the requests if a round was started or
+                 resumed, otherwise None
+        """
+        with self._lock:
+            round_ = self._round
+            if (round_ is not None and not round_.covered.is_set() and
+                    not round_.cancelled.is_set()):
+                round_.requests.extend(requests)
+                if not round_.finished:
+                    return None
+                round_.finished = False
+                return self._spawn(round_, send)
+        return self.start(send, requests, acknowledged)
+
+    def _run(self, round_, send):
+        """Send the unsent requests of the given round, waiting for tokens between them."""
+        with self._lock:
+            sent = round_.sent
+        while True:
+            with self._lock:
+                if sent == len(round_.requests):
+                    round_.finished = True
+                    return
+                request = round_.requests[sent]
+            if round_.cancelled.wait(self.bucket.reserve()):
+                return
+            try:
+                send(request)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("%s: Failed to send %s - cancelling round.", self.name, request)
+                with self._lock:
+                    round_.finished = True
+                    round_.cancelled.set()
+                return
+            sent += 1
+            with self._lock:
+                round_.sent += 1
+                # Finish under the same lock, so extend() cannot add requests left unsent
+                round_.finished = sent == len(round_.requests)
+                if not round_.acknowledged:
+                    self._check_coverage(round_)
+                if round_.finished:
+                    return
+
+    def acknowledge(self):
+        """Count a successful response to a request of the current round."""
+        with self._lock:
+            if self._round is not None and self._round.acknowledged:
+                self._round.acks += 1
+                self._check_coverage(self._round)
+
+    def _check_coverage(self, round_):
+        """Record the round's time to full coverage once complete; hold the lock."""
+        done = round_.acks if round_.acknowledged else round_.sent
+        if done < len(round_.requests) or round_.covered.is_set():
+            return
+        elapsed = time.monotonic_ns() - round_.started
+        self.coverage.record(elapsed)
+        self.last_coverage = elapsed / 1e9
+        round_.covered.set()
+        log.info("%s: Subscribed to all %d channels in %.3fs.", self.name,
+                 len(round_.requests), self.last_coverage)
+
+    def wait(self, timeout=None):
+        """Wait until the current round covers all channels.
+
+        :param timeout: seconds to wait at most
+        :return: :class:`bool`, whether all channels are covered
+        """
+        round_ = self._round
+        return round_ is not None and round_.covered.wait(timeout)
+
+    def snapshot(self):
+        """Return the progress of the current round, and coverage time statistics.
+
+        :return: dict with the number of ``requests``, ``sent`` and ``acknowledged`` requests
+                 of the current round, whether it is ``covered``, the ``last_coverage`` time
+                 in seconds, and the :meth:`Histogram.summary` of ``time_to_coverage`` in
+                 nanoseconds over all rounds
+        """
+        with self._lock:
+            round_ = self._round
+            stats = {'requests': 0, 'sent': 0, 'acknowledged': 0, 'covered': False}
+            if round_ is not None:
+                stats = {'requests': len(round_.requests), 'sent': round_.sent,
+                         'acknowledged': round_.acks, 'covered': round_.covered.is_set()}
+        stats.update(last_coverage=self.last_coverage, time_to_coverage=self.coverage.summary())
+        return stats
@@ -0,0 +1,497 @@
+"""Run connectors and nodes in supervised worker processes.
+
+Connectors parse messages and nodes publish them on the interpreter thread holding the GIL;
+hosting all exchanges in one process caps the total throughput at what a single core can do.
+A :class:`Supervisor` runs each group of connectors, and each :class:`thoth.DataNode`, in a
+worker process of its own, optionally pinned to a set of CPUs, so the throughput scales with
+the number of cores.
+
+Each connector group is wired to one node: its connectors bind ``<addr>_<group>_<i>``, which
+the node's :class:`thoth.core.receiver.PullReceiver` connects to. All messages of a group go
+through the same node, so the order of messages within a topic is preserved. Groups not
+assigned to a node explicitly are spread over the nodes round-robin.
+
+Workers write a heartbeat - the time of :func:`time.monotonic`, which is shared by all
+processes - to shared memory as they make progress: nodes on every iteration of their loop,
+connector groups every ``heartbeat_interval`` seconds for as long as all their connectors run
+and received data recently. A worker whose connector died exits. The supervisor restarts
+workers which exited, or missed their heartbeats for ``heartbeat_timeout`` seconds, without
+touching the others; zmq reconnects the sockets of the restarted worker's peers. A worker
+crashing again shortly after its restart is restarted with an exponentially growing delay.
+
+The ``thoth-supervisor`` command runs a supervisor described by a JSON file::
+
+    {"addr": "ipc:///tmp/thoth",
+     "nodes": [{"name": "node", "pub_addr": "tcp://127.0.0.1:5555", "cpus": [0]}],
+     "groups": [{"name": "binance", "node": "node", "cpus": [1],
+                 "connectors": [{"connector": "binance", "kwargs": {"pairs": ["bnbbtc"]}}]}]}
+
+Connectors are resolved by name with :func:`thoth.connectors.get_connector`.
+"""
+
+# Import Built-Ins
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+# Import Third-Party
+
+# Import Home-grown
+from thoth.core.receiver import PullReceiver
+from thoth.core.websocket import backoff_delay
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+def set_affinity(cpus):
+    """Pin the calling process to the given CPUs, if the platform supports it.
+
+    :param cpus: iterable of CPU numbers
+    :return: :class:`bool`, whether the affinity was set
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        log.warning("CPU affinity is not supported on this platform - ignoring cpus=%s.", cpus)
+        return False
+    os.sched_setaffinity(0, cpus)
+    return True
+
+
+def run_worker(target, cpus, heartbeat, initializer=None):
+    """Run the target of a worker process until SIGTERM is received.
+
+    :param target: callable(stopped, beat), running until the given :class:`threading.Event`
+                   is set, and calling ``beat()`` whenever it made progress
+    :param cpus: CPUs to pin the process to, or None
+    :param heartbeat: shared :class:`multiprocessing.Value` receiving the heartbeats
+    :param initializer: callable run first, e.g. to configure logging
+    :return: :class:`None`
+    """
+    if initializer is not None:
+        initializer()
+    if cpus:
+        set_affinity(cpus)
+    stopped = threading.Event()
+
+    def shutdown(*_):
+        """Let the target return."""
+        stopped.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    # Interrupts are handled by the supervisor, which stops its workers in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def beat():
+        """Write a heartbeat."""
+        heartbeat.value = time.monotonic()
+
+    beat()
+    target(stopped, beat)
+
+
+def _is_running(conn):
+    """Return whether the thread of the given connector, or of its Pusher connection, runs."""
+    thread = conn if isinstance(conn, threading.Thread) else getattr(conn, 'connection', None)
+    return not isinstance(thread, threading.Thread) or thread.is_alive()
+
+
+def _is_fresh(conn, now, started_at, stale_after):
+    """Return whether the given connector received data within ``stale_after`` seconds."""
+    last_seen = getattr(conn, 'last_seen', None)
+    if last_seen is None:
+        return True
+    # Connectors without data since the start count from then
+    return now - (last_seen or started_at) <= stale_after
+
+
+def run_connectors(factories, addrs, stopped, beat, interval=1, stale_after=60):
+    """Run the connectors of a group until stopped, beating while all of them work.
+
+    :param factories: callables(zmq_addr), each returning a connector
+    :param addrs: addresses the connectors bind to, one per factory
+    :param stopped: :class:`threading.Event` set once the connectors should stop
+    :param beat: callable writing a heartbeat
+    :param interval: seconds between checks of the connectors
+    :param stale_after: seconds without data after which a connector counts as stuck; the
+                        group stops beating until it receives data again. Connectors without
+                        a ``last_seen`` attribute are judged by their thread only
+    :return: :class:`None`
+    :raises RuntimeError: if the thread of a connector exited, ending the worker process
+    """
+    connectors = [factory(addr) for factory, addr in zip(factories, addrs)]
+    started_at = time.monotonic()
+    for conn in connectors:
+        conn.start()
+    try:
+        while not stopped.wait(interval):
+            now = time.monotonic()
+            for conn in connectors:
+                if not _is_running(conn):
+                    raise RuntimeError("Connector %s stopped running." % type(conn).__name__)
+            if all(_is_fresh(conn, now, started_at, stale_after) for conn in connectors):
+                beat()
+    finally:
+        for conn in connectors:
+            conn.stop()
+
+
+def run_node(node_factory, name, addrs, stopped, beat):
+    """Run a node receiving from the given addresses until stopped, beating every iteration.
+
+    The node's loop iterates at least every ``poll_timeout`` seconds, which must be shorter
+    than the supervisor's ``heartbeat_timeout``.
+
+    :param node_factory: callable(name, receiver), returning a :class:`thoth.DataNode`
+    :param name: name of the node
+    :param addrs: addresses of the connectors the node receives from
+    :param stopped: :class:`threading.Event` set once the node should stop
+    :param beat: callable writing a heartbeat
+    :return: :class:`None`
+    """
+    node = node_factory(name, PullReceiver(addrs, name='%s-receiver' % name))
+    dispatch = node._dispatch  # pylint: disable=protected-access
+
+    def dispatch_and_beat(batch):
+        """Handle the batch of a loop iteration, then beat."""
+        dispatch(batch)
+        beat()
+
+    node._dispatch = dispatch_and_beat  # pylint: disable=protected-access
+
+    def watch():
+        """Let the node leave its main loop once stopped."""
+        stopped.wait()
+        node._running = False  # pylint: disable=protected-access
+
+    threading.Thread(target=watch, daemon=True).start()
+    node.start()
+    try:
+        node.run()
+    finally:
+        node.stop()
+
+
+class ConnectorFactory:
+    """Picklable factory of a connector resolved by name."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, connector, **kwargs):
+        """Initialize the instance.
+
+        :param connector: name of the connector, see :func:`thoth.connectors.get_connector`
+        :param kwargs: keyword arguments for the connector
+        """
+        self.connector = connector
+        self.kwargs = kwargs
+
+    def __call__(self, zmq_addr):
+        """Return the connector, pushing to the given address."""
+        from thoth.connectors import get_connector  # pylint: disable=import-outside-toplevel
+        return get_connector(self.connector)(zmq_addr=zmq_addr, **self.kwargs)
+
+
+class NodeFactory:
+    """Picklable factory of a :class:`thoth.DataNode` publishing with a hermes Publisher."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, pub_addr, **kwargs):
+        """Initialize the instance.
+
+        :param pub_addr: address the node's :class:`hermes.Publisher` binds to
+        :param kwargs: keyword arguments for :class:`thoth.DataNode`
+        """
+        self.pub_addr = pub_addr
+        self.kwargs = kwargs
+
+    def __call__(self, name, receiver):
+        """Return the node of the given name, receiving from the given receiver."""
+        # pylint: disable=import-outside-toplevel
+        from hermes import Publisher
+        from thoth.core.node import DataNode
+        return DataNode(name, receiver=receiver, publisher=Publisher(self.pub_addr, name),
+                        **self.kwargs)
+
+
+class _Worker:
+    """State of a supervised worker process."""
+
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    def __init__(self, name, target, cpus):
+        """Initialize the instance."""
+        self.name = name
+        self.target = target
+        self.cpus = cpus
+        self.process = None
+        self.heartbeat = None
+        self.started_at = None
+        self.restart_at = None
+        self.restarts = 0
+        self.failures = 0
+
+    def heartbeat_age(self, now):
+        """Return the seconds since the last heartbeat, or since the worker was started."""
+        return now - max(self.heartbeat.value, self.started_at)
+
+
+class Supervisor:
+    """Run connector groups and nodes in worker processes, restarting failed workers."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, addr=None, heartbeat_interval=1, heartbeat_timeout=5,
+                 max_restart_delay=30, stable_after=60, mp_context=None, initializer=None):
+        """Initialize the instance.
+
+        :param addr: address prefix of the connectors' sockets; must be an ipc or tcp
+                     address. Defaults to an ipc address unique to this process
+        :param heartbeat_interval: seconds between heartbeats of connector groups, and between
+                                   checks of the supervisor
+        :param heartbeat_timeout: seconds without heartbeat after which a worker is killed and
+                                  restarted
+        :param max_restart_delay: maximum seconds to wait before restarting a worker which
+                                  keeps failing
+        :param stable_after: seconds a worker must run to no longer count as failing
+        :param mp_context: :mod:`multiprocessing` context to start workers with
+        :param initializer: callable run first by each worker, e.g. to configure logging -
+                            the logging thread started by
+                            :func:`thoth.core.logsetup.configure_logging` does not exist in
+                            forked processes. Must be picklable unless processes are forked
+        """
+        self.addr = addr or 'ipc:///tmp/thoth_supervisor_%s' % os.getpid()
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after
+        self.mp_context = mp_context or multiprocessing.get_context()
+        self.initializer = initializer
+        self.nodes = OrderedDict()
+        self.groups = OrderedDict()
+        self.workers = OrderedDict()
+        self._stopped = threading.Event()
+        self._monitor = None
+
+    def add_node(self, name, node_factory, cpus=None):
+        """Add a node, run in a worker process of its own.
+
+        :param name: name of the node and its worker
+        :param node_factory: callable(name, receiver), returning a :class:`thoth.DataNode`;
+                             must be picklable unless processes are forked
+        :param cpus: CPUs to pin the worker to
+        :return: :class:`None`
+        """
+        self.nodes[name] = (node_factory, cpus)
+
+    def add_group(self, name, factories, node=None, cpus=None):
+        """Add a group of connectors, run in a worker process of its own.
+
+        :param name: name of the group and its worker
+        :param factories: callables(zmq_addr), each returning a connector; must be picklable
+                          unless processes are forked
+        :param node: name of the node receiving the group's messages; assigned round-robin
+                     if None
+        :param cpus: CPUs to pin the worker to
+        :return: list of the addresses the group's connectors bind to
+        """
+        addrs = ['%s_%s_%d' % (self.addr, name, i) for i in range(len(factories))]
+        self.groups[name] = (list(factories), addrs, node, cpus)
+        return addrs
+
+    def add_worker(self, name, target, cpus=None):
+        """Add a worker process running the given target.
+
+        :param name: name of the worker
+        :param target: callable(stopped, beat), running until the given
+                       :class:`threading.Event` is set, and calling ``beat()`` whenever it made
+                       progress; must be picklable unless processes are forked
+        :param cpus: CPUs to pin the worker to
+        :return: :class:`None`
+        """
+        self.workers[name] = _Worker(name, target, cpus)
+
+    def _wire(self):
+        """Add the workers of all groups and nodes, connecting each group to its node."""
+        node_addrs = OrderedDict((name, []) for name in self.nodes)
+        nodes = list(node_addrs)
+        for i, (name, (factories, addrs, node, cpus)) in enumerate(self.groups.items()):
+            if node is None and nodes:
+                node = nodes[i % len(nodes)]
+            if node is not None:
+                node_addrs[node] += addrs
+            self.add_worker(name, partial(run_connectors, factories, addrs,
+                                          interval=self.heartbeat_interval), cpus)
+        for name, (node_factory, cpus) in self.nodes.items():
+            self.add_worker(name, partial(run_node, node_factory, name, node_addrs[name]), cpus)
+
+    def start(self):
+        """Start all workers, and the thread monitoring them."""
+        self._wire()
+        self._stopped.clear()
+        for worker in self.workers.values():
+            self._spawn(worker)
+        self._monitor = threading.Thread(target=self._run_monitor, daemon=True,
+                                         name='Supervisor-monitor')
+        self._monitor.start()
+
+    def _spawn(self, worker):
+        """Start the given worker's process."""
+        worker.heartbeat = self.mp_context.Value('d', 0.0, lock=False)
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        worker.process = self.mp_context.Process(
+            target=run_worker, name=worker.name, daemon=True,
+            args=(worker.target, worker.cpus, worker.heartbeat, self.initializer))
+        worker.process.start()
+        log.info("Started worker %s (pid %s, cpus %s).", worker.name, worker.process.pid,
+                 worker.cpus)
+
+    def _run_monitor(self):
+        """Check the workers every heartbeat interval, until stopped."""
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self.check()
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception(e)
+
+    def check(self):
+        """Restart workers which exited or missed their heartbeats.
+
+        :return: list of the names of the workers found failed
+        """
+        failed = []
+        now = time.monotonic()
+        for worker in self.workers.values():
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    self._spawn(worker)
+                continue
+            if not worker.process.is_alive():
+                reason = 'exited with code %s' % worker.process.exitcode
+            elif worker.heartbeat_age(now) > self.heartbeat_timeout:
+                reason = 'missed its heartbeats for %.1fs' % worker.heartbeat_age(now)
+                worker.process.kill()
+                worker.process.join(1)
+            else:
+                if worker.failures and now - worker.started_at > self.stable_after:
+                    worker.failures = 0
+                continue
+            failed.append(worker.name)
+            delay = backoff_delay(worker.failures, self.max_restart_delay)
+            worker.failures += 1
+            worker.restarts += 1
+            log.error("Worker %s %s - restarting in %.2fs.", worker.name, reason, delay)
+            worker.restart_at = now + delay
+            if not delay:
+                self._spawn(worker)
+        return failed
+
+    def stop(self, timeout=5):
+        """Stop the monitor, then the connector groups' and the nodes' workers.
+
+        :param timeout: seconds to wait for each worker to exit before killing it
+        :return: :class:`None`
+        """
+        self._stopped.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        # Connectors first, so the nodes may publish what they sent until then
+        for names in (list(self.groups), [n for n in self.workers if n not in self.groups]):
+            workers = [self.workers[name] for name in names if name in self.workers
+                       and self.workers[name].process is not None]
+            for worker in workers:
+                worker.process.terminate()
+            for worker in workers:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    log.warning("Worker %s did not exit in time - killing it.", worker.name)
+                    worker.process.kill()
+                    worker.process.join()
+        self.workers.clear()
+
+    def run(self):
+        """Start the supervisor, and run it until SIGTERM or SIGINT is received."""
+        stopped = threading.Event()
+
+        def shutdown(*_):
+            """Let the supervisor leave its main loop."""
+            stopped.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.start()
+        try:
+            while not stopped.wait(1):
+                pass
+        finally:
+            self.stop()
+
+    def snapshot(self):
+        """Return the state of all workers.
+
+        :return: dict by worker name of dicts with the worker's ``pid``, whether it is
+                 ``alive``, its number of ``restarts``, the seconds since its last heartbeat
+                 (``heartbeat_age``) and its ``cpus``
+        """
+        now = time.monotonic()
+        return {name: {'pid': worker.process.pid if worker.process else None,
+                       'alive': bool(worker.process and worker.process.is_alive()),
+                       'restarts': worker.restarts,
+                       'heartbeat_age': worker.heartbeat_age(now) if worker.process else None,
+                       'cpus': worker.cpus}
+                for name, worker in list(self.workers.items())}
+
+
+def from_config(config, **kwargs):
+    """Return a :class:`Supervisor` described by the given config.
+
+    :param config: dict as described in :mod:`thoth.core.supervisor`; further top-level keys
+                   are passed to :class:`Supervisor`
+    :param kwargs: further keyword arguments for :class:`Supervisor`
+    :return: :class:`Supervisor`
+    """
+    config = dict(config)
+    nodes, groups = config.pop('nodes', []), config.pop('groups', [])
+    supervisor = Supervisor(**config, **kwargs)
+    for node in nodes:
+        supervisor.add_node(node['name'], NodeFactory(node['pub_addr'], **node.get('kwargs', {})),
+                            cpus=node.get('cpus'))
+    for group in groups:
+        factories = [ConnectorFactory(conn['connector'], **conn.get('kwargs', {}))
+                     for conn in group['connectors']]
+        supervisor.add_group(group['name'], factories, node=group.get('node'),
+                             cpus=group.get('cpus'))
+    return supervisor
+
+
+def main(argv=None):
+    """Run the supervisor described by a JSON config file; entry point of ``thoth-supervisor``.
+
+    :param argv: command line arguments; defaults to :data:`sys.argv`
+    :return: :class:`None`
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('config', help='path of the JSON config file')
+    parser.add_argument('--log-file', default=None, help='log to this file instead of stderr')
+    parser.add_argument('--log-level', default='INFO', help='level of the thoth logger')
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    from thoth.core.logsetup import configure_logging, stop_logging
+    setup_logging = partial(configure_logging, args.log_file, level=args.log_level.upper())
+    listener = setup_logging()
+    try:
+        with open(args.config) as f:
+            supervisor = from_config(json.load(f), initializer=setup_logging)
+        supervisor.run()
+    finally:
+        stop_logging(listener)
@@ -0,0 +1,101 @@
+"""Precompiled tables of the topics a connector publishes.
+
+Connectors build the topic of every message from its pair, channel and event. A
+:class:`thoth.core.topics.TopicTable` holds these topics pre-encoded as :class:`bytes`, keyed
+by whatever identifies them in a message - a stream name, or a ``(event, pair)`` tuple, for
+example. It is filled when the connector subscribes, so looking up a message's topic is a
+single dict hit, and pushing it requires no concatenation or encoding; each topic exists as
+a single :class:`bytes` object, shared by all messages.
+
+Keys not known at subscribe time may be resolved by a factory. Since these keys are taken
+from message content, only topics found are added to the table, and only up to ``max_resolved``
+of them; keys without a topic, or beyond the limit, are resolved anew on every lookup. The
+table also lists all topics a connector may publish (see
+:meth:`TopicTable.topics`).
+"""
+
+# Import Built-Ins
+import logging
+
+# Import Third-Party
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class TopicTable:
+    """Map message keys to pre-encoded topics."""
+
+    def __init__(self, factory=None, max_resolved=1024):
+        """Initialize the instance.
+
+        :param factory: callable(key), returning the :class:`str` topic of a key not in the
+                        table, or None if the key has no topic
+        :param max_resolved: maximum number of topics resolved by the factory to add to the
+                             table
+        """
+        self.factory = factory
+        self.max_resolved = max_resolved
+        self.resolved = 0
+        self._topics = {}
+
+    def add(self, key, topic):
+        """Add the given topic, replacing the key's previous topic, if any.
+
+        :param key: hashable key identifying the topic's messages
+        :param topic: :class:`str` topic, or None if messages of this key have no topic
+        :return: the topic as :class:`bytes`, or None
+        """
+        if topic is not None and not isinstance(topic, bytes):
+            topic = topic.encode('UTF-8')
+        self._topics[key] = topic
+        return topic
+
+    def add_templates(self, pairs, templates):
+        """Add the topics of all combinations of the given pairs and templates.
+
+        :param pairs: iterable of pairs
+        :param templates: dict of events to topic templates, formatted with ``pair``; added
+                          with ``(event, pair)`` tuples as keys
+        :return: :class:`None`
+        """
+        for pair in pairs:
+            for event, template in templates.items():
+                self.add((event, pair), template.format(pair=pair))
+
+    def get(self, key):
+        """Return the topic of the given key.
+
+        :param key: hashable key
+        :return: :class:`bytes` topic, or None if the key has no topic
+        """
+        try:
+            return self._topics[key]
+        except KeyError:
+            if self.factory is None:
+                return None
+        topic = self.factory(key)
+        if topic is None:
+            return None
+        if self.resolved >= self.max_resolved:
+            return topic if isinstance(topic, bytes) else topic.encode('UTF-8')
+        self.resolved += 1
+        return self.add(key, topic)
+
+    def topics(self):
+        """Return all topics in the table.
+
+        :return: sorted list of :class:`str` topics
+        """
+        return sorted({topic.decode('UTF-8') for topic in self._topics.values()
+                       if topic is not None})
+
+    def __contains__(self, key):
+        """Return whether the given key is in the table."""
+        return key in self._topics
+
+    def __len__(self):
+        """Return the number of keys in the table."""
+        return len(self._topics)
@@ -0,0 +1,177 @@
+"""Process-wide Watchdog for connector time-outs.
+
+A single daemon thread drives a heap of deadlines, replacing the :class:`threading.Timer`
+instances the connectors used to start (and cancel) on every received message.
+
+Connectors register themselves via :meth:`thoth.core.watchdog.Watchdog.watch` and only update
+their ``last_seen`` attribute whenever data arrives. Once ``last_seen + connection_timeout``
+has passed without further data, the watchdog calls the connector's
+``_connection_timed_out()`` method.
+
+Besides watching connectors, arbitrary callbacks may be scheduled using
+:meth:`thoth.core.watchdog.Watchdog.call_later`.
+"""
+
+# Import Built-Ins
+import logging
+import heapq
+import itertools
+import os
+import time
+from threading import Thread, Condition, Lock
+
+# Import Third-Party
+
+# Import Home-grown
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class ScheduledCall:
+    """Handle for a callback scheduled on a :class:`thoth.core.watchdog.Watchdog`."""
+
+    __slots__ = ['deadline', 'callback', 'cancelled']
+
+    def __init__(self, deadline, callback):
+        """Initialize the instance.
+
+        :param deadline: :func:`time.monotonic` value at which to execute the callback
+        :param callback: callable, taking no arguments
+        """
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancel the call; it is discarded lazily once its deadline is reached."""
+        self.cancelled = True
+
+
+class Watchdog(Thread):
+    """Single thread executing scheduled callbacks and detecting stale connections."""
+
+    def __init__(self):
+        """Initialize the instance."""
+        super(Watchdog, self).__init__(name='ThothWatchdog')
+        self.daemon = True
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = Condition()
+        self._watched = {}
+
+    def call_at(self, deadline, callback):
+        """Schedule the given callback for execution at the given :func:`time.monotonic` value.
+
+        :param deadline: float, monotonic time at which to execute the callback
+        :param callback: callable, taking no arguments
+        :return: :class:`thoth.core.watchdog.ScheduledCall`
+        """
+        call = ScheduledCall(deadline, callback)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._counter), call))
+            if self._heap[0][2] is call:
+                self._cond.notify()
+        return call
+
+    def call_later(self, delay, callback):
+        """Schedule the given callback for execution in ``delay`` seconds.
+
+        :param delay: float, seconds
+        :param callback: callable, taking no arguments
+        :return: :class:`thoth.core.watchdog.ScheduledCall`
+        """
+        return self.call_at(time.monotonic() + delay, callback)
+
+    def watch(self, connector):
+        """Start watching the given connector for time-outs.
+
+        The connector must supply a ``last_seen`` (:func:`time.monotonic` value) and a
+        ``connection_timeout`` attribute, as well as a ``_connection_timed_out()`` method.
+
+        Re-registering an already watched connector resets its deadline.
+
+        :param connector: connector instance
+        :return: :class:`None`
+        """
+        with self._cond:
+            self._schedule_check(connector)
+
+    def unwatch(self, connector):
+        """Stop watching the given connector.
+
+        :param connector: connector instance
+        :return: :class:`None`
+        """
+        with self._cond:
+            call = self._watched.pop(connector, None)
+        if call:
+            call.cancel()
+
+    def _schedule_check(self, connector):
+        """Schedule a time-out check for the given connector; caller must hold the lock."""
+        previous = self._watched.get(connector)
+        if previous:
+            previous.cancel()
+        deadline = connector.last_seen + connector.connection_timeout
+        call = ScheduledCall(deadline, lambda: self._check(connector, call))
+        self._watched[connector] = call
+        heapq.heappush(self._heap, (deadline, next(self._counter), call))
+        if self._heap[0][2] is call:
+            self._cond.notify()
+
+    def _check(self, connector, call):
+        """Check if the connector timed out; re-schedule the check if it received data since."""
+        with self._cond:
+            if self._watched.get(connector) is not call:
+                # The connector was unwatched or re-registered in the meantime.
+                return
+            if time.monotonic() < connector.last_seen + connector.connection_timeout:
+                self._schedule_check(connector)
+                return
+            del self._watched[connector]
+        log.debug("%r timed out, no data received in %ss.", connector,
+                  connector.connection_timeout)
+        connector._connection_timed_out()  # pylint: disable=protected-access
+
+    def run(self):
+        """Execute callbacks as their deadlines pass."""
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                deadline, _, call = self._heap[0]
+                if call.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                heapq.heappop(self._heap)
+            try:
+                call.callback()
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception(e)
+
+
+_WATCHDOG = None
+_WATCHDOG_PID = None
+_WATCHDOG_LOCK = Lock()
+
+
+def get_watchdog():
+    """Return the process-wide :class:`thoth.core.watchdog.Watchdog`, starting it if necessary.
+
+    A new instance is created in forked child processes, since the parent's thread does not
+    survive the fork.
+
+    :return: :class:`thoth.core.watchdog.Watchdog`
+    """
+    global _WATCHDOG, _WATCHDOG_PID  # pylint: disable=global-statement
+    with _WATCHDOG_LOCK:
+        if _WATCHDOG is None or _WATCHDOG_PID != os.getpid():
+            _WATCHDOG = Watchdog()
+            _WATCHDOG_PID = os.getpid()
+            _WATCHDOG.start()
+        return _WATCHDOG
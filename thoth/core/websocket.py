@@ -3,13 +3,29 @@
 Uses zeromq to pass data upward, using PUSH/PULL.
 
 Passes data without touching it.
+
+Connections are replaced make-before-break: when a connection times out or is requested to
+reconnect, a replacement is opened and subscribed (by replaying :attr:`history`) while the
+old connection keeps running. The connector switches over once the replacement delivers its
+first message, and only then closes the old connection. Lost connections are replaced right
+away; only repeated failures back off, exponentially and with jitter, up to
+``reconnect_interval`` seconds (see :func:`backoff_delay`). Connections dropped before they
+delivered data and stayed up for ``timeout`` seconds count as failures, too, so servers
+closing connections right after accepting them - banning or rate-limiting the client, or
+rejecting its subscriptions - are not hammered with reconnects.
+
+Each connection runs on a thread of its own. Messages of the active connection are handled
+under a lock, since the thread of a replaced connection may still be pushing a message while
+the replacement's thread handles its first one, and zmq sockets are not thread-safe.
 """
 
 # pylint: disable=too-many-arguments
 
 # Import Built-Ins
 import logging
-from threading import Thread, Timer
+import random
+from threading import Thread, Event, Lock, local
+from functools import partial
 from abc import abstractmethod
 
 import json
@@ -21,10 +37,34 @@ import websocket
 import zmq
 
 # Import home-grown
+from thoth.core.watchdog import get_watchdog
+from thoth.core.batching import PushBatcher
+from thoth.core.frames import pack_frames, pack_traced_frames, send_frames
 
 # Init Logging Facilities
 log = logging.getLogger(__name__)
 
+#: Delay in seconds before the second attempt of consecutive failed connection attempts.
+BACKOFF_BASE = 0.25
+
+
+def backoff_delay(failures, maximum, base=None):
+    """Return the delay before the next connection attempt.
+
+    The first attempt after a connection was lost is made right away; further consecutive
+    failures back off exponentially from ``base`` seconds, up to ``maximum`` seconds, each
+    delay randomly shortened by up to half to spread out the attempts of many connectors.
+
+    :param failures: number of consecutive failed attempts
+    :param maximum: maximum delay in seconds
+    :param base: delay after the first failed attempt; defaults to :data:`BACKOFF_BASE`
+    :return: float, seconds
+    """
+    if not failures:
+        return 0
+    delay = min(maximum, (base or BACKOFF_BASE) * 2 ** (failures - 1))
+    return delay * random.uniform(0.5, 1)
+
 
 class WebSocketConnector(Thread):
     """Websocket Connection Thread."""
@@ -32,16 +72,22 @@ class WebSocketConnector(Thread):
     # pylint: disable=too-many-instance-attributes, too-many-arguments,unused-argument
 
     def __init__(self, url, zmq_addr=None, timeout=None, reconnect_interval=None, log_level=None,
-                 ctx=None):
+                 ctx=None, batch_size=None, batch_delay=None, sample_interval=None):
         """Initialize a WebSocketConnector Instance.
 
         :param url: websocket address, defaults to v2 websocket.
         :param zmq_addr: address for zmq socket to bind to.
         :param timeout: timeout for connection; defaults to 10s
-        :param reconnect_interval: interval at which to try reconnecting;
+        :param reconnect_interval: maximum interval between repeated attempts to reconnect;
                                    defaults to 10s.
         :param log_level: logging level for the connection Logger. Defaults to
                           logging.INFO.
+        :param ctx: :class:`zmq.Context` to create the PUSH socket with
+        :param batch_size: if given, push messages in batches of up to this many messages
+        :param batch_delay: maximum time in seconds a message is held back when batching;
+                            defaults to 500us
+        :param sample_interval: if given, trace every n-th received message through its stages
+                                (see :mod:`thoth.core.stats`)
         :param args: args for Thread.__init__()
         :param kwargs: kwargs for Thread.__ini__()
         """
@@ -50,6 +96,15 @@ class WebSocketConnector(Thread):
         self.q = self.ctx.socket(zmq.PUSH)
         self.zmq_addr = zmq_addr or 'ipc:///tmp/wss'
         self.q.bind(self.zmq_addr)
+        self.batcher = PushBatcher(self.q, batch_size, batch_delay) if batch_size else None
+        self._send_frames = self.batcher.push if self.batcher else partial(send_frames, self.q)
+
+        # Tracing of sampled messages
+        self.sample_interval = sample_interval
+        self._countdown = sample_interval
+        self._socket_at = None
+        self._parsed_at = None
+        self._trace_source = type(self).__name__.encode('UTF-8')
 
         # Connection Settings
         self.url = url
@@ -62,11 +117,27 @@ class WebSocketConnector(Thread):
         self.reconnect_interval = reconnect_interval if reconnect_interval else 10
         self.paused = False
 
+        # Make-before-break replacement of connections; each connection runs on a thread of
+        # its own, while this thread opens replacements
+        self._standby = None
+        self._standby_deadline = None
+        self._active_alive = False
+        self._promoted_at = None
+        self._delivered = False
+        self._replace_requested = False
+        self._failures = 0
+        self._wakeup = Event()
+        self._stopping = Event()
+        self._lock = Lock()
+        self._opening = local()
+        self._push_lock = Lock()
+        self._handle_message = self._on_frame if sample_interval else self._on_message
+
         # Set up history of sent commands for re-subscription
         self.history = []
 
-        # Setup timer attributes
-        self.connection_timer = None
+        # Setup time-out attributes; the connection is watched by the process-wide watchdog
+        self.last_seen = time.monotonic()
         self.connection_timeout = timeout if timeout else 10
 
         self.log = logging.getLogger(self.__module__)
@@ -74,12 +145,6 @@ class WebSocketConnector(Thread):
         if log_level == logging.DEBUG:
             websocket.enableTrace(True)
 
-        formatter = logging.Formatter('%(asctime)s:%(name)s:%(levelname)s\t%(message)s')
-        file_handler = logging.FileHandler(filename='wss.log', mode='w+')
-        file_handler.setLevel(level=log_level if log_level else logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        self.log.addHandler(file_handler)
-
         super(WebSocketConnector, self).__init__()
         self.daemon = True
 
@@ -91,61 +156,183 @@ class WebSocketConnector(Thread):
         :return:
         """
         self.disconnect()
+        if self.batcher:
+            self.batcher.flush()
         self.q.close()
-        super(WebSocketConnector, self).join(self, timeout)
+        super(WebSocketConnector, self).join(timeout)
+
+    @property
+    def connected(self):
+        """Return whether the websocket connection is open."""
+        return self._is_connected
 
     def disconnect(self):
         """Disconnect from the websocket connection and joins the Thread."""
         self.reconnect_required = False
         self.disconnect_called = True
         self._is_connected = False
-        if self.conn:
-            self.conn.close()
+        self._stopping.set()
+        self._wakeup.set()
+        for conn in (self.conn, self._standby):
+            if conn:
+                conn.on_message = None
+                conn.close()
 
     def reconnect(self):
-        """Issue a reconnection by setting the reconnect_required event."""
-        # Reconnect attempt at self.reconnect_interval
-        self.reconnect_required = True
-        self._is_connected = False
-        if self.conn:
-            self.conn.close()
+        """Issue a reconnection, replacing the connection make-before-break.
+
+        The current connection keeps delivering data until its replacement does.
+        """
+        self._replace_requested = True
+        self._wakeup.set()
 
     def _connect(self):
-        """Create a websocket connection.
+        """Open the websocket connection, replacing it whenever required until disconnected.
 
-        Automatically reconnects connection if it was severed unintentionally.
+        Replacements are opened right away, unless the previous attempts failed, and become
+        the active connection once they deliver data; see :meth:`_promote`.
         """
-        self.conn = websocket.WebSocketApp(
+        self._replace_requested = True
+        while not self.disconnect_called:
+            if self._standby is not None and time.monotonic() >= self._standby_deadline:
+                self.log.warning("Replacement connection delivered no data in %ss - retrying..",
+                                 self.connection_timeout)
+                self._discard_standby()
+            if self._standby is None and (self._replace_requested or not self._active_alive):
+                if self._active_alive and self._proved_stable():
+                    self._failures = 0
+                delay = backoff_delay(self._failures, self.reconnect_interval)
+                if delay:
+                    self.log.info("Attempting to connect again in %.2f seconds.", delay)
+                    if self._stopping.wait(delay):
+                        break
+                self._replace_requested = False
+                self._open_standby()
+            timeout = None
+            if self._standby is not None:
+                timeout = max(self._standby_deadline - time.monotonic(), 0)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _open_standby(self):
+        """Open a replacement connection on a thread of its own."""
+        conn = websocket.WebSocketApp(
             self.url,
-            on_open=self._on_open,
-            on_message=self._on_message,
+            on_open=self._on_standby_open,
+            on_message=self._on_standby_message,
             on_error=self._on_error,
             on_close=self._on_close
         )
-
+        # Replacements replay the subscriptions of the connection they replace
+        self.reconnect_required = self.conn is not None
+        self._standby = conn
+        self._standby_deadline = time.monotonic() + self.connection_timeout
+        Thread(target=self._run_connection, args=(conn,), daemon=True,
+               name='%s-connection' % self.name).start()
+
+    def _discard_standby(self):
+        """Close the replacement connection, counting a failed attempt."""
+        with self._lock:
+            conn, self._standby = self._standby, None
+        if conn is not None:
+            self._failures += 1
+            conn.on_message = None
+            conn.close()
+
+    def _run_connection(self, conn):
+        """Run the given connection until it is closed; notify the connector thread."""
         ssl_defaults = ssl.get_default_verify_paths()
         sslopt_ca_certs = {'ca_certs': ssl_defaults.cafile}
-        self.conn.run_forever(sslopt=sslopt_ca_certs)
+        # Skipping the UTF-8 validation hands us the payload as received, as bytes
+        conn.run_forever(sslopt=sslopt_ca_certs, skip_utf8_validation=True)
+        with self._lock:
+            if conn is self._standby:
+                self._standby = None
+                self._failures += 1
+            elif conn is self.conn:
+                self._active_alive = False
+                self._failures = 0 if self._proved_stable() else self._failures + 1
+        self._wakeup.set()
+
+    def _proved_stable(self):
+        """Return whether the active connection delivered data and stayed up long enough.
+
+        Only such connections count as successful attempts, resetting the backoff.
+        """
+        return self._delivered and time.monotonic() - self._promoted_at >= self.connection_timeout
+
+    def _on_standby_open(self, ws):
+        """Handle the opening of a replacement connection; requests it sends go out on it.
+
+        Without a live connection to replace, there is no reason to wait for data; the
+        replacement becomes the active connection right away.
+        """
+        if self.conn is None or not self._active_alive:
+            self._promote(ws)
+        self._opening.conn = ws
+        try:
+            self._on_open(ws)
+        finally:
+            self._opening.conn = None
 
-        while self.reconnect_required:
-            if not self.disconnect_called:
-                self.log.info("Attempting to connect again in %s seconds.", self.reconnect_interval)
-                time.sleep(self.reconnect_interval)
+    def _on_standby_message(self, ws, message):
+        """Switch over to the replacement connection, which delivered its first message.
 
-                # We need to set this flag since closing the socket will
-                # set it to False
-                self.conn.keep_running = True
-                self.conn.run_forever(sslopt=sslopt_ca_certs)
+        Replacements promoted when opening handle their first message here as well.
+        """
+        if ws is self.conn or self._promote(ws):
+            self._delivered = True
+            ws.on_message = self._dispatch
+            self._dispatch(ws, message)
+
+    def _promote(self, ws):
+        """Make the given replacement the active connection, and close the previous one.
+
+        :return: :class:`bool`, whether the connection was promoted
+        """
+        with self._lock:
+            if ws is not self._standby or self.disconnect_called:
+                return False
+            old, self.conn, self._standby = self.conn, ws, None
+            self._active_alive = True
+            self._replace_requested = False
+            self._promoted_at = time.monotonic()
+            self._delivered = False
+        if old is not None:
+            self.log.info("Switched over to replacement connection.")
+            old.on_message = None
+            old.close()
+        self._wakeup.set()
+        return True
 
     def run(self):
         """Run the main method of thread."""
         self._connect()
 
+    def _dispatch(self, ws, message):
+        """Handle a message of the active connection, serialized with the previous one's."""
+        with self._push_lock:
+            self._handle_message(ws, message)
+
+    def _on_frame(self, ws, message):
+        """Stamp every ``sample_interval``-th message at reception, then handle it.
+
+        :param ws: Websocket obj
+        :param message: message as received
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._countdown = self.sample_interval
+            self._socket_at = time.time_ns()
+        self._on_message(ws, message)
+        self._socket_at = self._parsed_at = None
+
     @abstractmethod
     def _on_message(self, ws, message):
         """Handle and pass received data to the appropriate handlers.
 
-        Resets timers for time-out countdown and logs exceptions during parsing.
+        Updates :attr:`thoth.WebSocketConnector.last_seen` for the time-out watchdog and logs
+        exceptions during parsing.
 
         All messages are time-stamped
 
@@ -153,18 +340,19 @@ class WebSocketConnector(Thread):
         :param message: tuple or list of topic, data, timestamp
         :return:
         """
-        self._stop_timers()
+        # We've received data, push back the time-out deadline
+        self.last_seen = time.monotonic()
+        if self._socket_at is not None:
+            # Parsing is done; the time until the node receives the message is transport
+            self._parsed_at = time.time_ns()
 
         try:
-            self.push(message)
+            self.push(*message)
         except Exception as e:
             log.exception(e)
             log.error(message)
             raise
 
-        # We've received data, reset timers
-        self._start_timers()
-
     def _on_close(self, ws, *args):
         """Log the close and stop the time-out countdown.
 
@@ -174,8 +362,9 @@ class WebSocketConnector(Thread):
         :param *args: additional arguments
         """
         self.log.info("Connection closed")
-        self._is_connected = False
-        self._stop_timers()
+        if ws is self.conn:
+            self._is_connected = False
+            self._stop_timers()
 
     def _on_open(self, ws):
         """Log connection status, set Events for _connect(), start timers and send a test ping.
@@ -210,35 +399,40 @@ class WebSocketConnector(Thread):
         :param error: Error message
         """
         self.log.info("Connection Error - %s", error)
-        self._is_connected = False
-        self.reconnect_required = True
+        if ws is self.conn:
+            self._is_connected = False
+            self.reconnect_required = True
 
     def _stop_timers(self):
-        """Stop connection timers."""
-        if self.connection_timer:
-            self.connection_timer.cancel()
+        """Stop watching the connection for time-outs."""
+        get_watchdog().unwatch(self)
 
     def _start_timers(self):
-        """Reset and start timers for API data and connection."""
-        self._stop_timers()
-
+        """Reset the time-out deadline and register the connection with the watchdog."""
         # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
+        self.last_seen = time.monotonic()
+        get_watchdog().watch(self)
 
-    def send(self, data):
+    def send(self, data, remember=True, conn=None):
         """Send the given Payload to the API via the websocket connection.
 
         Furthermore adds the sent payload to self.history.
 
         :param data: data to be sent
+        :param remember: whether to add the payload to self.history, replaying it after
+                         reconnecting; pass False for one-off requests
+        :param conn: connection to send on, e.g. by requests sent from another thread on
+                     behalf of a connection; defaults to the connection being opened, if
+                     called while opening one, otherwise the active connection
         :return:
         """
+        # Requests sent while a replacement opens go out on the replacement
+        conn = conn or getattr(self._opening, 'conn', None) or self.conn
         if self._is_connected:
             payload = json.dumps(data)
-            self.history.append(data)
-            self.conn.send(payload)
+            if remember:
+                self.history.append(data)
+            conn.send(payload)
         else:
             log.error("Cannot send payload! Connection not established!")
 
@@ -247,13 +441,23 @@ class WebSocketConnector(Thread):
 
         The socket type is :cls:`zmq.PUSH`.
 
+        The data is passed on untouched if it is :class:`bytes`; the time of reception is sent
+        as packed 8-byte integer of nanoseconds (see :mod:`thoth.core.frames`).
+
         :param topic: The topic of the message to send.
-        :param data: data to be pushed
-        :param recv_at: float, time of reception
+        :param data: data to be pushed, :class:`bytes` or :class:`str`
+        :param recv_at: int, nanoseconds (or float, seconds) since the epoch at reception
         :return:
         """
-        payload = [topic.encode('UTF-8'), data.encode('UTF-8'), str(recv_at).encode('UTF-8')]
-        self.q.send_multipart(payload)
+        if self._socket_at is None:
+            self._send_frames(pack_frames(topic, data, recv_at))
+            return
+        # Only the first message pushed for a sampled message is traced; connectors pushing
+        # without passing through _on_message() finished parsing when calling push()
+        socket_at, self._socket_at = self._socket_at, None
+        parsed_at = self._parsed_at or time.time_ns()
+        self._send_frames(pack_traced_frames(topic, data, recv_at, socket_at, parsed_at,
+                                             self._trace_source))
 
     def _connection_timed_out(self):
         """Issue a reconnection."""
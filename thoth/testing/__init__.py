@@ -0,0 +1,2 @@
+"""Tools for testing and benchmarking Thoth without live exchanges."""
+from thoth.testing.exchange import FakeExchange, start_exchange_process, FEEDS
@@ -0,0 +1,481 @@
+"""Local websocket server emitting synthetic, exchange-shaped market data.
+
+A :class:`thoth.testing.exchange.FakeExchange` serves a :class:`Feed` to every client that
+connects. Feeds mimic the messages and the subscription handshake of an exchange's websocket
+API, closely enough for the real connectors to consume them:
+
+    :class:`BinanceFeed`
+        combined-stream ``depthUpdate`` and ``trade`` events, streamed on connect
+    :class:`GDAXFeed`
+        ``l2update`` and ``ticker`` messages, streamed after a ``subscribe`` message
+    :class:`BitfinexFeed`
+        v2 ``info``/``subscribed`` events, then ``[chanId, [price, count, amount], seq, ts]``
+        book updates
+    :class:`BitstampFeed`
+        the Pusher protocol as spoken by Bitstamp: ``pusher:connection_established``,
+        ``pusher:subscribe``/``pusher_internal:subscription_succeeded`` and channel events
+
+Messages are sent at a configurable rate, optionally in bursts of several messages. Each
+message carries the time it was sent (in nanoseconds since the epoch) - as ``_sent`` field of
+JSON objects, or as last element of lists - which :meth:`Feed.sent_at` extracts again to
+measure end-to-end latency.
+
+The server runs on its own event loop, either in a thread (:meth:`FakeExchange.start`) or in
+a separate process (:func:`start_exchange_process`), which keeps its CPU usage out of the
+client's measurements.
+"""
+
+# Import Built-Ins
+import asyncio
+import logging
+import json
+import multiprocessing
+import time
+from abc import ABC, abstractmethod
+from threading import Thread, Event
+
+# Import Third-Party
+from autobahn.asyncio.websocket import WebSocketServerProtocol, WebSocketServerFactory
+
+# Import Home-grown
+from thoth.core.frames import as_buffer
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+#: Bytes buffered by a client's transport, above which sending pauses.
+HIGH_WATER_MARK = 4 * 1024 * 1024
+
+SENT_KEY = b'"_sent":'
+
+
+class Feed(ABC):
+    """Generate the messages of one client connection.
+
+    Subclasses implement :meth:`Feed.message` and, where the exchange requires a handshake,
+    :meth:`Feed.greeting` and :meth:`Feed.handle`.
+    """
+
+    name = None
+
+    #: Whether to start streaming on connect, instead of after a subscription.
+    stream_on_open = True
+
+    def __init__(self, symbols=None):
+        """Initialize the instance.
+
+        :param symbols: list of symbols to generate messages for
+        """
+        self.symbols = symbols or self.default_symbols()
+
+    @staticmethod
+    def default_symbols():
+        """Return the symbols to use if none were given."""
+        return ['BTCUSD']
+
+    def greeting(self):
+        """Return the messages to send when a client connected."""
+        return []
+
+    def handle(self, payload):
+        """Handle a message sent by the client.
+
+        :param payload: :class:`bytes`
+        :return: tuple of list of replies and whether to start streaming
+        """
+        return [], False
+
+    @abstractmethod
+    def message(self, seq, sent_at):
+        """Return the message with the given sequence number.
+
+        :param seq: int, sequence number of the message, starting at 0
+        :param sent_at: int, nanoseconds since the epoch
+        :return: :class:`bytes`
+        """
+
+    @staticmethod
+    def sent_at(data):
+        """Extract the send time from a message generated by this feed.
+
+        :param data: bytes-like or :class:`str` message or, for Pusher-based feeds, event data
+        :return: int, nanoseconds since the epoch
+        """
+        if isinstance(data, str):
+            data = data.encode('UTF-8')
+        data = bytes(as_buffer(data))
+        start = data.rindex(SENT_KEY) + len(SENT_KEY)
+        end = start
+        while data[end:end + 1].isdigit():
+            end += 1
+        return int(data[start:end])
+
+
+def _price(seq, base):
+    """Return a price string, oscillating around the base price."""
+    return '%.2f' % (base + (seq % 50) * 0.01)
+
+
+class BinanceFeed(Feed):
+    """Binance combined-stream depth updates and trades."""
+
+    name = 'binance'
+
+    @staticmethod
+    def default_symbols():
+        """Return the symbols to use if none were given."""
+        return ['BNBBTC']
+
+    def message(self, seq, sent_at):
+        """Return a depth update, or every 4th message, a trade."""
+        symbol = self.symbols[seq % len(self.symbols)]
+        ms = sent_at // 10 ** 6
+        if seq % 4 == 3:
+            event = ('{"e":"trade","E":%d,"s":"%s","t":%d,"p":"%s","q":"1.50","T":%d,"m":true,'
+                     '"_sent":%d}' % (ms, symbol, seq, _price(seq, 100), ms, sent_at))
+            stream = symbol.lower() + '@trade'
+        else:
+            event = ('{"e":"depthUpdate","E":%d,"s":"%s","U":%d,"u":%d,"b":[["%s","2.5"]],'
+                     '"a":[["%s","0.00"]],"_sent":%d}'
+                     % (ms, symbol, seq, seq, _price(seq, 100), _price(seq, 101), sent_at))
+            stream = symbol.lower() + '@depth'
+        return ('{"stream":"%s","data":%s}' % (stream, event)).encode()
+
+
+class GDAXFeed(Feed):
+    """GDAX level2 updates and tickers, streamed after subscribing."""
+
+    name = 'gdax'
+    stream_on_open = False
+
+    @staticmethod
+    def default_symbols():
+        """Return the symbols to use if none were given."""
+        return ['BTC-USD']
+
+    def handle(self, payload):
+        """Confirm subscriptions."""
+        request = json.loads(payload)
+        if request.get('type') != 'subscribe':
+            return [], False
+        self.symbols = request.get('product_ids') or self.symbols
+        reply = {'type': 'subscriptions', 'channels': [
+            {'name': name, 'product_ids': self.symbols} for name in request.get('channels', [])]}
+        return [json.dumps(reply).encode()], True
+
+    def message(self, seq, sent_at):
+        """Return a level2 update, or every 4th message, a ticker."""
+        product = self.symbols[seq % len(self.symbols)]
+        if seq % 4 == 3:
+            return ('{"type":"ticker","sequence":%d,"product_id":"%s","price":"%s",'
+                    '"best_bid":"%s","best_ask":"%s","side":"buy","last_size":"0.01",'
+                    '"_sent":%d}' % (seq, product, _price(seq, 6500), _price(seq, 6500),
+                                     _price(seq, 6501), sent_at)).encode()
+        return ('{"type":"l2update","product_id":"%s","changes":[["buy","%s","0.5"]],'
+                '"_sent":%d}' % (product, _price(seq, 6500), sent_at)).encode()
+
+
+class BitfinexFeed(Feed):
+    """Bitfinex v2 book updates, with sequence numbers and send timestamps appended."""
+
+    name = 'bitfinex'
+    stream_on_open = False
+
+    @staticmethod
+    def default_symbols():
+        """Return the symbols to use if none were given."""
+        return ['tBTCUSD']
+
+    def __init__(self, symbols=None):
+        """Initialize the instance."""
+        super(BitfinexFeed, self).__init__(symbols)
+        self.channels = []
+
+    def greeting(self):
+        """Send the info event."""
+        return [b'{"event":"info","version":2}']
+
+    def handle(self, payload):
+        """Confirm subscriptions."""
+        request = json.loads(payload)
+        if request.get('event') != 'subscribe':
+            return [], False
+        chan_id = len(self.channels) + 1
+        self.channels.append(chan_id)
+        reply = dict(request, event='subscribed', chanId=chan_id)
+        return [json.dumps(reply).encode()], True
+
+    def message(self, seq, sent_at):
+        """Return a book update on one of the subscribed channels."""
+        chan_id = self.channels[seq % len(self.channels)]
+        return ('[%d,[%s,%d,%s],%d,%d]' % (chan_id, _price(seq, 6500), seq % 5 + 1,
+                                           '0.5' if seq % 2 else '-0.5', seq,
+                                           sent_at)).encode()
+
+    @staticmethod
+    def sent_at(data):
+        """Extract the send time, the last element of the list."""
+        if isinstance(data, str):
+            data = data.encode('UTF-8')
+        data = bytes(as_buffer(data))
+        return int(data[data.rindex(b',') + 1:].rstrip(b']'))
+
+
+class BitstampFeed(Feed):
+    """Bitstamp events on the subscribed channels, spoken in the Pusher protocol."""
+
+    name = 'bitstamp'
+    stream_on_open = False
+
+    EVENTS = (('live_trades', 'trade'), ('diff_order_book', 'data'), ('order_book', 'data'),
+              ('live_orders', 'order_created'))
+
+    def __init__(self, symbols=None):
+        """Initialize the instance."""
+        super(BitstampFeed, self).__init__(symbols)
+        self.channels = []
+
+    def greeting(self):
+        """Establish the Pusher connection."""
+        data = json.dumps({'socket_id': '1234.5678', 'activity_timeout': 120})
+        return [json.dumps({'event': 'pusher:connection_established', 'data': data}).encode()]
+
+    def handle(self, payload):
+        """Confirm subscriptions and answer pings."""
+        request = json.loads(payload)
+        event = request.get('event')
+        if event == 'pusher:ping':
+            return [b'{"event":"pusher:pong","data":"{}"}'], False
+        if event != 'pusher:subscribe':
+            return [], False
+        channel = request['data']['channel']
+        for prefix, name in self.EVENTS:
+            if channel.startswith(prefix):
+                self.channels.append((channel, name))
+                break
+        reply = {'event': 'pusher_internal:subscription_succeeded', 'channel': channel,
+                 'data': '{}'}
+        return [json.dumps(reply).encode()], True
+
+    def message(self, seq, sent_at):
+        """Return an event on one of the subscribed channels."""
+        channel, event = self.channels[seq % len(self.channels)]
+        if event == 'trade':
+            data = ('{"id":%d,"amount":0.5,"price":%s,"type":0,"timestamp":"%d",'
+                    '"_sent":%d}' % (seq, _price(seq, 6500), sent_at // 10 ** 9, sent_at))
+        elif event == 'data':
+            data = ('{"timestamp":"%d","bids":[["%s","0.5"]],"asks":[["%s","0.7"]],'
+                    '"_sent":%d}' % (sent_at // 10 ** 9, _price(seq, 6500),
+                                     _price(seq, 6501), sent_at))
+        else:
+            data = ('{"id":%d,"amount":0.5,"price":%s,"order_type":0,"datetime":"%d",'
+                    '"_sent":%d}' % (seq, _price(seq, 6500), sent_at // 10 ** 9, sent_at))
+        return json.dumps({'event': event, 'channel': channel, 'data': data}).encode()
+
+
+class HitBTCFeed(Feed):
+    """HitBTC JSON-RPC tickers of the subscribed symbols, streamed after subscribing."""
+
+    name = 'hitbtc'
+    stream_on_open = False
+
+    def __init__(self, symbols=None):
+        """Initialize the instance."""
+        super(HitBTCFeed, self).__init__(symbols)
+        self.tickers = []
+
+    def handle(self, payload):
+        """Confirm subscriptions, one symbol per request."""
+        request = json.loads(payload)
+        method = request.get('method', '')
+        if not method.startswith('subscribe'):
+            return [], False
+        if method == 'subscribeTicker':
+            self.tickers.append(request['params']['symbol'])
+        reply = {'jsonrpc': '2.0', 'result': True, 'id': request['id']}
+        return [json.dumps(reply).encode()], bool(self.tickers)
+
+    def message(self, seq, sent_at):
+        """Return a ticker of one of the subscribed symbols."""
+        symbol = self.tickers[seq % len(self.tickers)]
+        price = _price(seq, 6500)
+        return ('{"jsonrpc":"2.0","method":"ticker","params":{"ask":"%s","bid":"%s",'
+                '"last":"%s","open":"%s","low":"%s","high":"%s","volume":"1.5",'
+                '"volumeQuote":"9750","timestamp":"%d","symbol":"%s","_sent":%d}}'
+                % (price, price, price, price, price, price, sent_at // 10 ** 6, symbol,
+                   sent_at)).encode()
+
+
+FEEDS = {feed.name: feed for feed in (BinanceFeed, GDAXFeed, BitfinexFeed, BitstampFeed,
+                                      HitBTCFeed)}
+
+
+class FakeExchangeProtocol(WebSocketServerProtocol):
+    """Server protocol forwarding events to the :class:`FakeExchange`."""
+
+    exchange = None
+
+    def onOpen(self):  # pylint: disable=invalid-name
+        """Greet the client and start streaming, if the feed does so on connect."""
+        self.exchange.on_open(self)
+
+    def onMessage(self, payload, isBinary):  # pylint: disable=invalid-name
+        """Handle a message of the client."""
+        self.exchange.on_message(self, payload)
+
+    def onClose(self, wasClean, code, reason):  # pylint: disable=invalid-name
+        """Stop streaming to the client."""
+        self.exchange.on_close(self)
+
+
+class FakeExchange:
+    """Websocket server streaming a :class:`Feed` to each client."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+
+    def __init__(self, feed, rate=None, burst=1, count=None, host='127.0.0.1', port=0):
+        """Initialize the instance.
+
+        :param feed: :class:`Feed` subclass, or name of a feed in :data:`FEEDS`; instantiated
+                     per connection
+        :param rate: messages per second and connection; as fast as possible if None
+        :param burst: number of messages sent back-to-back at a time; bursts are spaced such
+                      that the rate is kept on average
+        :param count: number of messages to send per connection; unlimited if None
+        :param host: address to listen on
+        :param port: port to listen on; a free port is picked if 0
+        """
+        self.feed = FEEDS[feed] if isinstance(feed, str) else feed
+        self.rate = rate
+        self.burst = burst
+        self.count = count
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.server = None
+        self.streams = {}
+        self.feeds = {}
+        self._thread = None
+        self._ready = Event()
+
+    @property
+    def url(self):
+        """Return the URL clients connect to."""
+        return 'ws://%s:%s' % (self.host, self.port)
+
+    async def serve(self, loop=None):
+        """Start listening on the event loop.
+
+        :param loop: event loop to serve on; defaults to the current event loop
+        :return: :class:`None`
+        """
+        self.loop = loop or asyncio.get_event_loop()
+        factory = WebSocketServerFactory()
+        factory.protocol = type('FakeExchangeProtocol', (FakeExchangeProtocol,),
+                                {'exchange': self})
+        self.server = await self.loop.create_server(factory, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info("Serving %s feed at %s..", self.feed.name, self.url)
+
+    def start(self):
+        """Serve on a new event loop in a background thread.
+
+        :return: :class:`None`, once the server is listening
+        """
+        def run():
+            """Run the event loop."""
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.serve(loop))
+            self._ready.set()
+            loop.run_forever()
+
+        self._thread = Thread(target=run, name='FakeExchange', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        """Stop serving and close all connections."""
+        if self.loop is None:
+            return
+
+        def shutdown():
+            """Close the server and connections, then stop the loop."""
+            for proto in list(self.feeds):
+                proto.sendClose()
+            self.server.close()
+            self.loop.call_later(0.1, self.loop.stop)
+
+        self.loop.call_soon_threadsafe(shutdown)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def on_open(self, proto):
+        """Greet the client and start streaming, if the feed does so on connect."""
+        feed = self.feeds[proto] = self.feed()
+        for message in feed.greeting():
+            proto.sendMessage(message)
+        if feed.stream_on_open:
+            self._start_stream(proto)
+
+    def on_message(self, proto, payload):
+        """Reply to a client message and start streaming, if required."""
+        replies, stream = self.feeds[proto].handle(payload)
+        for message in replies:
+            proto.sendMessage(message)
+        if stream:
+            self._start_stream(proto)
+
+    def on_close(self, proto):
+        """Stop streaming to the client."""
+        self.feeds.pop(proto, None)
+        stream = self.streams.pop(proto, None)
+        if stream is not None:
+            stream.cancel()
+
+    def _start_stream(self, proto):
+        """Start streaming to the client, unless already doing so."""
+        if proto not in self.streams:
+            self.streams[proto] = self.loop.create_task(self._stream(proto))
+
+    async def _stream(self, proto):
+        """Send the feed's messages at the configured rate."""
+        feed, loop, burst = self.feeds[proto], self.loop, self.burst
+        interval = burst / self.rate if self.rate else 0
+        next_at = loop.time()
+        seq = 0
+        while self.count is None or seq < self.count:
+            for _ in range(burst if self.count is None else min(burst, self.count - seq)):
+                proto.sendMessage(feed.message(seq, time.time_ns()))
+                seq += 1
+            while proto.transport.get_write_buffer_size() > HIGH_WATER_MARK:
+                await asyncio.sleep(0.001)
+            next_at += interval
+            await asyncio.sleep(max(next_at - loop.time(), 0))
+        log.info("Sent %s messages.", seq)
+
+
+def _run_exchange(port_queue, feed, exchange_kwargs):
+    """Serve the feed, reporting the port on the given queue, until terminated."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    exchange = FakeExchange(feed, **exchange_kwargs)
+    loop.run_until_complete(exchange.serve(loop))
+    port_queue.put(exchange.port)
+    loop.run_forever()
+
+
+def start_exchange_process(feed, mp_context=None, **exchange_kwargs):
+    """Run a :class:`FakeExchange` in a separate process.
+
+    :param feed: name of a feed in :data:`FEEDS`, or picklable :class:`Feed` subclass
+    :param mp_context: :mod:`multiprocessing` context to start the process with
+    :param exchange_kwargs: keyword arguments for :class:`FakeExchange`
+    :return: tuple of the :class:`multiprocessing.Process` and the port it listens on
+    """
+    mp_context = mp_context or multiprocessing.get_context()
+    port_queue = mp_context.Queue()
+    process = mp_context.Process(target=_run_exchange, args=(port_queue, feed, exchange_kwargs),
+                                 name='FakeExchange', daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=10)